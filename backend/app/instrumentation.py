@@ -0,0 +1,162 @@
+"""
+Server-Timing instrumentation and admin-only request profiling
+
+Every request gets a `Server-Timing` header splitting its time into
+storage calls (`db`), endpoint logic (`app`) and `serialize` (request
+parsing, response validation and encoding). Requests slower than
+`SLOW_REQUEST_MS` are logged with the same breakdown.
+
+With `PROFILING_ENABLED=true`, a request carrying `X-Profile: 1` and the
+`X-Admin-Token` runs under the sampling profiler and is answered with the
+collapsed-stack profile instead of its normal body.
+"""
+
+import asyncio
+import functools
+import hmac
+import logging
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qsl
+
+from fastapi import Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.settings import settings
+from utils.helpers import log_api_request
+from utils.profiling import SamplingProfiler, phase, start_request
+
+logger = logging.getLogger(__name__)
+
+# One profile at a time: the sampler sees every thread of the process
+profile_lock = asyncio.Lock()
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed(*args, **kwargs):
+            with phase('app'):
+                return await endpoint(*args, **kwargs)
+    else:
+        @functools.wraps(endpoint)
+        def timed(*args, **kwargs):
+            with phase('app'):
+                return endpoint(*args, **kwargs)
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """Route whose endpoint time is `app` and whose framework overhead is `serialize`"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            with phase('serialize'):
+                return await handler(request)
+        return timed_handler
+
+
+def profiling_allowed(token: Optional[str]) -> bool:
+    return bool(
+        settings.profiling_enabled and settings.admin_token and token
+        and hmac.compare_digest(token, settings.admin_token)
+    )
+
+
+async def require_profiling_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency of admin-only profiling endpoints"""
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not profiling_allowed(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def new_profiler() -> SamplingProfiler:
+    return SamplingProfiler(interval=settings.profile_interval, max_seconds=settings.profile_max_seconds)
+
+
+def profile_response(profiler: SamplingProfiler, name: str, headers: Optional[Dict[str, str]] = None) -> PlainTextResponse:
+    """Collapsed stacks as a downloadable file (flamegraph.pl, speedscope, inferno)"""
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}.folded"',
+            "X-Profile-Samples": str(profiler.samples),
+            **(headers or {})
+        }
+    )
+
+
+class ServerTimingMiddleware:
+    """Pure ASGI middleware: phase timings per request, opt-in profiling"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        if settings.profiling_enabled and request_headers.get("x-profile") == "1":
+            await self._profile(scope, receive, send, request_headers.get("x-admin-token"))
+            return
+        if not settings.server_timing:
+            await self.app(scope, receive, send)
+            return
+
+        timings = start_request()
+        status = 500
+
+        async def send_with_timings(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", timings.header())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            duration_ms = timings.total() * 1000
+            if settings.slow_request_ms and duration_ms >= settings.slow_request_ms:
+                log_api_request(
+                    scope["path"], scope["method"],
+                    params=dict(parse_qsl(scope.get("query_string", b"").decode("latin-1"))),
+                    status=status, timings=timings.report()
+                )
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send, token: Optional[str]):
+        if not profiling_allowed(token):
+            response = PlainTextResponse("Admin token required", status_code=403)
+        elif profile_lock.locked():
+            response = PlainTextResponse("A profile is already running", status_code=409)
+        else:
+            async with profile_lock:
+                timings = start_request()
+                status = 500
+
+                async def capture(message: Message):
+                    # The profiled response's body is replaced by the profile
+                    nonlocal status
+                    if message["type"] == "http.response.start":
+                        status = message["status"]
+
+                with new_profiler() as profiler:
+                    try:
+                        await self.app(scope, receive, capture)
+                    except Exception as e:
+                        logger.error(f"Profiled request {scope['path']} failed: {e}")
+                name = "profile-" + scope["path"].strip("/").replace("/", "-")
+                response = profile_response(profiler, name, {
+                    "X-Profiled-Status": str(status),
+                    "Server-Timing": timings.header()
+                })
+        await response(scope, receive, send)
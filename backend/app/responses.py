@@ -0,0 +1,130 @@
+"""
+Response helpers for high-volume endpoints
+"""
+
+import struct
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import orjson
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+
+from config.settings import settings
+from utils.profiling import phase
+
+# Packed typed-array format for chart data, selected with this Accept type:
+#   b"TRZC" | u8 version | 3 reserved bytes | u32 header length | JSON header
+#   then chunks of: u32 row count | each column's values, little-endian,
+#   in header order; a chunk with row count 0 ends the stream.
+COLUMNAR_MEDIA_TYPE = "application/vnd.triz.columnar"
+COLUMNAR_MAGIC = b"TRZC"
+COLUMNAR_VERSION = 1
+COLUMNAR_DTYPES = {'timestamp': '<i8', 'volume': '<i8'}
+
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    orjson response that encodes numpy column arrays directly.
+
+    Returning a response object bypasses `response_model` validation, so
+    this is only for payloads built from data already trusted from storage.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with phase('serialize'):
+            return orjson.dumps(
+                content,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+            )
+
+
+def fast_path_enabled(route_name: str) -> bool:
+    """Whether a route serves row payloads without per-row model validation"""
+    return route_name in settings.fast_json_routes
+
+
+def wants_columnar(request: Request) -> bool:
+    """Whether the client asked for the packed columnar format"""
+    accept = request.headers.get("accept", "")
+    for item in accept.split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        if media_type.lower() != COLUMNAR_MEDIA_TYPE:
+            continue
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def encode_columnar(
+    columns: Dict[str, np.ndarray],
+    metadata: Dict[str, Any],
+    chunk_rows: Optional[int] = None
+) -> Iterator[bytes]:
+    """Yield the columnar stream: header, then one block per chunk of rows"""
+    chunk_rows = chunk_rows or settings.columnar_chunk_rows
+    arrays = {}
+    for name, values in columns.items():
+        if name == 'timestamp':
+            values = values.astype('datetime64[s]').astype(np.int64)
+        arrays[name] = np.ascontiguousarray(values, dtype=COLUMNAR_DTYPES.get(name, '<f8'))
+
+    rows = len(next(iter(arrays.values()))) if arrays else 0
+    header = orjson.dumps({
+        **metadata,
+        'rows': rows,
+        'columns': [{'name': name, 'dtype': values.dtype.str} for name, values in arrays.items()]
+    }, option=orjson.OPT_NAIVE_UTC)
+    yield COLUMNAR_MAGIC + struct.pack('<B3xI', COLUMNAR_VERSION, len(header)) + header
+
+    for start in range(0, rows, chunk_rows):
+        count = min(chunk_rows, rows - start)
+        yield struct.pack('<I', count) + b''.join(
+            values[start:start + count].tobytes() for values in arrays.values()
+        )
+    yield struct.pack('<I', 0)
+
+
+def decode_columnar(payload: bytes) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Reference decoder for the columnar stream (header, column arrays)"""
+    if payload[:4] != COLUMNAR_MAGIC:
+        raise ValueError("Not a columnar payload")
+    version, header_length = struct.unpack_from('<B3xI', payload, 4)
+    if version != COLUMNAR_VERSION:
+        raise ValueError(f"Unsupported columnar version {version}")
+    offset = 12
+    header = orjson.loads(payload[offset:offset + header_length])
+    offset += header_length
+
+    parts = {column['name']: [] for column in header['columns']}
+    while True:
+        (count,) = struct.unpack_from('<I', payload, offset)
+        offset += 4
+        if count == 0:
+            break
+        for column in header['columns']:
+            dtype = np.dtype(column['dtype'])
+            parts[column['name']].append(np.frombuffer(payload, dtype=dtype, count=count, offset=offset))
+            offset += count * dtype.itemsize
+
+    columns = {
+        column['name']: np.concatenate(parts[column['name']]) if parts[column['name']]
+        else np.empty(0, dtype=column['dtype'])
+        for column in header['columns']
+    }
+    return header, columns
+
+
+def columnar_response(columns: Dict[str, np.ndarray], metadata: Dict[str, Any]) -> StreamingResponse:
+    """Stream column arrays in the packed columnar format"""
+    return StreamingResponse(
+        encode_columnar(columns, metadata),
+        media_type=COLUMNAR_MEDIA_TYPE,
+        headers={"Vary": "Accept"}
+    )
@@ -0,0 +1,62 @@
+"""
+Price alert API endpoints
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+
+from schemas.alert import AlertCreate
+from services.alert_service import alert_service
+from app.instrumentation import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+@router.get("/")
+async def list_alerts(
+    status: Optional[str] = Query(None, regex="^(active|triggered)$"),
+    page: int = Query(1, ge=1),
+    size: int = Query(100, ge=1, le=1000)
+):
+    """List price alerts"""
+    try:
+        alerts, total = await alert_service.list_rules(status=status, skip=(page - 1) * size, limit=size)
+        return {"alerts": alerts, "total": total, "page": page, "size": size}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching alerts: {str(e)}")
+
+@router.post("/", status_code=201)
+async def create_alert(alert: AlertCreate):
+    """Create a price alert"""
+    try:
+        row = await alert_service.create_rule(
+            alert.kind, alert.instrument_id, alert.condition, alert.threshold, alert.repeat
+        )
+        if not row:
+            raise HTTPException(status_code=404, detail="Instrument not found")
+        return row
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating alert: {str(e)}")
+
+@router.get("/metrics")
+async def get_alert_metrics():
+    """Evaluator throughput and delivery counters of this process"""
+    return alert_service.metrics()
+
+@router.get("/fired")
+async def get_fired_alerts(limit: int = Query(50, ge=1, le=200)):
+    """Most recently fired alerts, newest first (published by the evaluator with ALERT_SINK=channel)"""
+    return {"alerts": list(alert_service.recent_fired)[:limit]}
+
+@router.delete("/{alert_id}")
+async def delete_alert(alert_id: str):
+    """Delete a price alert"""
+    try:
+        if not await alert_service.delete_rule(alert_id):
+            raise HTTPException(status_code=404, detail="Alert not found")
+        return {"message": "Alert deleted successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting alert: {str(e)}")
@@ -0,0 +1,54 @@
+"""
+Analytics API endpoints
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from datetime import datetime, timedelta
+
+from services.correlation_service import correlation_service
+from services.index_service import index_service
+from app.instrumentation import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+@router.get("/correlations")
+async def get_correlations(
+    window: int = Query(60, ge=5, le=1000),
+    interval: str = Query("1d", regex="^(1h|1d)$"),
+    include_correlation: bool = Query(True)
+):
+    """Get rolling correlation matrix and stock-vs-currency betas for the whole universe"""
+    try:
+        return await correlation_service.get_matrices(
+            window=window,
+            interval=interval,
+            include_correlation=include_correlation
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing correlations: {str(e)}")
+
+@router.get("/indices")
+async def get_indices():
+    """Current cap-weighted and equal-weighted levels with breadth, for the market and each sector"""
+    try:
+        return await index_service.get_indices()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing indices: {str(e)}")
+
+@router.get("/indices/{scope}/history")
+async def get_index_history(
+    scope: str,
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    interval: str = Query("1d", regex="^(1m|5m|15m|30m|1h|1d)$")
+):
+    """Persisted index levels and breadth of one scope ('ALL' or a sector)"""
+    try:
+        if not end_date:
+            end_date = datetime.now()
+        if not start_date:
+            start_date = end_date - timedelta(days=1 if interval != "1d" else 365)
+        return await index_service.get_history(scope, start_date, end_date, interval)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching index history: {str(e)}")
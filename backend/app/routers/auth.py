@@ -4,8 +4,9 @@ Authentication-related API endpoints
 
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
+from app.instrumentation import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 class LoginRequest(BaseModel):
     email: str
@@ -2,40 +2,103 @@
 Currency-related API endpoints
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from typing import List, Optional
 from datetime import datetime, timedelta
 
+from app.instrumentation import TimedRoute
+from app.responses import FastJSONResponse, columnar_response, fast_path_enabled, wants_columnar
 from config.database import get_db_client
 from schemas.currency import (
-    Currency, CurrencyCreate, CurrencyUpdate, CurrencyListResponse,
-    CurrencyDetailResponse, CurrencySearchRequest, CurrencyWithLatestRate
+    Currency, CurrencyCreate, CurrencyUpdate, CurrencyListResponse, CurrencyDetailResponse,
+    CurrencyRateHistoryResponse, CurrencySearchRequest, CurrencyWithLatestRate
 )
+from services.currency_service import CurrencyService
+from services.price_history import history_columns, history_rows
+from services.indicator_service import indicator_service
+from services.fx_graph import fx_graph
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.get("/", response_model=CurrencyListResponse)
 async def get_currencies(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
     search: Optional[str] = Query(None),
+    history: int = Query(0, ge=0, le=30, description="Bars of rate history per currency"),
     db_client=Depends(get_db_client)
 ):
-    """Get list of currencies with pagination and filtering"""
+    """Get list of currencies with latest rate and optional short rate history"""
     try:
-        # Placeholder implementation - will be implemented with service
-        currencies = []
-        total = 0
+        currency_service = CurrencyService(db_client)
         
-        return CurrencyListResponse(
-            currencies=currencies,
-            total=total,
+        currencies, total = await currency_service.list_currencies(
             page=page,
-            size=size
+            size=size,
+            search=search,
+            history_points=history
         )
+        
+        payload = {"currencies": currencies, "total": total, "page": page, "size": size}
+        if fast_path_enabled("get_currencies"):
+            return FastJSONResponse(payload)
+        
+        return CurrencyListResponse(**payload)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching currencies: {str(e)}")
 
+@router.get("/cross/table")
+async def get_cross_rate_table(pivot: str = Query("TRY", min_length=3, max_length=3)):
+    """Get every derivable cross rate among the polled currencies"""
+    try:
+        await fx_graph.ensure_loaded()
+        return {
+            "currencies": fx_graph.currencies,
+            "rates": fx_graph.table(pivot)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error building cross rates: {str(e)}")
+
+@router.get("/cross/{base}/{quote}")
+async def get_cross_rate(base: str, quote: str):
+    """Get the latest cross rate (e.g. EUR/USD), triangulated through TRY or USD"""
+    try:
+        await fx_graph.ensure_loaded()
+        cross = fx_graph.cross(base, quote)
+        if not cross:
+            raise HTTPException(status_code=404, detail=f"No rate path for {base.upper()}/{quote.upper()}")
+        
+        return cross
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deriving cross rate: {str(e)}")
+
+@router.get("/cross/{base}/{quote}/history")
+async def get_cross_rate_history(
+    base: str,
+    quote: str,
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    interval: str = Query("1d", regex="^(1m|5m|15m|30m|1h|1d)$")
+):
+    """Get cross rate history derived from the history of each leg"""
+    try:
+        if not end_date:
+            end_date = datetime.now()
+        if not start_date:
+            start_date = end_date - timedelta(days=30)
+        
+        history = await fx_graph.cross_history(base, quote, start_date, end_date, interval)
+        if history is None:
+            raise HTTPException(status_code=404, detail=f"No rate path for {base.upper()}/{quote.upper()}")
+        
+        return history
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching cross rate history: {str(e)}")
+
 @router.get("/{currency_id}", response_model=CurrencyDetailResponse)
 async def get_currency_detail(
     currency_id: str,
@@ -51,25 +114,73 @@ async def get_currency_detail(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching currency detail: {str(e)}")
 
-@router.get("/{currency_id}/rates")
+@router.get("/{currency_id}/rates", response_model=CurrencyRateHistoryResponse)
 async def get_currency_rates(
     currency_id: str,
+    request: Request,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
+    interval: str = Query("1d", regex="^(1m|5m|15m|30m|1h|1d)$"),
+    layout: str = Query("rows", regex="^(rows|columns)$", description="rows: one object per bar, columns: one array per field"),
     db_client=Depends(get_db_client)
 ):
-    """Get currency rate history"""
+    """Get currency rate history (packed columnar stream with Accept: application/vnd.triz.columnar)"""
     try:
-        # Placeholder implementation
-        return {
+        currency_service = CurrencyService(db_client)
+        
+        if not end_date:
+            end_date = datetime.now()
+        if not start_date:
+            start_date = end_date - timedelta(days=30)
+        
+        bars = await currency_service.get_rate_history_with_interval(
+            currency_id=currency_id,
+            start_date=start_date,
+            end_date=end_date,
+            interval=interval
+        )
+        
+        payload = {
             "currency_id": currency_id,
             "start_date": start_date,
             "end_date": end_date,
-            "rates": []
+            "interval": interval
         }
+        if wants_columnar(request):
+            return columnar_response(history_columns('currency', bars), payload)
+        if layout == "columns":
+            return FastJSONResponse({**payload, "rates": history_columns('currency', bars)})
+        
+        payload["rates"] = history_rows('currency', currency_id, bars)
+        if fast_path_enabled("get_currency_rates"):
+            return FastJSONResponse(payload)
+        return payload
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching rate history: {str(e)}")
 
+@router.get("/{currency_id}/indicators")
+async def get_currency_indicators(
+    currency_id: str,
+    interval: str = Query("1d", regex="^(1m|5m|15m|30m|1h|1d)$"),
+    days: int = Query(180, ge=1, le=3650),
+    indicators: str = Query("sma:20,ema:50,rsi:14,macd:12:26:9,bbands:20:2"),
+):
+    """Get technical indicators (SMA, EMA, RSI, MACD, Bollinger bands) for a currency"""
+    try:
+        result = await indicator_service.get_indicators(
+            kind='currency',
+            instrument_id=currency_id,
+            interval=interval,
+            spec=indicators,
+            days=days
+        )
+        
+        return {"currency_id": currency_id, **result}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing indicators: {str(e)}")
+
 @router.get("/{currency_id}/latest")
 async def get_latest_currency_rate(
     currency_id: str,
@@ -82,4 +193,23 @@ async def get_latest_currency_rate(
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching latest rate: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error fetching latest rate: {str(e)}")
+
+@router.delete("/{currency_id}")
+async def delete_currency(
+    currency_id: str,
+    db_client=Depends(get_db_client)
+):
+    """Delete a currency (Admin only)"""
+    try:
+        currency_service = CurrencyService(db_client)
+        
+        purge = await currency_service.delete_currency(currency_id)
+        if not purge:
+            raise HTTPException(status_code=404, detail="Currency not found")
+        
+        return {"message": "Currency deleted successfully", "purge": purge}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting currency: {str(e)}")
@@ -2,10 +2,14 @@
 Data management API endpoints
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from app.instrumentation import TimedRoute, new_profiler, profile_lock, profile_response, require_profiling_admin
 from config.database import get_db_client
+from config.settings import settings
+from services.health_service import health_prober
+from services.purge_service import instrument_purger
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.post("/refresh/stocks")
 async def refresh_stock_data(db_client=Depends(get_db_client)):
@@ -26,10 +30,13 @@ async def refresh_currency_data(db_client=Depends(get_db_client)):
         raise HTTPException(status_code=500, detail=f"Error refreshing currency data: {str(e)}")
 
 @router.get("/status")
-async def get_data_status():
+async def get_data_status(request: Request):
     """Get data collection status"""
     try:
+        elector = getattr(request.app.state, 'collector_elector', None)
         return {
+            "collection_mode": settings.collection_mode,
+            "collector_role": elector.role if elector else "disabled",
             "status": "active",
             "last_update": "2024-01-01T00:00:00Z",
             "stocks_count": 10,
@@ -41,15 +48,42 @@ async def get_data_status():
 
 @router.get("/health")
 async def data_health_check():
-    """Health check for data services"""
+    """Health of data services from the latest background probe"""
     try:
+        report = health_prober.report
         return {
-            "status": "healthy",
+            "status": report["status"],
+            "checked_at": report["checked_at"],
             "services": {
-                "yfinance": "active",
-                "database": "connected",
-                "cache": "active"
+                "database": report.get("database"),
+                "collector": report.get("collector"),
+                "cache": report.get("caches")
             }
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Health check failed: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Health check failed: {str(e)}")
+
+@router.get("/purges")
+async def get_purge_progress():
+    """Progress of background history purges of deleted instruments"""
+    return {"purges": instrument_purger.progress()}
+
+@router.post("/profile/collector", dependencies=[Depends(require_profiling_admin)])
+async def profile_collector_cycle(
+    request: Request,
+    kind: str = Query("stock", regex="^(stock|currency)$")
+):
+    """Run one collector cycle under the sampling profiler and return its collapsed stacks (admin only)"""
+    data_collector = getattr(request.app.state, 'data_collector', None)
+    elector = getattr(request.app.state, 'collector_elector', None)
+    # The cycle writes prices: only the collector leader may run it
+    if data_collector is None or elector is None:
+        raise HTTPException(status_code=503, detail="Data collector is not running in this process")
+    if not elector.is_leader:
+        raise HTTPException(status_code=409, detail="Only the collector leader runs collection cycles")
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    async with profile_lock:
+        with new_profiler() as profiler:
+            await data_collector.run_cycle(kind)
+    return profile_response(profiler, f"profile-collector-{kind}")
@@ -0,0 +1,89 @@
+"""
+Bulk export API endpoints
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import datetime, timedelta
+
+from config.settings import settings
+from services.export_service import EXPORT_FORMATS, export_prices, resolve_instruments
+from app.instrumentation import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+def _split(values: Optional[str]):
+    return [value.strip() for value in (values or "").split(",") if value.strip()]
+
+def _export(
+    kind: str,
+    ids: Optional[str],
+    symbols: Optional[str],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    fmt: str,
+    compression: str
+) -> StreamingResponse:
+    id_list, symbol_list = _split(ids), _split(symbols)
+    if len(id_list) + len(symbol_list) > settings.max_export_instruments:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.max_export_instruments} instruments per export"
+        )
+    
+    if not end_date:
+        end_date = datetime.now()
+    if not start_date:
+        start_date = end_date - timedelta(days=30)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    
+    instruments = resolve_instruments(kind, id_list, symbol_list)
+    if not instruments:
+        raise HTTPException(status_code=404, detail="No matching instruments")
+    
+    media_type, extension = EXPORT_FORMATS[fmt]
+    filename = f"{kind}_prices_{start_date:%Y%m%d}_{end_date:%Y%m%d}.{extension}"
+    if compression == "gzip":
+        media_type, filename = "application/gzip", f"{filename}.gz"
+    
+    return StreamingResponse(
+        export_prices(kind, instruments, start_date, end_date, fmt, compression),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/stocks")
+async def export_stock_prices(
+    ids: Optional[str] = Query(None, description="Comma separated stock ids (all stocks if no ids or symbols)"),
+    symbols: Optional[str] = Query(None, description="Comma separated symbols (THYAO, GARAN)"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    compression: str = Query("none", regex="^(none|gzip)$")
+):
+    """Stream stock price rows over a date range as NDJSON or CSV"""
+    try:
+        return _export("stock", ids, symbols, start_date, end_date, format, compression)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exporting stock prices: {str(e)}")
+
+@router.get("/currencies")
+async def export_currency_rates(
+    ids: Optional[str] = Query(None, description="Comma separated currency ids (all currencies if no ids or symbols)"),
+    symbols: Optional[str] = Query(None, description="Comma separated symbols (USDTRY=X)"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    compression: str = Query("none", regex="^(none|gzip)$")
+):
+    """Stream currency rate rows over a date range as NDJSON or CSV"""
+    try:
+        return _export("currency", ids, symbols, start_date, end_date, format, compression)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exporting currency rates: {str(e)}")
@@ -0,0 +1,91 @@
+"""
+Portfolio API endpoints
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.instrumentation import TimedRoute
+from app.responses import FastJSONResponse
+from schemas.portfolio import PortfolioCreate, PositionUpsert
+from services.portfolio_service import portfolio_service
+
+router = APIRouter(route_class=TimedRoute)
+
+@router.get("/")
+async def list_portfolios(
+    page: int = Query(1, ge=1),
+    size: int = Query(100, ge=1, le=1000)
+):
+    """Get current valuations of all portfolios (served from the last revaluation)"""
+    try:
+        portfolios, total = await portfolio_service.list_valuations(skip=(page - 1) * size, limit=size)
+        return FastJSONResponse({"portfolios": portfolios, "total": total, "page": page, "size": size})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching portfolios: {str(e)}")
+
+@router.post("/", status_code=201)
+async def create_portfolio(portfolio: PortfolioCreate):
+    """Create an empty portfolio"""
+    try:
+        return await portfolio_service.create_portfolio(portfolio.name, portfolio.base_currency)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating portfolio: {str(e)}")
+
+@router.get("/{portfolio_id}")
+async def get_portfolio(portfolio_id: str):
+    """Get a portfolio's current valuation with per-position breakdown"""
+    try:
+        valuation = await portfolio_service.get_valuation(portfolio_id)
+        if not valuation:
+            raise HTTPException(status_code=404, detail="Portfolio not found")
+        return valuation
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching portfolio: {str(e)}")
+
+@router.delete("/{portfolio_id}")
+async def delete_portfolio(portfolio_id: str):
+    """Delete a portfolio and its positions"""
+    try:
+        if not await portfolio_service.delete_portfolio(portfolio_id):
+            raise HTTPException(status_code=404, detail="Portfolio not found")
+        return {"message": "Portfolio deleted successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting portfolio: {str(e)}")
+
+@router.put("/{portfolio_id}/positions/{kind}/{instrument_id}")
+async def set_position(
+    portfolio_id: str,
+    kind: str,
+    instrument_id: str,
+    position: PositionUpsert
+):
+    """Create or replace a position; returns the revalued portfolio"""
+    try:
+        if kind not in ("stock", "currency"):
+            raise HTTPException(status_code=400, detail="kind must be stock or currency")
+        valuation = await portfolio_service.set_position(
+            portfolio_id, kind, instrument_id, position.quantity, position.average_cost
+        )
+        if not valuation:
+            raise HTTPException(status_code=404, detail="Portfolio or instrument not found")
+        return valuation
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating position: {str(e)}")
+
+@router.delete("/{portfolio_id}/positions/{kind}/{instrument_id}")
+async def remove_position(portfolio_id: str, kind: str, instrument_id: str):
+    """Remove a position"""
+    try:
+        if not await portfolio_service.remove_position(portfolio_id, kind, instrument_id):
+            raise HTTPException(status_code=404, detail="Position not found")
+        return {"message": "Position removed successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error removing position: {str(e)}")
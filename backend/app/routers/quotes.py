@@ -0,0 +1,38 @@
+"""
+Bulk quote API endpoints
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+
+from config.settings import settings
+from services.quote_service import quote_service
+from app.instrumentation import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+def _split(values: Optional[str]):
+    return [value.strip() for value in (values or "").split(",") if value.strip()]
+
+@router.get("/")
+async def get_latest_quotes(
+    ids: Optional[str] = Query(None, description="Comma separated instrument ids"),
+    symbols: Optional[str] = Query(None, description="Comma separated symbols (THYAO, USDTRY=X)"),
+    kind: Optional[str] = Query(None, regex="^(stock|currency)$")
+):
+    """Get latest quotes for many stocks and/or currencies in one call"""
+    try:
+        id_list, symbol_list = _split(ids), _split(symbols)
+        if not id_list and not symbol_list:
+            raise HTTPException(status_code=400, detail="Provide ids or symbols")
+        if len(id_list) + len(symbol_list) > settings.max_bulk_quotes:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {settings.max_bulk_quotes} instruments per request"
+            )
+        
+        return await quote_service.get_latest_quotes(kind=kind, ids=id_list, symbols=symbol_list)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching quotes: {str(e)}")
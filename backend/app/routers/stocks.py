@@ -2,18 +2,25 @@
 Stock-related API endpoints
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from typing import List, Optional
 from datetime import datetime, timedelta
 
+from app.instrumentation import TimedRoute
+from app.responses import FastJSONResponse, columnar_response, fast_path_enabled, wants_columnar
 from config.database import get_db_client
+from config.settings import settings
 from schemas.stock import (
-    Stock, StockCreate, StockUpdate, StockListResponse,
-    StockDetailResponse, StockSearchRequest, StockWithLatestPrice
+    Stock, StockCreate, StockUpdate, StockListResponse, StockDetailResponse,
+    StockPriceHistoryResponse, StockSearchRequest, StockWithLatestPrice
 )
+from services.price_history import history_columns, history_rows
 from services.stock_service import StockService
+from services.indicator_service import indicator_service
+from services.screener_service import screener_service
+from services.leaderboard_service import leaderboard_service
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 stock_service = StockService()
 
 @router.get("/", response_model=StockListResponse)
@@ -22,30 +29,61 @@ async def get_stocks(
     size: int = Query(20, ge=1, le=100),
     sector: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    history: int = Query(0, ge=0, le=30, description="Bars of price history per stock"),
     db_client=Depends(get_db_client)
 ):
-    """Get list of stocks with pagination and filtering"""
+    """Get list of stocks with latest price and optional short price history"""
     try:
         stock_service = StockService(db_client)
         
-        stocks = await stock_service.get_stocks_with_pagination(
+        stocks, total = await stock_service.list_stocks(
             page=page,
             size=size,
             sector=sector,
-            search_query=search
+            search_query=search,
+            history_points=history
         )
         
-        total = await stock_service.get_total_count(sector=sector, search_query=search)
+        payload = {"stocks": stocks, "total": total, "page": page, "size": size}
+        if fast_path_enabled("get_stocks"):
+            return FastJSONResponse(payload)
         
-        return StockListResponse(
-            stocks=stocks,
-            total=total,
-            page=page,
-            size=size
-        )
+        return StockListResponse(**payload)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching stocks: {str(e)}")
 
+@router.get("/screen")
+async def screen_stocks(
+    where: Optional[str] = Query(None, description='e.g. sector == "Banka" and change_percent > 2 and volume > 10e6'),
+    sort: Optional[str] = Query(None, description="Comma separated fields, '-' for descending"),
+    limit: int = Query(50, ge=1),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return")
+):
+    """Screen every stock against the in-memory columnar snapshot"""
+    try:
+        result = await screener_service.screen(
+            where=where,
+            sort=sort,
+            limit=min(limit, settings.max_screen_results),
+            fields=[field.strip() for field in fields.split(",") if field.strip()] if fields else None
+        )
+        return FastJSONResponse(result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error screening stocks: {str(e)}")
+
+@router.get("/leaderboards")
+async def get_leaderboards(
+    sector: Optional[str] = Query(None),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Top gainers, top losers and most active stocks, overall or for one sector"""
+    try:
+        return FastJSONResponse(await leaderboard_service.get_leaderboards(sector=sector, limit=limit))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching leaderboards: {str(e)}")
+
 @router.get("/{stock_id}", response_model=StockDetailResponse)
 async def get_stock_detail(
     stock_id: str,
@@ -79,15 +117,17 @@ async def get_stock_detail(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching stock detail: {str(e)}")
 
-@router.get("/{stock_id}/prices")
+@router.get("/{stock_id}/prices", response_model=StockPriceHistoryResponse)
 async def get_stock_prices(
     stock_id: str,
+    request: Request,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     interval: str = Query("1d", regex="^(1m|5m|15m|30m|1h|1d)$"),
+    layout: str = Query("rows", regex="^(rows|columns)$", description="rows: one object per bar, columns: one array per field"),
     db_client=Depends(get_db_client)
 ):
-    """Get stock price history with different intervals"""
+    """Get stock price history with different intervals (packed columnar stream with Accept: application/vnd.triz.columnar)"""
     try:
         stock_service = StockService(db_client)
         
@@ -97,23 +137,54 @@ async def get_stock_prices(
         if not start_date:
             start_date = end_date - timedelta(days=30)
         
-        prices = await stock_service.get_price_history_with_interval(
+        bars = await stock_service.get_price_history_with_interval(
             stock_id=stock_id,
             start_date=start_date,
             end_date=end_date,
             interval=interval
         )
         
-        return {
+        payload = {
             "stock_id": stock_id,
             "start_date": start_date,
             "end_date": end_date,
-            "interval": interval,
-            "prices": prices
+            "interval": interval
         }
+        if wants_columnar(request):
+            return columnar_response(history_columns('stock', bars), payload)
+        if layout == "columns":
+            return FastJSONResponse({**payload, "prices": history_columns('stock', bars)})
+        
+        payload["prices"] = history_rows('stock', stock_id, bars)
+        if fast_path_enabled("get_stock_prices"):
+            return FastJSONResponse(payload)
+        return payload
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching price history: {str(e)}")
 
+@router.get("/{stock_id}/indicators")
+async def get_stock_indicators(
+    stock_id: str,
+    interval: str = Query("1d", regex="^(1m|5m|15m|30m|1h|1d)$"),
+    days: int = Query(180, ge=1, le=3650),
+    indicators: str = Query("sma:20,ema:50,rsi:14,macd:12:26:9,bbands:20:2"),
+):
+    """Get technical indicators (SMA, EMA, RSI, MACD, Bollinger bands) for a stock"""
+    try:
+        result = await indicator_service.get_indicators(
+            kind='stock',
+            instrument_id=stock_id,
+            interval=interval,
+            spec=indicators,
+            days=days
+        )
+        
+        return {"stock_id": stock_id, **result}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing indicators: {str(e)}")
+
 @router.get("/{stock_id}/latest")
 async def get_latest_stock_price(
     stock_id: str,
@@ -196,11 +267,11 @@ async def delete_stock(
     try:
         stock_service = StockService(db_client)
         
-        success = await stock_service.delete_stock(stock_id)
-        if not success:
+        purge = await stock_service.delete_stock(stock_id)
+        if not purge:
             raise HTTPException(status_code=404, detail="Stock not found")
         
-        return {"message": "Stock deleted successfully"}
+        return {"message": "Stock deleted successfully", "purge": purge}
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+HTTP load generator
+
+Drives a weighted mix of client behaviours against a running instance
+(--url) or the app in-process over ASGI (default), with many concurrent
+async clients, and reports throughput, latency percentiles and error rate
+per route:
+
+    watchlist  poll latest quotes of a fixed watchlist (/quotes?ids=...)
+    chart      chart loads on /stocks/{id}/prices at a random interval and range
+    search     search-as-you-type: one /stocks?search= request per keystroke
+    paginate   walk a few pages of the stock list, sometimes by sector
+
+In-process runs use the local storage backend (DATABASE_BACKEND=local) seeded
+with a synthetic universe, so they work offline:
+
+    cd backend && python -m benchmarks.load --clients 50 --duration 30
+    python -m benchmarks.load --mix watchlist=6,chart=2,search=1,paginate=1 --json load.json
+    python -m benchmarks.load --url http://localhost:8000 --mix charts
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+API = "/api/v1"
+
+MIXES = {
+    "browse": {"watchlist": 40, "chart": 25, "search": 20, "paginate": 15},
+    "watchlist": {"watchlist": 1},
+    "charts": {"chart": 1},
+    "search": {"search": 3, "paginate": 2},
+}
+
+CHART_INTERVALS = (("5m", 1), ("15m", 2), ("1h", 7), ("1d", 30))
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'browse' or 'watchlist=6,chart=2' -> scenario weights"""
+    if spec in MIXES:
+        return dict(MIXES[spec])
+    weights = {}
+    for item in spec.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {name} (choose from {', '.join(SCENARIOS)})")
+        weights[name] = float(weight or 1)
+    if not weights or sum(weights.values()) <= 0:
+        raise ValueError("A mix needs at least one scenario with a positive weight")
+    return weights
+
+
+@dataclass
+class RouteStats:
+    latencies: List[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    errors: int = 0
+
+    def summary(self, seconds: float) -> Dict:
+        latencies = np.array(self.latencies) * 1000
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+        return {
+            "requests": len(self.latencies),
+            "rps": round(len(self.latencies) / seconds, 1),
+            "p50_ms": round(float(p50), 2),
+            "p90_ms": round(float(p90), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(latencies.max()), 2) if len(latencies) else 0.0,
+            "error_rate": round(self.errors / len(self.latencies), 4) if self.latencies else 0.0,
+            "statuses": dict(sorted(self.statuses.items()))
+        }
+
+
+class LoadClient:
+    """One simulated user: a watchlist, a random source and shared per-route stats"""
+
+    def __init__(self, http: httpx.AsyncClient, stats: Dict[str, RouteStats], universe: List[Dict],
+                 rng: random.Random, think: float, watchlist_size: int):
+        self.http, self.stats, self.universe, self.rng, self.think = http, stats, universe, rng, think
+        self.watchlist = [stock["id"] for stock in rng.sample(universe, min(watchlist_size, len(universe)))]
+        self.sectors = sorted({stock["sector"] for stock in universe if stock.get("sector")})
+
+    async def get(self, route: str, path: str, params: Optional[Dict] = None):
+        started = time.perf_counter()
+        stats = self.stats.setdefault(route, RouteStats())
+        try:
+            response = await self.http.get(path, params=params)
+            await response.aread()
+            stats.statuses[str(response.status_code)] += 1
+            if response.status_code >= 400:
+                stats.errors += 1
+        except httpx.HTTPError as e:
+            stats.statuses[type(e).__name__] += 1
+            stats.errors += 1
+        stats.latencies.append(time.perf_counter() - started)
+
+    async def pause(self, seconds: float):
+        if self.think:
+            await asyncio.sleep(seconds * self.think * self.rng.uniform(0.5, 1.5))
+
+    async def watchlist_poll(self):
+        await self.get("GET /quotes (watchlist)", f"{API}/quotes/", {"ids": ",".join(self.watchlist), "kind": "stock"})
+        await self.pause(1.0)
+
+    async def chart(self):
+        stock = self.rng.choice(self.universe)
+        interval, days = self.rng.choice(CHART_INTERVALS)
+        end = datetime.now()
+        params = {"interval": interval, "start_date": (end - timedelta(days=days)).isoformat(timespec="seconds")}
+        await self.get(f"GET /stocks/{{id}}/prices [{interval}]", f"{API}/stocks/{stock['id']}/prices", params)
+        await self.pause(2.0)
+
+    async def search(self):
+        stock = self.rng.choice(self.universe)
+        term = stock["symbol"] if self.rng.random() < 0.7 else str(stock.get("name") or stock["symbol"])
+        for length in range(1, min(len(term), self.rng.randint(3, 6)) + 1):
+            await self.get("GET /stocks?search", f"{API}/stocks/", {"search": term[:length], "size": 10})
+            await self.pause(0.15)
+
+    async def paginate(self):
+        params = {"size": self.rng.choice((20, 50, 100))}
+        if self.sectors and self.rng.random() < 0.3:
+            params["sector"] = self.rng.choice(self.sectors)
+        for page in range(1, self.rng.randint(1, 5) + 1):
+            await self.get("GET /stocks?page", f"{API}/stocks/", {**params, "page": page})
+            await self.pause(0.5)
+
+
+SCENARIOS: Dict[str, Callable[[LoadClient], Awaitable[None]]] = {
+    "watchlist": LoadClient.watchlist_poll,
+    "chart": LoadClient.chart,
+    "search": LoadClient.search,
+    "paginate": LoadClient.paginate,
+}
+
+
+async def discover_universe(http: httpx.AsyncClient, max_pages: int = 50, size: int = 100) -> List[Dict]:
+    """Stock ids, symbols and sectors of the target, read from the list endpoint"""
+    universe = []
+    for page in range(1, max_pages + 1):
+        response = await http.get(f"{API}/stocks/", params={"page": page, "size": size})
+        response.raise_for_status()
+        stocks = response.json()["stocks"]
+        universe += [
+            {"id": str(stock["id"]), "symbol": stock["symbol"], "name": stock.get("name"), "sector": stock.get("sector")}
+            for stock in stocks
+        ]
+        if len(stocks) < size:
+            break
+    return universe
+
+
+async def run_load(
+    http: httpx.AsyncClient,
+    universe: List[Dict],
+    mix: Dict[str, float],
+    clients: int = 50,
+    duration: float = 30,
+    think: float = 1.0,
+    watchlist_size: int = 20,
+    seed: int = 42
+) -> Dict:
+    """Run `clients` concurrent users for `duration` seconds; per-route report"""
+    if not universe:
+        raise ValueError("The target has no stocks to request")
+    stats: Dict[str, RouteStats] = {}
+    names, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + duration
+
+    async def user(index: int):
+        rng = random.Random(seed * 100_003 + index)
+        client = LoadClient(http, stats, universe, rng, think, watchlist_size)
+        # Spread first requests so clients do not start in lockstep
+        await asyncio.sleep(rng.uniform(0, min(1.0, duration / 10)))
+        while time.perf_counter() < deadline:
+            await SCENARIOS[rng.choices(names, weights)[0]](client)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(index) for index in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    total = RouteStats()
+    for route_stats in stats.values():
+        total.latencies += route_stats.latencies
+        total.statuses.update(route_stats.statuses)
+        total.errors += route_stats.errors
+    return {
+        "clients": clients,
+        "seconds": round(elapsed, 2),
+        "mix": mix,
+        "universe": len(universe),
+        "routes": {route: stats[route].summary(elapsed) for route in sorted(stats)},
+        "total": total.summary(elapsed)
+    }
+
+
+def print_report(report: Dict):
+    print(f"{report['clients']} clients, {report['seconds']} s, {report['universe']:,} stocks, mix {report['mix']}")
+    print(f"{'route':<34} {'requests':>9} {'rps':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    for route, row in list(report["routes"].items()) + [("total", report["total"])]:
+        print(
+            f"{route:<34} {row['requests']:>9,} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p90_ms']:>8.1f} "
+            f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f} {row['error_rate']:>7.1%}"
+        )
+
+
+def in_process_client(symbols: int) -> httpx.AsyncClient:
+    """ASGI client for the app itself on seeded local storage (lifespan not run: no collector)"""
+    from config.settings import settings
+    settings.database_backend = "local"
+    settings.local_storage_symbols = symbols
+
+    from config.database import get_db_client
+    from main import app
+    get_db_client()  # seed before the clock starts
+    # TrustedHostMiddleware only accepts known hosts
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://localhost")
+
+
+async def _main(args) -> Dict:
+    if args.url:
+        limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+        http = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout)
+    else:
+        http = in_process_client(args.symbols)
+    async with http:
+        universe = await discover_universe(http)
+        return await run_load(
+            http, universe, parse_mix(args.mix), clients=args.clients, duration=args.duration,
+            think=args.think, watchlist_size=args.watchlist_size, seed=args.seed
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running instance (default: the app in-process)")
+    parser.add_argument("--mix", default="browse", help=f"{', '.join(MIXES)} or name=weight,... of {', '.join(SCENARIOS)}")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--think", type=float, default=1.0, help="think-time multiplier, 0 for closed-loop saturation")
+    parser.add_argument("--watchlist-size", type=int, default=20)
+    parser.add_argument("--symbols", type=int, default=5000, help="synthetic universe of in-process runs")
+    parser.add_argument("--timeout", type=float, default=30, help="request timeout against --url")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    report = asyncio.run(_main(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
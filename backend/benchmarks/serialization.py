@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Price history serialization benchmark
+
+Compares the default FastAPI path (response_model validation + json.dumps)
+with the fast paths (orjson on trusted rows, orjson on column arrays, the
+packed binary column stream) for a synthetic year of 5-minute bars.
+
+    cd backend && python -m benchmarks.serialization --bars 100000
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from pydantic import TypeAdapter
+
+from app.responses import FastJSONResponse, encode_columnar
+from schemas.stock import StockPriceHistoryResponse
+from services.price_history import history_columns, history_rows, with_changes
+
+
+def synthetic_bars(count: int, step: int = 300):
+    """Random-walk OHLCV bars ending now"""
+    rng = np.random.default_rng(42)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, count)))
+    spread = np.abs(rng.normal(0, 0.002, count)) * close
+    end = int(time.time()) // step * step
+    bars = {
+        'epoch': np.arange(end - (count - 1) * step, end + 1, step, dtype=np.int64),
+        'open': np.r_[close[0], close[:-1]],
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.integers(1_000, 100_000, count).astype(float)
+    }
+    return with_changes('stock', bars)
+
+
+def envelope(bars):
+    return {
+        "stock_id": "1",
+        "start_date": datetime.fromtimestamp(int(bars['epoch'][0]), tz=timezone.utc),
+        "end_date": datetime.fromtimestamp(int(bars['epoch'][-1]), tz=timezone.utc),
+        "interval": "5m"
+    }
+
+
+def validated_rows(bars, adapter):
+    """What FastAPI does with response_model and the default JSONResponse"""
+    payload = {**envelope(bars), "prices": history_rows('stock', "1", bars)}
+    value = adapter.validate_python(payload)
+    content = adapter.dump_python(value, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_rows(bars, adapter):
+    return FastJSONResponse({**envelope(bars), "prices": history_rows('stock', "1", bars)}).body
+
+
+def fast_columns(bars, adapter):
+    return FastJSONResponse({**envelope(bars), "prices": history_columns('stock', bars)}).body
+
+
+def binary_columns(bars, adapter):
+    return b"".join(encode_columnar(history_columns('stock', bars), envelope(bars)))
+
+
+def run(name, encode, bars, adapter, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = encode(bars, adapter)
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    print(f"{name:<18} {best * 1000:>9.1f} ms  {len(body) / 1e6:>7.2f} MB  {len(bars['epoch']) / best:>12,.0f} bars/s")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, default=105_120, help="bars per response (default: a year of 5m bars)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bars = synthetic_bars(args.bars)
+    adapter = TypeAdapter(StockPriceHistoryResponse)
+
+    print(f"{args.bars:,} bars, best of {args.repeat}")
+    baseline = run("validated rows", validated_rows, bars, adapter, args.repeat)
+    for name, encode in (("orjson rows", fast_rows), ("orjson columns", fast_columns), ("binary columns", binary_columns)):
+        best = run(name, encode, bars, adapter, args.repeat)
+        print(f"{'':<18} {baseline / best:>8.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
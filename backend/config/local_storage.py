@@ -0,0 +1,509 @@
+"""
+In-memory storage backend (DATABASE_BACKEND=local)
+
+Implements the subset of the supabase-py query builder this backend uses
+(select / filters / order / range / insert / upsert / update / delete and
+the RPCs behind the read paths) over plain Python rows, so the API runs
+offline. It is seeded with a synthetic universe (`LOCAL_STORAGE_SYMBOLS`)
+whose price history comes from the synthetic market data provider; load
+tests and demos need no Supabase project and no network.
+
+Equality filters go through lazily built per-column indexes, so lookups
+by instrument id stay cheap with thousands of instruments.
+"""
+
+import itertools
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_TIMESTAMP = re.compile(r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}')
+
+
+@lru_cache(maxsize=65536)
+def _epoch(text: str) -> float:
+    from utils.helpers import timestamp_to_epoch
+    return timestamp_to_epoch(text)
+
+
+def _comparable(value: Any) -> Any:
+    """Timestamps compare as instants whatever their offset, numbers numerically"""
+    if isinstance(value, str):
+        if _TIMESTAMP.match(value):
+            return _epoch(value)
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+
+def _compare(left: Any, right: Any, op: Callable[[Any, Any], bool]) -> bool:
+    if left is None or right is None:
+        return False
+    left, right = _comparable(left), _comparable(right)
+    try:
+        return op(left, right)
+    except TypeError:
+        return op(str(left), str(right))
+
+
+@lru_cache(maxsize=1024)
+def _like(pattern: str, case_sensitive: bool) -> re.Pattern:
+    regex = ''.join(
+        '.*' if char in '%*' else '.' if char == '_' else re.escape(char)
+        for char in pattern
+    )
+    return re.compile(f'^{regex}$', re.DOTALL if case_sensitive else re.DOTALL | re.IGNORECASE)
+
+
+def _is(value: Any, target: str) -> bool:
+    target = str(target).lower()
+    if target == 'null':
+        return value is None
+    return value is (target == 'true')
+
+
+def _split_values(text: str) -> List[str]:
+    """'("a","b",c)' -> ['a', 'b', 'c']"""
+    return [item.strip().strip('"') for item in text.strip().strip('()').split(',') if item.strip()]
+
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    'eq': lambda value, target: value is not None and str(value) == str(target),
+    'neq': lambda value, target: value is not None and str(value) != str(target),
+    'gt': lambda value, target: _compare(value, target, lambda a, b: a > b),
+    'gte': lambda value, target: _compare(value, target, lambda a, b: a >= b),
+    'lt': lambda value, target: _compare(value, target, lambda a, b: a < b),
+    'lte': lambda value, target: _compare(value, target, lambda a, b: a <= b),
+    'like': lambda value, target: value is not None and bool(_like(str(target), True).match(str(value))),
+    'ilike': lambda value, target: value is not None and bool(_like(str(target), False).match(str(value))),
+    'in': lambda value, targets: value is not None and str(value) in {str(target) for target in targets},
+    'is': _is,
+}
+
+
+def parse_or(expression: str) -> List[Tuple[str, str, Any]]:
+    """PostgREST `or` filter ('name.ilike.%a%,id.in.("1","2")') -> [(column, op, value)]"""
+    items, depth, current = [], 0, ''
+    for char in expression:
+        if char == ',' and depth == 0:
+            items.append(current)
+            current = ''
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        current += char
+    items.append(current)
+
+    conditions = []
+    for item in filter(None, (item.strip() for item in items)):
+        column, op, value = item.split('.', 2)
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported filter operator in local storage: {op}")
+        conditions.append((column, op, _split_values(value) if op == 'in' else value))
+    return conditions
+
+
+@dataclass
+class LocalResponse:
+    """Shape of a supabase-py APIResponse"""
+    data: Any
+    count: Optional[int] = None
+
+
+class LocalTable:
+    """Rows of one table with lazily built equality indexes"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows: List[Dict] = []
+        self._indexes: Dict[str, Dict[str, List[Dict]]] = {}
+        self._ids = itertools.count(1)
+
+    def index(self, column: str) -> Dict[str, List[Dict]]:
+        index = self._indexes.get(column)
+        if index is None:
+            index = {}
+            for row in self.rows:
+                if row.get(column) is not None:
+                    index.setdefault(str(row[column]), []).append(row)
+            self._indexes[column] = index
+        return index
+
+    def changed(self):
+        self._indexes.clear()
+
+    def next_id(self) -> str:
+        return str(next(self._ids))
+
+    def add(self, row: Dict) -> Dict:
+        row = dict(row)
+        if row.get('id') is None:
+            row['id'] = self.next_id()
+        self.rows.append(row)
+        return row
+
+
+class LocalQuery:
+    """Chainable query builder mirroring the supabase-py methods in use"""
+
+    def __init__(self, storage: "LocalStorageClient", table: str):
+        self.storage = storage
+        self.table = table
+        self.action = 'select'
+        self.columns: Optional[List[str]] = None
+        self.count: Optional[str] = None
+        self.filters: List[Tuple[str, str, Any]] = []
+        self.alternatives: List[List[Tuple[str, str, Any]]] = []
+        self.ordering: List[Tuple[str, bool]] = []
+        self.offset = 0
+        self.limit_rows: Optional[int] = None
+        self.payload: Any = None
+        self.on_conflict = 'id'
+        self.ignore_duplicates = False
+
+    # Statements
+    def select(self, columns: str = '*', count: Optional[str] = None) -> "LocalQuery":
+        self.columns = None if columns.strip() == '*' else [column.strip() for column in columns.split(',')]
+        self.count = count
+        return self
+
+    def insert(self, rows) -> "LocalQuery":
+        self.action, self.payload = 'insert', rows
+        return self
+
+    def upsert(self, rows, on_conflict: str = 'id', ignore_duplicates: bool = False) -> "LocalQuery":
+        self.action, self.payload = 'upsert', rows
+        self.on_conflict, self.ignore_duplicates = on_conflict or 'id', ignore_duplicates
+        return self
+
+    def update(self, values: Dict) -> "LocalQuery":
+        self.action, self.payload = 'update', values
+        return self
+
+    def delete(self) -> "LocalQuery":
+        self.action = 'delete'
+        return self
+
+    # Filters
+    def _filter(self, column: str, op: str, value: Any) -> "LocalQuery":
+        self.filters.append((column, op, value))
+        return self
+
+    def eq(self, column: str, value: Any) -> "LocalQuery":
+        return self._filter(column, 'eq', value)
+
+    def neq(self, column: str, value: Any) -> "LocalQuery":
+        return self._filter(column, 'neq', value)
+
+    def gt(self, column: str, value: Any) -> "LocalQuery":
+        return self._filter(column, 'gt', value)
+
+    def gte(self, column: str, value: Any) -> "LocalQuery":
+        return self._filter(column, 'gte', value)
+
+    def lt(self, column: str, value: Any) -> "LocalQuery":
+        return self._filter(column, 'lt', value)
+
+    def lte(self, column: str, value: Any) -> "LocalQuery":
+        return self._filter(column, 'lte', value)
+
+    def like(self, column: str, pattern: str) -> "LocalQuery":
+        return self._filter(column, 'like', pattern)
+
+    def ilike(self, column: str, pattern: str) -> "LocalQuery":
+        return self._filter(column, 'ilike', pattern)
+
+    def in_(self, column: str, values) -> "LocalQuery":
+        return self._filter(column, 'in', list(values))
+
+    def is_(self, column: str, value: Any) -> "LocalQuery":
+        return self._filter(column, 'is', value)
+
+    def or_(self, expression: str) -> "LocalQuery":
+        self.alternatives.append(parse_or(expression))
+        return self
+
+    # Modifiers
+    def order(self, column: str, desc: bool = False) -> "LocalQuery":
+        self.ordering.append((column, desc))
+        return self
+
+    def range(self, start: int, end: int) -> "LocalQuery":
+        self.offset, self.limit_rows = start, end - start + 1
+        return self
+
+    def limit(self, count: int) -> "LocalQuery":
+        self.limit_rows = count
+        return self
+
+    def execute(self) -> LocalResponse:
+        with self.storage.lock:
+            return getattr(self, f'_execute_{self.action}')(self.storage.table_rows(self.table))
+
+    # Execution
+    def _candidates(self, table: LocalTable) -> List[Dict]:
+        """Rows the first equality / membership filter allows, read from its index"""
+        for column, op, value in self.filters:
+            if op == 'eq':
+                return table.index(column).get(str(value), [])
+            if op == 'in':
+                index = table.index(column)
+                return [row for key in dict.fromkeys(str(item) for item in value) for row in index.get(key, [])]
+        return table.rows
+
+    def _matches(self, row: Dict) -> bool:
+        for column, op, value in self.filters:
+            if not OPERATORS[op](row.get(column), value):
+                return False
+        return all(
+            any(OPERATORS[op](row.get(column), value) for column, op, value in alternative)
+            for alternative in self.alternatives
+        )
+
+    def _matching(self, table: LocalTable) -> List[Dict]:
+        return [row for row in self._candidates(table) if self._matches(row)]
+
+    def _sorted(self, rows: List[Dict]) -> List[Dict]:
+        # Stable sorts applied last key first; nulls last either way, as in Postgres
+        for column, desc in reversed(self.ordering):
+            present = [row for row in rows if row.get(column) is not None]
+            absent = [row for row in rows if row.get(column) is None]
+            rows = sorted(present, key=lambda row: _comparable(row[column]), reverse=desc) + absent
+        return rows
+
+    def _project(self, row: Dict) -> Dict:
+        if self.columns is None:
+            return dict(row)
+        return {column: row.get(column) for column in self.columns}
+
+    def _execute_select(self, table: LocalTable) -> LocalResponse:
+        rows = self._sorted(self._matching(table))
+        total = len(rows) if self.count else None
+        end = None if self.limit_rows is None else self.offset + self.limit_rows
+        return LocalResponse([self._project(row) for row in rows[self.offset:end]], total)
+
+    def _execute_insert(self, table: LocalTable) -> LocalResponse:
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        inserted = [table.add(row) for row in rows]
+        table.changed()
+        return LocalResponse([dict(row) for row in inserted])
+
+    def _execute_upsert(self, table: LocalTable) -> LocalResponse:
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        keys = [column.strip() for column in self.on_conflict.split(',')]
+        index = table.index(keys[0])
+        written = []
+        for row in rows:
+            existing = next(
+                (
+                    candidate for candidate in index.get(str(row.get(keys[0])), [])
+                    if all(str(candidate.get(key)) == str(row.get(key)) for key in keys[1:])
+                ),
+                None
+            )
+            if existing is None:
+                existing = table.add(row)
+                index.setdefault(str(existing.get(keys[0])), []).append(existing)
+            elif self.ignore_duplicates:
+                continue
+            else:
+                existing.update(row)
+            written.append(dict(existing))
+        table.changed()
+        return LocalResponse(written)
+
+    def _execute_update(self, table: LocalTable) -> LocalResponse:
+        rows = self._matching(table)
+        for row in rows:
+            row.update(self.payload)
+        table.changed()
+        return LocalResponse([dict(row) for row in rows])
+
+    def _execute_delete(self, table: LocalTable) -> LocalResponse:
+        doomed = {id(row) for row in self._matching(table)}
+        deleted = [dict(row) for row in table.rows if id(row) in doomed]
+        table.rows = [row for row in table.rows if id(row) not in doomed]
+        table.changed()
+        return LocalResponse(deleted)
+
+
+class LocalRpc:
+    """Deferred call of a Python stand-in for a SQL function"""
+
+    def __init__(self, storage: "LocalStorageClient", name: str, params: Dict):
+        self.storage, self.name, self.params = storage, name, params or {}
+        self.offset, self.limit_rows = 0, None
+
+    def range(self, start: int, end: int) -> "LocalRpc":
+        self.offset, self.limit_rows = start, end - start + 1
+        return self
+
+    def limit(self, count: int) -> "LocalRpc":
+        self.limit_rows = count
+        return self
+
+    def execute(self) -> LocalResponse:
+        function = getattr(self.storage, f'_rpc_{self.name}', None)
+        if function is None:
+            raise NotImplementedError(f"RPC {self.name} is not available in local storage")
+        with self.storage.lock:
+            rows = function(**self.params)
+        if isinstance(rows, list):
+            end = None if self.limit_rows is None else self.offset + self.limit_rows
+            rows = rows[self.offset:end]
+        return LocalResponse(rows)
+
+
+class LocalStorageClient:
+    """Drop-in for the supabase client's table() / rpc() interface"""
+
+    def __init__(self):
+        self.tables: Dict[str, LocalTable] = {}
+        self.lock = threading.RLock()
+
+    def table_rows(self, name: str) -> LocalTable:
+        table = self.tables.get(name)
+        if table is None:
+            table = self.tables[name] = LocalTable(name)
+        return table
+
+    def table(self, name: str) -> LocalQuery:
+        return LocalQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict] = None) -> LocalRpc:
+        return LocalRpc(self, name, params)
+
+    def stats(self) -> Dict[str, int]:
+        return {name: len(table.rows) for name, table in self.tables.items()}
+
+    # SQL functions (see sql/)
+    def _rpc_price_history_window(self, p_kind: str, p_ids: List[str], p_points: int) -> List[Dict]:
+        table, id_column = ('stock_prices', 'stock_id') if p_kind == 'stock' else ('currency_rates', 'currency_id')
+        index = self.table_rows(table).index(id_column)
+        rows = []
+        for instrument_id in sorted({str(item) for item in p_ids}):
+            bars = sorted(index.get(instrument_id, []), key=lambda row: _comparable(row['timestamp']))[-p_points:]
+            for bar in bars:
+                rows.append({
+                    'id': str(bar.get('id')), 'instrument_id': instrument_id, 'timestamp': bar['timestamp'],
+                    'open': bar.get('open'), 'high': bar.get('high'), 'low': bar.get('low'),
+                    'close': bar.get('close', bar.get('rate')), 'volume': bar.get('volume')
+                })
+        return rows
+
+    def _rpc_stock_price_extremes(self, p_since: str, p_before: str) -> List[Dict]:
+        since, before = _comparable(p_since), _comparable(p_before)
+        extremes: Dict[str, Dict] = {}
+        for row in self.table_rows('stock_prices').rows:
+            if not since <= _comparable(row['timestamp']) < before:
+                continue
+            high = row.get('high') if row.get('high') is not None else row.get('close')
+            low = row.get('low') if row.get('low') is not None else row.get('close')
+            current = extremes.setdefault(str(row['stock_id']), {
+                'instrument_id': str(row['stock_id']), 'high': high, 'low': low
+            })
+            current['high'] = max(current['high'], high)
+            current['low'] = min(current['low'], low)
+        return list(extremes.values())
+
+    def _rpc_mark_alerts_triggered(self, p_rows: List[Dict]) -> int:
+        alerts = self.table_rows('price_alerts')
+        by_id = alerts.index('id')
+        fired_at = datetime.now(timezone.utc).isoformat()
+        updated = 0
+        for row in p_rows:
+            for alert in by_id.get(str(row['id']), []):
+                alert.update(triggered_at=fired_at, triggered_price=row['price'])
+                if row['reanchor']:
+                    alert['reference_price'] = row['price']
+                else:
+                    alert['status'] = 'triggered'
+                updated += 1
+        alerts.changed()
+        return updated
+
+    def _rpc_update_stock_metadata(self, p_rows: List[Dict]) -> int:
+        stocks = self.table_rows('stocks')
+        by_symbol = stocks.index('symbol')
+        updated = 0
+        for row in p_rows:
+            for stock in by_symbol.get(str(row['symbol']), []):
+                if stock.get('deleted_at') is not None:
+                    continue
+                market_cap = row.get('market_cap') if row.get('market_cap') is not None else stock.get('market_cap')
+                sector = stock.get('sector') or row.get('sector')
+                if market_cap != stock.get('market_cap') or sector != stock.get('sector'):
+                    stock.update(market_cap=market_cap, sector=sector,
+                                 updated_at=datetime.now(timezone.utc).isoformat())
+                    updated += 1
+        stocks.changed()
+        return updated
+
+
+def seed_synthetic(
+    storage: LocalStorageClient,
+    count: int,
+    history_days: int = 2,
+    interval: str = '1h',
+    seed: Optional[int] = None,
+    now: Optional[float] = None
+) -> Dict[str, int]:
+    """Fill the catalog, price history and latest quotes with a synthetic universe"""
+    from services.market_data import SyntheticProvider, synthetic_universe
+
+    now = time.time() if now is None else now
+    provider = SyntheticProvider(seed=settings.synthetic_seed if seed is None else seed, start=now)
+    created_at = datetime.fromtimestamp(now, tz=timezone.utc).isoformat()
+    stocks = storage.table_rows('stocks')
+    prices = storage.table_rows('stock_prices')
+    quotes = storage.table_rows('latest_quotes')
+
+    for stock in synthetic_universe(count):
+        stocks.add({**stock, 'is_active': True, 'deleted_at': None, 'created_at': created_at, 'updated_at': created_at})
+        symbol = stock['symbol']
+        bars = provider.intraday_bars([f"{symbol}.IS"], interval, now - history_days * 86400)[f"{symbol}.IS"]
+        latest = None
+        for bar in bars:
+            latest = prices.add({
+                'stock_id': stock['id'],
+                'timestamp': datetime.fromtimestamp(bar['epoch'], tz=timezone.utc).isoformat(),
+                'open': bar['open'], 'high': bar['high'], 'low': bar['low'], 'close': bar['close'],
+                'volume': int(bar['volume'])
+            })
+        if latest is not None:
+            quotes.add({
+                'kind': 'stock', 'instrument_id': stock['id'], 'symbol': symbol, 'timestamp': latest['timestamp'],
+                'price': latest['close'], 'open': latest['open'], 'high': latest['high'], 'low': latest['low'],
+                'close': latest['close'], 'volume': latest['volume'], 'rate': None,
+                'source_id': latest['id'], 'updated_at': created_at
+            })
+    for table in (stocks, prices, quotes):
+        table.changed()
+    return storage.stats()
+
+
+def create_local_storage() -> LocalStorageClient:
+    """Local storage seeded per LOCAL_STORAGE_* settings"""
+    storage = LocalStorageClient()
+    started = time.perf_counter()
+    stats = seed_synthetic(
+        storage,
+        settings.local_storage_symbols,
+        history_days=settings.local_storage_history_days,
+        interval=settings.local_storage_interval
+    )
+    logger.info(f"Seeded local storage in {time.perf_counter() - started:.1f}s: {stats}")
+    return storage
@@ -32,6 +32,10 @@ class Settings(BaseSettings):
     
     # Database Settings
     database_url: str = os.getenv("DATABASE_URL", "")
+    database_backend: str = os.getenv("DATABASE_BACKEND", "supabase")  # supabase | local
+    local_storage_symbols: int = int(os.getenv("LOCAL_STORAGE_SYMBOLS", "5000"))  # synthetic universe size
+    local_storage_history_days: int = int(os.getenv("LOCAL_STORAGE_HISTORY_DAYS", "2"))
+    local_storage_interval: str = os.getenv("LOCAL_STORAGE_INTERVAL", "1h")  # seeded bar size
     
     # External API Settings
     alpha_vantage_api_key: str = os.getenv("ALPHA_VANTAGE_API_KEY", "")
@@ -52,6 +56,103 @@ class Settings(BaseSettings):
     data_collection_interval: int = 60  # seconds
     data_update_interval: int = int(os.getenv("DATA_UPDATE_INTERVAL", "300"))
     currency_update_interval: int = int(os.getenv("CURRENCY_UPDATE_INTERVAL", "60"))
+
+    # Collector Leadership Settings
+    collector_lock_backend: str = os.getenv("COLLECTOR_LOCK_BACKEND", "file")  # file | redis
+    collector_lock_file: str = os.getenv("COLLECTOR_LOCK_FILE", "/tmp/triz-trade-collector.lock")
+    collector_lock_key: str = os.getenv("COLLECTOR_LOCK_KEY", "triz:collector:leader")
+    collector_lock_ttl: int = int(os.getenv("COLLECTOR_LOCK_TTL", "30"))  # seconds
+    collector_election_interval: int = int(os.getenv("COLLECTOR_ELECTION_INTERVAL", "5"))  # seconds
+    quote_channel_backend: str = os.getenv("QUOTE_CHANNEL_BACKEND", "unix")  # unix (one host) | redis | local (one process)
+    quote_channel_dir: str = os.getenv("QUOTE_CHANNEL_DIR", "/tmp/triz-trade-quotes")  # sockets of the unix channel
+    quote_channel_name: str = os.getenv("QUOTE_CHANNEL_NAME", "triz:quotes")
+
+    # Distributed Collection Settings
+    collection_mode: str = os.getenv("COLLECTION_MODE", "inprocess")  # inprocess | distributed
+    celery_broker_url: str = os.getenv("CELERY_BROKER_URL", os.getenv("REDIS_URL", "redis://localhost:6379"))
+    celery_result_backend: str = os.getenv("CELERY_RESULT_BACKEND", os.getenv("REDIS_URL", "redis://localhost:6379"))
+    collection_shard_size: int = int(os.getenv("COLLECTION_SHARD_SIZE", "50"))
+
+    # Market Data Provider Settings
+    market_data_provider: str = os.getenv("MARKET_DATA_PROVIDER", "yfinance")  # yfinance | replay | synthetic
+    market_data_record_path: str = os.getenv("MARKET_DATA_RECORD_PATH", "")  # record responses to this archive
+    market_data_replay_path: str = os.getenv("MARKET_DATA_REPLAY_PATH", "")
+    market_data_speed: float = float(os.getenv("MARKET_DATA_SPEED", "1"))  # replay / synthetic clock, 1 to 1000
+    synthetic_seed: int = int(os.getenv("SYNTHETIC_SEED", "42"))
+
+    # Intraday Collection Settings
+    collection_bars: str = os.getenv("COLLECTION_BARS", "daily")  # daily | intraday
+    intraday_interval: str = os.getenv("INTRADAY_INTERVAL", "1m")  # 1m | 5m | 15m
+    intraday_poll_seconds: int = int(os.getenv("INTRADAY_POLL_SECONDS", "60"))
+    intraday_batch_size: int = int(os.getenv("INTRADAY_BATCH_SIZE", "50"))  # symbols per provider request
+    intraday_overlap_bars: int = int(os.getenv("INTRADAY_OVERLAP_BARS", "5"))  # bars re-requested for late revisions
+    intraday_buffer_bars: int = int(os.getenv("INTRADAY_BUFFER_BARS", "1440"))  # bars kept in memory per instrument
+    intraday_session: str = os.getenv("INTRADAY_SESSION", "10:00-18:10")  # stock session, exchange local time
+    intraday_timezone: str = os.getenv("INTRADAY_TIMEZONE", "Europe/Istanbul")
+
+    # Quote Cache Settings
+    quote_cache_ttl: int = int(os.getenv("QUOTE_CACHE_TTL", "120"))  # seconds
+    max_bulk_quotes: int = int(os.getenv("MAX_BULK_QUOTES", "1000"))
+
+    # Analytics Settings
+    indicator_cache_size: int = int(os.getenv("INDICATOR_CACHE_SIZE", "512"))  # cached bar series
+    indicator_max_bars: int = int(os.getenv("INDICATOR_MAX_BARS", "5000"))
+    correlation_rebuild_seconds: int = int(os.getenv("CORRELATION_REBUILD_SECONDS", "3600"))
+
+    # Response Settings
+    # Routes (by endpoint function name) that skip per-row response validation
+    fast_json_routes: List[str] = [
+        "get_stock_prices", "get_currency_rates", "get_stocks", "get_currencies"
+    ]
+    columnar_chunk_rows: int = int(os.getenv("COLUMNAR_CHUNK_ROWS", "65536"))  # rows per binary chunk
+    max_export_instruments: int = int(os.getenv("MAX_EXPORT_INSTRUMENTS", "500"))
+    screener_rebuild_seconds: int = int(os.getenv("SCREENER_REBUILD_SECONDS", "300"))  # catalog refresh
+    max_screen_results: int = int(os.getenv("MAX_SCREEN_RESULTS", "500"))
+
+    # Metadata Cache Settings
+    metadata_cache_path: str = os.getenv("METADATA_CACHE_PATH", "/tmp/triz-trade-metadata.json")
+    metadata_ttls: str = os.getenv("METADATA_TTLS", "name:30d,sector:7d,market_cap:1d,currency:30d,info:1d")
+    metadata_refresh_concurrency: int = int(os.getenv("METADATA_REFRESH_CONCURRENCY", "4"))  # provider calls at once
+    metadata_flush_delay: float = float(os.getenv("METADATA_FLUSH_DELAY", "2"))  # seconds to coalesce saves
+    metadata_retry_after: float = float(os.getenv("METADATA_RETRY_AFTER", "60"))  # seconds before a failed fetch is retried
+
+    # Startup Settings
+    # Serve immediately and probe the database in the background (see /ready)
+    fast_start: bool = os.getenv("FAST_START", "false").lower() == "true"
+
+    # Retention Settings
+    retention_tiers: str = os.getenv("RETENTION_TIERS", "raw:7d,5m:90d,1d:forever")
+    compaction_interval: int = int(os.getenv("COMPACTION_INTERVAL", "0"))  # seconds, 0 disables
+    compaction_batch_size: int = int(os.getenv("COMPACTION_BATCH_SIZE", "20000"))  # rows per call
+    compaction_pause: float = float(os.getenv("COMPACTION_PAUSE", "0.2"))  # seconds between batches
+    purge_batch_size: int = int(os.getenv("PURGE_BATCH_SIZE", "1000"))  # rows per delete of a removed instrument
+    purge_pause: float = float(os.getenv("PURGE_PAUSE", "0.2"))  # seconds between batches
+
+    # Health Probe Settings
+    health_probe_interval: int = int(os.getenv("HEALTH_PROBE_INTERVAL", "10"))  # seconds
+    health_db_timeout: int = int(os.getenv("HEALTH_DB_TIMEOUT", "3"))  # seconds
+    collector_stale_after_stock: int = int(os.getenv("COLLECTOR_STALE_AFTER_STOCK", "900"))  # seconds
+    collector_stale_after_currency: int = int(os.getenv("COLLECTOR_STALE_AFTER_CURRENCY", "180"))  # seconds
+
+    # Index Settings
+    index_base_level: float = float(os.getenv("INDEX_BASE_LEVEL", "1000"))
+    index_rebalance_seconds: int = int(os.getenv("INDEX_REBALANCE_SECONDS", "86400"))  # reweight constituents
+    index_snapshot_interval: int = int(os.getenv("INDEX_SNAPSHOT_INTERVAL", "60"))  # seconds between persisted points
+    index_intraday_retention_days: int = int(os.getenv("INDEX_INTRADAY_RETENTION_DAYS", "7"))
+
+    # Alert Settings
+    alert_sink: str = os.getenv("ALERT_SINK", "log")  # log | channel | webhook
+    alert_webhook_url: str = os.getenv("ALERT_WEBHOOK_URL", "")
+    alert_webhook_timeout: float = float(os.getenv("ALERT_WEBHOOK_TIMEOUT", "5"))  # seconds
+    alert_retry_delay: float = float(os.getenv("ALERT_RETRY_DELAY", "1"))  # seconds before the first redelivery, doubling
+
+    # Instrumentation Settings
+    server_timing: bool = os.getenv("SERVER_TIMING", "true").lower() == "true"  # Server-Timing header per request
+    slow_request_ms: float = float(os.getenv("SLOW_REQUEST_MS", "1000"))  # log slower requests with timings, 0 disables
+    profiling_enabled: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    admin_token: str = os.getenv("ADMIN_TOKEN", "")  # X-Admin-Token of profiling requests
+    profile_interval: float = float(os.getenv("PROFILE_INTERVAL", "0.002"))  # seconds between stack samples
+    profile_max_seconds: float = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
     
     # Logging Settings
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
@@ -66,7 +167,7 @@ class Settings(BaseSettings):
         "CADTRY=X", "AUDTRY=X", "JPYTRY=X", "RUBTRY=X"
     ]
     
-    @validator('cors_origins', pre=True)
+    @validator('cors_origins', 'fast_json_routes', pre=True)
     def parse_cors_origins(cls, v):
         if isinstance(v, str):
             return [i.strip() for i in v.split(',')]
@@ -3,9 +3,14 @@ TRIZ Trade Backend API
 FastAPI backend for financial data platform
 """
 
+import time
+
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import uvicorn
 import os
@@ -15,37 +20,166 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import routers
-from app.routers import stocks, currencies, auth, data
+from app.routers import stocks, currencies, auth, data, analytics, quotes, export, portfolios, alerts
 
 # Import services
 from services.data_collector import DataCollectorService
+from services.leader_election import LeaderElector, create_leader_lock
+from services.market_data import close_market_data_provider
+from services.quote_channel import create_quote_channel
+from services.indicator_service import indicator_service
+from services.correlation_service import correlation_service
+from services.fx_graph import fx_graph
+from services.quote_service import quote_service
+from services.portfolio_service import portfolio_service
+from services.alert_service import alert_service, create_alert_sink
+from services.screener_service import screener_service
+from services.leaderboard_service import leaderboard_service
+from services.index_service import index_service
+from services.intraday_service import intraday_book
+from services.metadata_service import metadata_service
+from services.health_service import health_prober
+from services.purge_service import instrument_purger
 from config.database import init_db
 from config.settings import settings
+from app.instrumentation import ServerTimingMiddleware, TimedRoute
+from utils.startup import StartupProfile
+
+startup = StartupProfile(_import_started)
+startup.record("imports", _import_started)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle management for FastAPI app"""
     # Startup
     print("🚀 Starting TRIZ Trade Backend...")
+    app.state.startup = startup
     
-    # Initialize database
-    await init_db()
+    # Initialize database; in fast-start mode the probe runs in the background
+    # and /ready reports its outcome
+    await startup.check("database", init_db, background=settings.fast_start)
     
     # Initialize data collector service
-    data_collector = DataCollectorService()
-    app.state.data_collector = data_collector
+    with startup.phase("collector"):
+        data_collector = DataCollectorService()
+        app.state.data_collector = data_collector
+        
+        # Keep cached analytics in step with collected quotes
+        data_collector.add_listener(quote_service.on_quote)
+        data_collector.add_listener(intraday_book.on_quote)
+        data_collector.add_listener(indicator_service.on_quote)
+        data_collector.add_listener(correlation_service.on_quote)
+        data_collector.add_listener(fx_graph.on_quote)
+        data_collector.add_listener(portfolio_service.on_quote)
+        data_collector.add_listener(alert_service.on_quote)
+        data_collector.add_listener(screener_service.on_quote)
+        data_collector.add_listener(leaderboard_service.on_quote)
+        data_collector.add_listener(index_service.on_quote)
+        data_collector.add_listener(health_prober.on_quote)
+        
+        # Deleted instruments leave every cache at once
+        instrument_purger.add_listener(quote_service.evict)
+        instrument_purger.add_listener(intraday_book.invalidate)
+        instrument_purger.add_listener(indicator_service.invalidate)
+        instrument_purger.add_listener(correlation_service.invalidate)
+        instrument_purger.add_listener(fx_graph.invalidate)
+        instrument_purger.add_listener(portfolio_service.invalidate)
+        instrument_purger.add_listener(alert_service.invalidate)
+        instrument_purger.add_listener(screener_service.invalidate)
+        instrument_purger.add_listener(leaderboard_service.invalidate)
+        instrument_purger.add_listener(index_service.invalidate)
+    
+    # Share collected quotes with every worker process
+    with startup.phase("quote_channel"):
+        quote_channel = create_quote_channel()
+        await quote_channel.subscribe(data_collector.receive_quote)
+        data_collector.attach_channel(quote_channel)
+        await instrument_purger.attach_channel(quote_channel)
+        await portfolio_service.attach_channel(quote_channel)
+        await alert_service.attach_channel(quote_channel, create_alert_sink(quote_channel))
+        app.state.quote_channel = quote_channel
+    
+    # API workers read the metadata cache file but leave saving it to the
+    # process that collects: the collector leader or the Celery workers
+    metadata_service.persist = False
+    
+    if settings.collection_mode == "distributed":
+        # Celery workers collect; this process only consumes the quote channel
+        print("🛰️ Collection mode: distributed (Celery workers)")
+    else:
+        # Only the elected leader runs background data collection and
+        # resumes purges of instruments deleted before a restart
+        async def on_elected():
+            metadata_service.persist = True
+            await data_collector.start_background_tasks()
+            await instrument_purger.resume_pending()
+        
+        async def on_demoted():
+            metadata_service.persist = False
+            await data_collector.stop_background_tasks()
+        
+        collector_elector = LeaderElector(
+            create_leader_lock(),
+            on_elected=on_elected,
+            on_demoted=on_demoted,
+            interval=settings.collector_election_interval
+        )
+        app.state.collector_elector = collector_elector
+        with startup.phase("election"):
+            await collector_elector.start()
+        print(f"🗳️ Collector role: {collector_elector.role}")
+    
+    # One process evaluates price alerts and persists index values
+    async def on_analytics_elected():
+        await alert_service.start()
+        await index_service.start()
     
-    # Start background tasks for data collection
-    await data_collector.start_background_tasks()
+    async def on_analytics_demoted():
+        await index_service.stop()
+        await alert_service.stop()
     
-    print("✅ Backend started successfully!")
+    analytics_elector = LeaderElector(
+        create_leader_lock("analytics"),
+        on_elected=on_analytics_elected,
+        on_demoted=on_analytics_demoted,
+        interval=settings.collector_election_interval,
+        name="analytics"
+    )
+    app.state.analytics_elector = analytics_elector
+    await startup.check("analytics_election", analytics_elector.start, background=settings.fast_start)
+    
+    # Dependency checks behind /health, /ready and /api/v1/data/health
+    health_prober.add_cache("quotes", quote_service.cache_stats)
+    health_prober.add_cache("intraday", intraday_book.cache_stats)
+    health_prober.add_cache("metadata", metadata_service.cache_stats)
+    health_prober.add_cache("indicators", indicator_service.cache_stats)
+    health_prober.add_cache("correlations", correlation_service.cache_stats)
+    health_prober.add_cache("fx_graph", fx_graph.cache_stats)
+    health_prober.add_cache("portfolios", portfolio_service.cache_stats)
+    health_prober.add_cache("alerts", alert_service.metrics)
+    health_prober.add_cache("screener", screener_service.cache_stats)
+    health_prober.add_cache("leaderboards", leaderboard_service.cache_stats)
+    health_prober.add_cache("indices", index_service.cache_stats)
+    await health_prober.start()
+    
+    startup.finish()
+    print(f"✅ Backend started successfully in {startup.ready_after:.0f} ms! {startup.phases}")
     
     yield
     
     # Shutdown
     print("🛑 Shutting down TRIZ Trade Backend...")
-    if hasattr(app.state, 'data_collector'):
-        await app.state.data_collector.stop_background_tasks()
+    await startup.close()
+    await health_prober.stop()
+    await instrument_purger.close()
+    if hasattr(app.state, 'collector_elector'):
+        await app.state.collector_elector.stop()
+    if hasattr(app.state, 'analytics_elector'):
+        await app.state.analytics_elector.stop()
+    await metadata_service.close()
+    close_market_data_provider()
+    if hasattr(app.state, 'quote_channel'):
+        await app.state.quote_channel.close()
     print("✅ Backend shutdown complete!")
 
 # Create FastAPI application
@@ -57,6 +191,7 @@ app = FastAPI(
     redoc_url="/redoc",
     lifespan=lifespan
 )
+app.router.route_class = TimedRoute
 
 # Configure CORS
 app.add_middleware(
@@ -73,11 +208,19 @@ app.add_middleware(
     allowed_hosts=["localhost", "127.0.0.1", "*.vercel.app"]
 )
 
+# Per-phase Server-Timing headers and opt-in profiling (outermost, so it times the whole stack)
+app.add_middleware(ServerTimingMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(stocks.router, prefix="/api/v1/stocks", tags=["Stocks"])
 app.include_router(currencies.router, prefix="/api/v1/currencies", tags=["Currencies"])
 app.include_router(data.router, prefix="/api/v1/data", tags=["Data Management"])
+app.include_router(quotes.router, prefix="/api/v1/quotes", tags=["Quotes"])
+app.include_router(analytics.router, prefix="/api/v1/analytics", tags=["Analytics"])
+app.include_router(export.router, prefix="/api/v1/export", tags=["Export"])
+app.include_router(portfolios.router, prefix="/api/v1/portfolios", tags=["Portfolios"])
+app.include_router(alerts.router, prefix="/api/v1/alerts", tags=["Alerts"])
 
 @app.get("/")
 async def root():
@@ -91,12 +234,27 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "service": "triz-trade-backend",
-        "version": "1.0.0"
-    }
+    """Liveness: the process is up and its event loop keeps the prober cycling"""
+    liveness = health_prober.liveness()
+    return JSONResponse(
+        {
+            **liveness,
+            "status": "healthy" if liveness["alive"] else "unhealthy",
+            "service": "triz-trade-backend",
+            "version": "1.0.0"
+        },
+        status_code=200 if liveness["alive"] else 503
+    )
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: startup finished and the last background probe passed (served from cache)"""
+    report = health_prober.report
+    ready = startup.ready_after is not None and report["ready"]
+    return JSONResponse(
+        {**report, "ready": ready, "startup": startup.report()},
+        status_code=200 if ready else 503
+    )
 
 @app.get("/api/v1/info")
 async def api_info():
@@ -108,7 +266,12 @@ async def api_info():
             "stocks": "/api/v1/stocks",
             "currencies": "/api/v1/currencies",
             "auth": "/api/v1/auth",
-            "data": "/api/v1/data"
+            "data": "/api/v1/data",
+            "quotes": "/api/v1/quotes",
+            "analytics": "/api/v1/analytics",
+            "export": "/api/v1/export",
+            "portfolios": "/api/v1/portfolios",
+            "alerts": "/api/v1/alerts"
         }
     }
 
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Market data record / replay CLI for TRIZ Trade Backend
+
+    python replay.py record ./market.jsonl.gz --rounds 12 --every 300     # live yfinance responses
+    python replay.py synthetic ./synthetic.jsonl.gz --symbols 5000 --rounds 12
+    python replay.py replay ./market.jsonl.gz --speed 100                 # collector against the archive
+
+`record` and `synthetic` need no database. `replay` runs the collector's
+background loops on the archive's virtual clock and writes to the configured
+storage; the same archive gives the same quotes at any speed.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from config.settings import settings
+from services.market_data import MarketDataProvider, RecordingProvider, ReplayProvider, SyntheticProvider, synthetic_universe
+
+def _record(provider: RecordingProvider, symbols, rounds: int, every: float, intraday: bool) -> dict:
+    """Poll every symbol `rounds` times through the recording provider"""
+    async def run():
+        started = time.perf_counter()
+        for round_index in range(rounds):
+            if intraday:
+                for offset in range(0, len(symbols), settings.intraday_batch_size):
+                    await asyncio.to_thread(
+                        provider.intraday_bars, symbols[offset:offset + settings.intraday_batch_size],
+                        settings.intraday_interval, None
+                    )
+            else:
+                for symbol in symbols:
+                    await asyncio.to_thread(provider.daily_bars, symbol)
+            if round_index < rounds - 1:
+                await provider.sleep(every)
+        return {"symbols": len(symbols), "rounds": rounds, "seconds": round(time.perf_counter() - started, 3)}
+
+    try:
+        return asyncio.run(run())
+    finally:
+        provider.close()
+
+async def _replay(path: str, speed: float, duration: float) -> dict:
+    """Run the collector loops on the replay clock for `duration` virtual seconds"""
+    from config.database import get_db_client
+    from services.data_collector import DataCollectorService
+
+    provider = ReplayProvider(path, speed=speed)
+    collector = DataCollectorService(provider)
+    quotes = []
+    collector.add_listener(quotes.append)
+
+    duration = duration or max(provider.end - provider.now(), 0) + 1
+    started = time.perf_counter()
+    db_client = get_db_client()
+    stocks = db_client.table('stocks').select('*').is_('deleted_at', 'null').execute().data or []
+    logging.info(f"Replaying {len(provider.symbols)} symbols for {len(stocks)} catalog stocks at {speed}x")
+
+    await collector.start_background_tasks()
+    await provider.sleep(duration)
+    await collector.stop_background_tasks()
+    return {
+        "virtual_seconds": duration,
+        "wall_seconds": round(time.perf_counter() - started, 3),
+        "quotes": len(quotes),
+        "instruments": len({(quote['kind'], str(quote['instrument_id'])) for quote in quotes})
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="Record live provider responses")
+    record.add_argument("archive")
+    record.add_argument("--rounds", type=int, default=1)
+    record.add_argument("--every", type=float, default=300, help="Seconds between rounds")
+    record.add_argument("--intraday", action="store_true", help="Record intraday bars instead of daily ones")
+
+    synthetic = commands.add_parser("synthetic", help="Record a synthetic random-walk universe")
+    synthetic.add_argument("archive")
+    synthetic.add_argument("--symbols", type=int, default=1000)
+    synthetic.add_argument("--rounds", type=int, default=12)
+    synthetic.add_argument("--every", type=float, default=300, help="Virtual seconds between rounds")
+    synthetic.add_argument("--intraday", action="store_true")
+    synthetic.add_argument("--seed", type=int, default=settings.synthetic_seed)
+
+    replay = commands.add_parser("replay", help="Run the collector against an archive")
+    replay.add_argument("archive")
+    replay.add_argument("--speed", type=float, default=100, help="1 to 1000")
+    replay.add_argument("--duration", type=float, default=0, help="Virtual seconds (default: whole archive)")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "record":
+        symbols = list(settings.stock_symbols) + list(settings.currency_pairs)
+        summary = _record(RecordingProvider(MarketDataProvider(), args.archive), symbols, args.rounds, args.every, args.intraday)
+    elif args.command == "synthetic":
+        symbols = [f"{stock['symbol']}.IS" for stock in synthetic_universe(args.symbols)]
+        provider = RecordingProvider(SyntheticProvider(seed=args.seed, speed=1000), args.archive)
+        summary = _record(provider, symbols, args.rounds, args.every, args.intraday)
+    else:
+        if not 1 <= args.speed <= 1000:
+            parser.error("--speed must be between 1 and 1000")
+        summary = asyncio.run(_replay(args.archive, args.speed, args.duration))
+
+    print(json.dumps(summary))
+
+if __name__ == "__main__":
+    main()
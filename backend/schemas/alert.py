@@ -0,0 +1,13 @@
+"""
+Pydantic schemas for price alerts
+"""
+
+from pydantic import BaseModel, Field
+
+class AlertCreate(BaseModel):
+    """Schema for creating a price alert"""
+    kind: str = Field(..., pattern="^(stock|currency)$")
+    instrument_id: str
+    condition: str = Field(..., pattern="^(above|below|move_pct)$", description="Cross above/below a price, or move by a percentage")
+    threshold: float = Field(..., gt=0, description="Price for above/below, percent for move_pct")
+    repeat: bool = Field(False, description="move_pct only: re-anchor at the trigger price and keep watching")
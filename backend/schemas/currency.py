@@ -70,6 +70,14 @@ class CurrencyDetailResponse(BaseModel):
     currency: CurrencyWithLatestRate
     rate_history: List[CurrencyRate]
 
+class CurrencyRateHistoryResponse(BaseModel):
+    """Response schema for currency rate history"""
+    currency_id: str
+    start_date: datetime
+    end_date: datetime
+    interval: str
+    rates: List[CurrencyRate]
+
 class CurrencySearchRequest(BaseModel):
     """Request schema for currency search"""
     query: Optional[str] = None
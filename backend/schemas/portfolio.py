@@ -0,0 +1,15 @@
+"""
+Pydantic schemas for portfolio-related data
+"""
+
+from pydantic import BaseModel, Field
+
+class PortfolioCreate(BaseModel):
+    """Schema for creating a portfolio"""
+    name: str = Field(..., min_length=1, description="Portfolio name")
+    base_currency: str = Field("TRY", pattern="^(TRY|USD|EUR)$", description="Reporting currency")
+
+class PositionUpsert(BaseModel):
+    """Schema for setting a position"""
+    quantity: float = Field(..., gt=0, description="Shares, or units of foreign currency")
+    average_cost: float = Field(0.0, ge=0, description="Average cost per unit in TRY")
@@ -73,6 +73,14 @@ class StockDetailResponse(BaseModel):
     stock: StockWithLatestPrice
     price_history: List[StockPrice]
     
+class StockPriceHistoryResponse(BaseModel):
+    """Response schema for stock price history"""
+    stock_id: str
+    start_date: datetime
+    end_date: datetime
+    interval: str
+    prices: List[StockPrice]
+    
 class StockSearchRequest(BaseModel):
     """Request schema for stock search"""
     query: Optional[str] = None
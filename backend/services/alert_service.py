@@ -0,0 +1,478 @@
+"""
+Alert Service
+Price alerts evaluated per tick against sorted threshold indexes
+
+Active rules are indexed per instrument in two sorted lists: thresholds
+above the last price (fire when the price rises to them) and thresholds
+below it (fire when it falls to them). A tick from p0 to p1 only has to
+cut the crossed prefix/suffix off one list, so evaluation costs
+O(log n + k) for n rules on the instrument and k fired, however many
+rules exist. Fired events are queued, marked triggered in one bulk call
+and handed to a pluggable sink off the tick path; a batch that fails is
+retried with backoff instead of being dropped.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+
+from sortedcontainers import SortedKeyList
+
+from config.database import fetch_all, get_db_client
+from config.settings import settings
+from services.quote_channel import QuoteChannel
+from services.quote_service import quote_service
+
+logger = logging.getLogger(__name__)
+
+INSTRUMENT_TABLES = {'stock': 'stocks', 'currency': 'currencies'}
+ALERT_EVENT = 'alert_changed'
+FIRED_EVENT = 'alert_fired'
+RECENT_FIRED = 200          # fired alerts kept per worker for GET /alerts/fired
+MAX_RETRY_DELAY = 60        # seconds between delivery attempts of a failing batch
+
+
+class AlertRule:
+    """An active rule and its entries in the threshold index"""
+
+    __slots__ = ('id', 'kind', 'instrument_id', 'condition', 'threshold', 'reference_price', 'repeat', 'entries')
+
+    def __init__(self, row: Dict):
+        self.id = str(row['id'])
+        self.kind = row['kind']
+        self.instrument_id = str(row['instrument_id'])
+        self.condition = row['condition']
+        self.threshold = float(row['threshold'])
+        self.reference_price = float(row['reference_price']) if row.get('reference_price') else None
+        self.repeat = bool(row.get('repeat'))
+        self.entries: List[Tuple[str, float]] = []
+
+
+class _InstrumentIndex:
+    """Rules of one instrument keyed by trigger price"""
+
+    __slots__ = ('last', 'up', 'down', 'pending')
+
+    def __init__(self):
+        self.last: Optional[float] = None
+        self.up = SortedKeyList(key=itemgetter(0))    # (threshold, rule_id), all above `last`
+        self.down = SortedKeyList(key=itemgetter(0))  # (threshold, rule_id), all below `last`
+        self.pending: List[str] = []                  # rules waiting for a first price
+
+
+class AlertEngine:
+    """Sorted threshold index over every active rule"""
+
+    def __init__(self):
+        self.rules: Dict[str, AlertRule] = {}
+        self.index: Dict[Tuple[str, str], _InstrumentIndex] = {}
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def set_price(self, kind: str, instrument_id: str, price: float):
+        """Seed the last price of an instrument without evaluating rules"""
+        index = self.index.setdefault((kind, str(instrument_id)), _InstrumentIndex())
+        if index.last is None:
+            index.last = float(price)
+
+    def add(self, rule: AlertRule, timestamp: Optional[str] = None) -> List[Dict]:
+        """Index a rule; returns its event if it already holds at the last price"""
+        self.rules[rule.id] = rule
+        index = self.index.setdefault((rule.kind, rule.instrument_id), _InstrumentIndex())
+        if index.last is None:
+            index.pending.append(rule.id)
+            return []
+        return self._arm(rule, index, timestamp)
+
+    def remove(self, rule_id: str) -> Optional[AlertRule]:
+        rule = self.rules.pop(str(rule_id), None)
+        if rule is not None:
+            index = self.index[(rule.kind, rule.instrument_id)]
+            self._unindex(rule, index)
+            if rule.id in index.pending:
+                index.pending.remove(rule.id)
+        return rule
+
+    def evaluate(self, kind: str, instrument_id: str, price: float, timestamp: Optional[str] = None) -> List[Dict]:
+        """Apply a tick and return the events of every rule it crossed"""
+        index = self.index.get((kind, str(instrument_id)))
+        if index is None:
+            return []
+        previous, index.last = index.last, float(price)
+
+        if previous is None:
+            pending, index.pending = index.pending, []
+            return [event for rule_id in pending for event in self._arm(self.rules[rule_id], index, timestamp)]
+
+        if index.last > previous:
+            stop = index.up.bisect_key_right(index.last)
+            crossed = list(index.up.islice(0, stop))
+            del index.up[:stop]
+        elif index.last < previous:
+            start = index.down.bisect_key_left(index.last)
+            crossed = list(index.down.islice(start))
+            del index.down[start:]
+        else:
+            return []
+
+        events = []
+        for threshold, rule_id in crossed:
+            rule = self.rules.get(rule_id)
+            if rule is not None and rule.entries:
+                events.extend(self._fire(rule, index, timestamp))
+        return events
+
+    def _arm(self, rule: AlertRule, index: _InstrumentIndex, timestamp: Optional[str]) -> List[Dict]:
+        last = index.last
+        if rule.condition == 'above':
+            if last >= rule.threshold:
+                return self._fire(rule, index, timestamp)
+            entries = [('up', rule.threshold)]
+        elif rule.condition == 'below':
+            if last <= rule.threshold:
+                return self._fire(rule, index, timestamp)
+            entries = [('down', rule.threshold)]
+        else:
+            if rule.reference_price is None:
+                rule.reference_price = last
+            band = rule.reference_price * rule.threshold / 100
+            upper, lower = rule.reference_price + band, rule.reference_price - band
+            if last >= upper or last <= lower:
+                return self._fire(rule, index, timestamp)
+            entries = [('up', upper), ('down', lower)]
+
+        for side, threshold in entries:
+            getattr(index, side).add((threshold, rule.id))
+        rule.entries = entries
+        return []
+
+    def _unindex(self, rule: AlertRule, index: _InstrumentIndex):
+        for side, threshold in rule.entries:
+            entry = (threshold, rule.id)
+            if entry in getattr(index, side):
+                getattr(index, side).remove(entry)
+        rule.entries = []
+
+    def _fire(self, rule: AlertRule, index: _InstrumentIndex, timestamp: Optional[str]) -> List[Dict]:
+        self._unindex(rule, index)
+        event = {
+            'rule_id': rule.id,
+            'kind': rule.kind,
+            'instrument_id': rule.instrument_id,
+            'condition': rule.condition,
+            'threshold': rule.threshold,
+            'reference_price': rule.reference_price,
+            'price': index.last,
+            'timestamp': timestamp,
+            'repeat': rule.repeat
+        }
+        if rule.condition == 'move_pct' and rule.repeat:
+            rule.reference_price = index.last
+            self._arm(rule, index, timestamp)
+        else:
+            del self.rules[rule.id]
+        return [event]
+
+
+class AlertSink:
+    """Base class for fired-alert destinations"""
+
+    async def deliver(self, events: List[Dict]):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class LogAlertSink(AlertSink):
+    """Writes fired alerts to the application log"""
+
+    async def deliver(self, events: List[Dict]):
+        for event in events:
+            logger.info(
+                f"Alert {event['rule_id']} fired: {event['kind']} {event['instrument_id']} "
+                f"{event['condition']} {event['threshold']} at {event['price']}"
+            )
+
+
+class ChannelAlertSink(AlertSink):
+    """Publishes fired alerts on the quote channel for every worker"""
+
+    def __init__(self, channel: QuoteChannel):
+        self.channel = channel
+
+    async def deliver(self, events: List[Dict]):
+        for event in events:
+            await self.channel.publish({'event': FIRED_EVENT, **event})
+
+
+class WebhookAlertSink(AlertSink):
+    """POSTs each batch of fired alerts as JSON to a webhook"""
+
+    def __init__(self, url: str, timeout: float):
+        self.url = url
+        self.timeout = timeout
+        self._client = None
+
+    async def deliver(self, events: List[Dict]):
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        response = await self._client.post(self.url, json={'alerts': events})
+        response.raise_for_status()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def create_alert_sink(channel: Optional[QuoteChannel] = None) -> AlertSink:
+    """Create the alert sink configured in settings"""
+    if settings.alert_sink == "webhook" and settings.alert_webhook_url:
+        return WebhookAlertSink(settings.alert_webhook_url, settings.alert_webhook_timeout)
+    if settings.alert_sink == "channel" and channel is not None:
+        return ChannelAlertSink(channel)
+    return LogAlertSink()
+
+
+class AlertService:
+    """Alert CRUD; the elected evaluator process also runs the engine on collector ticks"""
+
+    def __init__(self, sink: Optional[AlertSink] = None):
+        self.engine = AlertEngine()
+        self.sink = sink or LogAlertSink()
+        self.active = False
+        self.instance_id = uuid.uuid4().hex
+        self.channel: Optional[QuoteChannel] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._delivery: Optional[asyncio.Task] = None
+        self._retry: Optional[asyncio.Task] = None
+        self.recent_fired: deque = deque(maxlen=RECENT_FIRED)
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self.started_at = time.time()
+        self.counters = {'ticks': 0, 'ticks_with_rules': 0, 'fired': 0, 'delivered': 0, 'delivery_errors': 0}
+        self.eval_seconds = 0.0
+        self.max_eval_seconds = 0.0
+
+    async def attach_channel(self, channel: QuoteChannel, sink: Optional[AlertSink] = None):
+        """Share rule edits with the evaluator and fired alerts with every worker over the quote channel"""
+        self.channel = channel
+        if sink is not None:
+            self.sink = sink
+        await channel.subscribe(self.receive_event)
+
+    async def receive_event(self, message: Dict):
+        if message.get('event') == FIRED_EVENT:
+            self.recent_fired.appendleft({key: value for key, value in message.items() if key != 'event'})
+            return
+        if message.get('event') != ALERT_EVENT or message.get('origin') == self.instance_id or not self.active:
+            return
+        if message['action'] == 'add':
+            self._index(AlertRule(message['rule']))
+        else:
+            self.engine.remove(message['rule_id'])
+
+    async def start(self):
+        """Become the evaluator; retried in the background while the database is unavailable"""
+        if self.active:
+            return
+        try:
+            await self._load()
+        except Exception as e:
+            logger.error(f"Could not start alert evaluator: {e}")
+            self._retry = asyncio.create_task(self._start_later())
+
+    async def _start_later(self):
+        await asyncio.sleep(settings.collector_election_interval)
+        self._retry = None
+        await self.start()
+
+    async def _load(self):
+        """Load active rules and seed last prices"""
+        db_client = get_db_client()
+        rows = await asyncio.to_thread(
+            fetch_all, lambda: db_client.table('price_alerts').select('*').eq('status', 'active').order('id')
+        )
+        self.engine = AlertEngine()
+        for kind in INSTRUMENT_TABLES:
+            ids = sorted({str(row['instrument_id']) for row in rows if row['kind'] == kind})
+            if ids:
+                quotes = await quote_service.get_latest_quotes(kind=kind, ids=ids)
+                for quote in quotes['quotes']:
+                    self.engine.set_price(kind, quote['instrument_id'], quote['price'])
+
+        self._queue = asyncio.Queue()
+        self._delivery = asyncio.create_task(self._deliver())
+        self._reset_metrics()
+        self.active = True
+        for row in rows:
+            self._index(AlertRule(row))
+        logger.info(f"Alert evaluator started with {len(self.engine)} rules")
+
+    async def stop(self):
+        self.active = False
+        if self._retry is not None:
+            self._retry.cancel()
+            self._retry = None
+        if self._delivery is not None:
+            self._delivery.cancel()
+            await asyncio.gather(self._delivery, return_exceptions=True)
+            self._delivery = None
+        self.engine = AlertEngine()
+        await self.sink.close()
+
+    def on_quote(self, quote: Dict):
+        """Collector listener: evaluate only the rules the tick crossed"""
+        if not self.active:
+            return
+        started = time.perf_counter()
+        events = self.engine.evaluate(
+            quote.get('kind'), quote.get('instrument_id'), float(quote['price']), str(quote.get('timestamp'))
+        )
+        elapsed = time.perf_counter() - started
+        self.counters['ticks'] += 1
+        if (quote.get('kind'), str(quote.get('instrument_id'))) in self.engine.index:
+            self.counters['ticks_with_rules'] += 1
+        self.eval_seconds += elapsed
+        self.max_eval_seconds = max(self.max_eval_seconds, elapsed)
+        self._enqueue(events)
+
+    def _index(self, rule: AlertRule):
+        self._enqueue(self.engine.add(rule))
+
+    def _enqueue(self, events: List[Dict]):
+        if events:
+            self.counters['fired'] += len(events)
+            self._queue.put_nowait(events)
+
+    async def _deliver(self):
+        """Persist and hand fired events to the sink in batches, off the tick path
+
+        A failed batch stays pending (growing with newly fired events) and is
+        retried with exponential backoff, so fired alerts are delivered at
+        least once; events already marked triggered are not marked again.
+        """
+        events: List[Dict] = []
+        marked = failures = 0
+        while True:
+            try:
+                if not events:
+                    events = await self._queue.get()
+                while not self._queue.empty():
+                    events.extend(self._queue.get_nowait())
+                if marked < len(events):
+                    await asyncio.to_thread(self._mark_triggered, events[marked:])
+                    marked = len(events)
+                await self.sink.deliver(events)
+                self.counters['delivered'] += len(events)
+                events, marked, failures = [], 0, 0
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                failures += 1
+                self.counters['delivery_errors'] += 1
+                logger.error(f"Error delivering {len(events)} alerts (attempt {failures}), retrying: {e}")
+                try:
+                    await asyncio.sleep(min(settings.alert_retry_delay * 2 ** (failures - 1), MAX_RETRY_DELAY))
+                except asyncio.CancelledError:
+                    break
+
+    def _mark_triggered(self, events: List[Dict]):
+        """Mark fired rules triggered (or re-anchor repeating ones) in one call"""
+        latest = {event['rule_id']: event for event in events}
+        rows = [
+            {
+                'id': rule_id,
+                'price': event['price'],
+                'reanchor': bool(event['repeat'] and event['condition'] == 'move_pct')
+            }
+            for rule_id, event in latest.items()
+        ]
+        get_db_client().rpc('mark_alerts_triggered', {'p_rows': rows}).execute()
+
+    def metrics(self) -> Dict:
+        uptime = max(time.time() - self.started_at, 1e-9)
+        ticks = self.counters['ticks']
+        return {
+            'active': self.active,
+            'rules': len(self.engine),
+            'instruments': len(self.engine.index),
+            **self.counters,
+            'pending_delivery': self._queue.qsize() if self._queue is not None else 0,
+            'recent_fired': len(self.recent_fired),
+            'ticks_per_second': round(ticks / uptime, 2),
+            'avg_eval_us': round(self.eval_seconds / ticks * 1e6, 2) if ticks else None,
+            'max_eval_us': round(self.max_eval_seconds * 1e6, 2),
+            'uptime_seconds': round(uptime)
+        }
+
+    async def list_rules(self, status: Optional[str] = None, skip: int = 0, limit: int = 100) -> Tuple[List[Dict], int]:
+        db_client = get_db_client()
+        query = db_client.table('price_alerts').select('*', count='exact')
+        if status:
+            query = query.eq('status', status)
+        response = query.order('created_at', desc=True).range(skip, skip + limit - 1).execute()
+        return response.data or [], response.count or 0
+
+    async def create_rule(
+        self, kind: str, instrument_id: str, condition: str, threshold: float, repeat: bool = False
+    ) -> Optional[Dict]:
+        """Store and index a rule; None if the instrument does not exist"""
+        db_client = get_db_client()
+        instrument = db_client.table(INSTRUMENT_TABLES[kind]).select('id')\
+            .eq('id', instrument_id).is_('deleted_at', 'null').execute()
+        if not instrument.data:
+            return None
+
+        reference_price = None
+        if condition == 'move_pct':
+            quotes = await quote_service.get_latest_quotes(kind=kind, ids=[instrument_id])
+            reference_price = quotes['quotes'][0]['price'] if quotes['quotes'] else None
+        row = db_client.table('price_alerts').insert({
+            'kind': kind,
+            'instrument_id': str(instrument_id),
+            'condition': condition,
+            'threshold': threshold,
+            'reference_price': reference_price,
+            'repeat': repeat and condition == 'move_pct'
+        }).execute().data[0]
+
+        if self.active:
+            self._index(AlertRule(row))
+        await self._publish({'action': 'add', 'rule': row})
+        return row
+
+    async def delete_rule(self, rule_id: str) -> bool:
+        db_client = get_db_client()
+        response = db_client.table('price_alerts').delete().eq('id', rule_id).execute()
+        if not response.data:
+            return False
+        self.engine.remove(rule_id)
+        await self._publish({'action': 'remove', 'rule_id': str(rule_id)})
+        return True
+
+    def invalidate(self, kind: str, instrument_id: str):
+        """Drop the rules of a deleted instrument"""
+        index = self.engine.index.get((kind, str(instrument_id)))
+        if index is None:
+            return
+        for rule_id in [rule.id for rule in self.engine.rules.values()
+                        if (rule.kind, rule.instrument_id) == (kind, str(instrument_id))]:
+            self.engine.remove(rule_id)
+        del self.engine.index[(kind, str(instrument_id))]
+
+    async def _publish(self, message: Dict):
+        if self.channel is not None:
+            await self.channel.publish({'event': ALERT_EVENT, 'origin': self.instance_id, **message})
+
+
+# Shared instance fed by the data collector
+alert_service = AlertService()
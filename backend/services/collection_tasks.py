@@ -0,0 +1,170 @@
+"""
+Distributed Collection Tasks
+Celery app that shards the instrument universe across collector workers
+
+Run a worker and the scheduler with:
+    celery -A services.collection_tasks worker --loglevel=info
+    celery -A services.collection_tasks beat --loglevel=info
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from celery import Celery, chord
+
+from config.database import get_db_client
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+INSTRUMENT_TABLES = {
+    'stock': 'stocks',
+    'currency': 'currencies'
+}
+
+
+def _broker_transport_options(broker_url: str) -> Dict:
+    """Folder layout for the filesystem broker used in local runs"""
+    if not broker_url.startswith('filesystem://'):
+        return {}
+    folder = os.getenv("CELERY_BROKER_FOLDER", "/tmp/triz-trade-broker")
+    for sub in ('out', 'processed'):
+        os.makedirs(os.path.join(folder, sub), exist_ok=True)
+    return {
+        'data_folder_in': os.path.join(folder, 'out'),
+        'data_folder_out': os.path.join(folder, 'out'),
+        'processed_folder': os.path.join(folder, 'processed'),
+        'store_processed': False
+    }
+
+
+celery_app = Celery(
+    'triz_collection',
+    broker=settings.celery_broker_url,
+    backend=settings.celery_result_backend
+)
+
+celery_app.conf.update(
+    task_serializer='json',
+    result_serializer='json',
+    accept_content=['json'],
+    broker_transport_options=_broker_transport_options(settings.celery_broker_url),
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    beat_schedule={
+        'collect-stocks': {
+            'task': 'collection.dispatch',
+            'schedule': settings.data_update_interval,
+            'args': ('stock',)
+        },
+        'collect-currencies': {
+            'task': 'collection.dispatch',
+            'schedule': settings.currency_update_interval,
+            'args': ('currency',)
+        },
+        **({
+            'compact-prices': {
+                'task': 'maintenance.compact',
+                'schedule': settings.compaction_interval
+            }
+        } if settings.compaction_interval > 0 else {})
+    }
+)
+
+
+def shard_instruments(instruments: List[Dict], shard_size: int) -> List[List[Dict]]:
+    """Split instruments into stable, symbol-ordered shards"""
+    if shard_size < 1:
+        raise ValueError("shard_size must be positive")
+    ordered = sorted(instruments, key=lambda item: item['symbol'])
+    return [ordered[i:i + shard_size] for i in range(0, len(ordered), shard_size)]
+
+
+async def _collect(kind: str, instruments: List[Dict]) -> Dict[str, int]:
+    """Run the collector for one shard, publishing quotes to the shared channel"""
+    from services.data_collector import DataCollectorService
+    from services.quote_channel import create_quote_channel
+
+    collector = DataCollectorService()
+    channel = create_quote_channel()
+    collector.attach_channel(channel)
+    try:
+        if kind == 'stock':
+            return await collector.collect_stocks(instruments)
+        return await collector.collect_currencies(instruments)
+    finally:
+        await channel.close()
+
+
+@celery_app.task(name='collection.collect_shard')
+def collect_shard(kind: str, shard_index: int, instruments: List[Dict]) -> Dict:
+    """Fetch and store one shard of instruments"""
+    started = time.perf_counter()
+    stats = asyncio.run(_collect(kind, instruments))
+    return {
+        'kind': kind,
+        'shard': shard_index,
+        'instruments': len(instruments),
+        **stats,
+        'elapsed_seconds': round(time.perf_counter() - started, 4)
+    }
+
+
+@celery_app.task(name='collection.aggregate')
+def aggregate_results(results: List[Dict], kind: str, dispatched_at: float) -> Dict:
+    """Combine per-shard results into one collection report"""
+    shards = sorted(results, key=lambda item: item['shard'])
+    summary = {
+        'kind': kind,
+        'shards': len(shards),
+        'instruments': sum(item['instruments'] for item in shards),
+        'updated': sum(item['updated'] for item in shards),
+        'missing': sum(item['missing'] for item in shards),
+        'failed': sum(item['failed'] for item in shards),
+        'wall_seconds': round(time.time() - dispatched_at, 4),
+        'slowest_shard_seconds': max((item['elapsed_seconds'] for item in shards), default=0.0),
+        'shard_results': shards,
+        'completed_at': datetime.now().isoformat()
+    }
+    logger.info(
+        f"Collected {summary['updated']}/{summary['instruments']} {kind} instruments "
+        f"in {summary['shards']} shards ({summary['wall_seconds']}s)"
+    )
+    return summary
+
+
+def schedule_collection(kind: str, instruments: Optional[List[Dict]] = None, shard_size: Optional[int] = None):
+    """Shard the universe and dispatch one collection task per shard"""
+    if kind not in INSTRUMENT_TABLES:
+        raise ValueError(f"Unknown instrument kind: {kind}")
+
+    if instruments is None:
+        db_client = get_db_client()
+        instruments = db_client.table(INSTRUMENT_TABLES[kind]).select('id,symbol').is_('deleted_at', 'null').execute().data or []
+
+    shards = shard_instruments(instruments, shard_size or settings.collection_shard_size)
+    if not shards:
+        logger.warning(f"No {kind} instruments to collect")
+        return None
+
+    header = [collect_shard.s(kind, index, shard) for index, shard in enumerate(shards)]
+    return chord(header)(aggregate_results.s(kind, time.time()))
+
+
+@celery_app.task(name='collection.dispatch')
+def dispatch_collection(kind: str) -> Optional[str]:
+    """Beat entry point: schedule a full collection round"""
+    result = schedule_collection(kind)
+    return result.id if result is not None else None
+
+
+@celery_app.task(name='maintenance.compact')
+def compact_prices() -> Dict:
+    """Apply the price retention tiers (see services.compaction_service)"""
+    from services.compaction_service import CompactionJob
+
+    return CompactionJob().run()
@@ -0,0 +1,157 @@
+"""
+Compaction Service
+Retention tiers for the price tables: raw rows are merged into coarser bars
+as they age, so table size and history queries stay flat over time
+
+A tier spec such as "raw:7d,5m:90d,1d:forever" keeps raw rows for 7 days,
+5-minute bars until 90 days and daily bars after that; a finite last tier
+("1d:5y") deletes rows beyond it. The work is done by the
+`compact_price_bars` / `delete_price_rows` functions (sql/004), one bounded
+transaction per call, so the job is idempotent and can stop at any batch.
+"""
+
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from config.database import get_db_client
+from config.settings import settings
+from utils.helpers import INTERVAL_SECONDS, parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+DURATION_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800, 'y': 31536000}
+
+
+class RetentionTier(NamedTuple):
+    interval: str               # 'raw' or a key of INTERVAL_SECONDS
+    keep_seconds: Optional[int]  # None for forever
+
+
+def parse_duration(text: str) -> Optional[int]:
+    """'7d' -> seconds; 'forever' -> None"""
+    if text == 'forever':
+        return None
+    match = re.fullmatch(r'(\d+)([mhdwy])', text)
+    if not match:
+        raise ValueError(f"Invalid duration: {text}")
+    return int(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+def parse_retention_tiers(spec: str) -> List[RetentionTier]:
+    """Parse 'raw:7d,5m:90d,1d:forever' into ordered, validated tiers"""
+    tiers = []
+    for part in spec.split(','):
+        interval, _, keep = part.strip().partition(':')
+        if interval != 'raw' and interval not in INTERVAL_SECONDS:
+            raise ValueError(f"Unknown retention interval: {interval}")
+        tiers.append(RetentionTier(interval, parse_duration(keep)))
+
+    if not tiers or tiers[0].interval != 'raw':
+        raise ValueError("The first retention tier must be 'raw'")
+    for previous, tier in zip(tiers, tiers[1:]):
+        if previous.keep_seconds is None:
+            raise ValueError("Only the last retention tier can be 'forever'")
+        if tier.keep_seconds is not None and tier.keep_seconds <= previous.keep_seconds:
+            raise ValueError("Retention tiers must cover increasing ages")
+        if previous.interval != 'raw' and INTERVAL_SECONDS[tier.interval] <= INTERVAL_SECONDS[previous.interval]:
+            raise ValueError("Retention tiers must use increasing intervals")
+    return tiers
+
+
+def _align(moment: datetime, step: int, up: bool = False) -> datetime:
+    """Round to a bucket boundary of `step` seconds (down, or up with `up`)"""
+    epoch = moment.timestamp()
+    bucket = -(-epoch // step) if up else epoch // step
+    return datetime.fromtimestamp(bucket * step, tz=timezone.utc)
+
+
+class CompactionJob:
+    """Runs the retention tiers against stock_prices and currency_rates"""
+
+    def __init__(
+        self,
+        tiers: Optional[List[RetentionTier]] = None,
+        batch_size: Optional[int] = None,
+        pause: Optional[float] = None
+    ):
+        self.tiers = tiers or parse_retention_tiers(settings.retention_tiers)
+        self.batch_size = batch_size or settings.compaction_batch_size
+        self.pause = settings.compaction_pause if pause is None else pause
+
+    def run(self, kinds: Iterable[str] = ('stock', 'currency'), now: Optional[datetime] = None) -> Dict:
+        """Compact every tier window until nothing is left; returns rows reclaimed per kind and tier"""
+        now = now or datetime.now(timezone.utc)
+        started = time.monotonic()
+        report: Dict = {'rows_reclaimed': 0, 'kinds': {}}
+
+        for kind in kinds:
+            kind_report = report['kinds'].setdefault(kind, {})
+            for index, tier in enumerate(self.tiers[1:], start=1):
+                newer = now - timedelta(seconds=self.tiers[index - 1].keep_seconds)
+                older = now - timedelta(seconds=tier.keep_seconds) if tier.keep_seconds is not None else None
+                stats = self._compact(kind, tier.interval, older, newer)
+                kind_report[tier.interval] = stats
+                report['rows_reclaimed'] += stats['rows_reclaimed']
+
+            last = self.tiers[-1]
+            if last.keep_seconds is not None:
+                expired = self._expire(kind, now - timedelta(seconds=last.keep_seconds))
+                kind_report['expired'] = expired
+                report['rows_reclaimed'] += expired
+
+        report['seconds'] = round(time.monotonic() - started, 1)
+        logger.info(f"Compaction reclaimed {report['rows_reclaimed']} rows in {report['seconds']}s")
+        return report
+
+    def _compact(self, kind: str, interval: str, start: Optional[datetime], end: datetime) -> Dict[str, int]:
+        """Merge rows in [start, end) into `interval` bars, one bounded slice per call
+
+        The window is narrowed to whole buckets so no bar takes in rows of the
+        neighbouring tiers; the remainder is picked up by a later run. Each
+        call returns where its slice ended, and the next call starts there, so
+        every row of the window is read once.
+        """
+        db_client = get_db_client()
+        stats = {'buckets': 0, 'rows_deleted': 0, 'rows_reclaimed': 0, 'batches': 0}
+        step = INTERVAL_SECONDS[interval]
+        end = _align(end, step)
+        cursor = _align(start, step, up=True) if start else None
+        while cursor is None or cursor < end:
+            response = db_client.rpc('compact_price_bars', {
+                'p_kind': kind,
+                'p_step': step,
+                'p_from': cursor.isoformat() if cursor else '-infinity',
+                'p_to': end.isoformat(),
+                'p_batch': self.batch_size
+            }).execute()
+            row = (response.data or [{}])[0]
+            if not row.get('next_from'):
+                break
+            cursor = parse_timestamp(row['next_from'])
+            stats['batches'] += 1
+            buckets, deleted = row.get('buckets') or 0, row.get('rows_deleted') or 0
+            if buckets:
+                stats['buckets'] += buckets
+                stats['rows_deleted'] += deleted
+                stats['rows_reclaimed'] += deleted - buckets
+                logger.info(f"Compacted {deleted} {kind} rows into {buckets} {interval} bars")
+                time.sleep(self.pause)
+        return stats
+
+    def _expire(self, kind: str, before: datetime) -> int:
+        """Delete rows older than the last tier, one bounded batch per call"""
+        db_client = get_db_client()
+        total = 0
+        while True:
+            deleted = db_client.rpc('delete_price_rows', {
+                'p_kind': kind,
+                'p_before': before.isoformat(),
+                'p_limit': self.batch_size
+            }).execute().data or 0
+            if not deleted:
+                return total
+            total += deleted
+            time.sleep(self.pause)
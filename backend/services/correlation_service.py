@@ -0,0 +1,298 @@
+"""
+Correlation Service
+Rolling cross-asset correlation and beta matrices over the whole universe
+
+Returns of every stock and currency pair are aligned into one (bars x
+instruments) matrix. Each window keeps running sums and a cross-product
+matrix, so a new bar costs one rank-one update instead of a full rebuild,
+and the covariance, correlation and beta matrices come out of a handful
+of vectorized operations.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.database import fetch_all, get_db_client
+from config.settings import settings
+from utils.helpers import INTERVAL_SECONDS, bucket_epoch, timestamp_to_epoch
+
+logger = logging.getLogger(__name__)
+
+ID_BATCH_SIZE = 100
+
+UNIVERSE_SOURCES = (
+    ('stock', 'stocks', 'stock_prices', 'stock_id', 'close'),
+    ('currency', 'currencies', 'currency_rates', 'currency_id', 'rate')
+)
+
+
+def align_prices(
+    epochs: np.ndarray,
+    columns: np.ndarray,
+    values: np.ndarray,
+    n_columns: int,
+    interval: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build a forward-filled (buckets x instruments) price matrix from
+    time-ordered samples. The last sample of each bucket wins.
+    """
+    step = INTERVAL_SECONDS[interval]
+    buckets = (epochs // step).astype(np.int64) * step
+    unique = np.unique(buckets)
+    prices = np.full((len(unique), n_columns), np.nan)
+    prices[np.searchsorted(unique, buckets), columns] = values
+
+    # Forward fill along time without Python loops
+    filled = np.where(~np.isnan(prices), np.arange(len(unique))[:, None], 0)
+    np.maximum.accumulate(filled, axis=0, out=filled)
+    prices = prices[filled, np.arange(n_columns)]
+    return unique, prices
+
+
+def log_returns(prices: np.ndarray) -> np.ndarray:
+    """Log returns between consecutive rows; gaps contribute a zero return"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.diff(np.log(prices), axis=0)
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+class RollingMoments:
+    """First and second moments of the last `window` return rows"""
+
+    def __init__(self, returns: np.ndarray, window: int):
+        self.window = window
+        self.n_columns = returns.shape[1]
+        self.buffer = np.zeros((window, self.n_columns))
+        tail = returns[-window:]
+        self.buffer[:len(tail)] = tail
+        self.count = len(tail)
+        self.position = self.count % window
+        self.updates = 0
+        self._recompute()
+
+    def _recompute(self):
+        rows = self.buffer[:self.count] if self.count < self.window else self.buffer
+        self.sum = rows.sum(axis=0)
+        self.cross = rows.T @ rows
+
+    def push(self, row: np.ndarray):
+        """Slide the window forward by one return row"""
+        if self.count == self.window:
+            old = self.buffer[self.position]
+            self.sum -= old
+            self.cross -= np.outer(old, old)
+        else:
+            self.count += 1
+
+        self.buffer[self.position] = row
+        self.sum += row
+        self.cross += np.outer(row, row)
+        self.position = (self.position + 1) % self.window
+
+        # Bound floating point drift from repeated add/subtract
+        self.updates += 1
+        if self.updates % self.window == 0:
+            self._recompute()
+
+    def covariance(self) -> np.ndarray:
+        if self.count == 0:
+            return np.full((self.n_columns, self.n_columns), np.nan)
+        mean = self.sum / self.count
+        return self.cross / self.count - np.outer(mean, mean)
+
+    def correlation(self) -> np.ndarray:
+        covariance = self.covariance()
+        std = np.sqrt(np.clip(np.diag(covariance), 0.0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = covariance / np.outer(std, std)
+        correlation[~np.isfinite(correlation)] = np.nan
+        return np.clip(correlation, -1.0, 1.0)
+
+
+class _Universe:
+    """Aligned universe for one interval plus its rolling windows"""
+
+    def __init__(self, interval: str, instruments: List[Dict], lookback_bars: int):
+        self.interval = interval
+        self.instruments = instruments
+        self.lookback_bars = lookback_bars
+        self.columns = {(item['kind'], str(item['id'])): index for index, item in enumerate(instruments)}
+        self.n_stocks = sum(1 for item in instruments if item['kind'] == 'stock')
+        self.built_at = time.time()
+        self.returns = np.zeros((0, len(instruments)))
+        self.last_prices = np.full(len(instruments), np.nan)
+        self.pending = np.full(len(instruments), np.nan)
+        self.current_bucket: Optional[int] = None
+        self.windows: Dict[int, RollingMoments] = {}
+
+    def load(self, buckets: np.ndarray, prices: np.ndarray):
+        if len(buckets) == 0:
+            return
+        self.returns = log_returns(prices)
+        # The latest bucket may still be forming: keep it pending
+        self.current_bucket = int(buckets[-1])
+        self.pending = prices[-1].copy()
+        self.last_prices = prices[-2].copy() if len(prices) > 1 else np.full(len(self.instruments), np.nan)
+        self.returns = self.returns[:-1] if len(self.returns) else self.returns
+
+    def moments(self, window: int) -> RollingMoments:
+        """Moments over the last `window` completed bars"""
+        if window not in self.windows:
+            self.windows[window] = RollingMoments(self.returns, window)
+        return self.windows[window]
+
+    def _pending_return(self) -> np.ndarray:
+        prices = np.vstack([self.last_prices, np.where(np.isnan(self.pending), self.last_prices, self.pending)])
+        return log_returns(prices)[0]
+
+    def on_quote(self, kind: str, instrument_id: str, epoch: float, price: float):
+        column = self.columns.get((kind, instrument_id))
+        if column is None:
+            return
+        bucket = bucket_epoch(epoch, self.interval)
+        if self.current_bucket is not None and bucket < self.current_bucket:
+            return
+
+        if self.current_bucket is not None and bucket > self.current_bucket:
+            self._close_bar()
+        self.current_bucket = bucket
+        self.pending[column] = price
+
+    def _close_bar(self):
+        """The forming bar is complete: push its return into every window"""
+        if not np.all(np.isnan(self.last_prices)):
+            row = self._pending_return()
+            self.returns = np.vstack([self.returns, row])[-self.lookback_bars:]
+            for moments in self.windows.values():
+                moments.push(row)
+        self.last_prices = np.where(np.isnan(self.pending), self.last_prices, self.pending)
+        self.pending = self.last_prices.copy()
+
+
+class CorrelationService:
+    """Rolling correlation and beta matrices cached per (interval, window)"""
+
+    def __init__(self):
+        self._universes: Dict[str, _Universe] = {}
+
+    def cache_stats(self) -> Dict:
+        return {
+            interval: {
+                'instruments': len(universe.instruments),
+                'bars': len(universe.returns),
+                'age_seconds': round(time.time() - universe.built_at)
+            }
+            for interval, universe in self._universes.items()
+        }
+
+    async def get_matrices(self, window: int, interval: str = "1d", include_correlation: bool = True) -> Dict:
+        """Correlation of every instrument pair and beta of every stock against every currency pair"""
+        universe = self._universes.get(interval)
+        if (
+            universe is None
+            or universe.lookback_bars < window + 1
+            or time.time() - universe.built_at > settings.correlation_rebuild_seconds
+        ):
+            universe = self._build_universe(interval, max(window + 1, getattr(universe, 'lookback_bars', 0)))
+            self._universes[interval] = universe
+
+        moments = universe.moments(window)
+        covariance = moments.covariance()
+        stocks = slice(0, universe.n_stocks)
+        currencies = slice(universe.n_stocks, len(universe.instruments))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            beta = covariance[stocks, currencies] / np.diag(covariance)[currencies]
+
+        result = {
+            'interval': interval,
+            'window': window,
+            'observations': moments.count,
+            'as_of': datetime.fromtimestamp(universe.current_bucket, tz=timezone.utc).isoformat()
+            if universe.current_bucket is not None else None,
+            'instruments': universe.instruments,
+            'beta': {
+                'stocks': [item['symbol'] for item in universe.instruments[stocks]],
+                'currencies': [item['symbol'] for item in universe.instruments[currencies]],
+                'matrix': _json_matrix(beta)
+            }
+        }
+        if include_correlation:
+            result['correlation'] = _json_matrix(moments.correlation())
+        return result
+
+    def on_quote(self, quote: Dict):
+        """Collector listener: fold the quote into the forming bar of each universe"""
+        epoch = timestamp_to_epoch(quote['timestamp'])
+        for universe in self._universes.values():
+            universe.on_quote(quote.get('kind'), str(quote.get('instrument_id')), epoch, float(quote['price']))
+
+    def invalidate(self, kind: str, instrument_id: str):
+        """Drop universes containing an instrument; they rebuild without it on the next request"""
+        for interval, universe in list(self._universes.items()):
+            if (kind, str(instrument_id)) in universe.columns:
+                del self._universes[interval]
+
+    def _build_universe(self, interval: str, lookback_bars: int) -> _Universe:
+        started = time.perf_counter()
+        db_client = get_db_client()
+        step = INTERVAL_SECONDS[interval]
+        # Calendar slack for weekends and holidays
+        since = datetime.now(timezone.utc) - timedelta(seconds=step * lookback_bars * 1.5) - timedelta(days=4)
+
+        instruments: List[Dict] = []
+        samples: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        for kind, table, price_table, id_column, value_column in UNIVERSE_SOURCES:
+            rows = db_client.table(table).select('id,symbol').is_('deleted_at', 'null').order('symbol').execute().data or []
+            offset = len(instruments)
+            index = {str(row['id']): offset + i for i, row in enumerate(rows)}
+            instruments.extend({'kind': kind, 'id': str(row['id']), 'symbol': row['symbol']} for row in rows)
+            if not rows:
+                continue
+
+            ids = list(index)
+            prices: List[Dict] = []
+            # Keep the `in` filter short enough for the request URL
+            for start in range(0, len(ids), ID_BATCH_SIZE):
+                batch = ids[start:start + ID_BATCH_SIZE]
+                prices.extend(fetch_all(
+                    lambda: db_client.table(price_table)
+                    .select(f'{id_column},timestamp,{value_column}')
+                    .in_(id_column, batch)
+                    .gte('timestamp', since.isoformat())
+                    .order('timestamp', desc=False)
+                ))
+            samples.append((
+                np.fromiter((timestamp_to_epoch(row['timestamp']) for row in prices), dtype=float, count=len(prices)),
+                np.fromiter((index[str(row[id_column])] for row in prices), dtype=np.int64, count=len(prices)),
+                np.fromiter((float(row[value_column]) for row in prices), dtype=float, count=len(prices))
+            ))
+
+        universe = _Universe(interval, instruments, lookback_bars)
+        if samples:
+            epochs = np.concatenate([sample[0] for sample in samples])
+            order = np.argsort(epochs, kind='stable')
+            columns = np.concatenate([sample[1] for sample in samples])[order]
+            values = np.concatenate([sample[2] for sample in samples])[order]
+            buckets, prices = align_prices(epochs[order], columns, values, len(instruments), interval)
+            universe.load(buckets[-(lookback_bars + 2):], prices[-(lookback_bars + 2):])
+
+        logger.info(
+            f"Built {interval} correlation universe: {len(instruments)} instruments, "
+            f"{len(universe.returns)} return rows in {time.perf_counter() - started:.2f}s"
+        )
+        return universe
+
+
+def _json_matrix(matrix: np.ndarray) -> List[List[Optional[float]]]:
+    """Round and convert a matrix to nested lists (NaN -> None)"""
+    rounded = np.round(matrix, 6)
+    return np.where(np.isnan(rounded), None, rounded).tolist()
+
+
+# Shared instance fed by the data collector
+correlation_service = CorrelationService()
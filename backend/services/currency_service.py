@@ -3,20 +3,32 @@ Currency Service
 Business logic for currency-related operations
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 import logging
 from config.database import get_db_client
 from schemas.currency import Currency, CurrencyCreate, CurrencyUpdate
 from services.data_collector import DataCollectorService
+from services.price_history import fetch_history
+from services.price_windows import attach_prices
+from services.purge_service import instrument_purger
+from services.quote_service import quote_service
 
 logger = logging.getLogger(__name__)
 
 class CurrencyService:
     """Service for currency-related business logic"""
     
-    def __init__(self):
-        self.data_collector = DataCollectorService()
+    def __init__(self, db_client=None):
+        self.db_client = db_client
+        self._data_collector: Optional[DataCollectorService] = None
+    
+    @property
+    def data_collector(self) -> DataCollectorService:
+        """Collector for on-demand refreshes, built only when one is requested"""
+        if self._data_collector is None:
+            self._data_collector = DataCollectorService()
+        return self._data_collector
         
     async def get_currencies(
         self, 
@@ -29,7 +41,7 @@ class CurrencyService:
             db_client = get_db_client()
             
             # Build query
-            query = db_client.table('currencies').select('*')
+            query = db_client.table('currencies').select('*').is_('deleted_at', 'null')
             
             # Apply filters
             if search:
@@ -42,7 +54,7 @@ class CurrencyService:
             response = query.execute()
             
             # Get total count for pagination
-            count_query = db_client.table('currencies').select('*', count='exact')
+            count_query = db_client.table('currencies').select('*', count='exact').is_('deleted_at', 'null')
             if search:
                 count_query = count_query.or_(f'name.ilike.%{search}%,symbol.ilike.%{search}%')
             
@@ -59,12 +71,47 @@ class CurrencyService:
             logger.error(f"Error getting currencies: {e}")
             raise
             
+    async def list_currencies(
+        self,
+        page: int = 1,
+        size: int = 20,
+        search: Optional[str] = None,
+        history_points: int = 0
+    ) -> Tuple[List[Dict], int]:
+        """Page of currencies with latest rate and optional short history.
+        
+        Uses a constant number of round trips whatever the page size.
+        """
+        try:
+            db_client = self.db_client or get_db_client()
+            
+            query = db_client.table('currencies').select('*', count='exact').is_('deleted_at', 'null')
+            if search:
+                query = query.or_(f'name.ilike.%{search}%,symbol.ilike.%{search}%')
+            
+            skip = (page - 1) * size
+            response = query.order('symbol').range(skip, skip + size - 1).execute()
+            currencies = response.data or []
+            
+            latest_quotes = {}
+            if currencies and not history_points:
+                quotes = await quote_service.get_latest_quotes(
+                    kind='currency', ids=[str(currency['id']) for currency in currencies]
+                )
+                latest_quotes = {quote['instrument_id']: quote for quote in quotes['quotes']}
+            
+            return attach_prices('currency', currencies, history_points, latest_quotes), response.count or 0
+            
+        except Exception as e:
+            logger.error(f"Error listing currencies: {e}")
+            raise
+            
     async def get_currency_by_id(self, currency_id: int) -> Optional[Currency]:
         """Get currency by ID"""
         try:
             db_client = get_db_client()
             
-            response = db_client.table('currencies').select('*').eq('id', currency_id).execute()
+            response = db_client.table('currencies').select('*').eq('id', currency_id).is_('deleted_at', 'null').execute()
             
             if response.data:
                 return Currency(**response.data[0])
@@ -104,6 +151,21 @@ class CurrencyService:
             logger.error(f"Error fetching rate history for currency {currency_id}: {e}")
             raise
             
+    async def get_rate_history_with_interval(
+        self,
+        currency_id: str,
+        start_date: datetime,
+        end_date: datetime,
+        interval: str = '1d'
+    ) -> Dict[str, Any]:
+        """Rate bars for a date range as column arrays (see services.price_history)"""
+        try:
+            return fetch_history('currency', currency_id, start_date, end_date, interval)
+            
+        except Exception as e:
+            logger.error(f"Error fetching {interval} rate history for currency {currency_id}: {e}")
+            raise
+            
     async def get_latest_rate(self, currency_id: str) -> Optional[Dict]:
         """Get latest rate for a currency"""
         try:
@@ -157,18 +219,11 @@ class CurrencyService:
             logger.error(f"Error updating currency {currency_id}: {e}")
             raise
             
-    async def delete_currency(self, currency_id: str) -> bool:
-        """Delete a currency"""
+    async def delete_currency(self, currency_id: str) -> Optional[Dict]:
+        """Soft delete a currency; its rate history is purged in the background"""
         try:
-            db_client = get_db_client()
-            
-            # Delete related rate data first
-            await db_client.table('currency_rates').delete().eq('currency_id', currency_id).execute()
-            
-            # Delete currency
-            response = await db_client.table('currencies').delete().eq('id', currency_id).execute()
-            
-            return True
+            job = await instrument_purger.soft_delete('currency', currency_id)
+            return job.to_dict() if job else None
             
         except Exception as e:
             logger.error(f"Error deleting currency {currency_id}: {e}")
@@ -4,21 +4,83 @@ Handles data collection from external sources like yfinance
 """
 
 import asyncio
-import yfinance as yf
-from datetime import datetime, timedelta
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional
 import logging
 from config.database import get_db_client
 from config.settings import settings
+from services.intraday_service import bar_to_row, in_session, intraday_book, session_start
+from services.market_data import MarketDataProvider, yfinance_ticker, get_market_data_provider
+from services.metadata_service import metadata_service
+from services.price_history import HISTORY_SOURCES
+from services.quote_channel import QuoteCallback, QuoteChannel, invoke_callback
+from services.quote_service import latest_quote_row
 
 logger = logging.getLogger(__name__)
 
+def _provider_symbol(kind: str, instrument: Dict) -> str:
+    return f"{instrument['symbol']}.IS" if kind == 'stock' else instrument['symbol']
+
+INSTRUMENT_TABLES = {'stock': 'stocks', 'currency': 'currencies'}
+FLUSH_BATCH_SIZE = 1000  # bar rows per storage request
+
 class DataCollectorService:
     """Service for collecting financial data from external sources"""
     
-    def __init__(self):
+    def __init__(self, provider: Optional[MarketDataProvider] = None):
+        self.provider = provider or get_market_data_provider()
         self.is_running = False
         self.tasks = []
+        self.instance_id = uuid.uuid4().hex
+        self.listeners: List[QuoteCallback] = []
+        self.channel: Optional[QuoteChannel] = None
+        
+    def add_listener(self, callback: QuoteCallback):
+        """Register a callback invoked for every collected quote"""
+        self.listeners.append(callback)
+        
+    def attach_channel(self, channel: QuoteChannel):
+        """Publish collected quotes to a channel shared with other workers"""
+        self.channel = channel
+        
+    async def receive_quote(self, quote: Dict):
+        """Dispatch a quote published by the collector leader"""
+        if quote.get('origin') == self.instance_id or 'event' in quote:
+            return
+        await self._dispatch_quote(quote)
+        
+    async def _dispatch_quote(self, quote: Dict):
+        """Hand a quote to local listeners"""
+        for callback in list(self.listeners):
+            await invoke_callback(callback, quote)
+            
+    async def _emit_quote(self, kind: str, instrument: Dict, row: Dict) -> Dict:
+        """Announce a freshly stored row locally and on the shared channel"""
+        quote = {
+            **row,
+            'kind': kind,
+            'instrument_id': instrument['id'],
+            'symbol': instrument['symbol'],
+            'price': row['close'] if kind == 'stock' else row['rate'],
+            'origin': self.instance_id
+        }
+        await self._dispatch_quote(quote)
+        if self.channel is not None:
+            await self.channel.publish(quote)
+        return quote
+        
+    def _store_latest_quotes(self, quotes: List[Dict]):
+        """Upsert the latest quote of each collected instrument in one request"""
+        if not quotes:
+            return
+        try:
+            db_client = get_db_client()
+            db_client.table('latest_quotes')\
+                .upsert([latest_quote_row(quote) for quote in quotes], on_conflict='kind,instrument_id')\
+                .execute()
+        except Exception as e:
+            logger.error(f"Error storing latest quotes: {e}")
         
     async def start_background_tasks(self):
         """Start background data collection tasks"""
@@ -29,8 +91,14 @@ class DataCollectorService:
         logger.info("Starting data collection background tasks...")
         
         # Start periodic tasks
-        self.tasks.append(asyncio.create_task(self._periodic_stock_update()))
-        self.tasks.append(asyncio.create_task(self._periodic_currency_update()))
+        if settings.collection_bars == "intraday":
+            self.tasks.append(asyncio.create_task(self._periodic_intraday_update('stock')))
+            self.tasks.append(asyncio.create_task(self._periodic_intraday_update('currency')))
+        else:
+            self.tasks.append(asyncio.create_task(self._periodic_stock_update()))
+            self.tasks.append(asyncio.create_task(self._periodic_currency_update()))
+        if settings.compaction_interval > 0:
+            self.tasks.append(asyncio.create_task(self._periodic_compaction()))
         
     async def stop_background_tasks(self):
         """Stop background data collection tasks"""
@@ -54,12 +122,12 @@ class DataCollectorService:
             try:
                 await self.update_stock_data()
                 # Update every 5 minutes during market hours
-                await asyncio.sleep(300)
+                await self.provider.sleep(300)
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Error in periodic stock update: {e}")
-                await asyncio.sleep(60)  # Wait 1 minute on error
+                await self.provider.sleep(60)  # Wait 1 minute on error
                 
     async def _periodic_currency_update(self):
         """Periodic currency data update task"""
@@ -67,12 +135,57 @@ class DataCollectorService:
             try:
                 await self.update_currency_data()
                 # Update every 1 minute
-                await asyncio.sleep(60)
+                await self.provider.sleep(60)
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Error in periodic currency update: {e}")
-                await asyncio.sleep(60)  # Wait 1 minute on error
+                await self.provider.sleep(60)  # Wait 1 minute on error
+                
+    async def _periodic_intraday_update(self, kind: str):
+        """Poll intraday bars while the market is open; flush the closing bars after it"""
+        while self.is_running:
+            try:
+                await self.intraday_cycle(kind)
+                await self.provider.sleep(settings.intraday_poll_seconds)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in periodic intraday {kind} update: {e}")
+                await self.provider.sleep(settings.intraday_poll_seconds)
+                
+    async def intraday_cycle(self, kind: str):
+        """One intraday poll: collect during the session, flush the closing bars after it"""
+        if in_session(kind, datetime.fromtimestamp(self.provider.now(), tz=timezone.utc)):
+            db_client = get_db_client()
+            instruments = db_client.table(INSTRUMENT_TABLES[kind]).select('*').is_('deleted_at', 'null').execute().data
+            await self.collect_intraday(kind, instruments)
+            if kind == 'stock':
+                metadata_service.refresh_stale(kind, [instrument['symbol'] for instrument in instruments])
+        else:
+            self._flush_intraday(kind)
+    
+    async def run_cycle(self, kind: str):
+        """One iteration of the background loop collecting `kind` (used for profiling)"""
+        if settings.collection_bars == "intraday":
+            await self.intraday_cycle(kind)
+        elif kind == 'stock':
+            await self.update_stock_data()
+        else:
+            await self.update_currency_data()
+                
+    async def _periodic_compaction(self):
+        """Periodic retention compaction, run in a thread off the request path"""
+        from services.compaction_service import CompactionJob
+        
+        while self.is_running:
+            try:
+                await asyncio.sleep(settings.compaction_interval)
+                await asyncio.to_thread(CompactionJob().run)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in periodic compaction: {e}")
                 
     async def update_stock_data(self):
         """Update stock data from yfinance"""
@@ -83,47 +196,62 @@ class DataCollectorService:
             db_client = get_db_client()
             
             # Fetch stocks from database
-            stocks_response = db_client.table('stocks').select('*').execute()
-            stocks = stocks_response.data
-            
-            for stock in stocks:
-                try:
-                    # Fetch data from yfinance with BIST suffix
-                    symbol_with_suffix = f"{stock['symbol']}.IS"
-                    logger.info(f"Fetching data for {symbol_with_suffix}")
-                    
-                    ticker = yf.Ticker(symbol_with_suffix)
-                    hist = ticker.history(period="5d", interval="1d")  # 5 günlük veri, günlük interval
-                    
-                    if not hist.empty:
-                        latest = hist.iloc[-1]
-                        
-                        # Insert latest price data
-                        price_data = {
-                            'stock_id': stock['id'],
-                            'timestamp': datetime.now().isoformat(),
-                            'open': float(latest['Open']),
-                            'high': float(latest['High']),
-                            'low': float(latest['Low']),
-                            'close': float(latest['Close']),
-                            'volume': int(latest['Volume'])
-                        }
-                        
-                        db_client.table('stock_prices').insert(price_data).execute()
-                        logger.info(f"Successfully updated {symbol_with_suffix}: Close={latest['Close']}")
-                        
-                    else:
-                        logger.warning(f"No data found for {symbol_with_suffix}")
-                        
-                except Exception as e:
-                    logger.error(f"Error updating stock {stock['symbol']}: {e}")
-                    continue
+            stocks_response = db_client.table('stocks').select('*').is_('deleted_at', 'null').execute()
+            await self.collect_stocks(stocks_response.data)
+            # Keep sector / market cap current without waiting on Ticker.info
+            metadata_service.refresh_stale('stock', [stock['symbol'] for stock in stocks_response.data])
                     
             logger.info("Stock data update completed")
             
         except Exception as e:
             logger.error(f"Error in update_stock_data: {e}")
             
+    async def collect_stocks(self, stocks: List[Dict]) -> Dict[str, int]:
+        """Fetch and store the latest bar for the given stocks"""
+        stats = {'updated': 0, 'missing': 0, 'failed': 0}
+        db_client = get_db_client()
+        latest_quotes = []
+        
+        for stock in stocks:
+            try:
+                # Fetch data from yfinance with BIST suffix
+                symbol_with_suffix = f"{stock['symbol']}.IS"
+                logger.info(f"Fetching data for {symbol_with_suffix}")
+                
+                bars = await asyncio.to_thread(self.provider.daily_bars, symbol_with_suffix)
+                
+                if bars:
+                    latest = bars[-1]
+                    
+                    # Insert latest price data
+                    price_data = {
+                        'stock_id': stock['id'],
+                        'timestamp': datetime.fromtimestamp(self.provider.now()).isoformat(),
+                        'open': latest['open'],
+                        'high': latest['high'],
+                        'low': latest['low'],
+                        'close': latest['close'],
+                        'volume': int(latest['volume'])
+                    }
+                    
+                    response = db_client.table('stock_prices').insert(price_data).execute()
+                    stored = response.data[0] if response.data else price_data
+                    latest_quotes.append(await self._emit_quote('stock', stock, stored))
+                    stats['updated'] += 1
+                    logger.info(f"Successfully updated {symbol_with_suffix}: Close={latest['close']}")
+                    
+                else:
+                    stats['missing'] += 1
+                    logger.warning(f"No data found for {symbol_with_suffix}")
+                    
+            except Exception as e:
+                stats['failed'] += 1
+                logger.error(f"Error updating stock {stock['symbol']}: {e}")
+                continue
+                
+        self._store_latest_quotes(latest_quotes)
+        return stats
+            
     async def update_currency_data(self):
         """Update currency data from yfinance"""
         try:
@@ -132,49 +260,120 @@ class DataCollectorService:
             db_client = get_db_client()
             
             # Fetch currencies from database
-            currencies_response = db_client.table('currencies').select('*').execute()
-            currencies = currencies_response.data
+            currencies_response = db_client.table('currencies').select('*').is_('deleted_at', 'null').execute()
+            await self.collect_currencies(currencies_response.data)
+                    
+            logger.info("Currency data update completed")
+            
+        except Exception as e:
+            logger.error(f"Error in update_currency_data: {e}")
             
-            for currency in currencies:
-                try:
-                    # Fetch data from yfinance
-                    logger.info(f"Fetching data for {currency['symbol']}")
+    async def collect_currencies(self, currencies: List[Dict]) -> Dict[str, int]:
+        """Fetch and store the latest rate for the given currencies"""
+        stats = {'updated': 0, 'missing': 0, 'failed': 0}
+        db_client = get_db_client()
+        latest_quotes = []
+        
+        for currency in currencies:
+            try:
+                # Fetch data from yfinance
+                logger.info(f"Fetching data for {currency['symbol']}")
+                
+                bars = await asyncio.to_thread(self.provider.daily_bars, currency['symbol'])
+                
+                if bars:
+                    latest = bars[-1]
                     
-                    ticker = yf.Ticker(currency['symbol'])
-                    hist = ticker.history(period="5d", interval="1d")  # 5 günlük veri, günlük interval
+                    # Insert latest rate data
+                    rate_data = {
+                        'currency_id': currency['id'],
+                        'timestamp': datetime.fromtimestamp(self.provider.now()).isoformat(),
+                        'rate': latest['close'],
+                        'high': latest['high'],
+                        'low': latest['low']
+                    }
                     
-                    if not hist.empty:
-                        latest = hist.iloc[-1]
-                        
-                        # Insert latest rate data
-                        rate_data = {
-                            'currency_id': currency['id'],
-                            'timestamp': datetime.now().isoformat(),
-                            'rate': float(latest['Close']),
-                            'high': float(latest['High']),
-                            'low': float(latest['Low'])
-                        }
-                        
-                        db_client.table('currency_rates').insert(rate_data).execute()
-                        logger.info(f"Successfully updated {currency['symbol']}: Rate={latest['Close']}")
-                        
-                    else:
-                        logger.warning(f"No data found for {currency['symbol']}")
-                        
-                except Exception as e:
-                    logger.error(f"Error updating currency {currency['symbol']}: {e}")
-                    continue
+                    response = db_client.table('currency_rates').insert(rate_data).execute()
+                    stored = response.data[0] if response.data else rate_data
+                    latest_quotes.append(await self._emit_quote('currency', currency, stored))
+                    stats['updated'] += 1
+                    logger.info(f"Successfully updated {currency['symbol']}: Rate={latest['close']}")
                     
-            logger.info("Currency data update completed")
+                else:
+                    stats['missing'] += 1
+                    logger.warning(f"No data found for {currency['symbol']}")
+                    
+            except Exception as e:
+                stats['failed'] += 1
+                logger.error(f"Error updating currency {currency['symbol']}: {e}")
+                continue
+                
+        self._store_latest_quotes(latest_quotes)
+        return stats
             
+    async def collect_intraday(self, kind: str, instruments: List[Dict]) -> Dict[str, int]:
+        """Merge the latest intraday window of each instrument and flush finished bars"""
+        stats = {'updated': 0, 'missing': 0, 'failed': 0, 'flushed': 0}
+        symbols = {_provider_symbol(kind, instrument): instrument for instrument in instruments}
+        ordered = list(symbols)
+        latest_quotes = []
+        
+        for offset in range(0, len(ordered), settings.intraday_batch_size):
+            batch = ordered[offset:offset + settings.intraday_batch_size]
+            buffers = {symbol: intraday_book.buffer(kind, symbols[symbol]['id']) for symbol in batch}
+            
+            # Re-request a few bars before the oldest known one so late revisions
+            # are merged; instruments seen for the first time get the whole day
+            known = [buffer.last_epoch for buffer in buffers.values()]
+            start = None if None in known else min(known) - intraday_book.step * settings.intraday_overlap_bars
+            try:
+                fetched = await asyncio.to_thread(self.provider.intraday_bars, batch, intraday_book.interval, start)
+            except Exception as e:
+                stats['failed'] += len(batch)
+                logger.error(f"Error fetching intraday bars for {len(batch)} {kind} instruments: {e}")
+                continue
+                
+            for symbol in batch:
+                bars = fetched.get(symbol)
+                if not bars:
+                    stats['missing'] += 1
+                    continue
+                changed = buffers[symbol].merge(bars)
+                if not changed:
+                    continue
+                # Quotes carry the session bar so far plus the bars that changed
+                instrument = symbols[symbol]
+                session = buffers[symbol].session(session_start(buffers[symbol].last_epoch))
+                row = {**bar_to_row(kind, instrument['id'], session), 'bars': changed, 'bar_interval': intraday_book.interval}
+                latest_quotes.append(await self._emit_quote(kind, instrument, row))
+                stats['updated'] += 1
+                
+        stats['flushed'] = self._flush_intraday(kind)
+        self._store_latest_quotes(latest_quotes)
+        return stats
+        
+    def _flush_intraday(self, kind: str) -> int:
+        """Write every finished, unflushed bar in bulk; a bar already stored is skipped"""
+        rows, watermarks = intraday_book.pending_rows(kind, self.provider.now())
+        if not rows:
+            return 0
+        table, id_column = HISTORY_SOURCES[kind][:2]
+        try:
+            db_client = get_db_client()
+            for offset in range(0, len(rows), FLUSH_BATCH_SIZE):
+                db_client.table(table)\
+                    .upsert(rows[offset:offset + FLUSH_BATCH_SIZE], on_conflict=f'{id_column},timestamp', ignore_duplicates=True)\
+                    .execute()
         except Exception as e:
-            logger.error(f"Error in update_currency_data: {e}")
+            logger.error(f"Error flushing {len(rows)} intraday {kind} bars: {e}")
+            return 0
+        intraday_book.mark_flushed(kind, watermarks)
+        return len(rows)
             
     async def get_stock_data(self, symbol: str, period: str = "1d") -> Optional[Dict]:
         """Get stock data for a specific symbol"""
         try:
-            ticker = yf.Ticker(f"{symbol}.IS")
-            hist = ticker.history(period=period)
+            hist = await asyncio.to_thread(lambda: yfinance_ticker(f"{symbol}.IS").history(period=period))
             
             if hist.empty:
                 return None
@@ -182,7 +381,7 @@ class DataCollectorService:
             return {
                 'symbol': symbol,
                 'data': hist.to_dict('records'),
-                'info': ticker.info
+                'info': (await metadata_service.get('stock', symbol, ('info',)))['info']
             }
             
         except Exception as e:
@@ -192,8 +391,7 @@ class DataCollectorService:
     async def get_currency_data(self, symbol: str, period: str = "1d") -> Optional[Dict]:
         """Get currency data for a specific symbol"""
         try:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period=period)
+            hist = await asyncio.to_thread(lambda: yfinance_ticker(symbol).history(period=period))
             
             if hist.empty:
                 return None
@@ -201,7 +399,7 @@ class DataCollectorService:
             return {
                 'symbol': symbol,
                 'data': hist.to_dict('records'),
-                'info': ticker.info
+                'info': (await metadata_service.get('currency', symbol, ('info',)))['info']
             }
             
         except Exception as e:
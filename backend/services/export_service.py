@@ -0,0 +1,131 @@
+"""
+Export Service
+Streams long price ranges as NDJSON or CSV without materializing them
+
+Every stage is a generator: storage is read one keyset page at a time,
+each page is encoded and handed to the response (optionally through an
+incremental gzip compressor), so memory stays flat for any range.
+"""
+
+import csv
+import io
+import logging
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import orjson
+
+from config.database import PAGE_SIZE, fetch_all, get_db_client, iter_pages
+from services.price_history import HISTORY_SOURCES
+
+logger = logging.getLogger(__name__)
+
+INSTRUMENT_TABLES = {'stock': 'stocks', 'currency': 'currencies'}
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv')
+}
+
+
+def export_columns(kind: str) -> List[str]:
+    """Column order of exported rows"""
+    return ['symbol', 'instrument_id', 'timestamp', *HISTORY_SOURCES[kind][3]]
+
+
+def resolve_instruments(kind: str, ids: List[str], symbols: List[str]) -> List[Dict]:
+    """Instruments (id, symbol) matching the given ids and/or symbols, ordered by symbol"""
+    def quoted(values):
+        return ','.join(f'"{value}"' for value in values)
+
+    filters = []
+    if ids:
+        filters.append(f"id.in.({quoted(ids)})")
+    if symbols:
+        filters.append(f"symbol.in.({quoted(symbol.upper() for symbol in symbols)})")
+
+    db_client = get_db_client()
+
+    def build_query():
+        query = db_client.table(INSTRUMENT_TABLES[kind]).select('id,symbol').is_('deleted_at', 'null')
+        if filters:
+            query = query.or_(','.join(filters))
+        return query.order('symbol')
+
+    return fetch_all(build_query)
+
+
+def iter_price_pages(
+    kind: str,
+    instruments: List[Dict],
+    start_date: datetime,
+    end_date: datetime,
+    page_size: int = PAGE_SIZE
+) -> Iterator[List[Dict]]:
+    """Pages of price rows, instrument by instrument, oldest first"""
+    table, id_column, _, fields = HISTORY_SOURCES[kind]
+    db_client = get_db_client()
+
+    for instrument in instruments:
+        instrument_id = str(instrument['id'])
+        pages = iter_pages(
+            lambda: db_client.table(table)
+            .select(','.join(('timestamp',) + fields))
+            .eq(id_column, instrument_id)
+            .gte('timestamp', start_date.isoformat())
+            .lte('timestamp', end_date.isoformat())
+            .order('timestamp', desc=False),
+            page_size=page_size
+        )
+        for page in pages:
+            yield [{'symbol': instrument['symbol'], 'instrument_id': instrument_id, **row} for row in page]
+
+
+def encode_ndjson(pages: Iterable[List[Dict]], columns: List[str]) -> Iterator[bytes]:
+    """One JSON object per line, one chunk per page"""
+    for page in pages:
+        yield b''.join(orjson.dumps({name: row.get(name) for name in columns}) + b'\n' for row in page)
+
+
+def encode_csv(pages: Iterable[List[Dict]], columns: List[str]) -> Iterator[bytes]:
+    """CSV with a header row, one chunk per page"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for page in pages:
+        writer.writerows([row.get(name) for name in columns] for row in page)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a byte stream incrementally into a single gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_prices(
+    kind: str,
+    instruments: List[Dict],
+    start_date: datetime,
+    end_date: datetime,
+    fmt: str = 'ndjson',
+    compression: Optional[str] = None,
+    page_size: int = PAGE_SIZE
+) -> Iterator[bytes]:
+    """The full export pipeline: storage pages -> encoder -> optional gzip"""
+    columns = export_columns(kind)
+    pages = iter_price_pages(kind, instruments, start_date, end_date, page_size)
+    encoder = encode_csv if fmt == 'csv' else encode_ndjson
+    chunks = encoder(pages, columns)
+    if compression == 'gzip':
+        chunks = gzip_stream(chunks)
+    logger.info(f"Exporting {kind} prices for {len(instruments)} instruments as {fmt}")
+    return chunks
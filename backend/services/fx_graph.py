@@ -0,0 +1,223 @@
+"""
+FX Graph
+Derives cross rates from the polled currency pairs by triangulation
+
+Every polled pair (USDTRY=X, EURTRY=X, ...) is an edge between two
+currencies. Any cross such as EUR/USD is derived through a pivot currency
+(TRY first, then USD), so new crosses need no extra Yahoo symbols. A tick
+updates one edge in O(1); a full cross table costs O(pairs).
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.database import fetch_all, get_db_client
+from services.correlation_service import align_prices
+from utils.helpers import timestamp_to_epoch
+
+logger = logging.getLogger(__name__)
+
+PIVOTS = ("TRY", "USD")
+
+
+def parse_pair(symbol: str) -> Optional[Tuple[str, str]]:
+    """Split a pair symbol (USDTRY=X, USD/TRY, USDTRY) into (base, quote)"""
+    text = symbol.upper().replace("=X", "").strip()
+    if "/" in text:
+        parts = text.split("/")
+        if len(parts) == 2 and all(len(part) == 3 for part in parts):
+            return parts[0], parts[1]
+        return None
+    if len(text) == 6 and text.isalpha():
+        return text[:3], text[3:]
+    return None
+
+
+class FXGraph:
+    """Latest rate per polled pair with triangulated crosses"""
+
+    def __init__(self):
+        # (base, quote) -> (rate, timestamp, currency_id)
+        self.edges: Dict[Tuple[str, str], Tuple[float, str, str]] = {}
+        self.loaded = False
+
+    def cache_stats(self) -> Dict:
+        return {'loaded': self.loaded, 'pairs': len(self.edges)}
+
+    @property
+    def currencies(self) -> List[str]:
+        return sorted({code for pair in self.edges for code in pair})
+
+    def update(self, symbol: str, rate: float, timestamp: str, currency_id: Optional[str] = None):
+        """Apply one tick: O(1)"""
+        pair = parse_pair(symbol)
+        if pair is None or not rate:
+            return
+        previous = self.edges.get(pair)
+        self.edges[pair] = (float(rate), str(timestamp), str(currency_id or (previous[2] if previous else "")))
+
+    def on_quote(self, quote: Dict):
+        """Collector listener for currency quotes"""
+        if quote.get('kind') == 'currency':
+            self.update(quote['symbol'], quote['price'], quote['timestamp'], quote.get('instrument_id'))
+
+    def invalidate(self, kind: str, instrument_id: str):
+        """Drop the pair of a deleted currency"""
+        if kind != 'currency':
+            return
+        for pair in [pair for pair, edge in self.edges.items() if edge[2] == str(instrument_id)]:
+            del self.edges[pair]
+
+    def route(self, base: str, quote: str) -> Optional[List[Tuple[str, str, bool]]]:
+        """
+        Stored legs needed for base/quote as (pair base, pair quote, inverted),
+        direct if possible, otherwise through the first pivot that connects them.
+        """
+        def leg(a, b):
+            if (a, b) in self.edges:
+                return (a, b, False)
+            if (b, a) in self.edges:
+                return (b, a, True)
+            return None
+
+        direct = leg(base, quote)
+        if direct:
+            return [direct]
+        for pivot in PIVOTS:
+            if pivot in (base, quote):
+                continue
+            first, second = leg(base, pivot), leg(pivot, quote)
+            if first and second:
+                return [first, second]
+        return None
+
+    def cross(self, base: str, quote: str) -> Optional[Dict]:
+        """Latest base/quote rate, derived through a pivot when not polled directly"""
+        base, quote = base.upper(), quote.upper()
+        if base == quote:
+            return {'base': base, 'quote': quote, 'rate': 1.0, 'path': [], 'derived': False, 'as_of': None}
+
+        legs = self.route(base, quote)
+        if legs is None:
+            return None
+
+        rate = 1.0
+        path = []
+        timestamps = []
+        for pair_base, pair_quote, inverted in legs:
+            value, timestamp, _ = self.edges[(pair_base, pair_quote)]
+            rate *= 1.0 / value if inverted else value
+            path.append(f"{'1/' if inverted else ''}{pair_base}{pair_quote}")
+            timestamps.append(timestamp)
+
+        return {
+            'base': base,
+            'quote': quote,
+            'rate': rate,
+            'path': path,
+            'derived': len(legs) > 1,
+            'as_of': min(timestamps)
+        }
+
+    def table(self, pivot: str = "TRY") -> Dict[str, Dict[str, float]]:
+        """All crosses among reachable currencies in O(pairs) plus output size"""
+        pivot = pivot.upper()
+        to_pivot = {pivot: 1.0}
+        for code in self.currencies:
+            if code != pivot:
+                result = self.cross(code, pivot)
+                if result:
+                    to_pivot[code] = result['rate']
+
+        codes = sorted(to_pivot)
+        values = np.array([to_pivot[code] for code in codes])
+        matrix = values[:, None] / values[None, :]
+        return {
+            base: {quote: float(matrix[i, j]) for j, quote in enumerate(codes)}
+            for i, base in enumerate(codes)
+        }
+
+    async def ensure_loaded(self):
+        """Seed the graph with the latest stored rate of every pair"""
+        if self.loaded:
+            return
+        db_client = get_db_client()
+        currencies = fetch_all(
+            lambda: db_client.table('currencies').select('id,symbol').is_('deleted_at', 'null').order('id')
+        )
+        # One read of the collector's latest quotes instead of a query per pair
+        latest = {
+            row['instrument_id']: row
+            for row in fetch_all(
+                lambda: db_client.table('latest_quotes').select('instrument_id,price,timestamp')
+                .eq('kind', 'currency').order('instrument_id')
+            )
+        }
+        for currency in currencies:
+            quote = latest.get(str(currency['id']))
+            if quote:
+                self.update(currency['symbol'], quote['price'], quote['timestamp'], currency['id'])
+        self.loaded = True
+        logger.info(f"FX graph loaded with {len(self.edges)} pairs")
+
+    async def cross_history(
+        self,
+        base: str,
+        quote: str,
+        start_date: datetime,
+        end_date: datetime,
+        interval: str = "1d"
+    ) -> Optional[Dict]:
+        """Cross rate history derived from the stored history of each leg"""
+        await self.ensure_loaded()
+        base, quote = base.upper(), quote.upper()
+        legs = self.route(base, quote)
+        if legs is None:
+            return None
+
+        db_client = get_db_client()
+        epochs, columns, values = [], [], []
+        for column, (pair_base, pair_quote, _) in enumerate(legs):
+            currency_id = self.edges[(pair_base, pair_quote)][2]
+            rows = fetch_all(
+                lambda: db_client.table('currency_rates')
+                .select('timestamp,rate')
+                .eq('currency_id', currency_id)
+                .gte('timestamp', start_date.isoformat())
+                .lte('timestamp', end_date.isoformat())
+                .order('timestamp', desc=False)
+            )
+            epochs.extend(timestamp_to_epoch(row['timestamp']) for row in rows)
+            columns.extend([column] * len(rows))
+            values.extend(float(row['rate']) for row in rows)
+
+        history = []
+        if epochs:
+            order = np.argsort(np.asarray(epochs), kind='stable')
+            buckets, prices = align_prices(
+                np.asarray(epochs)[order], np.asarray(columns)[order], np.asarray(values)[order],
+                len(legs), interval
+            )
+            rates = np.ones(len(buckets))
+            for column, (_, _, inverted) in enumerate(legs):
+                rates = rates / prices[:, column] if inverted else rates * prices[:, column]
+            valid = ~np.isnan(rates)
+            history = [
+                {'timestamp': datetime.fromtimestamp(bucket, tz=timezone.utc).isoformat(), 'rate': float(rate)}
+                for bucket, rate in zip(buckets[valid], rates[valid])
+            ]
+
+        return {
+            'base': base,
+            'quote': quote,
+            'interval': interval,
+            'path': [f"{'1/' if inverted else ''}{a}{b}" for a, b, inverted in legs],
+            'rates': history
+        }
+
+
+# Shared instance fed by the data collector
+fx_graph = FXGraph()
@@ -0,0 +1,183 @@
+"""
+Health Service
+Background dependency prober behind the liveness and readiness endpoints
+
+Probes run on a timer and their results are cached, so probe endpoints
+only read memory however often the orchestrator polls them.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from config.database import db_manager, get_db_client
+from config.settings import settings
+from services.intraday_service import in_session
+from utils.helpers import timestamp_to_epoch
+
+logger = logging.getLogger(__name__)
+
+
+def _isoformat(epoch: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat() if epoch else None
+
+
+class HealthProber:
+    """Periodically checks the database, collector freshness and caches"""
+
+    def __init__(self, interval: Optional[int] = None, stale_after: Optional[Dict[str, int]] = None):
+        self.interval = interval or settings.health_probe_interval
+        self.stale_after = stale_after or {
+            'stock': settings.collector_stale_after_stock,
+            'currency': settings.collector_stale_after_currency
+        }
+        self.started_at = time.time()
+        self.caches: Dict[str, Callable[[], Any]] = {}
+        self.last_write: Dict[str, float] = {}
+        # When each asset class's session last opened (intraday collection only writes in session)
+        self.session_opened: Dict[str, Optional[float]] = {}
+        self.report: Dict[str, Any] = {'status': 'starting', 'ready': False, 'checked_at': None}
+        self.last_cycle: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add_cache(self, name: str, stats: Callable[[], Any]):
+        """Report a cache's state (a cheap callable returning a dict) in every probe"""
+        self.caches[name] = stats
+
+    def on_quote(self, quote: Dict):
+        """Collector listener: a quote means a successful write for its asset class"""
+        self.last_write[quote.get('kind')] = time.time()
+
+    async def start(self):
+        """Probe right away and then every `interval` seconds, without holding the caller"""
+        if self._task is None:
+            self.started_at = time.time()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe()
+                await asyncio.sleep(self.interval)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Health probe failed: {e}")
+                await asyncio.sleep(self.interval)
+
+    async def probe(self) -> Dict[str, Any]:
+        """Run every check once and cache the result"""
+        database = await self._check_database()
+        if database['status'] == 'ok':
+            await asyncio.to_thread(self._load_last_writes)
+        collector = self._check_collector()
+        caches = self._check_caches()
+
+        # Readiness only gates on this worker's own checks: the collector is shared,
+        # so a stale feed would take every worker out of rotation at once
+        ready = database['status'] == 'ok'
+        stale = any(item['status'] == 'stale' for item in collector.values())
+        self.last_cycle = time.time()
+        self.report = {
+            'status': 'unavailable' if not ready else 'degraded' if stale else 'ready',
+            'ready': ready,
+            'checked_at': _isoformat(self.last_cycle),
+            'database': database,
+            'collector': collector,
+            'caches': caches
+        }
+        return self.report
+
+    async def _check_database(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.to_thread(db_manager.ping), timeout=settings.health_db_timeout)
+            return {'status': 'ok', 'latency_ms': round((time.perf_counter() - started) * 1000, 1)}
+        except asyncio.TimeoutError:
+            return {'status': 'failed', 'error': f"no answer within {settings.health_db_timeout}s"}
+        except Exception as e:
+            return {'status': 'failed', 'error': str(e)}
+
+    def _load_last_writes(self):
+        """Newest stored quote per asset class, for workers that have not seen one yet"""
+        db_client = get_db_client()
+        for kind in self.stale_after:
+            try:
+                rows = db_client.table('latest_quotes').select('timestamp')\
+                    .eq('kind', kind).order('timestamp', desc=True).limit(1).execute().data
+            except Exception as e:
+                logger.warning(f"Could not read latest {kind} quote: {e}")
+                continue
+            if rows:
+                stored = timestamp_to_epoch(rows[0]['timestamp'])
+                self.last_write[kind] = max(self.last_write.get(kind, 0.0), stored)
+
+    def _session_state(self, kind: str, now: float) -> Optional[float]:
+        """None while the market is closed, else when its session opened (as seen by the prober)"""
+        if not in_session(kind, datetime.fromtimestamp(now, tz=timezone.utc)):
+            self.session_opened[kind] = None
+            return None
+        if self.session_opened.get(kind) is None:
+            self.session_opened[kind] = now
+        return self.session_opened[kind]
+
+    def _check_collector(self) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        result = {}
+        for kind, threshold in self.stale_after.items():
+            last = self.last_write.get(kind)
+            age = now - last if last else None
+            if settings.collection_bars == 'intraday':
+                opened = self._session_state(kind, now)
+                if opened is None:
+                    status = 'closed'
+                else:
+                    # Writes resume with the session: age counts from its open at the earliest
+                    status = 'fresh' if now - max(last or 0.0, opened) <= threshold else 'stale'
+            elif age is not None:
+                status = 'fresh' if age <= threshold else 'stale'
+            else:
+                # Nothing written yet: only stale once a full window has passed
+                status = 'waiting' if now - self.started_at <= threshold else 'stale'
+            result[kind] = {
+                'status': status,
+                'last_write': _isoformat(last),
+                'age_seconds': round(age) if age is not None else None,
+                'stale_after_seconds': threshold
+            }
+        return result
+
+    def _check_caches(self) -> Dict[str, Any]:
+        caches = {}
+        for name, stats in self.caches.items():
+            try:
+                caches[name] = stats()
+            except Exception as e:
+                caches[name] = {'error': str(e)}
+        return caches
+
+    def liveness(self) -> Dict[str, Any]:
+        """Alive while the prober loop keeps cycling (a wedged event loop stops it)"""
+        lag = time.time() - self.last_cycle if self.last_cycle else None
+        window = self.interval * 3 + settings.health_db_timeout
+        if lag is None:
+            alive = self._task is None or time.time() - self.started_at <= window
+        else:
+            alive = lag <= window
+        return {
+            'status': 'alive' if alive else 'stalled',
+            'alive': alive,
+            'last_probe_seconds_ago': round(lag, 1) if lag is not None else None
+        }
+
+
+# Shared instance started with the app
+health_prober = HealthProber()
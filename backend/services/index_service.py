@@ -0,0 +1,327 @@
+"""
+Index Service
+Cap-weighted and equal-weighted market / sector indices with breadth
+
+Each scope ('ALL' and every sector) holds, per weighting, a share count
+per constituent fixed at the last rebalance (market_cap / price for cap
+weighting, 1 / price for equal weighting), the aggregate value
+sum(shares * price) and a divisor that keeps the level continuous across
+rebalances. A tick changes the aggregate by shares * (new - old) and moves
+the breadth counters by the stock's change of state, so nothing is summed
+from scratch. The analytics leader persists the levels every
+`index_snapshot_interval` seconds.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config.database import fetch_all, get_db_client
+from config.settings import settings
+from services.indicator_service import resample_last
+from services.screener_service import fetch_stock_universe
+from utils.helpers import bucket_epoch, timestamp_to_epoch
+
+logger = logging.getLogger(__name__)
+
+MARKET_SCOPE = 'ALL'
+WEIGHTINGS = ('cap_weighted', 'equal_weighted')
+BREADTH = ('advancers', 'decliners', 'unchanged', 'new_highs', 'new_lows')
+SERIES_COLUMNS = WEIGHTINGS + ('constituents',) + BREADTH
+
+
+class _Scope:
+    """Aggregates of one index scope"""
+
+    __slots__ = ('shares', 'value', 'divisor', 'breadth', 'constituents')
+
+    def __init__(self):
+        self.shares: Dict[str, Dict[str, float]] = {weighting: {} for weighting in WEIGHTINGS}
+        self.value = {weighting: 0.0 for weighting in WEIGHTINGS}
+        self.divisor: Dict[str, Optional[float]] = {weighting: None for weighting in WEIGHTINGS}
+        self.breadth = {name: 0 for name in BREADTH}
+        self.constituents = 0
+
+    def level(self, weighting: str) -> Optional[float]:
+        divisor = self.divisor[weighting]
+        return self.value[weighting] / divisor if divisor else None
+
+
+class _StockState:
+    __slots__ = ('scopes', 'price', 'open', 'prior_high', 'prior_low', 'flags')
+
+    def __init__(self, scopes):
+        self.scopes = scopes
+        self.price: Optional[float] = None
+        self.open: Optional[float] = None
+        self.prior_high: Optional[float] = None
+        self.prior_low: Optional[float] = None
+        self.flags = {name: 0 for name in BREADTH}
+
+
+class MarketIndices:
+    """Index levels and breadth for the whole market and each sector"""
+
+    def __init__(self, base_level: Optional[float] = None):
+        self.base_level = base_level or settings.index_base_level
+        self.scopes: Dict[str, _Scope] = {}
+        self.stocks: Dict[str, _StockState] = {}
+        self.rebalanced_at: Optional[float] = None
+        self.updated_at: Optional[str] = None
+        self.stale = True
+
+    def cache_stats(self) -> Dict:
+        return {
+            'scopes': len(self.scopes),
+            'stocks': len(self.stocks),
+            'rebalance_age_seconds': round(time.time() - self.rebalanced_at) if self.rebalanced_at else None,
+            'updated_at': self.updated_at
+        }
+
+    def rebalance(
+        self,
+        stocks: List[Dict],
+        quotes: List[Dict],
+        extremes: Dict[str, Dict],
+        levels: Optional[Dict[str, Dict[str, float]]] = None
+    ):
+        """
+        Reweight every scope from the catalog and latest quotes. Levels carry
+        over from the current state, else from `levels` (last persisted), else
+        start at the base level.
+        """
+        previous = {
+            name: {weighting: scope.level(weighting) for weighting in WEIGHTINGS}
+            for name, scope in self.scopes.items()
+        }
+        by_id = {str(quote['instrument_id']): quote for quote in quotes}
+        self.scopes, self.stocks = {}, {}
+
+        for stock in stocks:
+            stock_id = str(stock['id'])
+            names = [MARKET_SCOPE] + ([stock['sector']] if stock.get('sector') else [])
+            scopes = [self.scopes.setdefault(name, _Scope()) for name in names]
+            state = self.stocks[stock_id] = _StockState(scopes)
+            extreme = extremes.get(stock_id) or {}
+            state.prior_high, state.prior_low = extreme.get('high'), extreme.get('low')
+            for scope in scopes:
+                scope.constituents += 1
+
+            quote = by_id.get(stock_id)
+            if quote is None:
+                continue
+            self._apply(stock_id, state, quote)
+            price = state.price
+            if not price:
+                continue
+            for scope in scopes:
+                if stock.get('market_cap'):
+                    scope.shares['cap_weighted'][stock_id] = float(stock['market_cap']) / price
+                    scope.value['cap_weighted'] += float(stock['market_cap'])
+                scope.shares['equal_weighted'][stock_id] = 1.0 / price
+                scope.value['equal_weighted'] += 1.0
+
+        for name, scope in self.scopes.items():
+            for weighting in WEIGHTINGS:
+                level = (previous.get(name, {}).get(weighting)
+                         or (levels or {}).get(name, {}).get(weighting)
+                         or self.base_level)
+                scope.divisor[weighting] = scope.value[weighting] / level if scope.value[weighting] else None
+
+        self.rebalanced_at = time.time()
+        self.stale = False
+
+    def update(self, quote: Dict) -> bool:
+        """Apply one tick in O(1) per scope; False if the stock is not a constituent"""
+        stock_id = str(quote.get('instrument_id'))
+        state = self.stocks.get(stock_id)
+        if state is None:
+            return False
+        self._apply(stock_id, state, quote)
+        return True
+
+    def _apply(self, stock_id: str, state: _StockState, quote: Dict):
+        close = quote.get('close') if quote.get('close') is not None else quote.get('price')
+        if close is None:
+            return
+        price = float(close)
+        if quote.get('open') is not None:
+            state.open = float(quote['open'])
+        high = float(quote['high']) if quote.get('high') is not None else price
+        low = float(quote['low']) if quote.get('low') is not None else price
+
+        direction = np.sign(price - state.open) if state.open is not None else 0
+        flags = {
+            'advancers': int(direction > 0),
+            'decliners': int(direction < 0),
+            'unchanged': int(direction == 0),
+            'new_highs': int(state.prior_high is not None and high > state.prior_high),
+            'new_lows': int(state.prior_low is not None and low < state.prior_low)
+        }
+
+        for scope in state.scopes:
+            if state.price is not None:
+                for weighting in WEIGHTINGS:
+                    shares = scope.shares[weighting].get(stock_id)
+                    if shares:
+                        scope.value[weighting] += shares * (price - state.price)
+            for name in BREADTH:
+                scope.breadth[name] += flags[name] - state.flags[name]
+
+        state.price, state.flags = price, flags
+        self.updated_at = str(quote['timestamp'])
+
+    def remove(self, stock_id: str):
+        """Drop a deleted constituent, keeping every level continuous"""
+        state = self.stocks.pop(str(stock_id), None)
+        if state is None:
+            return
+        for scope in state.scopes:
+            scope.constituents -= 1
+            for name in BREADTH:
+                scope.breadth[name] -= state.flags[name]
+            for weighting in WEIGHTINGS:
+                shares = scope.shares[weighting].pop(str(stock_id), None)
+                if shares and state.price is not None:
+                    level = scope.level(weighting)
+                    scope.value[weighting] -= shares * state.price
+                    scope.divisor[weighting] = scope.value[weighting] / level if scope.value[weighting] and level else None
+
+    def snapshot(self) -> List[Dict]:
+        return [
+            {
+                'scope': name,
+                **{weighting: _round(scope.level(weighting)) for weighting in WEIGHTINGS},
+                'constituents': scope.constituents,
+                **scope.breadth
+            }
+            for name, scope in sorted(self.scopes.items(), key=lambda item: (item[0] != MARKET_SCOPE, item[0]))
+        ]
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 4) if value is not None else None
+
+
+class IndexService:
+    """Keeps the indices current and, on the analytics leader, persists their series"""
+
+    def __init__(self, indices: Optional[MarketIndices] = None):
+        self.indices = indices or MarketIndices()
+        self._task: Optional[asyncio.Task] = None
+
+    def cache_stats(self) -> Dict:
+        return self.indices.cache_stats()
+
+    def on_quote(self, quote: Dict):
+        """Collector listener"""
+        if quote.get('kind') != 'stock' or self.indices.stale:
+            return
+        if not self.indices.update(quote):
+            self.indices.stale = True
+
+    def invalidate(self, kind: str, instrument_id: str):
+        if kind == 'stock':
+            self.indices.remove(instrument_id)
+
+    async def ensure_fresh(self):
+        rebalanced_at = self.indices.rebalanced_at
+        if self.indices.stale or rebalanced_at is None or time.time() - rebalanced_at > settings.index_rebalance_seconds:
+            self._load()
+
+    def _load(self):
+        stocks, quotes = fetch_stock_universe()
+        db_client = get_db_client()
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        rows = fetch_all(lambda: db_client.rpc('stock_price_extremes', {
+            'p_since': (today - timedelta(days=365)).isoformat(),
+            'p_before': today.isoformat()
+        }))
+        extremes = {str(row['instrument_id']): row for row in rows}
+
+        levels = {}
+        if not self.indices.scopes:
+            latest = db_client.table('index_values').select('scope,cap_weighted,equal_weighted')\
+                .eq('resolution', '1d').order('timestamp', desc=True).limit(1000).execute().data or []
+            for row in latest:
+                levels.setdefault(row['scope'], {weighting: row[weighting] for weighting in WEIGHTINGS})
+        self.indices.rebalance(stocks, quotes, extremes, levels)
+        logger.info(f"Indices rebalanced over {len(self.indices.stocks)} stocks, {len(self.indices.scopes)} scopes")
+
+    async def get_indices(self) -> Dict:
+        await self.ensure_fresh()
+        return {'indices': self.indices.snapshot(), 'as_of': self.indices.updated_at}
+
+    async def get_history(
+        self, scope: str, start_date: datetime, end_date: datetime, interval: str = '1d'
+    ) -> Dict:
+        """Persisted series of one scope; intraday intervals resample the 1m rows"""
+        resolution = '1d' if interval == '1d' else '1m'
+        db_client = get_db_client()
+        rows = fetch_all(
+            lambda: db_client.table('index_values').select('*')
+            .eq('scope', scope).eq('resolution', resolution)
+            .gte('timestamp', start_date.isoformat()).lte('timestamp', end_date.isoformat())
+            .order('timestamp', desc=False)
+        )
+        epochs = np.fromiter((timestamp_to_epoch(row['timestamp']) for row in rows), dtype=float, count=len(rows))
+        series = {}
+        buckets = np.empty(0, dtype=np.int64)
+        for column in SERIES_COLUMNS:
+            values = np.array([row[column] if row[column] is not None else np.nan for row in rows], dtype=float)
+            buckets, series[column] = resample_last(epochs, values, interval)
+        return {
+            'scope': scope,
+            'interval': interval,
+            'timestamps': [datetime.fromtimestamp(int(bucket), tz=timezone.utc).isoformat() for bucket in buckets],
+            **{column: [None if np.isnan(value) else float(value) for value in series[column]]
+               for column in SERIES_COLUMNS}
+        }
+
+    async def start(self):
+        """Analytics leader: persist the series every index_snapshot_interval seconds"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.ensure_fresh()
+                self.persist()
+                await asyncio.sleep(settings.index_snapshot_interval)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error persisting index values: {e}")
+                await asyncio.sleep(settings.index_snapshot_interval)
+
+    def persist(self, now: Optional[float] = None):
+        """Upsert the current 1m and 1d points and prune old intraday rows"""
+        now = now or time.time()
+        snapshot = self.indices.snapshot()
+        if not snapshot:
+            return
+        rows = [
+            {**row, 'resolution': resolution,
+             'timestamp': datetime.fromtimestamp(bucket_epoch(now, resolution), tz=timezone.utc).isoformat()}
+            for resolution in ('1m', '1d') for row in snapshot
+        ]
+        db_client = get_db_client()
+        db_client.table('index_values').upsert(rows, on_conflict='scope,resolution,timestamp').execute()
+
+        cutoff = datetime.fromtimestamp(now, tz=timezone.utc) - timedelta(days=settings.index_intraday_retention_days)
+        db_client.table('index_values').delete().eq('resolution', '1m').lt('timestamp', cutoff.isoformat()).execute()
+
+
+# Shared instance fed by the data collector
+index_service = IndexService()
@@ -0,0 +1,196 @@
+"""
+Indicator Service
+Serves technical indicators from cached series that advance with each new bar
+"""
+
+import copy
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.database import fetch_all, get_db_client
+from config.settings import settings
+from services.indicators import Indicator, parse_indicator_spec
+from utils.helpers import INTERVAL_SECONDS, bucket_epoch, timestamp_to_epoch
+
+logger = logging.getLogger(__name__)
+
+PRICE_SOURCES = {
+    'stock': ('stock_prices', 'stock_id', 'close'),
+    'currency': ('currency_rates', 'currency_id', 'rate')
+}
+
+
+def resample_last(epochs: np.ndarray, values: np.ndarray, interval: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Collapse time-ordered samples into interval buckets, keeping the last value"""
+    if len(epochs) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=float)
+    step = INTERVAL_SECONDS[interval]
+    buckets = (epochs // step).astype(np.int64) * step
+    # Last sample per bucket: first occurrence in the reversed array
+    unique, reversed_index = np.unique(buckets[::-1], return_index=True)
+    last_index = len(buckets) - 1 - reversed_index
+    return unique, values[last_index]
+
+
+def _json_series(values) -> List[Optional[float]]:
+    """Convert a float series to a JSON-safe list (NaN -> None)"""
+    array = np.asarray(values, dtype=float)
+    return np.where(np.isnan(array), None, array).tolist()
+
+
+class _IndicatorTrack:
+    """Outputs and incremental state of one indicator on one bar series"""
+
+    def __init__(self, indicator: Indicator, closes: np.ndarray):
+        self.indicator = indicator
+        self.before_last: Optional[Indicator] = None
+        # Prime on all but the last bar so the current bar can be replaced later
+        self.outputs = {name: series.tolist() for name, series in indicator.compute(closes[:-1]).items()}
+        if len(closes):
+            self.append(float(closes[-1]))
+
+    def append(self, close: float):
+        self.before_last = copy.deepcopy(self.indicator)
+        for name, value in self.indicator.update(close).items():
+            self.outputs[name].append(value)
+
+    def replace_last(self, close: float):
+        if self.before_last is None:
+            return
+        self.indicator = copy.deepcopy(self.before_last)
+        for name, value in self.indicator.update(close).items():
+            self.outputs[name][-1] = value
+
+    def trim(self, count: int):
+        for name in self.outputs:
+            del self.outputs[name][:count]
+
+
+class _BarSeries:
+    """Bars for one (instrument, interval) with the indicator tracks built on them"""
+
+    def __init__(self, start_epoch: float, buckets: np.ndarray, closes: np.ndarray):
+        self.start_epoch = start_epoch
+        self.buckets: List[int] = buckets.tolist()
+        self.closes: List[float] = closes.tolist()
+        self.tracks: Dict[str, _IndicatorTrack] = {}
+
+    def track(self, indicator: Indicator) -> _IndicatorTrack:
+        if indicator.key not in self.tracks:
+            self.tracks[indicator.key] = _IndicatorTrack(indicator, np.asarray(self.closes, dtype=float))
+        return self.tracks[indicator.key]
+
+    def advance(self, bucket: int, close: float):
+        """Apply a new sample: update the current bar or open a new one"""
+        if self.buckets and bucket < self.buckets[-1]:
+            return
+        if self.buckets and bucket == self.buckets[-1]:
+            self.closes[-1] = close
+            for track in self.tracks.values():
+                track.replace_last(close)
+            return
+
+        self.buckets.append(bucket)
+        self.closes.append(close)
+        for track in self.tracks.values():
+            track.append(close)
+
+        excess = len(self.buckets) - settings.indicator_max_bars
+        if excess > settings.indicator_max_bars // 4:
+            del self.buckets[:excess]
+            del self.closes[:excess]
+            self.start_epoch = self.buckets[0]
+            for track in self.tracks.values():
+                track.trim(excess)
+
+
+class IndicatorService:
+    """Technical indicators with per (instrument, interval, params) caching"""
+
+    def __init__(self, max_series: Optional[int] = None):
+        self.max_series = max_series or settings.indicator_cache_size
+        self._series: "OrderedDict[Tuple[str, str, str], _BarSeries]" = OrderedDict()
+
+    async def get_indicators(
+        self,
+        kind: str,
+        instrument_id: str,
+        interval: str,
+        spec: str,
+        days: int
+    ) -> Dict:
+        """Indicator series for the last `days` of an instrument"""
+        indicators = parse_indicator_spec(spec)
+        start_epoch = (datetime.now(timezone.utc) - timedelta(days=days)).timestamp()
+
+        key = (kind, str(instrument_id), interval)
+        series = self._series.get(key)
+        if series is None or series.start_epoch > start_epoch:
+            series = self._load_series(kind, instrument_id, interval, start_epoch)
+            self._series[key] = series
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+        self._series.move_to_end(key)
+
+        first = int(np.searchsorted(np.asarray(series.buckets), start_epoch))
+        result = {}
+        for indicator in indicators:
+            track = series.track(indicator)
+            result[indicator.key] = {
+                name: _json_series(values[first:]) for name, values in track.outputs.items()
+            }
+
+        return {
+            'interval': interval,
+            'timestamps': [
+                datetime.fromtimestamp(bucket, tz=timezone.utc).isoformat()
+                for bucket in series.buckets[first:]
+            ],
+            'close': _json_series(series.closes[first:]),
+            'indicators': result
+        }
+
+    def on_quote(self, quote: Dict):
+        """Collector listener: advance every cached series of the instrument by one step"""
+        kind = quote.get('kind')
+        instrument_id = str(quote.get('instrument_id'))
+        epoch = timestamp_to_epoch(quote['timestamp'])
+        for interval in INTERVAL_SECONDS:
+            series = self._series.get((kind, instrument_id, interval))
+            if series is not None:
+                series.advance(bucket_epoch(epoch, interval), float(quote['price']))
+
+    def invalidate(self, kind: str, instrument_id: str):
+        """Drop every cached series of an instrument"""
+        for key in [key for key in self._series if key[:2] == (kind, str(instrument_id))]:
+            del self._series[key]
+
+    def cache_stats(self) -> Dict:
+        return {'series': len(self._series), 'capacity': self.max_series}
+
+    def _load_series(self, kind: str, instrument_id: str, interval: str, start_epoch: float) -> _BarSeries:
+        table, id_column, value_column = PRICE_SOURCES[kind]
+        db_client = get_db_client()
+        start = datetime.fromtimestamp(start_epoch, tz=timezone.utc).isoformat()
+
+        rows = fetch_all(
+            lambda: db_client.table(table)
+            .select(f'timestamp,{value_column}')
+            .eq(id_column, instrument_id)
+            .gte('timestamp', start)
+            .order('timestamp', desc=False)
+        )
+
+        epochs = np.fromiter((timestamp_to_epoch(row['timestamp']) for row in rows), dtype=float, count=len(rows))
+        values = np.fromiter((float(row[value_column]) for row in rows), dtype=float, count=len(rows))
+        buckets, closes = resample_last(epochs, values, interval)
+        logger.info(f"Loaded {len(closes)} {interval} bars for {kind} {instrument_id}")
+        return _BarSeries(start_epoch, buckets, closes)
+
+
+# Shared instance fed by the data collector
+indicator_service = IndicatorService()
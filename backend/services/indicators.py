@@ -0,0 +1,338 @@
+"""
+Technical Indicators
+Vectorized numpy implementations with incrementally updatable state
+
+Each indicator computes its full series with `compute(close)`, which also
+primes its internal state from the tail of the series. `update(value)`
+then advances the indicator by one bar in O(1) (O(period) for windowed
+indicators) instead of recomputing the whole window.
+"""
+
+import math
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Keep b**-k within float range when unrolling the EMA recursion in blocks
+_MAX_SCALE_EXPONENT = 100 * math.log(10)
+
+
+def _ewm(values: np.ndarray, alpha: float, seed: float) -> np.ndarray:
+    """
+    Evaluate y[k] = (1 - alpha) * y[k-1] + alpha * values[k] with y[-1] = seed.
+
+    The recursion is unrolled into a closed form that numpy evaluates with
+    one cumulative sum per block; blocks keep the scaling factors finite.
+    """
+    n = len(values)
+    out = np.empty(n, dtype=float)
+    if n == 0:
+        return out
+
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[:] = values
+        return out
+
+    block = max(1, int(_MAX_SCALE_EXPONENT / -math.log(decay)))
+    previous = seed
+    for start in range(0, n, block):
+        chunk = values[start:start + block]
+        k = np.arange(len(chunk), dtype=float)
+        powers = decay ** k
+        weighted = np.cumsum(chunk / powers)
+        out[start:start + len(chunk)] = decay * powers * previous + alpha * powers * weighted
+        previous = out[start + len(chunk) - 1]
+    return out
+
+
+def _first_valid(values: np.ndarray) -> int:
+    """Index of the first non-NaN value (len(values) if none)"""
+    valid = np.flatnonzero(~np.isnan(values))
+    return int(valid[0]) if len(valid) else len(values)
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    """Simple moving average"""
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    if len(values) < period:
+        return out
+    cumulative = np.cumsum(np.insert(values, 0, 0.0))
+    out[period - 1:] = (cumulative[period:] - cumulative[:-period]) / period
+    return out
+
+
+def ema(values: np.ndarray, period: int, alpha: Optional[float] = None) -> np.ndarray:
+    """Exponential moving average seeded with the SMA of the first period values"""
+    values = np.asarray(values, dtype=float)
+    alpha = alpha if alpha is not None else 2.0 / (period + 1)
+    out = np.full(len(values), np.nan)
+
+    start = _first_valid(values)
+    seed_end = start + period
+    if len(values) < seed_end:
+        return out
+
+    seed = float(values[start:seed_end].mean())
+    out[seed_end - 1] = seed
+    out[seed_end:] = _ewm(values[seed_end:], alpha, seed)
+    return out
+
+
+def rsi(close: np.ndarray, period: int = 14) -> Dict[str, np.ndarray]:
+    """Wilder's relative strength index, with the smoothed gain/loss averages"""
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    avg_gain = np.full(n, np.nan)
+    avg_loss = np.full(n, np.nan)
+
+    if n > period:
+        deltas = np.diff(close)
+        gains = np.clip(deltas, 0.0, None)
+        losses = np.clip(-deltas, 0.0, None)
+        avg_gain[1:] = ema(gains, period, alpha=1.0 / period)
+        avg_loss[1:] = ema(losses, period, alpha=1.0 / period)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        value = 100.0 - 100.0 / (1.0 + rs)
+    value = np.where((avg_loss == 0) & ~np.isnan(avg_gain), 100.0, value)
+    return {'value': value, 'avg_gain': avg_gain, 'avg_loss': avg_loss}
+
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """Moving average convergence/divergence line, signal line and histogram"""
+    close = np.asarray(close, dtype=float)
+    fast_ema = ema(close, fast)
+    slow_ema = ema(close, slow)
+    line = fast_ema - slow_ema
+    signal_line = ema(line, signal)
+    return {
+        'macd': line,
+        'signal': signal_line,
+        'histogram': line - signal_line,
+        'fast_ema': fast_ema,
+        'slow_ema': slow_ema
+    }
+
+
+def bollinger_bands(close: np.ndarray, period: int = 20, width: float = 2.0) -> Dict[str, np.ndarray]:
+    """Bollinger bands: SMA middle band +/- width population standard deviations"""
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    middle = np.full(n, np.nan)
+    deviation = np.full(n, np.nan)
+    if n >= period:
+        windows = np.lib.stride_tricks.sliding_window_view(close, period)
+        middle[period - 1:] = windows.mean(axis=1)
+        deviation[period - 1:] = windows.std(axis=1)
+    return {
+        'middle': middle,
+        'upper': middle + width * deviation,
+        'lower': middle - width * deviation
+    }
+
+
+class _EMAState:
+    """Running EMA: accumulates the SMA seed, then applies the recursion"""
+
+    def __init__(self, period: int, alpha: Optional[float] = None):
+        self.period = period
+        self.alpha = alpha if alpha is not None else 2.0 / (period + 1)
+        self.count = 0
+        self.seed_sum = 0.0
+        self.value = math.nan
+
+    def prime(self, values: np.ndarray, series: np.ndarray):
+        """Adopt the state at the end of a fully computed series"""
+        valid = values[~np.isnan(values)]
+        self.count = len(valid)
+        if self.count >= self.period:
+            self.value = float(series[-1])
+        else:
+            self.seed_sum = float(valid.sum())
+            self.value = math.nan
+
+    def update(self, value: float) -> float:
+        if math.isnan(value):
+            return self.value
+        self.count += 1
+        if self.count < self.period:
+            self.seed_sum += value
+        elif self.count == self.period:
+            self.value = (self.seed_sum + value) / self.period
+        else:
+            self.value = (1.0 - self.alpha) * self.value + self.alpha * value
+        return self.value
+
+
+class Indicator:
+    """Base class for indicators"""
+
+    name = ""
+
+    def __init__(self, *params):
+        self.params = params
+
+    @property
+    def key(self) -> str:
+        return "_".join([self.name] + [f"{param:g}" for param in self.params])
+
+    def compute(self, close: np.ndarray) -> Dict[str, np.ndarray]:
+        """Compute the full series and prime the incremental state"""
+        raise NotImplementedError
+
+    def update(self, value: float) -> Dict[str, float]:
+        """Advance by one bar and return the new output values"""
+        raise NotImplementedError
+
+
+class SMA(Indicator):
+    name = "sma"
+
+    def __init__(self, period: int = 20):
+        super().__init__(period)
+        self.period = period
+        self.window = deque(maxlen=period)
+
+    def compute(self, close):
+        close = np.asarray(close, dtype=float)
+        self.window = deque(close[-self.period:].tolist(), maxlen=self.period)
+        return {'value': sma(close, self.period)}
+
+    def update(self, value):
+        self.window.append(value)
+        if len(self.window) < self.period:
+            return {'value': math.nan}
+        return {'value': sum(self.window) / self.period}
+
+
+class EMA(Indicator):
+    name = "ema"
+
+    def __init__(self, period: int = 20):
+        super().__init__(period)
+        self.state = _EMAState(period)
+
+    def compute(self, close):
+        close = np.asarray(close, dtype=float)
+        series = ema(close, self.state.period)
+        self.state.prime(close, series)
+        return {'value': series}
+
+    def update(self, value):
+        return {'value': self.state.update(value)}
+
+
+class RSI(Indicator):
+    name = "rsi"
+
+    def __init__(self, period: int = 14):
+        super().__init__(period)
+        self.period = period
+        self.previous_close = math.nan
+        self.gain = _EMAState(period, alpha=1.0 / period)
+        self.loss = _EMAState(period, alpha=1.0 / period)
+
+    def compute(self, close):
+        close = np.asarray(close, dtype=float)
+        result = rsi(close, self.period)
+        if len(close):
+            self.previous_close = float(close[-1])
+        deltas = np.diff(close)
+        self.gain.prime(np.clip(deltas, 0.0, None), result['avg_gain'])
+        self.loss.prime(np.clip(-deltas, 0.0, None), result['avg_loss'])
+        return {'value': result['value']}
+
+    def update(self, value):
+        if math.isnan(self.previous_close):
+            self.previous_close = value
+            return {'value': math.nan}
+        delta = value - self.previous_close
+        self.previous_close = value
+        avg_gain = self.gain.update(max(delta, 0.0))
+        avg_loss = self.loss.update(max(-delta, 0.0))
+        if math.isnan(avg_gain):
+            return {'value': math.nan}
+        if avg_loss == 0:
+            return {'value': 100.0}
+        return {'value': 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)}
+
+
+class MACD(Indicator):
+    name = "macd"
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        super().__init__(fast, slow, signal)
+        self.fast = _EMAState(fast)
+        self.slow = _EMAState(slow)
+        self.signal = _EMAState(signal)
+
+    def compute(self, close):
+        close = np.asarray(close, dtype=float)
+        result = macd(close, self.fast.period, self.slow.period, self.signal.period)
+        self.fast.prime(close, result['fast_ema'])
+        self.slow.prime(close, result['slow_ema'])
+        self.signal.prime(result['macd'], result['signal'])
+        return {key: result[key] for key in ('macd', 'signal', 'histogram')}
+
+    def update(self, value):
+        line = self.fast.update(value) - self.slow.update(value)
+        signal_value = self.signal.update(line)
+        return {'macd': line, 'signal': signal_value, 'histogram': line - signal_value}
+
+
+class BollingerBands(Indicator):
+    name = "bbands"
+
+    def __init__(self, period: int = 20, width: float = 2.0):
+        super().__init__(period, width)
+        self.period = period
+        self.width = width
+        self.window = deque(maxlen=period)
+
+    def compute(self, close):
+        close = np.asarray(close, dtype=float)
+        self.window = deque(close[-self.period:].tolist(), maxlen=self.period)
+        return bollinger_bands(close, self.period, self.width)
+
+    def update(self, value):
+        self.window.append(value)
+        if len(self.window) < self.period:
+            return {'middle': math.nan, 'upper': math.nan, 'lower': math.nan}
+        window = np.fromiter(self.window, dtype=float)
+        middle = float(window.mean())
+        deviation = float(window.std())
+        return {
+            'middle': middle,
+            'upper': middle + self.width * deviation,
+            'lower': middle - self.width * deviation
+        }
+
+
+INDICATORS = {
+    cls.name: cls for cls in (SMA, EMA, RSI, MACD, BollingerBands)
+}
+
+
+def parse_indicator_spec(spec: str) -> List[Indicator]:
+    """
+    Parse a comma separated indicator spec such as
+    "sma:20,ema:50,rsi:14,macd:12:26:9,bbands:20:2".
+    """
+    indicators = []
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, *raw_params = item.split(':')
+        cls = INDICATORS.get(name.lower())
+        if cls is None:
+            raise ValueError(f"Unknown indicator: {name}")
+        try:
+            params = [float(p) if '.' in p else int(p) for p in raw_params]
+        except ValueError:
+            raise ValueError(f"Invalid parameters for indicator {name}: {raw_params}")
+        if any(p <= 0 for p in params):
+            raise ValueError(f"Indicator parameters must be positive: {item}")
+        indicators.append(cls(*params))
+    return indicators
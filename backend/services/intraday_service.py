@@ -0,0 +1,179 @@
+"""
+Intraday Service
+Rolling in-memory minute bars per instrument
+
+In intraday collection mode the collector leader polls the provider for
+the last few bars of the whole universe and merges each overlapping window
+into one buffer per instrument, keyed by bar start. The newest bar is still
+forming and is served from memory; finished bars are flushed to storage in
+bulk and never written twice. Every worker keeps the same buffers from the
+quotes on the shared channel, so any of them can serve the partial bar.
+"""
+
+import logging
+from datetime import datetime, time as dt_time, timezone
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sortedcontainers import SortedDict
+
+from config.settings import settings
+from utils.helpers import INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+ID_COLUMNS = {'stock': 'stock_id', 'currency': 'currency_id'}
+
+
+def bar_to_row(kind: str, instrument_id, bar: Dict) -> Dict:
+    """Storage row (stock_prices / currency_rates) of one bar"""
+    timestamp = datetime.fromtimestamp(bar['epoch'], tz=timezone.utc).isoformat()
+    if kind == 'stock':
+        return {
+            'stock_id': instrument_id, 'timestamp': timestamp,
+            'open': bar['open'], 'high': bar['high'], 'low': bar['low'], 'close': bar['close'],
+            'volume': int(bar['volume'] or 0)
+        }
+    return {'currency_id': instrument_id, 'timestamp': timestamp, 'rate': bar['close'], 'high': bar['high'], 'low': bar['low']}
+
+
+def in_session(kind: str, now: Optional[datetime] = None) -> bool:
+    """Stocks trade during the exchange session; FX on weekdays"""
+    now = (now or datetime.now(timezone.utc)).astimezone(ZoneInfo(settings.intraday_timezone))
+    if now.weekday() >= 5:
+        return False
+    if kind == 'currency':
+        return True
+    opens, closes = (dt_time.fromisoformat(part.strip()) for part in settings.intraday_session.split('-'))
+    return opens <= now.time() <= closes
+
+
+def session_start(epoch: int) -> int:
+    """Local midnight (epoch seconds) of the trading day containing epoch"""
+    local = datetime.fromtimestamp(epoch, tz=ZoneInfo(settings.intraday_timezone))
+    return int(local.replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+
+
+class IntradayBuffer:
+    """Bars of one instrument by start epoch; the last one may still be forming"""
+
+    def __init__(self, capacity: Optional[int] = None):
+        self.capacity = capacity or settings.intraday_buffer_bars
+        self.bars = SortedDict()
+        self.flushed_through = 0
+        # Set once this process collects the instrument itself; mirrored buffers are never flushed here
+        self.owned = False
+
+    def __len__(self) -> int:
+        return len(self.bars)
+
+    @property
+    def last_epoch(self) -> Optional[int]:
+        return self.bars.peekitem(-1)[0] if self.bars else None
+
+    def merge(self, bars: List[Dict], mirrored: bool = False) -> List[Dict]:
+        """Insert or revise bars from an overlapping window; returns the ones that changed.
+
+        `mirrored` bars come from another process's quotes: that process
+        flushes them, so here they are only kept up to capacity.
+        """
+        if not mirrored:
+            self.owned = True
+        changed = []
+        for bar in bars:
+            epoch = bar['epoch']
+            if epoch <= self.flushed_through or self.bars.get(epoch) == bar:
+                continue
+            self.bars[epoch] = bar
+            changed.append(bar)
+        # Drop the oldest bars beyond capacity; unflushed bars stay while this process owes their write
+        while len(self.bars) > self.capacity and (not self.owned or self.bars.peekitem(0)[0] <= self.flushed_through):
+            self.bars.popitem(0)
+        return changed
+
+    def finished(self, now: float, step: int) -> List[Dict]:
+        """Bars that closed and are not in storage yet"""
+        start = self.bars.bisect_right(self.flushed_through)
+        return [bar for epoch, bar in self.bars.items()[start:] if epoch + step <= now]
+
+    def mark_flushed(self, epoch: int):
+        self.flushed_through = max(self.flushed_through, epoch)
+
+    def between(self, after: float, until: float) -> List[Dict]:
+        start, stop = self.bars.bisect_right(after), self.bars.bisect_right(until)
+        return list(self.bars.values()[start:stop])
+
+    def session(self, since: int) -> Optional[Dict]:
+        """Aggregate bar of the session since `since`: first open, extremes, last close, summed volume"""
+        bars = self.between(since - 1, float('inf'))
+        if not bars:
+            return None
+        return {
+            'epoch': bars[-1]['epoch'],
+            'open': bars[0]['open'],
+            'high': max(bar['high'] for bar in bars),
+            'low': min(bar['low'] for bar in bars),
+            'close': bars[-1]['close'],
+            'volume': sum(bar['volume'] or 0 for bar in bars)
+        }
+
+
+class IntradayBook:
+    """Intraday buffers of every instrument in this process"""
+
+    def __init__(self, interval: Optional[str] = None):
+        self.interval = interval or settings.intraday_interval
+        self.step = INTERVAL_SECONDS[self.interval]
+        self.buffers: Dict[Tuple[str, str], IntradayBuffer] = {}
+
+    def cache_stats(self) -> Dict:
+        return {
+            'interval': self.interval,
+            'instruments': len(self.buffers),
+            'bars': sum(len(buffer) for buffer in self.buffers.values())
+        }
+
+    def buffer(self, kind: str, instrument_id) -> IntradayBuffer:
+        key = (kind, str(instrument_id))
+        if key not in self.buffers:
+            self.buffers[key] = IntradayBuffer()
+        return self.buffers[key]
+
+    def merge(self, kind: str, instrument_id, bars: List[Dict], mirrored: bool = False) -> List[Dict]:
+        return self.buffer(kind, instrument_id).merge(bars, mirrored=mirrored)
+
+    def on_quote(self, quote: Dict):
+        """Collector listener: keep the bars carried by leader quotes"""
+        if quote.get('bars') and quote.get('bar_interval') == self.interval:
+            self.merge(quote['kind'], quote['instrument_id'], quote['bars'], mirrored=True)
+
+    def invalidate(self, kind: str, instrument_id: str):
+        self.buffers.pop((kind, str(instrument_id)), None)
+
+    def pending_rows(self, kind: str, now: float) -> Tuple[List[Dict], Dict[str, int]]:
+        """Storage rows of every finished, unflushed bar and the watermark each one advances to"""
+        rows, watermarks = [], {}
+        for (buffer_kind, instrument_id), buffer in self.buffers.items():
+            if buffer_kind != kind:
+                continue
+            bars = buffer.finished(now, self.step)
+            if bars:
+                rows.extend(bar_to_row(kind, instrument_id, bar) for bar in bars)
+                watermarks[instrument_id] = bars[-1]['epoch']
+        return rows, watermarks
+
+    def mark_flushed(self, kind: str, watermarks: Dict[str, int]):
+        for instrument_id, epoch in watermarks.items():
+            self.buffer(kind, instrument_id).mark_flushed(epoch)
+
+    def overlay_rows(self, kind: str, instrument_id, after: float, until: float) -> List[Dict]:
+        """Buffered bars newer than what storage returned, as storage rows"""
+        buffer = self.buffers.get((kind, str(instrument_id)))
+        if buffer is None:
+            return []
+        return [bar_to_row(kind, instrument_id, bar) for bar in buffer.between(after, until)]
+
+
+# Shared instance fed by the data collector
+intraday_book = IntradayBook()
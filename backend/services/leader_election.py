@@ -0,0 +1,209 @@
+"""
+Leader Election
+Ensures exactly one process per deployment runs data collection
+"""
+
+import asyncio
+import fcntl
+import logging
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """Base class for leadership locks"""
+
+    async def acquire(self) -> bool:
+        """Try to take the lock without blocking"""
+        raise NotImplementedError
+
+    async def refresh(self) -> bool:
+        """Confirm (and extend) ownership of the lock"""
+        raise NotImplementedError
+
+    async def release(self):
+        """Give up the lock"""
+        raise NotImplementedError
+
+
+class FileLeaderLock(LeaderLock):
+    """
+    Advisory lock on a local file.
+
+    The kernel drops the lock when the owning process exits, so a crashed
+    leader is replaced on the next election round. Covers every worker on
+    one host.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    async def acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    async def refresh(self) -> bool:
+        return self._fd is not None
+
+    async def release(self):
+        if self._fd is None:
+            return
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class RedisLeaderLock(LeaderLock):
+    """
+    Lease stored in Redis with a TTL.
+
+    The leader renews the lease every election round; if it dies the key
+    expires and another worker, on any host, takes over.
+    """
+
+    _REFRESH_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('pexpire', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+
+    _RELEASE_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, redis_url: str, key: str, ttl: int):
+        self.redis_url = redis_url
+        self.key = key
+        self.ttl_ms = ttl * 1000
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        self._redis = None
+
+    async def _get_redis(self):
+        if self._redis is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url)
+        return self._redis
+
+    async def acquire(self) -> bool:
+        redis_client = await self._get_redis()
+        return bool(await redis_client.set(self.key, self.token, nx=True, px=self.ttl_ms))
+
+    async def refresh(self) -> bool:
+        redis_client = await self._get_redis()
+        return bool(await redis_client.eval(self._REFRESH_SCRIPT, 1, self.key, self.token, self.ttl_ms))
+
+    async def release(self):
+        if self._redis is None:
+            return
+        try:
+            await self._redis.eval(self._RELEASE_SCRIPT, 1, self.key, self.token)
+        finally:
+            await self._redis.close()
+            self._redis = None
+
+
+class LeaderElector:
+    """Periodically competes for a LeaderLock and reports role changes"""
+
+    def __init__(
+        self,
+        lock: LeaderLock,
+        on_elected: Callable[[], Awaitable[None]],
+        on_demoted: Callable[[], Awaitable[None]],
+        interval: float = 5,
+        name: str = "collector"
+    ):
+        self.lock = lock
+        self.name = name
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.interval = interval
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def role(self) -> str:
+        return "leader" if self.is_leader else "follower"
+
+    async def start(self):
+        """Run the first election round immediately, then keep competing"""
+        if self._task is not None:
+            return
+        await self._election_round()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop competing and hand leadership over"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        if self.is_leader:
+            self.is_leader = False
+            await self.on_demoted()
+        await self.lock.release()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.sleep(self.interval)
+                await self._election_round()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in leader election: {e}")
+
+    async def _election_round(self):
+        try:
+            if self.is_leader:
+                held = await self.lock.refresh()
+            else:
+                held = await self.lock.acquire()
+        except Exception as e:
+            logger.error(f"Leader lock unavailable: {e}")
+            held = False
+
+        if held and not self.is_leader:
+            self.is_leader = True
+            logger.info(f"Process {os.getpid()} elected {self.name} leader")
+            await self.on_elected()
+        elif not held and self.is_leader:
+            self.is_leader = False
+            logger.warning(f"Process {os.getpid()} lost {self.name} leadership")
+            await self.on_demoted()
+
+
+def create_leader_lock(role: str = "collector") -> LeaderLock:
+    """Create the leadership lock configured in settings; each role is a separate election"""
+    key, path = settings.collector_lock_key, settings.collector_lock_file
+    if role != "collector":
+        key, path = f"{key}:{role}", f"{path}.{role}"
+    if settings.collector_lock_backend == "redis":
+        return RedisLeaderLock(settings.redis_url, key, settings.collector_lock_ttl)
+    return FileLeaderLock(path)
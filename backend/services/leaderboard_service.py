@@ -0,0 +1,149 @@
+"""
+Leaderboard Service
+Top gainers, top losers and most active stocks, maintained per tick
+
+Each ranking (change percent, volume) is an order-statistic list per scope
+(all stocks and every sector). A tick moves one stock's entries, O(log n)
+per list; the top k of any scope are a slice from either end. Snapshots
+are cached until the next tick, so dashboard requests only copy them.
+"""
+
+import logging
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+
+from sortedcontainers import SortedKeyList
+
+from services.screener_service import fetch_stock_universe
+from utils.helpers import calculate_percentage_change
+
+logger = logging.getLogger(__name__)
+
+RANKINGS = ('change_percent', 'volume')
+
+
+class Leaderboards:
+    """Order-statistic rankings of every stock, overall and per sector"""
+
+    def __init__(self):
+        self.stocks: Dict[str, Dict] = {}
+        self.rankings: Dict[Tuple[str, Optional[str]], SortedKeyList] = {}
+        self.version = 0
+        self.stale = True
+        self.updated_at: Optional[str] = None
+        self._snapshots: Dict[Tuple[Optional[str], int], Tuple[int, Dict]] = {}
+
+    def cache_stats(self) -> Dict:
+        return {'stocks': len(self.stocks), 'sectors': len(self.sectors), 'updated_at': self.updated_at}
+
+    @property
+    def sectors(self) -> List[str]:
+        return sorted({sector for _, sector in self.rankings if sector is not None})
+
+    def load(self, stocks: List[Dict], quotes: List[Dict]):
+        """Rebuild every ranking from catalog rows and latest_quotes rows"""
+        self.stocks, self.rankings, self._snapshots = {}, {}, {}
+        for stock in stocks:
+            self.stocks[str(stock['id'])] = {
+                'id': str(stock['id']),
+                'symbol': stock['symbol'],
+                'name': stock.get('name'),
+                'sector': stock.get('sector'),
+                'price': None, 'change_percent': None, 'volume': None, 'timestamp': None
+            }
+        for quote in quotes:
+            self.update(quote)
+        self.stale = False
+
+    def _ranking(self, metric: str, sector: Optional[str]) -> SortedKeyList:
+        key = (metric, sector)
+        if key not in self.rankings:
+            self.rankings[key] = SortedKeyList(key=itemgetter(0))
+        return self.rankings[key]
+
+    def update(self, quote: Dict) -> bool:
+        """Move one stock in every ranking it belongs to; False if it is not known"""
+        stock = self.stocks.get(str(quote.get('instrument_id')))
+        if stock is None:
+            return False
+        close = quote.get('close') if quote.get('close') is not None else quote.get('price')
+        if close is None:
+            return True
+        values = {
+            'change_percent': calculate_percentage_change(float(quote['open']), float(close))
+            if quote.get('open') is not None else None,
+            'volume': float(quote['volume']) if quote.get('volume') is not None else None
+        }
+        for metric in RANKINGS:
+            self._move(stock, metric, values[metric])
+        stock.update(values, price=float(close), timestamp=str(quote['timestamp']))
+        self.updated_at = stock['timestamp']
+        self.version += 1
+        return True
+
+    def _move(self, stock: Dict, metric: str, value: Optional[float]):
+        for sector in {None, stock['sector']}:
+            ranking = self._ranking(metric, sector)
+            if stock[metric] is not None:
+                ranking.remove((stock[metric], stock['id']))
+            if value is not None:
+                ranking.add((value, stock['id']))
+
+    def remove(self, instrument_id: str):
+        stock = self.stocks.pop(str(instrument_id), None)
+        if stock is not None:
+            for metric in RANKINGS:
+                self._move(stock, metric, None)
+            self.version += 1
+
+    def snapshot(self, sector: Optional[str] = None, limit: int = 10) -> Dict:
+        """Top `limit` gainers, losers and most active; cached until the next tick"""
+        cached = self._snapshots.get((sector, limit))
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+
+        changes = self.rankings.get(('change_percent', sector), [])
+        volumes = self.rankings.get(('volume', sector), [])
+        snapshot = {
+            'sector': sector,
+            'gainers': [self._entry(stock_id) for value, stock_id in reversed(changes[-limit:]) if value > 0],
+            'losers': [self._entry(stock_id) for value, stock_id in changes[:limit] if value < 0],
+            'most_active': [self._entry(stock_id) for _, stock_id in reversed(volumes[-limit:])],
+            'as_of': self.updated_at
+        }
+        self._snapshots[(sector, limit)] = (self.version, snapshot)
+        return snapshot
+
+    def _entry(self, stock_id: str) -> Dict:
+        return dict(self.stocks[stock_id])
+
+
+class LeaderboardService:
+    """Keeps the leaderboards loaded and fed by collector ticks"""
+
+    def __init__(self, boards: Optional[Leaderboards] = None):
+        self.boards = boards or Leaderboards()
+
+    def cache_stats(self) -> Dict:
+        return self.boards.cache_stats()
+
+    def on_quote(self, quote: Dict):
+        """Collector listener: O(log n) per ranking touched"""
+        if quote.get('kind') != 'stock' or self.boards.stale:
+            return
+        if not self.boards.update(quote):
+            self.boards.stale = True
+
+    def invalidate(self, kind: str, instrument_id: str):
+        if kind == 'stock':
+            self.boards.remove(instrument_id)
+
+    async def get_leaderboards(self, sector: Optional[str] = None, limit: int = 10) -> Dict:
+        if self.boards.stale:
+            self.boards.load(*fetch_stock_universe())
+            logger.info(f"Leaderboards built for {len(self.boards.stocks)} stocks")
+        return self.boards.snapshot(sector, limit)
+
+
+# Shared instance fed by the data collector
+leaderboard_service = LeaderboardService()
@@ -0,0 +1,382 @@
+"""
+Market Data Providers
+Where the collector gets its bars, and the clock it runs on
+
+- `YFinanceProvider`: live provider responses, real time
+- `RecordingProvider`: wraps a provider and appends every response to a
+  compact archive (gzip JSON lines, bars as [epoch, o, h, l, c, v])
+- `ReplayProvider`: answers from an archive on a virtual clock
+- `SyntheticProvider`: random-walk OHLCV for any number of symbols
+
+Replay and synthetic providers run on a `VirtualClock`: time only moves
+when the collector sleeps, and a sleep of s seconds takes s / speed real
+seconds. A replay therefore sees the same responses at the same virtual
+times however fast it runs, from 1x to 1000x.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_VERSION = 1
+DAY = 86400
+
+
+def yfinance_ticker(symbol: str):
+    """yfinance ticker; yfinance and pandas are imported on first use to keep startup fast"""
+    import yfinance as yf
+    return yf.Ticker(symbol)
+
+
+def frame_to_bars(frame, symbols: List[str]) -> Dict[str, List[Dict]]:
+    """Split a provider download into bar dicts per symbol"""
+    import pandas as pd
+    bars = {}
+    if frame is None or frame.empty:
+        return bars
+    grouped = isinstance(frame.columns, pd.MultiIndex)
+    for symbol in symbols:
+        if grouped and symbol not in frame.columns.get_level_values(0):
+            continue
+        if not grouped and len(symbols) > 1:
+            break
+        data = (frame[symbol] if grouped else frame).dropna(subset=['Close'])
+        bars[symbol] = [
+            {
+                'epoch': int(index.timestamp()),
+                'open': float(row.Open),
+                'high': float(row.High),
+                'low': float(row.Low),
+                'close': float(row.Close),
+                'volume': float(row.Volume) if row.Volume == row.Volume else 0.0
+            }
+            for index, row in zip(data.index, data.itertuples(index=False))
+        ]
+    return bars
+
+
+def _pack(bars: List[Dict]) -> List[List[float]]:
+    return [[bar['epoch'], bar['open'], bar['high'], bar['low'], bar['close'], bar['volume']] for bar in bars]
+
+
+def _unpack(rows: List[List[float]]) -> List[Dict]:
+    return [
+        {'epoch': int(row[0]), 'open': row[1], 'high': row[2], 'low': row[3], 'close': row[4], 'volume': row[5]}
+        for row in rows
+    ]
+
+
+class MarketDataProvider:
+    """Live yfinance responses on the real clock"""
+
+    name = 'yfinance'
+
+    def now(self) -> float:
+        return time.time()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+    def daily_bars(self, symbol: str) -> List[Dict]:
+        """Last few daily bars of one symbol (blocking; run off the event loop)"""
+        return frame_to_bars(yfinance_ticker(symbol).history(period="5d", interval="1d"), [symbol]).get(symbol, [])
+
+    def intraday_bars(self, symbols: List[str], interval: str, start: Optional[float]) -> Dict[str, List[Dict]]:
+        """Intraday bars of many symbols since `start` (today if None) in one request (blocking)"""
+        import yfinance as yf
+        window = {'start': datetime.fromtimestamp(start, tz=timezone.utc)} if start else {'period': '1d'}
+        frame = yf.download(
+            symbols, interval=interval, group_by='ticker', auto_adjust=False, progress=False, threads=True, **window
+        )
+        return frame_to_bars(frame, symbols)
+
+    def close(self):
+        pass
+
+
+YFinanceProvider = MarketDataProvider
+
+
+class VirtualClock:
+    """Simulated time that advances only through sleep, `speed` times faster than real time"""
+
+    def __init__(self, start: float, speed: float = 1.0):
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        self.current = start
+        self.speed = speed
+
+    def now(self) -> float:
+        return self.current
+
+    async def sleep(self, seconds: float):
+        # Concurrent sleepers wake in order; time never moves backwards
+        wake_at = self.current + seconds
+        await asyncio.sleep(seconds / self.speed)
+        self.current = max(self.current, wake_at)
+
+
+class RecordingProvider(MarketDataProvider):
+    """Passes calls through to `inner` and appends each response to an archive"""
+
+    def __init__(self, inner: MarketDataProvider, path: str):
+        self.inner = inner
+        self.path = path
+        self.name = f"{inner.name}+recording"
+        resuming = os.path.exists(path) and os.path.getsize(path) > 0
+        self._handle = gzip.open(path, 'at', encoding='utf-8')
+        # Fetches run in worker threads; records must not interleave
+        self._lock = threading.Lock()
+        if not resuming:
+            self._write({'version': ARCHIVE_VERSION, 'started_at': inner.now()})
+
+    def _write(self, record: Dict):
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._handle.write(line)
+            self._handle.flush()
+
+    def now(self) -> float:
+        return self.inner.now()
+
+    async def sleep(self, seconds: float):
+        await self.inner.sleep(seconds)
+
+    def daily_bars(self, symbol: str) -> List[Dict]:
+        bars = self.inner.daily_bars(symbol)
+        self._write({'t': self.now(), 'call': 'daily', 'bars': {symbol: _pack(bars)}})
+        return bars
+
+    def intraday_bars(self, symbols: List[str], interval: str, start: Optional[float]) -> Dict[str, List[Dict]]:
+        bars = self.inner.intraday_bars(symbols, interval, start)
+        self._write({
+            't': self.now(), 'call': 'intraday', 'interval': interval,
+            'bars': {symbol: _pack(symbol_bars) for symbol, symbol_bars in bars.items()}
+        })
+        return bars
+
+    def close(self):
+        with self._lock:
+            self._handle.close()
+        self.inner.close()
+
+
+def read_archive(path: str) -> Tuple[Dict, List[Dict]]:
+    """Header and records of an archive; a recording cut off mid-write keeps its complete lines"""
+    header, records = {}, []
+    with gzip.open(path, 'rt', encoding='utf-8') as handle:
+        try:
+            for line in handle:
+                if not line.endswith('\n'):
+                    break
+                record = json.loads(line)
+                if 'version' in record:
+                    header = header or record
+                else:
+                    records.append(record)
+        except EOFError:
+            pass
+    if header.get('version') != ARCHIVE_VERSION:
+        raise ValueError(f"Unsupported market data archive: {path}")
+    return header, records
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves recorded responses on a virtual clock starting at the recording's
+    start: each call gets, per symbol, the latest response recorded at or
+    before the current virtual time.
+    """
+
+    name = 'replay'
+
+    def __init__(self, path: str, speed: float = 1.0, start: Optional[float] = None):
+        header, records = read_archive(path)
+        self.clock = VirtualClock(start if start is not None else header['started_at'], speed)
+        self.responses: Dict[Tuple[str, str], List[Tuple[float, List[Dict]]]] = defaultdict(list)
+        for record in records:
+            for symbol, rows in record['bars'].items():
+                self.responses[(record['call'], symbol)].append((record['t'], _unpack(rows)))
+        for series in self.responses.values():
+            series.sort(key=lambda item: item[0])
+        self.symbols = sorted({symbol for _, symbol in self.responses})
+        self.end = max((record['t'] for record in records), default=self.clock.now())
+
+    def now(self) -> float:
+        return self.clock.now()
+
+    async def sleep(self, seconds: float):
+        await self.clock.sleep(seconds)
+
+    def _latest(self, call: str, symbol: str) -> List[Dict]:
+        series = self.responses.get((call, symbol), [])
+        now = self.clock.now()
+        bars = []
+        for recorded_at, recorded in series:
+            if recorded_at > now:
+                break
+            bars = recorded
+        return bars
+
+    def daily_bars(self, symbol: str) -> List[Dict]:
+        return self._latest('daily', symbol)
+
+    def intraday_bars(self, symbols: List[str], interval: str, start: Optional[float]) -> Dict[str, List[Dict]]:
+        bars = {}
+        for symbol in symbols:
+            recorded = [bar for bar in self._latest('intraday', symbol) if start is None or bar['epoch'] >= start]
+            if recorded:
+                bars[symbol] = recorded
+        return bars
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Deterministic random-walk bars for any symbol. Each UTC day's one-minute
+    path is drawn from a generator seeded by (seed, symbol, day) and opens at
+    the previous day's close, so overlapping requests always agree.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, seed: int = 42, speed: float = 1.0, start: Optional[float] = None, volatility: float = 0.0008):
+        self.seed = seed
+        self.volatility = volatility
+        self.clock = VirtualClock(start if start is not None else time.time(), speed)
+        self.origin_day = int(self.clock.now() // DAY) - 7
+        self._closes: Dict[Tuple[str, int], float] = {}
+
+    def now(self) -> float:
+        return self.clock.now()
+
+    async def sleep(self, seconds: float):
+        await self.clock.sleep(seconds)
+
+    def _symbol_key(self, symbol: str) -> int:
+        return zlib.crc32(symbol.encode())
+
+    def _day_open(self, symbol: str, day: int) -> float:
+        if day <= self.origin_day:
+            return 10.0 + self._symbol_key(symbol) % 990
+        # Walk forward from the last day whose close is known
+        known = day - 1
+        while known >= self.origin_day and (symbol, known) not in self._closes:
+            known -= 1
+        for missing in range(max(known + 1, self.origin_day), day):
+            self._day_path(symbol, missing)
+        return self._closes[(symbol, day - 1)]
+
+    def _day_path(self, symbol: str, day: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Minute closes and volumes of one day"""
+        rng = np.random.default_rng([self.seed, self._symbol_key(symbol), day])
+        closes = self._day_open(symbol, day) * np.exp(np.cumsum(rng.normal(0, self.volatility, 1440)))
+        volumes = rng.integers(100, 10_000, 1440).astype(float)
+        self._closes[(symbol, day)] = float(closes[-1])
+        return closes, volumes
+
+    def _bars(self, symbol: str, start: float, end: float, step: int) -> List[Dict]:
+        """Bars of `step` seconds covering minutes in [start, end]"""
+        bars = []
+        for day in range(int(start // DAY), int(end // DAY) + 1):
+            closes, volumes = self._day_path(symbol, day)
+            opens = np.r_[self._day_open(symbol, day), closes[:-1]]
+            first = max(0, int((start - day * DAY) // 60))
+            last = min(1439, int((end - day * DAY) // 60))
+            minutes = np.arange(first, last + 1)
+            if len(minutes) == 0:
+                continue
+            buckets = (day * DAY + minutes * 60) // step * step
+            starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+            ends = np.r_[starts[1:], len(minutes)]
+            opens, closes, volumes = opens[minutes], closes[minutes], volumes[minutes]
+            columns = (
+                buckets[starts].tolist(),
+                opens[starts].tolist(),
+                np.maximum.reduceat(np.maximum(opens, closes), starts).tolist(),
+                np.minimum.reduceat(np.minimum(opens, closes), starts).tolist(),
+                closes[ends - 1].tolist(),
+                np.add.reduceat(volumes, starts).tolist()
+            )
+            bars.extend(
+                {'epoch': epoch, 'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}
+                for epoch, open_, high, low, close, volume in zip(*columns)
+            )
+        return bars
+
+    def daily_bars(self, symbol: str) -> List[Dict]:
+        now = self.clock.now()
+        return self._bars(symbol, (now // DAY - 4) * DAY, now, DAY)
+
+    def intraday_bars(self, symbols: List[str], interval: str, start: Optional[float]) -> Dict[str, List[Dict]]:
+        from utils.helpers import INTERVAL_SECONDS
+        now = self.clock.now()
+        start = start if start is not None else now // DAY * DAY
+        return {symbol: self._bars(symbol, start, now, INTERVAL_SECONDS[interval]) for symbol in symbols}
+
+
+def synthetic_universe(count: int, sectors: int = 12) -> List[Dict]:
+    """Catalog rows for `count` synthetic stocks"""
+    return [
+        {
+            'id': str(index + 1),
+            'symbol': f"SYN{index:05d}",
+            'name': f"Synthetic {index}",
+            'sector': f"Sector {index % sectors:02d}",
+            'market_cap': 1_000_000_000 + zlib.crc32(f"SYN{index:05d}".encode()) % 99_000_000_000
+        }
+        for index in range(count)
+    ]
+
+
+def create_market_data_provider() -> MarketDataProvider:
+    """Provider selected by MARKET_DATA_PROVIDER, recorded if MARKET_DATA_RECORD_PATH is set"""
+    kind = settings.market_data_provider
+    if not 1 <= settings.market_data_speed <= 1000:
+        raise ValueError("MARKET_DATA_SPEED must be between 1 and 1000")
+    if kind == 'replay':
+        provider = ReplayProvider(settings.market_data_replay_path, speed=settings.market_data_speed)
+    elif kind == 'synthetic':
+        provider = SyntheticProvider(seed=settings.synthetic_seed, speed=settings.market_data_speed)
+    elif kind == 'yfinance':
+        provider = MarketDataProvider()
+    else:
+        raise ValueError(f"Unknown market data provider: {kind}")
+    if settings.market_data_record_path:
+        provider = RecordingProvider(provider, settings.market_data_record_path)
+    return provider
+
+
+_shared_provider: Optional[MarketDataProvider] = None
+_shared_provider_lock = threading.Lock()
+
+
+def get_market_data_provider() -> MarketDataProvider:
+    """The process-wide provider: one archive handle (or parsed replay) per process"""
+    global _shared_provider
+    with _shared_provider_lock:
+        if _shared_provider is None:
+            _shared_provider = create_market_data_provider()
+        return _shared_provider
+
+
+def close_market_data_provider():
+    """Close the process-wide provider, if one was created"""
+    global _shared_provider
+    with _shared_provider_lock:
+        provider, _shared_provider = _shared_provider, None
+    if provider is not None:
+        provider.close()
@@ -0,0 +1,290 @@
+"""
+Metadata Service
+Persistent TTL cache of ticker fundamentals (yfinance `Ticker.info`)
+
+`Ticker.info` is one of the slowest provider calls, so each instrument's
+name, sector, market cap, currency and raw info are cached with per-field
+TTLs (`METADATA_TTLS`, e.g. "market_cap:1d,sector:7d"). A read only checks
+the fields it asks for: fresh values are returned as is, stale ones are
+returned immediately while one background refresh per symbol runs
+(stale-while-revalidate). Only a symbol never seen before waits for the
+provider, and a symbol whose fetch failed is not retried for
+`METADATA_RETRY_AFTER` seconds. The cache is saved to `METADATA_CACHE_PATH`
+(by the collector leader only) so it survives restarts, and changed market
+caps (and sectors missing from the catalog) are written back to `stocks`
+in one bulk call.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from config.database import get_db_client
+from config.settings import settings
+from services.compaction_service import parse_duration
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('name', 'sector', 'market_cap', 'currency', 'info')
+CACHE_VERSION = 1
+
+
+def parse_ttls(spec: str) -> Dict[str, Optional[int]]:
+    """'market_cap:1d,sector:7d' -> seconds per field; unlisted fields never expire"""
+    ttls = {field: None for field in FIELDS}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        field, _, duration = item.strip().partition(':')
+        if field not in ttls:
+            raise ValueError(f"Unknown metadata field: {field}")
+        ttls[field] = parse_duration(duration)
+    return ttls
+
+
+def fetch_info(kind: str, symbol: str) -> Dict:
+    """Provider info of one instrument (blocking; run off the event loop)"""
+    import yfinance as yf
+    return yf.Ticker(f"{symbol}.IS" if kind == 'stock' else symbol).info or {}
+
+
+def info_fields(info: Dict) -> Dict:
+    """Cached fields of a provider info dict; missing ones are left out"""
+    values = {
+        'name': info.get('longName') or info.get('shortName'),
+        'sector': info.get('sector'),
+        'market_cap': int(info['marketCap']) if info.get('marketCap') else None,
+        'currency': info.get('currency') or info.get('financialCurrency'),
+        'info': info or None
+    }
+    return {field: value for field, value in values.items() if value is not None}
+
+
+class MetadataCache:
+    """Field values and their fetch times per (kind, symbol), saved as JSON"""
+
+    def __init__(self, path: Optional[str] = None, ttls: Optional[Dict[str, Optional[int]]] = None):
+        self.path = path if path is not None else settings.metadata_cache_path
+        self.ttls = ttls or parse_ttls(settings.metadata_ttls)
+        self.entries: Dict[Tuple[str, str], Dict[str, Tuple[float, object]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def values(self, kind: str, symbol: str) -> Optional[Dict]:
+        entry = self.entries.get((kind, symbol))
+        return {field: value for field, (_, value) in entry.items()} if entry is not None else None
+
+    def stale_fields(self, kind: str, symbol: str, fields: Iterable[str], now: Optional[float] = None) -> List[str]:
+        """Requested fields that are missing or past their TTL"""
+        now = time.time() if now is None else now
+        entry = self.entries.get((kind, symbol), {})
+        stale = []
+        for field in fields:
+            fetched_at = entry[field][0] if field in entry else None
+            ttl = self.ttls[field]
+            if fetched_at is None or (ttl is not None and now - fetched_at >= ttl):
+                stale.append(field)
+        return stale
+
+    def put(self, kind: str, symbol: str, values: Dict, now: Optional[float] = None) -> Dict:
+        """Record a fetch of every field (one left out keeps its last value); returns the changed ones"""
+        now = time.time() if now is None else now
+        entry = self.entries.setdefault((kind, symbol), {})
+        changed = {}
+        for field in FIELDS:
+            previous = entry[field][1] if field in entry else None
+            value = values.get(field, previous)
+            if value is not None and value != previous:
+                changed[field] = value
+            entry[field] = (now, value)
+        return changed
+
+    def evict(self, kind: str, symbol: str):
+        self.entries.pop((kind, symbol), None)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as handle:
+                data = json.load(handle)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable metadata cache {self.path}: {e}")
+            return
+        if data.get('version') != CACHE_VERSION:
+            return
+        self.entries = {
+            (item['kind'], item['symbol']): {field: tuple(pair) for field, pair in item['fields'].items()}
+            for item in data['entries']
+        }
+
+    def save(self):
+        if not self.path:
+            return
+        data = {
+            'version': CACHE_VERSION,
+            'entries': [
+                {'kind': kind, 'symbol': symbol, 'fields': {field: list(pair) for field, pair in entry.items()}}
+                for (kind, symbol), entry in self.entries.items()
+            ]
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # A temporary file of its own, so concurrent saves never share one
+        descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.metadata-', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w') as handle:
+                json.dump(data, handle, separators=(',', ':'))
+            os.replace(temporary, self.path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+
+class MetadataService:
+    """Stale-while-revalidate reads over the metadata cache, with catalog write-back"""
+
+    def __init__(self, cache: Optional[MetadataCache] = None, fetcher: Optional[Callable[[str, str], Dict]] = None):
+        self.cache = cache if cache is not None else MetadataCache()
+        self.fetcher = fetcher or fetch_info
+        self.refreshing: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.pending_writes: Dict[str, Dict] = {}
+        self.failed: Dict[Tuple[str, str], float] = {}  # fetch failure times, retried after METADATA_RETRY_AFTER
+        # Saving the cache file is left to one process (the collector leader)
+        self.persist = True
+        self._flush_task: Optional[asyncio.Task] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._flush_lock = threading.Lock()
+        self._loaded = False
+
+    def cache_stats(self) -> Dict:
+        return {
+            'entries': len(self.cache),
+            'refreshing': len(self.refreshing),
+            'failed': len(self.failed),
+            'pending_writes': len(self.pending_writes)
+        }
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.cache.load()
+            self._loaded = True
+
+    async def get(self, kind: str, symbol: str, fields: Iterable[str] = FIELDS) -> Dict:
+        """Cached fields of one instrument; stale values are served while they refresh"""
+        self._ensure_loaded()
+        fields = list(fields)
+        values = self.cache.values(kind, symbol)
+        if values is None:
+            # Concurrent first reads share one fetch; a cancelled reader leaves it running for the others
+            task = self.schedule_refresh(kind, symbol)
+            if task is not None:
+                await asyncio.shield(task)
+            values = self.cache.values(kind, symbol) or {}
+        elif self.cache.stale_fields(kind, symbol, fields):
+            self.schedule_refresh(kind, symbol)
+        return {field: values.get(field) for field in fields}
+
+    def recently_failed(self, kind: str, symbol: str) -> bool:
+        """Whether the last fetch failed less than METADATA_RETRY_AFTER seconds ago"""
+        failed_at = self.failed.get((kind, symbol))
+        if failed_at is None:
+            return False
+        if time.time() - failed_at < settings.metadata_retry_after:
+            return True
+        del self.failed[(kind, symbol)]
+        return False
+
+    def schedule_refresh(self, kind: str, symbol: str) -> Optional[asyncio.Task]:
+        """Start one background refresh per symbol, unless its last fetch just failed"""
+        key = (kind, symbol)
+        task = self.refreshing.get(key)
+        if task is None:
+            if self.recently_failed(kind, symbol):
+                return None
+            task = asyncio.create_task(self.refresh(kind, symbol))
+            self.refreshing[key] = task
+            task.add_done_callback(lambda _: self.refreshing.pop(key, None))
+        return task
+
+    def refresh_stale(self, kind: str, symbols: Iterable[str], fields: Iterable[str] = ('sector', 'market_cap')):
+        """Schedule refreshes for every symbol whose `fields` expired"""
+        self._ensure_loaded()
+        fields = list(fields)
+        for symbol in symbols:
+            if self.cache.stale_fields(kind, symbol, fields):
+                self.schedule_refresh(kind, symbol)
+
+    async def refresh(self, kind: str, symbol: str):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.metadata_refresh_concurrency)
+        try:
+            async with self._semaphore:
+                info = await asyncio.to_thread(self.fetcher, kind, symbol)
+        except Exception as e:
+            logger.error(f"Error fetching metadata for {kind} {symbol}: {e}")
+            self.failed[(kind, symbol)] = time.time()
+            return
+        self.failed.pop((kind, symbol), None)
+        changed = self.cache.put(kind, symbol, info_fields(info))
+        if kind == 'stock' and ('sector' in changed or 'market_cap' in changed):
+            values = self.cache.values(kind, symbol)
+            self.pending_writes[symbol] = {
+                'symbol': symbol, 'sector': values.get('sector'), 'market_cap': values.get('market_cap')
+            }
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        """Coalesce the disk save and catalog write-back of refreshes finishing together"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        try:
+            await asyncio.sleep(settings.metadata_flush_delay)
+            await asyncio.to_thread(self.flush)
+        finally:
+            self._flush_task = None
+
+    def flush(self) -> int:
+        """Save the cache and write changed stock metadata back in one call"""
+        with self._flush_lock:
+            if self.persist:
+                try:
+                    self.cache.save()
+                except OSError as e:
+                    logger.error(f"Error saving metadata cache: {e}")
+            if not self.pending_writes:
+                return 0
+            rows = list(self.pending_writes.values())
+            self.pending_writes = {}
+        try:
+            result = get_db_client().rpc('update_stock_metadata', {'p_rows': rows}).execute()
+            updated = result.data if isinstance(result.data, int) else len(rows)
+            logger.info(f"Wrote metadata of {updated} stocks back to the catalog")
+            return updated
+        except Exception as e:
+            for row in rows:
+                self.pending_writes.setdefault(row['symbol'], row)
+            logger.error(f"Error writing stock metadata back: {e}")
+            return 0
+
+    async def close(self):
+        for task in list(self.refreshing.values()):
+            task.cancel()
+        await asyncio.gather(*self.refreshing.values(), return_exceptions=True)
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        if self._loaded:
+            await asyncio.to_thread(self.flush)
+
+
+# Shared instance used by the data collector
+metadata_service = MetadataService()
@@ -0,0 +1,357 @@
+"""
+Portfolio Service
+Portfolios valued against the hot quote set in one vectorized pass
+
+Every position of every portfolio is a slot in flat numpy arrays
+(portfolio row, instrument column, quantity, cost); latest prices live in
+one array indexed by instrument column. A collector tick updates one price
+and schedules a revaluation, which prices all positions with a single
+gather and sums them per portfolio with `np.bincount`. Positions are priced
+in TRY (BIST stocks, or foreign currency through its TRY pair) and each
+portfolio is reported in its base currency through the FX graph; cost
+basis is kept in TRY and converted at the current rate. Requests only read
+the last valuation.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.database import fetch_all, get_db_client
+from services.fx_graph import fx_graph
+from services.quote_channel import QuoteChannel
+from services.quote_service import quote_service
+
+logger = logging.getLogger(__name__)
+
+BASE_CURRENCIES = ('TRY', 'USD', 'EUR')
+INSTRUMENT_TABLES = {'stock': 'stocks', 'currency': 'currencies'}
+PORTFOLIO_EVENT = 'portfolio_changed'
+
+
+class PortfolioBook:
+    """Positions of every portfolio as flat arrays, revalued in one pass"""
+
+    def __init__(self):
+        self.portfolios: Dict[str, Dict] = {}
+        # portfolio id -> (kind, instrument_id) -> (quantity, average_cost)
+        self.positions: Dict[str, Dict[Tuple[str, str], Tuple[float, float]]] = {}
+        self.columns: Dict[Tuple[str, str], int] = {}
+        self.prices = np.empty(0)
+        self.order: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.keys: List[Tuple[str, str]] = []
+        self.owner = np.empty(0, dtype=np.int64)
+        self.instrument = np.empty(0, dtype=np.int64)
+        self.quantity = np.empty(0)
+        self.cost = np.empty(0)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.base = np.empty(0, dtype=np.int64)
+        self.valuation: Dict[str, np.ndarray] = {}
+        self.valued_at: Optional[str] = None
+
+    def set_portfolio(self, portfolio: Dict, positions: List[Dict]):
+        """Replace one portfolio and its positions (call compile() afterwards)"""
+        portfolio_id = str(portfolio['id'])
+        self.portfolios[portfolio_id] = {
+            'id': portfolio_id, 'name': portfolio['name'], 'base_currency': portfolio['base_currency']
+        }
+        self.positions[portfolio_id] = {
+            (row['kind'], str(row['instrument_id'])): (float(row['quantity']), float(row.get('average_cost') or 0.0))
+            for row in positions
+        }
+
+    def remove_portfolio(self, portfolio_id: str):
+        self.portfolios.pop(portfolio_id, None)
+        self.positions.pop(portfolio_id, None)
+
+    def column(self, kind: str, instrument_id: str) -> int:
+        """Price column of an instrument, added (unpriced) on first use"""
+        key = (kind, str(instrument_id))
+        index = self.columns.get(key)
+        if index is None:
+            index = self.columns[key] = len(self.columns)
+            self.prices = np.append(self.prices, np.nan)
+        return index
+
+    def set_price(self, kind: str, instrument_id: str, price: Optional[float]) -> bool:
+        """Apply one tick in O(1); False if no portfolio holds the instrument"""
+        index = self.columns.get((kind, str(instrument_id)))
+        if index is None:
+            return False
+        self.prices[index] = np.nan if price is None else float(price)
+        return True
+
+    def compile(self):
+        """Lay positions out contiguously by portfolio row"""
+        self.order = sorted(self.portfolios)
+        self.rows = {portfolio_id: row for row, portfolio_id in enumerate(self.order)}
+        owner, instrument, quantity, cost, keys = [], [], [], [], []
+        for row, portfolio_id in enumerate(self.order):
+            for key, (amount, average_cost) in self.positions[portfolio_id].items():
+                owner.append(row)
+                instrument.append(self.column(*key))
+                quantity.append(amount)
+                cost.append(average_cost)
+                keys.append(key)
+
+        self.keys = keys
+        self.owner = np.asarray(owner, dtype=np.int64)
+        self.instrument = np.asarray(instrument, dtype=np.int64)
+        self.quantity = np.asarray(quantity, dtype=float)
+        self.cost = np.asarray(cost, dtype=float)
+        self.offsets = np.searchsorted(self.owner, np.arange(len(self.order) + 1))
+        self.base = np.asarray(
+            [BASE_CURRENCIES.index(self.portfolios[portfolio_id]['base_currency']) for portfolio_id in self.order],
+            dtype=np.int64
+        )
+
+    def revalue(self, fx_to_try: Dict[str, float]):
+        """Value every position and portfolio; fx_to_try maps base currency -> TRY per unit"""
+        count = len(self.order)
+        value = self.quantity * self.prices[self.instrument]
+        priced = ~np.isnan(value)
+        cost = np.where(priced, self.quantity * self.cost, 0.0)
+        rates = np.asarray([fx_to_try.get(code, np.nan) for code in BASE_CURRENCIES])[self.base]
+
+        self.valuation = {
+            'position_value': value,
+            'value': np.bincount(self.owner, weights=np.where(priced, value, 0.0), minlength=count) / rates,
+            'cost': np.bincount(self.owner, weights=cost, minlength=count) / rates,
+            'unpriced': np.bincount(self.owner, weights=~priced, minlength=count).astype(np.int64),
+            'rate': rates
+        }
+        self.valued_at = datetime.now(timezone.utc).isoformat()
+
+    def summary(self, row: int) -> Dict:
+        value, cost = float(self.valuation['value'][row]), float(self.valuation['cost'][row])
+        portfolio = self.portfolios[self.order[row]]
+        return {
+            **portfolio,
+            'value': _number(value),
+            'cost': _number(cost),
+            'pnl': _number(value - cost),
+            'pnl_percent': _number((value - cost) / cost * 100) if cost else None,
+            'position_count': int(self.offsets[row + 1] - self.offsets[row]),
+            'unpriced_positions': int(self.valuation['unpriced'][row]),
+            'valued_at': self.valued_at
+        }
+
+    def detail(self, row: int) -> Dict:
+        start, stop = int(self.offsets[row]), int(self.offsets[row + 1])
+        rate = float(self.valuation['rate'][row])
+        positions = []
+        for slot in range(start, stop):
+            kind, instrument_id = self.keys[slot]
+            price = float(self.prices[self.instrument[slot]])
+            value = float(self.valuation['position_value'][slot]) / rate
+            cost = float(self.quantity[slot] * self.cost[slot]) / rate
+            positions.append({
+                'kind': kind,
+                'instrument_id': instrument_id,
+                'quantity': float(self.quantity[slot]),
+                'average_cost': float(self.cost[slot]),
+                'price': _number(price),
+                'value': _number(value),
+                'pnl': _number(value - cost)
+            })
+        return {**self.summary(row), 'positions': positions}
+
+
+def _number(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(value, 6)
+
+
+class PortfolioService:
+    """Portfolio CRUD plus valuations kept current by collector ticks"""
+
+    def __init__(self, book: Optional[PortfolioBook] = None):
+        self.book = book or PortfolioBook()
+        self.loaded = False
+        self.instance_id = uuid.uuid4().hex
+        self.channel: Optional[QuoteChannel] = None
+        self._pending = False
+
+    def cache_stats(self) -> Dict:
+        return {
+            'loaded': self.loaded,
+            'portfolios': len(self.book.order),
+            'positions': len(self.book.keys),
+            'valued_at': self.book.valued_at
+        }
+
+    async def attach_channel(self, channel: QuoteChannel):
+        """Share portfolio edits with every worker over the quote channel"""
+        self.channel = channel
+        await channel.subscribe(self.receive_event)
+
+    async def receive_event(self, message: Dict):
+        if message.get('event') != PORTFOLIO_EVENT or message.get('origin') == self.instance_id or not self.loaded:
+            return
+        portfolio_id = str(message['portfolio_id'])
+        portfolio, positions = await asyncio.to_thread(self._fetch_portfolio, portfolio_id)
+        if portfolio is None:
+            self.book.remove_portfolio(portfolio_id)
+        else:
+            self.book.set_portfolio(portfolio, positions)
+        await self._refresh()
+
+    async def ensure_loaded(self):
+        """Load every portfolio and seed prices from the latest quotes"""
+        if self.loaded:
+            return
+        db_client = get_db_client()
+        portfolios = fetch_all(lambda: db_client.table('portfolios').select('*').order('id'))
+        positions = fetch_all(
+            lambda: db_client.table('portfolio_positions').select('*').order('portfolio_id').order('kind').order('instrument_id')
+        )
+        by_portfolio: Dict[str, List[Dict]] = {}
+        for row in positions:
+            by_portfolio.setdefault(str(row['portfolio_id']), []).append(row)
+        for portfolio in portfolios:
+            self.book.set_portfolio(portfolio, by_portfolio.get(str(portfolio['id']), []))
+
+        await fx_graph.ensure_loaded()
+        await self._refresh()
+        self.loaded = True
+        logger.info(f"Loaded {len(self.book.order)} portfolios with {len(self.book.keys)} positions")
+
+    async def _seed_prices(self):
+        """Latest price of every held instrument that has none yet"""
+        for kind in INSTRUMENT_TABLES:
+            ids = [
+                instrument_id for (key_kind, instrument_id), column in self.book.columns.items()
+                if key_kind == kind and np.isnan(self.book.prices[column])
+            ]
+            if ids:
+                quotes = await quote_service.get_latest_quotes(kind=kind, ids=ids)
+                for quote in quotes['quotes']:
+                    self.book.set_price(kind, quote['instrument_id'], quote['price'])
+
+    def on_quote(self, quote: Dict):
+        """Collector listener: apply the tick and revalue once the current burst is done"""
+        if not self.loaded:
+            return
+        held = self.book.set_price(quote.get('kind'), quote.get('instrument_id'), quote.get('price'))
+        if held or quote.get('kind') == 'currency':
+            self._schedule_revalue()
+
+    def invalidate(self, kind: str, instrument_id: str):
+        """A deleted instrument no longer has a price"""
+        if self.book.set_price(kind, instrument_id, None):
+            self._schedule_revalue()
+
+    def _schedule_revalue(self):
+        if self._pending:
+            return
+        self._pending = True
+        try:
+            asyncio.get_running_loop().call_soon(self.revalue)
+        except RuntimeError:
+            self.revalue()
+
+    def revalue(self):
+        """One vectorized pass over all positions"""
+        self._pending = False
+        fx_to_try = {'TRY': 1.0}
+        for code in BASE_CURRENCIES[1:]:
+            cross = fx_graph.cross(code, 'TRY')
+            fx_to_try[code] = cross['rate'] if cross else np.nan
+        self.book.revalue(fx_to_try)
+
+    async def list_valuations(self, skip: int = 0, limit: int = 100) -> Tuple[List[Dict], int]:
+        await self.ensure_loaded()
+        rows = range(skip, min(skip + limit, len(self.book.order)))
+        return [self.book.summary(row) for row in rows], len(self.book.order)
+
+    async def get_valuation(self, portfolio_id: str) -> Optional[Dict]:
+        await self.ensure_loaded()
+        row = self.book.rows.get(str(portfolio_id))
+        return self.book.detail(row) if row is not None else None
+
+    async def create_portfolio(self, name: str, base_currency: str) -> Dict:
+        await self.ensure_loaded()
+        db_client = get_db_client()
+        response = db_client.table('portfolios').insert({'name': name, 'base_currency': base_currency}).execute()
+        portfolio = response.data[0]
+        self.book.set_portfolio(portfolio, [])
+        await self._changed(str(portfolio['id']))
+        return await self.get_valuation(str(portfolio['id']))
+
+    async def delete_portfolio(self, portfolio_id: str) -> bool:
+        await self.ensure_loaded()
+        db_client = get_db_client()
+        response = db_client.table('portfolios').delete().eq('id', portfolio_id).execute()
+        if not response.data:
+            return False
+        self.book.remove_portfolio(str(portfolio_id))
+        await self._changed(str(portfolio_id))
+        return True
+
+    async def set_position(
+        self, portfolio_id: str, kind: str, instrument_id: str, quantity: float, average_cost: float
+    ) -> Optional[Dict]:
+        """Create or replace a position; None if the portfolio or instrument does not exist"""
+        await self.ensure_loaded()
+        portfolio_id = str(portfolio_id)
+        if portfolio_id not in self.book.portfolios:
+            return None
+        db_client = get_db_client()
+        instrument = db_client.table(INSTRUMENT_TABLES[kind]).select('id')\
+            .eq('id', instrument_id).is_('deleted_at', 'null').execute()
+        if not instrument.data:
+            return None
+
+        db_client.table('portfolio_positions').upsert({
+            'portfolio_id': portfolio_id,
+            'kind': kind,
+            'instrument_id': str(instrument_id),
+            'quantity': quantity,
+            'average_cost': average_cost,
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        }, on_conflict='portfolio_id,kind,instrument_id').execute()
+        self.book.positions[portfolio_id][(kind, str(instrument_id))] = (float(quantity), float(average_cost))
+        await self._changed(portfolio_id)
+        return await self.get_valuation(portfolio_id)
+
+    async def remove_position(self, portfolio_id: str, kind: str, instrument_id: str) -> bool:
+        await self.ensure_loaded()
+        portfolio_id = str(portfolio_id)
+        positions = self.book.positions.get(portfolio_id, {})
+        if (kind, str(instrument_id)) not in positions:
+            return False
+        db_client = get_db_client()
+        db_client.table('portfolio_positions').delete()\
+            .eq('portfolio_id', portfolio_id).eq('kind', kind).eq('instrument_id', str(instrument_id)).execute()
+        del positions[(kind, str(instrument_id))]
+        await self._changed(portfolio_id)
+        return True
+
+    async def _refresh(self):
+        """Recompile and revalue in one step (requests never see a half-built book), then price new holdings"""
+        self.book.compile()
+        self.revalue()
+        await self._seed_prices()
+        self.revalue()
+
+    async def _changed(self, portfolio_id: str):
+        """Refresh locally, then tell the other workers to reload the portfolio"""
+        await self._refresh()
+        if self.channel is not None:
+            await self.channel.publish({'event': PORTFOLIO_EVENT, 'portfolio_id': portfolio_id, 'origin': self.instance_id})
+
+    def _fetch_portfolio(self, portfolio_id: str) -> Tuple[Optional[Dict], List[Dict]]:
+        db_client = get_db_client()
+        portfolio = db_client.table('portfolios').select('*').eq('id', portfolio_id).execute().data
+        if not portfolio:
+            return None, []
+        positions = db_client.table('portfolio_positions').select('*').eq('portfolio_id', portfolio_id).execute().data
+        return portfolio[0], positions or []
+
+
+# Shared instance fed by the data collector
+portfolio_service = PortfolioService()
@@ -0,0 +1,176 @@
+"""
+Price History
+Column-oriented price history loading and resampling
+
+History is kept as numpy column arrays from the storage read to the
+response. The fast response path encodes these arrays directly; the
+row-shaped path builds StockPrice / CurrencyRate dicts from them.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+
+from config.database import fetch_all, get_db_client
+from services.intraday_service import intraday_book
+from utils.helpers import INTERVAL_SECONDS, timestamp_to_epoch
+
+logger = logging.getLogger(__name__)
+
+# table, id column, price column, stored OHLCV columns
+HISTORY_SOURCES = {
+    'stock': ('stock_prices', 'stock_id', 'close', ('open', 'high', 'low', 'close', 'volume')),
+    'currency': ('currency_rates', 'currency_id', 'rate', ('rate', 'high', 'low'))
+}
+
+
+def _float_column(rows: List[Dict], name: str) -> np.ndarray:
+    values = (row.get(name) for row in rows)
+    return np.fromiter((np.nan if value is None else value for value in values), dtype=float, count=len(rows))
+
+
+def rows_to_columns(kind: str, rows: List[Dict]) -> Dict[str, np.ndarray]:
+    """Time-ordered storage rows to epoch + value column arrays"""
+    fields = HISTORY_SOURCES[kind][3]
+    columns = {
+        'epoch': np.fromiter((timestamp_to_epoch(row['timestamp']) for row in rows), dtype=np.int64, count=len(rows))
+    }
+    for name in fields:
+        columns[name] = _float_column(rows, name)
+    return columns
+
+
+def resample_ohlcv(kind: str, columns: Dict[str, np.ndarray], interval: str) -> Dict[str, np.ndarray]:
+    """
+    Aggregate samples into interval bars: first open, max high, min low,
+    last price, summed volume. Input must be sorted by epoch.
+    """
+    epochs = columns['epoch']
+    if len(epochs) == 0:
+        return {name: values[:0] for name, values in columns.items()}
+
+    step = INTERVAL_SECONDS[interval]
+    buckets = epochs // step * step
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(epochs)] - 1
+
+    price_column = HISTORY_SOURCES[kind][2]
+    bars = {'epoch': buckets[starts]}
+    for name, values in columns.items():
+        if name == 'epoch':
+            continue
+        if name == 'open':
+            bars[name] = values[starts]
+        elif name == 'high':
+            bars[name] = np.fmax.reduceat(values, starts)
+        elif name == 'low':
+            bars[name] = np.fmin.reduceat(values, starts)
+        elif name == 'volume':
+            bars[name] = np.add.reduceat(np.nan_to_num(values), starts)
+        else:
+            bars[name] = values[ends]
+    if 'open' not in bars:
+        bars['open'] = columns[price_column][starts]
+    return bars
+
+
+def with_changes(kind: str, bars: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Add change and change_percent against the previous bar (the open for the first)"""
+    price = bars[HISTORY_SOURCES[kind][2]]
+    reference = np.empty_like(price)
+    if len(price):
+        reference[0] = bars['open'][0]
+        reference[1:] = price[:-1]
+    change = price - reference
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change_percent = np.where(reference != 0, change / reference * 100, 0.0)
+    return {**bars, 'change': np.nan_to_num(change), 'change_percent': np.nan_to_num(change_percent)}
+
+
+def fetch_history(
+    kind: str,
+    instrument_id: str,
+    start_date: datetime,
+    end_date: datetime,
+    interval: str
+) -> Dict[str, np.ndarray]:
+    """Resampled OHLCV bars of one instrument as column arrays"""
+    table, id_column, _, fields = HISTORY_SOURCES[kind]
+    db_client = get_db_client()
+
+    rows = fetch_all(
+        lambda: db_client.table(table)
+        .select(','.join(('timestamp',) + fields))
+        .eq(id_column, instrument_id)
+        .gte('timestamp', start_date.isoformat())
+        .lte('timestamp', end_date.isoformat())
+        .order('timestamp', desc=False)
+    )
+    # Bars not flushed yet, including the one still forming, are only in memory
+    after = timestamp_to_epoch(rows[-1]['timestamp']) if rows else timestamp_to_epoch(start_date) - 1
+    rows += intraday_book.overlay_rows(kind, instrument_id, after, timestamp_to_epoch(end_date))
+
+    bars = with_changes(kind, resample_ohlcv(kind, rows_to_columns(kind, rows), interval))
+    logger.info(f"Loaded {len(bars['epoch'])} {interval} bars for {kind} {instrument_id}")
+    return bars
+
+
+def history_columns(kind: str, bars: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Public column layout: timestamps as datetime64, volume as integers"""
+    columns = {'timestamp': bars['epoch'].astype('datetime64[s]')}
+    for name, values in bars.items():
+        if name == 'epoch':
+            continue
+        columns[name] = values.astype(np.int64) if name == 'volume' else values
+    return columns
+
+
+def history_rows(kind: str, instrument_id: str, bars: Dict[str, np.ndarray]) -> List[Dict]:
+    """Row layout matching the StockPrice / CurrencyRate schemas"""
+    columns = {
+        name: np.where(np.isnan(values), None, values).tolist() if values.dtype == float else values.tolist()
+        for name, values in bars.items()
+    }
+    timestamps = [datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat() for epoch in columns['epoch']]
+
+    if kind == 'stock':
+        return [
+            {
+                'id': f"{instrument_id}@{timestamp}",
+                'stock_id': instrument_id,
+                'timestamp': timestamp,
+                'price': close,
+                'change': change,
+                'change_percent': change_percent,
+                'volume': int(volume) if volume is not None else None,
+                'open_price': open_,
+                'high_price': high,
+                'low_price': low,
+                'close_price': close
+            }
+            for timestamp, open_, high, low, close, volume, change, change_percent in zip(
+                timestamps, columns['open'], columns['high'], columns['low'], columns['close'],
+                columns['volume'], columns['change'], columns['change_percent']
+            )
+        ]
+
+    return [
+        {
+            'id': f"{instrument_id}@{timestamp}",
+            'currency_id': instrument_id,
+            'timestamp': timestamp,
+            'rate': rate,
+            'change': change,
+            'change_percent': change_percent,
+            'open_rate': open_,
+            'high_rate': high,
+            'low_rate': low,
+            'close_rate': rate
+        }
+        for timestamp, open_, high, low, rate, change, change_percent in zip(
+            timestamps, columns['open'], columns['high'], columns['low'], columns['rate'],
+            columns['change'], columns['change_percent']
+        )
+    ]
@@ -0,0 +1,115 @@
+"""
+Price Windows
+Latest price and short history for a page of instruments in one round trip
+"""
+
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from config.database import get_db_client
+from utils.helpers import calculate_percentage_change
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_price_windows(kind: str, instrument_ids: List[str], points: int) -> Dict[str, List[Dict]]:
+    """Last `points` bars of every instrument, oldest first, via one RPC call"""
+    if not instrument_ids or points < 1:
+        return {}
+
+    db_client = get_db_client()
+    response = db_client.rpc('price_history_window', {
+        'p_kind': kind,
+        'p_ids': [str(item) for item in instrument_ids],
+        'p_points': points
+    }).execute()
+
+    windows: Dict[str, List[Dict]] = defaultdict(list)
+    for row in response.data or []:
+        windows[str(row['instrument_id'])].append(row)
+    return windows
+
+
+def _change(close: float, reference: Optional[float]) -> Dict[str, float]:
+    if reference is None:
+        return {'change': 0.0, 'change_percent': 0.0}
+    return {
+        'change': close - reference,
+        'change_percent': calculate_percentage_change(reference, close)
+    }
+
+
+def to_stock_price(row: Dict, previous_close: Optional[float] = None) -> Dict:
+    """Map a stock_prices / latest_quotes row onto the StockPrice schema"""
+    close = float(row['close'])
+    reference = previous_close if previous_close is not None else row.get('open')
+    return {
+        'id': str(row.get('id') or row.get('source_id') or f"{row.get('instrument_id')}@{row['timestamp']}"),
+        'stock_id': str(row.get('stock_id') or row.get('instrument_id')),
+        'timestamp': row['timestamp'],
+        'price': close,
+        **_change(close, reference),
+        'volume': row.get('volume'),
+        'open_price': row.get('open'),
+        'high_price': row.get('high'),
+        'low_price': row.get('low'),
+        'close_price': close
+    }
+
+
+def to_currency_rate(row: Dict, previous_rate: Optional[float] = None) -> Dict:
+    """Map a currency_rates / latest_quotes row onto the CurrencyRate schema"""
+    rate = float(row['rate'] if row.get('rate') is not None else row['close'])
+    return {
+        'id': str(row.get('id') or row.get('source_id') or f"{row.get('instrument_id')}@{row['timestamp']}"),
+        'currency_id': str(row.get('currency_id') or row.get('instrument_id')),
+        'timestamp': row['timestamp'],
+        'rate': rate,
+        **_change(rate, previous_rate),
+        'high_rate': row.get('high'),
+        'low_rate': row.get('low'),
+        'close_rate': rate
+    }
+
+
+def attach_prices(
+    kind: str,
+    instruments: List[Dict],
+    history_points: int,
+    latest_quotes: Dict[str, Dict]
+) -> List[Dict]:
+    """
+    Add latest price and short history to each instrument row.
+
+    With history requested, one RPC returns both the window and the latest
+    bar; otherwise `latest_quotes` (from the quote service) is used.
+    """
+    convert = to_stock_price if kind == 'stock' else to_currency_rate
+    latest_key, history_key = (
+        ('latest_price', 'price_history') if kind == 'stock' else ('latest_rate', 'rate_history')
+    )
+    ids = [str(item['id']) for item in instruments]
+    # One extra bar gives the first history point (and the latest) a change value
+    windows = fetch_price_windows(kind, ids, history_points + 1) if history_points else {}
+
+    rows = []
+    for item in instruments:
+        instrument_id = str(item['id'])
+        history: List[Dict] = []
+        previous = None
+        for bar in windows.get(instrument_id, []):
+            converted = convert(bar, previous)
+            previous = converted['price'] if kind == 'stock' else converted['rate']
+            history.append(converted)
+        history = history[-history_points:] if history_points else []
+
+        if history:
+            latest = history[-1]
+        elif instrument_id in latest_quotes:
+            latest = convert(latest_quotes[instrument_id])
+        else:
+            latest = None
+
+        rows.append({**item, latest_key: latest, history_key: history})
+    return rows
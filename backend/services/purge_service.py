@@ -0,0 +1,172 @@
+"""
+Purge Service
+Soft delete of instruments followed by a throttled background purge
+
+Deleting an instrument only sets `deleted_at`, which hides it from every
+catalog query, and evicts it from the in-memory caches of every worker
+(via the quote channel). Its price history is then removed in bounded
+batches off the request path; the instrument row itself goes last. A
+purge interrupted by a restart is resumed by the next collector leader.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from config.database import get_db_client
+from config.settings import settings
+from services.quote_channel import QuoteChannel
+
+logger = logging.getLogger(__name__)
+
+INSTRUMENT_TABLES = {'stock': 'stocks', 'currency': 'currencies'}
+REMOVAL_EVENT = 'instrument_removed'
+
+RemovalCallback = Callable[[str, str], Union[None, Awaitable[None]]]
+
+
+class PurgeJob:
+    """Progress of one instrument's history purge"""
+
+    def __init__(self, kind: str, instrument_id: str):
+        self.kind = kind
+        self.instrument_id = instrument_id
+        self.status = 'queued'
+        self.rows_deleted = 0
+        self.batches = 0
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return dict(vars(self))
+
+
+class InstrumentPurger:
+    """Soft deletes instruments and purges their history in the background"""
+
+    def __init__(self, batch_size: Optional[int] = None, pause: Optional[float] = None):
+        self.batch_size = batch_size or settings.purge_batch_size
+        self.pause = settings.purge_pause if pause is None else pause
+        self.instance_id = uuid.uuid4().hex
+        self.listeners: List[RemovalCallback] = []
+        self.channel: Optional[QuoteChannel] = None
+        self.jobs: Dict[Tuple[str, str], PurgeJob] = {}
+        self._tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._stopping = False
+
+    def add_listener(self, callback: RemovalCallback):
+        """Register a cache eviction callback(kind, instrument_id)"""
+        self.listeners.append(callback)
+
+    async def attach_channel(self, channel: QuoteChannel):
+        """Share removals with every worker over the quote channel"""
+        self.channel = channel
+        await channel.subscribe(self.receive_event)
+
+    async def receive_event(self, message: Dict):
+        if message.get('event') == REMOVAL_EVENT and message.get('origin') != self.instance_id:
+            await self._evict(message['kind'], str(message['instrument_id']))
+
+    async def _evict(self, kind: str, instrument_id: str):
+        for callback in list(self.listeners):
+            try:
+                result = callback(kind, instrument_id)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Error evicting {kind} {instrument_id} from {callback}: {e}")
+
+    async def soft_delete(self, kind: str, instrument_id: str) -> Optional[PurgeJob]:
+        """Hide the instrument now and start purging its history; None if not found"""
+        db_client = get_db_client()
+        response = db_client.table(INSTRUMENT_TABLES[kind])\
+            .update({'deleted_at': datetime.now(timezone.utc).isoformat()})\
+            .eq('id', instrument_id)\
+            .is_('deleted_at', 'null')\
+            .execute()
+        if not response.data:
+            return self.jobs.get((kind, str(instrument_id)))
+
+        db_client.table('latest_quotes').delete().eq('kind', kind).eq('instrument_id', str(instrument_id)).execute()
+        await self._evict(kind, str(instrument_id))
+        if self.channel is not None:
+            await self.channel.publish({
+                'event': REMOVAL_EVENT, 'kind': kind, 'instrument_id': str(instrument_id), 'origin': self.instance_id
+            })
+        return self.schedule(kind, str(instrument_id))
+
+    def schedule(self, kind: str, instrument_id: str) -> PurgeJob:
+        """Start (or return the running) purge of a soft-deleted instrument"""
+        key = (kind, instrument_id)
+        task = self._tasks.get(key)
+        if task is not None and not task.done():
+            return self.jobs[key]
+
+        job = PurgeJob(kind, instrument_id)
+        self.jobs[key] = job
+        self._tasks[key] = asyncio.create_task(asyncio.to_thread(self._purge, job))
+        return job
+
+    async def resume_pending(self) -> int:
+        """Restart purges of instruments soft-deleted before a restart"""
+        db_client = get_db_client()
+        resumed = 0
+        for kind, table in INSTRUMENT_TABLES.items():
+            rows = await asyncio.to_thread(
+                lambda: db_client.table(table).select('id').not_.is_('deleted_at', 'null').execute().data or []
+            )
+            for row in rows:
+                self.schedule(kind, str(row['id']))
+                resumed += 1
+        if resumed:
+            logger.info(f"Resumed {resumed} instrument purges")
+        return resumed
+
+    def _purge(self, job: PurgeJob):
+        """Delete history in throttled batches, then the instrument row"""
+        db_client = get_db_client()
+        job.status = 'running'
+        job.started_at = datetime.now(timezone.utc).isoformat()
+        try:
+            while True:
+                if self._stopping:
+                    job.status = 'interrupted'
+                    return
+                deleted = db_client.rpc('delete_price_rows', {
+                    'p_kind': job.kind,
+                    'p_before': 'infinity',
+                    'p_limit': self.batch_size,
+                    'p_instrument_id': job.instrument_id
+                }).execute().data or 0
+                if not deleted:
+                    break
+                job.rows_deleted += deleted
+                job.batches += 1
+                time.sleep(self.pause)
+
+            db_client.table(INSTRUMENT_TABLES[job.kind]).delete().eq('id', job.instrument_id).execute()
+            job.status = 'done'
+            logger.info(f"Purged {job.kind} {job.instrument_id}: {job.rows_deleted} rows in {job.batches} batches")
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            logger.error(f"Error purging {job.kind} {job.instrument_id}: {e}")
+        finally:
+            job.finished_at = datetime.now(timezone.utc).isoformat()
+
+    def progress(self) -> List[Dict]:
+        return [job.to_dict() for job in self.jobs.values()]
+
+    async def close(self):
+        """Stop running purges after their current batch; they resume under the next leader"""
+        self._stopping = True
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+
+# Shared instance used by the delete endpoints
+instrument_purger = InstrumentPurger()
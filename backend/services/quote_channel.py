@@ -0,0 +1,238 @@
+"""
+Quote Channel
+Fan-out of freshly collected quotes to every worker process
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+QuoteCallback = Callable[[Dict], Union[None, Awaitable[None]]]
+
+
+async def invoke_callback(callback: QuoteCallback, quote: Dict):
+    """Call a sync or async quote callback, logging instead of raising"""
+    try:
+        result = callback(quote)
+        if asyncio.iscoroutine(result):
+            await result
+    except Exception as e:
+        logger.error(f"Error in quote subscriber {callback}: {e}")
+
+
+class QuoteChannel:
+    """Base class for quote channels"""
+
+    async def publish(self, quote: Dict):
+        """Publish a quote to all subscribers"""
+        raise NotImplementedError
+
+    async def subscribe(self, callback: QuoteCallback):
+        """Register a callback invoked for every published quote"""
+        raise NotImplementedError
+
+    async def close(self):
+        """Release channel resources"""
+        pass
+
+
+class LocalQuoteChannel(QuoteChannel):
+    """In-process channel, suitable for a single process or for tests"""
+
+    def __init__(self):
+        self.subscribers: List[QuoteCallback] = []
+
+    async def publish(self, quote: Dict):
+        for callback in list(self.subscribers):
+            await invoke_callback(callback, quote)
+
+    async def subscribe(self, callback: QuoteCallback):
+        self.subscribers.append(callback)
+
+    async def close(self):
+        self.subscribers.clear()
+
+
+class RedisQuoteChannel(QuoteChannel):
+    """Redis pub/sub channel shared by every worker of a deployment"""
+
+    def __init__(self, redis_url: str, channel_name: str):
+        self.redis_url = redis_url
+        self.channel_name = channel_name
+        self.subscribers: List[QuoteCallback] = []
+        self._redis = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def _get_redis(self):
+        if self._redis is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url)
+        return self._redis
+
+    async def publish(self, quote: Dict):
+        try:
+            redis_client = await self._get_redis()
+            await redis_client.publish(self.channel_name, json.dumps(quote, default=str))
+        except Exception as e:
+            logger.error(f"Error publishing quote to {self.channel_name}: {e}")
+
+    async def subscribe(self, callback: QuoteCallback):
+        self.subscribers.append(callback)
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        """Read messages from Redis and dispatch them, reconnecting on failure"""
+        while True:
+            try:
+                redis_client = await self._get_redis()
+                self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                await self._pubsub.subscribe(self.channel_name)
+                async for message in self._pubsub.listen():
+                    if message.get('type') != 'message':
+                        continue
+                    quote = json.loads(message['data'])
+                    for callback in list(self.subscribers):
+                        await invoke_callback(callback, quote)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Quote channel listener error, reconnecting: {e}")
+                await asyncio.sleep(5)
+
+    async def close(self):
+        if self._listener:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+        self.subscribers.clear()
+
+
+class _DatagramQueue(asyncio.DatagramProtocol):
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+
+    def datagram_received(self, data: bytes, addr):
+        self.queue.put_nowait(data)
+
+
+class UnixSocketQuoteChannel(QuoteChannel):
+    """
+    Fan-out between the processes of one host: every subscribed process binds
+    a datagram socket in `directory` and publishers send each quote to all of
+    them (their own included). Sockets of dead processes are removed when a
+    send to them is refused.
+    """
+
+    PEER_REFRESH_SECONDS = 1.0
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self.subscribers: List[QuoteCallback] = []
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._sender: Optional[socket.socket] = None
+        self._peers: List[str] = []
+        self._peers_listed_at = 0.0
+
+    def _peer_paths(self) -> List[str]:
+        now = time.monotonic()
+        if now - self._peers_listed_at >= self.PEER_REFRESH_SECONDS:
+            try:
+                names = os.listdir(self.directory)
+            except FileNotFoundError:
+                names = []
+            self._peers = [os.path.join(self.directory, name) for name in names if name.endswith('.sock')]
+            self._peers_listed_at = now
+        return self._peers
+
+    async def publish(self, quote: Dict):
+        if self._sender is None:
+            self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sender.setblocking(False)
+        data = json.dumps(quote, default=str).encode()
+        for peer in list(self._peer_paths()):
+            try:
+                self._sender.sendto(data, peer)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The process behind this socket is gone
+                self._peers.remove(peer)
+                try:
+                    os.unlink(peer)
+                except OSError:
+                    pass
+            except BlockingIOError:
+                logger.warning(f"Quote channel peer {peer} is not keeping up, dropped a quote")
+            except OSError as e:
+                logger.error(f"Error publishing quote to {peer}: {e}")
+
+    async def subscribe(self, callback: QuoteCallback):
+        self.subscribers.append(callback)
+        if self._transport is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._queue = asyncio.Queue()
+            loop = asyncio.get_running_loop()
+            self._transport, _ = await loop.create_datagram_endpoint(
+                lambda: _DatagramQueue(self._queue), local_addr=self.path, family=socket.AF_UNIX
+            )
+            self._peers_listed_at = 0.0
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        """Dispatch received quotes in arrival order"""
+        while True:
+            data = await self._queue.get()
+            try:
+                quote = json.loads(data)
+            except ValueError as e:
+                logger.error(f"Ignoring malformed quote on {self.path}: {e}")
+                continue
+            for callback in list(self.subscribers):
+                await invoke_callback(callback, quote)
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+        if self._sender is not None:
+            self._sender.close()
+            self._sender = None
+        self.subscribers.clear()
+
+
+def create_quote_channel() -> QuoteChannel:
+    """Create the quote channel configured in settings"""
+    backend = settings.quote_channel_backend
+    if backend == "redis":
+        return RedisQuoteChannel(settings.redis_url, settings.quote_channel_name)
+    if backend == "unix" and hasattr(socket, "AF_UNIX"):
+        return UnixSocketQuoteChannel(settings.quote_channel_dir)
+    if backend == "unix":
+        logger.warning("Unix sockets are unavailable, quotes only reach the current process")
+    return LocalQuoteChannel()
@@ -0,0 +1,158 @@
+"""
+Quote Service
+Bulk latest-quote lookups for stocks and currencies
+
+Latest quotes are kept in memory (fed by the data collector) and backed by
+the `latest_quotes` table, which the collector upserts on every round. A
+bulk request for hundreds of instruments is answered from memory plus one
+query per `ID_BATCH_SIZE` misses.
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config.database import get_db_client
+from config.settings import settings
+from utils.helpers import timestamp_to_epoch
+
+logger = logging.getLogger(__name__)
+
+# Ids and symbols per query: keeps the `or` filter short enough for the request URL
+ID_BATCH_SIZE = 100
+
+LATEST_QUOTE_COLUMNS = (
+    'kind', 'instrument_id', 'symbol', 'timestamp', 'price',
+    'open', 'high', 'low', 'close', 'volume', 'rate', 'source_id'
+)
+
+
+def latest_quote_row(quote: Dict) -> Dict:
+    """Project a collector quote onto the latest_quotes columns"""
+    row = {column: quote.get(column) for column in LATEST_QUOTE_COLUMNS}
+    row['instrument_id'] = str(row['instrument_id'])
+    if quote.get('id') is not None:
+        row['source_id'] = str(quote['id'])
+    return row
+
+
+class LatestQuoteCache:
+    """Hot set of latest quotes keyed by (kind, instrument_id) and (kind, symbol)"""
+
+    def __init__(self, ttl: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else settings.quote_cache_ttl
+        self._by_id: Dict[Tuple[str, str], Tuple[float, Dict]] = {}
+        self._by_symbol: Dict[Tuple[str, str], str] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def put(self, row: Dict):
+        key = (row['kind'], str(row['instrument_id']))
+        current = self._by_id.get(key)
+        if current and timestamp_to_epoch(current[1]['timestamp']) > timestamp_to_epoch(row['timestamp']):
+            return
+        self._by_id[key] = (time.monotonic(), row)
+        self._by_symbol[(row['kind'], str(row['symbol']).upper())] = key[1]
+
+    def get(self, kind: str, instrument_id: str) -> Optional[Dict]:
+        entry = self._by_id.get((kind, str(instrument_id)))
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def get_by_symbol(self, kind: str, symbol: str) -> Optional[Dict]:
+        instrument_id = self._by_symbol.get((kind, symbol.upper()))
+        return self.get(kind, instrument_id) if instrument_id else None
+
+    def evict(self, kind: str, instrument_id: str):
+        entry = self._by_id.pop((kind, str(instrument_id)), None)
+        if entry:
+            self._by_symbol.pop((kind, str(entry[1]['symbol']).upper()), None)
+
+    def snapshot(self, kind: Optional[str] = None) -> List[Dict]:
+        """Every cached quote, regardless of age"""
+        return [row for (row_kind, _), (_, row) in self._by_id.items() if kind is None or row_kind == kind]
+
+
+class QuoteService:
+    """Latest quotes for many instruments in one call"""
+
+    def __init__(self, cache: Optional[LatestQuoteCache] = None):
+        self.cache = cache or LatestQuoteCache()
+
+    def cache_stats(self) -> Dict:
+        return {'quotes': len(self.cache)}
+
+    def evict(self, kind: str, instrument_id: str):
+        """Forget the cached quote of a deleted instrument"""
+        self.cache.evict(kind, instrument_id)
+
+    def on_quote(self, quote: Dict):
+        """Collector listener: keep the hot set current"""
+        self.cache.put(latest_quote_row(quote))
+
+    async def get_latest_quotes(
+        self,
+        kind: Optional[str] = None,
+        ids: Optional[List[str]] = None,
+        symbols: Optional[List[str]] = None
+    ) -> Dict:
+        """Latest quotes for the given instrument ids and/or symbols"""
+        kinds = [kind] if kind else ['stock', 'currency']
+        ids = [str(item) for item in ids or []]
+        symbols = [item.upper() for item in symbols or []]
+
+        found: Dict[Tuple[str, str], Dict] = {}
+        missing_ids, missing_symbols = [], []
+        for instrument_id in ids:
+            rows = [self.cache.get(k, instrument_id) for k in kinds]
+            hits = [row for row in rows if row]
+            if hits:
+                found.update({(row['kind'], row['instrument_id']): row for row in hits})
+            else:
+                missing_ids.append(instrument_id)
+        for symbol in symbols:
+            rows = [self.cache.get_by_symbol(k, symbol) for k in kinds]
+            hits = [row for row in rows if row]
+            if hits:
+                found.update({(row['kind'], row['instrument_id']): row for row in hits})
+            else:
+                missing_symbols.append(symbol)
+
+        if missing_ids or missing_symbols:
+            for row in self._fetch(kinds, missing_ids, missing_symbols):
+                self.cache.put(row)
+                found[(row['kind'], str(row['instrument_id']))] = row
+
+        returned_ids = {key[1] for key in found}
+        returned_symbols = {str(row['symbol']).upper() for row in found.values()}
+        return {
+            'quotes': list(found.values()),
+            'count': len(found),
+            'missing': [item for item in ids if item not in returned_ids]
+            + [item for item in symbols if item not in returned_symbols]
+        }
+
+    def _fetch(self, kinds: List[str], ids: List[str], symbols: List[str]) -> List[Dict]:
+        """Round trips to latest_quotes for everything not in memory, ID_BATCH_SIZE values each"""
+        def quoted(values):
+            return ','.join(f'"{value}"' for value in values)
+
+        values = [('instrument_id', item) for item in ids] + [('symbol', item) for item in symbols]
+        db_client = get_db_client()
+        rows = []
+        for start in range(0, len(values), ID_BATCH_SIZE):
+            batch = values[start:start + ID_BATCH_SIZE]
+            filters = []
+            for column in ('instrument_id', 'symbol'):
+                matching = [value for batch_column, value in batch if batch_column == column]
+                if matching:
+                    filters.append(f"{column}.in.({quoted(matching)})")
+            query = db_client.table('latest_quotes').select('*').in_('kind', kinds).or_(','.join(filters))
+            rows.extend(query.execute().data or [])
+        return rows
+
+
+# Shared instance fed by the data collector
+quote_service = QuoteService()
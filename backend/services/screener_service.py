@@ -0,0 +1,291 @@
+"""
+Screener Service
+Columnar in-memory snapshot of every stock, screened with vectorized masks
+
+The snapshot keeps one numpy column per field (latest bar from
+`latest_quotes`, catalog fields from `stocks`, derived metrics). Collector
+ticks update a single row in place, and the catalog is re-read every
+`screener_rebuild_seconds`. A screen such as
+
+    sector == "Banka" and change_percent > 2 and volume > 10e6
+
+is parsed once with `ast` (a small whitelisted grammar, never eval'd) and
+evaluated as boolean masks over whole columns.
+"""
+
+import ast
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.database import fetch_all, get_db_client
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+TEXT_FIELDS = ('id', 'symbol', 'name', 'sector')
+BAR_FIELDS = ('price', 'open', 'high', 'low', 'volume')
+DERIVED_FIELDS = ('change', 'change_percent', 'turnover', 'range_percent', 'range_position')
+NUMERIC_FIELDS = BAR_FIELDS + ('market_cap',) + DERIVED_FIELDS
+FIELDS = TEXT_FIELDS + NUMERIC_FIELDS + ('timestamp',)
+
+_COMPARISONS = {
+    ast.Eq: np.equal, ast.NotEq: np.not_equal,
+    ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal
+}
+_ARITHMETIC = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+
+
+def parse_screen(expression: str) -> ast.AST:
+    """Parse a screen expression, rejecting anything outside the grammar"""
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Invalid screen expression: {e.msg}")
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id not in FIELDS:
+            raise ValueError(f"Unknown field: {node.id}")
+        if not isinstance(node, (
+            ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub,
+            ast.Compare, ast.In, ast.NotIn, ast.BinOp, ast.Name, ast.Load, ast.Constant,
+            ast.List, ast.Tuple, *_COMPARISONS, *_ARITHMETIC
+        )):
+            raise ValueError(f"Unsupported syntax in screen expression: {type(node).__name__}")
+    return tree
+
+
+def evaluate_screen(node: ast.AST, columns: Dict[str, np.ndarray]):
+    """Evaluate a parsed expression to a column (boolean mask for conditions) or scalar"""
+    if isinstance(node, ast.Expression):
+        return evaluate_screen(node.body, columns)
+    if isinstance(node, ast.Name):
+        return columns[node.id]
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [evaluate_screen(item, columns) for item in node.elts]
+    if isinstance(node, ast.BoolOp):
+        masks = [np.asarray(evaluate_screen(value, columns), dtype=bool) for value in node.values]
+        return np.logical_and.reduce(masks) if isinstance(node.op, ast.And) else np.logical_or.reduce(masks)
+    if isinstance(node, ast.UnaryOp):
+        operand = evaluate_screen(node.operand, columns)
+        return ~np.asarray(operand, dtype=bool) if isinstance(node.op, ast.Not) else np.negative(operand)
+    if isinstance(node, ast.BinOp):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return _ARITHMETIC[type(node.op)](evaluate_screen(node.left, columns), evaluate_screen(node.right, columns))
+    if isinstance(node, ast.Compare):
+        mask = None
+        left = evaluate_screen(node.left, columns)
+        for op, comparator in zip(node.ops, node.comparators):
+            right = evaluate_screen(comparator, columns)
+            if isinstance(op, (ast.In, ast.NotIn)):
+                result = np.isin(left, np.asarray(right, dtype=object))
+                result = ~result if isinstance(op, ast.NotIn) else result
+            else:
+                with np.errstate(invalid='ignore'):
+                    result = _COMPARISONS[type(op)](left, right)
+            mask = result if mask is None else mask & result
+            left = right
+        return np.asarray(mask, dtype=bool)
+    raise ValueError(f"Unsupported syntax in screen expression: {type(node).__name__}")
+
+
+def parse_sort(sort: Optional[str]) -> List[Tuple[str, bool]]:
+    """'-change_percent,symbol' -> [('change_percent', True), ('symbol', False)]"""
+    keys = []
+    for item in (sort or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        descending = item.startswith('-')
+        field = item.lstrip('-+')
+        if field not in FIELDS:
+            raise ValueError(f"Unknown sort field: {field}")
+        keys.append((field, descending))
+    return keys
+
+
+def fetch_stock_universe() -> Tuple[List[Dict], List[Dict]]:
+    """Every live stock's catalog row and its latest_quotes row"""
+    db_client = get_db_client()
+    stocks = fetch_all(
+        lambda: db_client.table('stocks').select('id,symbol,name,sector,market_cap')
+        .is_('deleted_at', 'null').order('id')
+    )
+    quotes = fetch_all(
+        lambda: db_client.table('latest_quotes').select('*').eq('kind', 'stock').order('instrument_id')
+    )
+    return stocks, quotes
+
+
+class StockScreener:
+    """Columnar snapshot of every live stock"""
+
+    def __init__(self):
+        self.columns: Dict[str, np.ndarray] = {}
+        self.rows: Dict[str, int] = {}
+        self.built_at: Optional[float] = None
+        self.updated_at: Optional[str] = None
+        self.stale = True
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def cache_stats(self) -> Dict:
+        return {
+            'stocks': len(self.rows),
+            'age_seconds': round(time.time() - self.built_at) if self.built_at else None,
+            'updated_at': self.updated_at
+        }
+
+    def load(self, stocks: List[Dict], quotes: List[Dict]):
+        """Build the columns from catalog rows and latest_quotes rows"""
+        by_id = {str(quote['instrument_id']): quote for quote in quotes}
+        count = len(stocks)
+        columns = {field: np.empty(count, dtype=object) for field in TEXT_FIELDS + ('timestamp',)}
+        columns.update({field: np.full(count, np.nan) for field in NUMERIC_FIELDS})
+        columns['live'] = np.ones(count, dtype=bool)
+
+        for row, stock in enumerate(stocks):
+            for field in TEXT_FIELDS:
+                columns[field][row] = str(stock[field]) if stock.get(field) is not None else None
+            if stock.get('market_cap') is not None:
+                columns['market_cap'][row] = float(stock['market_cap'])
+            quote = by_id.get(str(stock['id']))
+            if quote:
+                self._set_bar(columns, row, quote)
+
+        self.columns = columns
+        self.rows = {stock_id: row for row, stock_id in enumerate(columns['id'])}
+        self._derive(slice(None))
+        self.built_at = time.time()
+        self.updated_at = datetime.now(timezone.utc).isoformat()
+        self.stale = False
+
+    @staticmethod
+    def _set_bar(columns: Dict[str, np.ndarray], row: int, quote: Dict):
+        columns['price'][row] = float(quote.get('close') if quote.get('close') is not None else quote['price'])
+        for field in ('open', 'high', 'low', 'volume'):
+            value = quote.get(field)
+            columns[field][row] = float(value) if value is not None else np.nan
+        columns['timestamp'][row] = str(quote['timestamp'])
+
+    def _derive(self, rows):
+        """Recompute derived metrics for a row or slice; change is against the session open"""
+        c = self.columns
+        with np.errstate(divide='ignore', invalid='ignore'):
+            c['change'][rows] = c['price'][rows] - c['open'][rows]
+            c['change_percent'][rows] = c['change'][rows] / c['open'][rows] * 100
+            c['turnover'][rows] = c['price'][rows] * c['volume'][rows]
+            c['range_percent'][rows] = (c['high'][rows] - c['low'][rows]) / c['low'][rows] * 100
+            c['range_position'][rows] = (c['price'][rows] - c['low'][rows]) / (c['high'][rows] - c['low'][rows])
+
+    def on_quote(self, quote: Dict):
+        """Collector listener: update one row in place"""
+        if quote.get('kind') != 'stock' or self.built_at is None:
+            return
+        row = self.rows.get(str(quote.get('instrument_id')))
+        if row is None:
+            self.stale = True
+            return
+        self._set_bar(self.columns, row, quote)
+        self._derive(row)
+        self.updated_at = datetime.now(timezone.utc).isoformat()
+
+    def invalidate(self, kind: str, instrument_id: str):
+        """Hide a deleted stock until the next rebuild drops it"""
+        row = self.rows.get(str(instrument_id)) if kind == 'stock' else None
+        if row is not None:
+            self.columns['live'][row] = False
+
+    def screen(
+        self,
+        where: Optional[str] = None,
+        sort: Optional[str] = None,
+        limit: int = 50,
+        fields: Optional[List[str]] = None
+    ) -> Dict:
+        """Rows matching `where`, ordered by `sort`, projected on `fields`"""
+        started = time.perf_counter()
+        fields = fields or list(FIELDS)
+        unknown = [field for field in fields if field not in FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        sort_keys = parse_sort(sort)
+
+        mask = self.columns['live'].copy()
+        if where:
+            try:
+                result = evaluate_screen(parse_screen(where), self.columns)
+            except TypeError:
+                raise ValueError("Screen expression compares text with numbers")
+            if np.ndim(result) == 0 or np.asarray(result).dtype != bool:
+                raise ValueError("Screen expression must be a condition on fields")
+            mask &= result
+        selected = np.flatnonzero(mask)
+
+        if sort_keys:
+            # np.lexsort sorts by the last key first; missing values go last either way
+            order_keys = []
+            for field, descending in reversed(sort_keys):
+                values = self.columns[field][selected]
+                if field in NUMERIC_FIELDS:
+                    keys = -values if descending else values
+                    order_keys.append(np.where(np.isnan(keys), np.inf, keys))
+                else:
+                    ranks = np.unique(values.astype(str), return_inverse=True)[1]
+                    order_keys.append(-ranks if descending else ranks)
+            selected = selected[np.lexsort(order_keys)]
+
+        page = selected[:limit]
+        values = {field: self.columns[field][page].tolist() for field in fields}
+        results = [
+            {field: _json_value(values[field][index]) for field in fields}
+            for index in range(len(page))
+        ]
+        return {
+            'count': int(len(selected)),
+            'results': results,
+            'as_of': self.updated_at,
+            'elapsed_us': round((time.perf_counter() - started) * 1e6, 1)
+        }
+
+
+def _json_value(value):
+    return None if isinstance(value, float) and value != value else value
+
+
+class ScreenerService:
+    """Keeps the stock snapshot loaded and periodically rebuilt from the catalog"""
+
+    def __init__(self, screener: Optional[StockScreener] = None):
+        self.screener = screener or StockScreener()
+
+    def cache_stats(self) -> Dict:
+        return self.screener.cache_stats()
+
+    def on_quote(self, quote: Dict):
+        self.screener.on_quote(quote)
+
+    def invalidate(self, kind: str, instrument_id: str):
+        self.screener.invalidate(kind, instrument_id)
+
+    async def screen(self, **kwargs) -> Dict:
+        await self.ensure_fresh()
+        return self.screener.screen(**kwargs)
+
+    async def ensure_fresh(self):
+        built_at = self.screener.built_at
+        if self.screener.stale or built_at is None or time.time() - built_at > settings.screener_rebuild_seconds:
+            self.rebuild()
+
+    def rebuild(self):
+        self.screener.load(*fetch_stock_universe())
+        logger.info(f"Screener snapshot built with {len(self.screener)} stocks")
+
+
+# Shared instance fed by the data collector
+screener_service = ScreenerService()
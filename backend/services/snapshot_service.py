@@ -0,0 +1,234 @@
+"""
+Snapshot Service
+Partitioned Parquet snapshots of the price history, and bulk import of them
+
+Layout under the snapshot root (hive-style partitions):
+
+    instruments/kind=stock.parquet
+    prices/kind=stock/instrument_id=<id>/month=YYYY-MM/data.parquet
+    _manifest.json
+
+The manifest records the row count and newest timestamp of every exported
+partition. An export compares it with `price_partition_stats` and rewrites
+only the partitions that differ, saving the manifest every
+`MANIFEST_SAVE_PARTITIONS` partitions or `MANIFEST_SAVE_SECONDS` seconds so
+an interrupted run resumes close to where it stopped.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config.database import fetch_all, get_db_client, iter_pages
+from utils.helpers import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+# instrument table, price table, price foreign key
+SNAPSHOT_SOURCES = {
+    'stock': ('stocks', 'stock_prices', 'stock_id'),
+    'currency': ('currencies', 'currency_rates', 'currency_id')
+}
+TIMESTAMP_COLUMNS = ('timestamp', 'created_at', 'updated_at')
+MANIFEST_FILE = '_manifest.json'
+# Checkpoints of a running export; at most this much work is redone after an interruption
+MANIFEST_SAVE_PARTITIONS = 100
+MANIFEST_SAVE_SECONDS = 10
+
+
+def month_bounds(month: str) -> Tuple[datetime, datetime]:
+    """UTC start of a YYYY-MM month and of the month after"""
+    year, number = (int(part) for part in month.split('-'))
+    start = datetime(year, number, 1, tzinfo=timezone.utc)
+    end = datetime(year + number // 12, number % 12 + 1, 1, tzinfo=timezone.utc)
+    return start, end
+
+
+def rows_to_table(rows: List[Dict]) -> pa.Table:
+    """Storage rows to an Arrow table with real timestamp columns"""
+    columns = {}
+    for name in rows[0].keys() if rows else []:
+        values = [row.get(name) for row in rows]
+        if name in TIMESTAMP_COLUMNS:
+            parsed = [parse_timestamp(value) if value is not None else None for value in values]
+            values = [
+                value.replace(tzinfo=timezone.utc) if value is not None and value.tzinfo is None else value
+                for value in parsed
+            ]
+            columns[name] = pa.array(values, type=pa.timestamp('us', tz='UTC'))
+        else:
+            columns[name] = pa.array(values)
+    return pa.table(columns)
+
+
+def table_rows(batch: pa.RecordBatch) -> List[Dict]:
+    """Arrow rows back to storage rows (ISO timestamps)"""
+    rows = batch.to_pylist()
+    for row in rows:
+        for name in TIMESTAMP_COLUMNS:
+            if isinstance(row.get(name), datetime):
+                row[name] = row[name].isoformat()
+    return rows
+
+
+def _write_atomic(table: pa.Table, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.tmp"
+    pq.write_table(table, temporary, compression='zstd')
+    os.replace(temporary, path)
+
+
+class ParquetSnapshot:
+    """Incremental Parquet export of the price history, and its bulk import"""
+
+    def __init__(self, root: str, db_client=None):
+        self.root = root
+        self.db_client = db_client
+        self.manifest_path = os.path.join(root, MANIFEST_FILE)
+
+    def _client(self):
+        return self.db_client or get_db_client()
+
+    def partition_path(self, kind: str, instrument_id: str, month: str) -> str:
+        return os.path.join(
+            self.root, 'prices', f'kind={kind}', f'instrument_id={instrument_id}', f'month={month}', 'data.parquet'
+        )
+
+    def instruments_path(self, kind: str) -> str:
+        return os.path.join(self.root, 'instruments', f'kind={kind}.parquet')
+
+    def load_manifest(self) -> Dict:
+        if not os.path.exists(self.manifest_path):
+            return {'partitions': {}}
+        with open(self.manifest_path) as handle:
+            return json.load(handle)
+
+    def _save_manifest(self, manifest: Dict):
+        os.makedirs(self.root, exist_ok=True)
+        temporary = f"{self.manifest_path}.tmp"
+        with open(temporary, 'w') as handle:
+            json.dump(manifest, handle, indent=1, sort_keys=True)
+        os.replace(temporary, self.manifest_path)
+
+    def partition_stats(self, kind: str) -> Dict[str, Dict]:
+        """Current {partition key: {rows, max_timestamp}} in storage"""
+        db_client = self._client()
+        rows = fetch_all(lambda: db_client.rpc('price_partition_stats', {'p_kind': kind}))
+        return {
+            f"{kind}/{row['instrument_id']}/{row['month']}": {
+                'rows': row['row_count'],
+                'max_timestamp': row['max_timestamp']
+            }
+            for row in rows
+        }
+
+    def export(self, kinds: Iterable[str] = ('stock', 'currency'), full: bool = False) -> Dict[str, int]:
+        """Write changed partitions (all with `full`) and drop vanished ones"""
+        manifest = {'partitions': {}} if full else self.load_manifest()
+        summary = {'written': 0, 'unchanged': 0, 'removed': 0, 'rows': 0}
+        db_client = self._client()
+        unsaved, saved_at = 0, time.monotonic()
+
+        for kind in kinds:
+            instrument_table, price_table, foreign_key = SNAPSHOT_SOURCES[kind]
+            instruments = fetch_all(lambda: db_client.table(instrument_table).select('*').is_('deleted_at', 'null').order('id'))
+            if instruments:
+                _write_atomic(rows_to_table(instruments), self.instruments_path(kind))
+
+            stats = self.partition_stats(kind)
+            for key, current in stats.items():
+                if manifest['partitions'].get(key) == current:
+                    summary['unchanged'] += 1
+                    continue
+
+                _, instrument_id, month = key.split('/')
+                start, end = month_bounds(month)
+                rows = [
+                    row
+                    for page in iter_pages(
+                        lambda: db_client.table(price_table)
+                        .select('*')
+                        .eq(foreign_key, instrument_id)
+                        .gte('timestamp', start.isoformat())
+                        .lt('timestamp', end.isoformat())
+                        .order('timestamp', desc=False)
+                    )
+                    for row in page
+                ]
+                if rows:
+                    _write_atomic(rows_to_table(rows), self.partition_path(kind, instrument_id, month))
+                manifest['partitions'][key] = current
+                unsaved += 1
+                if unsaved >= MANIFEST_SAVE_PARTITIONS or time.monotonic() - saved_at >= MANIFEST_SAVE_SECONDS:
+                    self._save_manifest(manifest)
+                    unsaved, saved_at = 0, time.monotonic()
+                summary['written'] += 1
+                summary['rows'] += len(rows)
+
+            vanished = [key for key in manifest['partitions'] if key.startswith(f"{kind}/") and key not in stats]
+            for key in vanished:
+                shutil.rmtree(os.path.dirname(self.partition_path(kind, *key.split('/')[1:])), ignore_errors=True)
+                del manifest['partitions'][key]
+                summary['removed'] += 1
+
+        manifest['exported_at'] = datetime.now(timezone.utc).isoformat()
+        self._save_manifest(manifest)
+        logger.info(f"Parquet snapshot export: {summary}")
+        return summary
+
+    def partition_files(self, kind: str) -> List[str]:
+        base = os.path.join(self.root, 'prices', f'kind={kind}')
+        return sorted(
+            os.path.join(directory, name)
+            for directory, _, names in os.walk(base)
+            for name in names if name.endswith('.parquet')
+        )
+
+    def import_into(
+        self,
+        db_client=None,
+        kinds: Iterable[str] = ('stock', 'currency'),
+        batch_size: int = 5000,
+        workers: int = 4
+    ) -> Dict[str, int]:
+        """
+        Upsert a snapshot into a storage backend (any client with the
+        table().upsert() interface), instruments first, then prices in
+        large batches written by a pool of workers. Re-running is safe:
+        rows are upserted by id.
+        """
+        db_client = db_client or self._client()
+        summary = {'instruments': 0, 'rows': 0, 'files': 0}
+
+        def upsert(table: str, rows: List[Dict]) -> int:
+            db_client.table(table).upsert(rows, on_conflict='id').execute()
+            return len(rows)
+
+        for kind in kinds:
+            instrument_table, price_table, _ = SNAPSHOT_SOURCES[kind]
+            if os.path.exists(self.instruments_path(kind)):
+                for batch in pq.read_table(self.instruments_path(kind)).to_batches(batch_size):
+                    summary['instruments'] += upsert(instrument_table, table_rows(batch))
+
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                pending = set()
+                for path in self.partition_files(kind):
+                    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+                        # Bound in-flight batches so memory stays flat
+                        if len(pending) >= workers * 2:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            summary['rows'] += sum(future.result() for future in done)
+                        pending.add(pool.submit(upsert, price_table, table_rows(batch)))
+                    summary['files'] += 1
+                summary['rows'] += sum(future.result() for future in wait(pending).done)
+
+        logger.info(f"Parquet snapshot import: {summary}")
+        return summary
@@ -3,20 +3,32 @@ Stock Service
 Business logic for stock-related operations
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 import logging
 from config.database import get_db_client
 from schemas.stock import Stock, StockCreate, StockUpdate, StockPrice
 from services.data_collector import DataCollectorService
+from services.price_history import fetch_history
+from services.price_windows import attach_prices
+from services.purge_service import instrument_purger
+from services.quote_service import quote_service
 
 logger = logging.getLogger(__name__)
 
 class StockService:
     """Service for stock-related business logic"""
     
-    def __init__(self):
-        self.data_collector = DataCollectorService()
+    def __init__(self, db_client=None):
+        self.db_client = db_client
+        self._data_collector: Optional[DataCollectorService] = None
+    
+    @property
+    def data_collector(self) -> DataCollectorService:
+        """Collector for on-demand refreshes, built only when one is requested"""
+        if self._data_collector is None:
+            self._data_collector = DataCollectorService()
+        return self._data_collector
         
     async def get_stocks(
         self, 
@@ -30,7 +42,7 @@ class StockService:
             db_client = get_db_client()
             
             # Build query
-            query = db_client.table('stocks').select('*')
+            query = db_client.table('stocks').select('*').is_('deleted_at', 'null')
             
             # Apply filters
             if search:
@@ -46,7 +58,7 @@ class StockService:
             response = query.execute()
             
             # Get total count for pagination
-            count_query = db_client.table('stocks').select('*', count='exact')
+            count_query = db_client.table('stocks').select('*', count='exact').is_('deleted_at', 'null')
             if search:
                 count_query = count_query.ilike('name', f'%{search}%')
             if sector:
@@ -65,12 +77,52 @@ class StockService:
             logger.error(f"Error getting stocks: {e}")
             raise
             
+    async def list_stocks(
+        self,
+        page: int = 1,
+        size: int = 20,
+        sector: Optional[str] = None,
+        search_query: Optional[str] = None,
+        history_points: int = 0
+    ) -> Tuple[List[Dict], int]:
+        """Page of stocks with latest price and optional short history.
+        
+        Uses a constant number of round trips whatever the page size: one
+        for the page and its total, one for prices (history window RPC, or
+        the latest-quote lookup when no history is requested).
+        """
+        try:
+            db_client = self.db_client or get_db_client()
+            
+            query = db_client.table('stocks').select('*', count='exact').is_('deleted_at', 'null')
+            if search_query:
+                query = query.or_(f'name.ilike.%{search_query}%,symbol.ilike.%{search_query}%')
+            if sector:
+                query = query.eq('sector', sector)
+            
+            skip = (page - 1) * size
+            response = query.order('symbol').range(skip, skip + size - 1).execute()
+            stocks = response.data or []
+            
+            latest_quotes = {}
+            if stocks and not history_points:
+                quotes = await quote_service.get_latest_quotes(
+                    kind='stock', ids=[str(stock['id']) for stock in stocks]
+                )
+                latest_quotes = {quote['instrument_id']: quote for quote in quotes['quotes']}
+            
+            return attach_prices('stock', stocks, history_points, latest_quotes), response.count or 0
+            
+        except Exception as e:
+            logger.error(f"Error listing stocks: {e}")
+            raise
+            
     async def get_stock_by_id(self, stock_id: int) -> Optional[Stock]:
         """Get stock by ID"""
         try:
             db_client = get_db_client()
             
-            response = db_client.table('stocks').select('*').eq('id', stock_id).execute()
+            response = db_client.table('stocks').select('*').eq('id', stock_id).is_('deleted_at', 'null').execute()
             
             if response.data:
                 return Stock(**response.data[0])
@@ -111,6 +163,21 @@ class StockService:
             logger.error(f"Error fetching price history for stock {stock_id}: {e}")
             raise
             
+    async def get_price_history_with_interval(
+        self,
+        stock_id: str,
+        start_date: datetime,
+        end_date: datetime,
+        interval: str = '1d'
+    ) -> Dict[str, Any]:
+        """OHLCV bars for a date range as column arrays (see services.price_history)"""
+        try:
+            return fetch_history('stock', stock_id, start_date, end_date, interval)
+            
+        except Exception as e:
+            logger.error(f"Error fetching {interval} price history for stock {stock_id}: {e}")
+            raise
+            
     async def get_latest_price(self, stock_id: str) -> Optional[Dict]:
         """Get latest price for a stock"""
         try:
@@ -136,6 +203,7 @@ class StockService:
             
             response = await db_client.table('stocks')\
                 .select('sector')\
+                .is_('deleted_at', 'null')\
                 .execute()
                 
             if not response.data:
@@ -184,18 +252,11 @@ class StockService:
             logger.error(f"Error updating stock {stock_id}: {e}")
             raise
             
-    async def delete_stock(self, stock_id: str) -> bool:
-        """Delete a stock"""
+    async def delete_stock(self, stock_id: str) -> Optional[Dict]:
+        """Soft delete a stock; its price history is purged in the background"""
         try:
-            db_client = get_db_client()
-            
-            # Delete related price data first
-            await db_client.table('stock_prices').delete().eq('stock_id', stock_id).execute()
-            
-            # Delete stock
-            response = await db_client.table('stocks').delete().eq('id', stock_id).execute()
-            
-            return True
+            job = await instrument_purger.soft_delete('stock', stock_id)
+            return job.to_dict() if job else None
             
         except Exception as e:
             logger.error(f"Error deleting stock {stock_id}: {e}")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Parquet snapshot CLI for TRIZ Trade Backend
+
+    python snapshot.py export ./snapshots            # only changed partitions
+    python snapshot.py export ./snapshots --full     # rewrite everything
+    python snapshot.py import ./snapshots            # into the configured Supabase
+    python snapshot.py import ./snapshots --url URL --key KEY
+
+Run `export` from cron (or any scheduler) to keep a snapshot current.
+"""
+
+import argparse
+import json
+import logging
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from services.snapshot_service import ParquetSnapshot
+
+KINDS = {"all": ("stock", "currency"), "stock": ("stock",), "currency": ("currency",)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    export = commands.add_parser("export", help="Write changed partitions to a snapshot")
+    export.add_argument("root", help="Snapshot directory")
+    export.add_argument("--kind", choices=KINDS, default="all")
+    export.add_argument("--full", action="store_true", help="Ignore the manifest and rewrite every partition")
+    
+    load = commands.add_parser("import", help="Load a snapshot into a storage backend")
+    load.add_argument("root", help="Snapshot directory")
+    load.add_argument("--kind", choices=KINDS, default="all")
+    load.add_argument("--url", help="Target Supabase URL (default: SUPABASE_URL)")
+    load.add_argument("--key", help="Target Supabase key (default: SUPABASE_SERVICE_ROLE_KEY)")
+    load.add_argument("--batch-size", type=int, default=5000)
+    load.add_argument("--workers", type=int, default=4)
+    
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    snapshot = ParquetSnapshot(args.root)
+    
+    if args.command == "export":
+        summary = snapshot.export(kinds=KINDS[args.kind], full=args.full)
+    else:
+        from supabase import create_client
+        from config.settings import settings
+        
+        target = create_client(
+            args.url or settings.supabase_url,
+            args.key or settings.supabase_service_role_key or settings.supabase_key
+        )
+        summary = snapshot.import_into(
+            target, kinds=KINDS[args.kind], batch_size=args.batch_size, workers=args.workers
+        )
+    
+    print(json.dumps(summary))
+
+if __name__ == "__main__":
+    main()
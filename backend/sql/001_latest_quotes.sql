@@ -0,0 +1,37 @@
+-- Latest quote per instrument, maintained by the data collector.
+-- Serves bulk latest-quote lookups in a single query.
+
+create table if not exists latest_quotes (
+    kind text not null check (kind in ('stock', 'currency')),
+    instrument_id text not null,
+    symbol text not null,
+    timestamp timestamptz not null,
+    price double precision not null,
+    open double precision,
+    high double precision,
+    low double precision,
+    close double precision,
+    volume bigint,
+    rate double precision,
+    updated_at timestamptz not null default now(),
+    primary key (kind, instrument_id)
+);
+
+create index if not exists latest_quotes_symbol_idx on latest_quotes (kind, symbol);
+
+-- Backfill from existing history
+insert into latest_quotes (kind, instrument_id, symbol, timestamp, price, open, high, low, close, volume)
+select distinct on (p.stock_id)
+    'stock', p.stock_id::text, s.symbol, p.timestamp, p.close, p.open, p.high, p.low, p.close, p.volume
+from stock_prices p
+join stocks s on s.id = p.stock_id
+order by p.stock_id, p.timestamp desc
+on conflict (kind, instrument_id) do nothing;
+
+insert into latest_quotes (kind, instrument_id, symbol, timestamp, price, high, low, rate)
+select distinct on (r.currency_id)
+    'currency', r.currency_id::text, c.symbol, r.timestamp, r.rate, r.high, r.low, r.rate
+from currency_rates r
+join currencies c on c.id = r.currency_id
+order by r.currency_id, r.timestamp desc
+on conflict (kind, instrument_id) do nothing;
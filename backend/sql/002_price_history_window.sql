@@ -0,0 +1,50 @@
+-- Last N bars for many instruments in one call, used by list endpoints
+-- to embed a short price history without a query per row.
+
+create index if not exists stock_prices_stock_id_timestamp_idx
+    on stock_prices (stock_id, timestamp desc);
+create index if not exists currency_rates_currency_id_timestamp_idx
+    on currency_rates (currency_id, timestamp desc);
+
+-- Id of the history row a latest quote was taken from
+alter table latest_quotes add column if not exists source_id text;
+
+create or replace function price_history_window(p_kind text, p_ids text[], p_points int)
+returns table (
+    id text,
+    instrument_id text,
+    "timestamp" timestamptz,
+    open double precision,
+    high double precision,
+    low double precision,
+    close double precision,
+    volume bigint
+)
+language sql stable
+as $$
+    select w.id, w.instrument_id, w."timestamp", w.open, w.high, w.low, w.close, w.volume
+    from (
+        select p.id::text, s.id::text as instrument_id, p."timestamp",
+               p.open, p.high, p.low, p.close, p.volume
+        from stocks s
+        cross join lateral (
+            select * from stock_prices sp
+            where sp.stock_id = s.id
+            order by sp."timestamp" desc
+            limit p_points
+        ) p
+        where p_kind = 'stock' and s.id::text = any(p_ids)
+        union all
+        select r.id::text, c.id::text, r."timestamp",
+               null, r.high, r.low, r.rate, null
+        from currencies c
+        cross join lateral (
+            select * from currency_rates cr
+            where cr.currency_id = c.id
+            order by cr."timestamp" desc
+            limit p_points
+        ) r
+        where p_kind = 'currency' and c.id::text = any(p_ids)
+    ) w
+    order by w.instrument_id, w."timestamp";
+$$;
@@ -0,0 +1,25 @@
+-- Row count and newest timestamp per (instrument, month), used by the
+-- Parquet snapshot job to export only partitions that changed.
+
+create or replace function price_partition_stats(p_kind text)
+returns table (
+    instrument_id text,
+    month text,
+    row_count bigint,
+    max_timestamp timestamptz
+)
+language sql stable
+as $$
+    select sp.stock_id::text, to_char(sp."timestamp" at time zone 'UTC', 'YYYY-MM'),
+           count(*), max(sp."timestamp")
+    from stock_prices sp
+    where p_kind = 'stock'
+    group by 1, 2
+    union all
+    select cr.currency_id::text, to_char(cr."timestamp" at time zone 'UTC', 'YYYY-MM'),
+           count(*), max(cr."timestamp")
+    from currency_rates cr
+    where p_kind = 'currency'
+    group by 1, 2
+    order by 1, 2;
+$$;
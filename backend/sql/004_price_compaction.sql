@@ -0,0 +1,160 @@
+-- Retention compaction: merge the rows of each (instrument, bucket) in a
+-- time range into one bar at the bucket start, and delete expired rows.
+-- Each call handles one slice of about p_batch rows / at most p_limit rows
+-- in a single transaction, so the job can be interrupted and re-run at any
+-- point.
+
+create index if not exists stock_prices_timestamp_idx on stock_prices ("timestamp");
+create index if not exists currency_rates_timestamp_idx on currency_rates ("timestamp");
+
+-- Compacts the oldest slice of [p_from, p_to): the first p_batch rows by
+-- timestamp, cut back to whole buckets (but at least one bucket). Returns
+-- where the slice ended as next_from, so the caller walks the window with a
+-- cursor and every row is read once; next_from is null when no rows are left.
+drop function if exists compact_price_bars(text, int, timestamptz, timestamptz, int);
+create or replace function compact_price_bars(
+    p_kind text,
+    p_step int,                -- bucket width in seconds
+    p_from timestamptz,        -- inclusive ('-infinity' for no lower bound), on a bucket boundary
+    p_to timestamptz,          -- exclusive, on a bucket boundary
+    p_batch int                -- rows per slice
+)
+returns table (buckets bigint, rows_deleted bigint, next_from timestamptz)
+language plpgsql
+as $$
+declare
+    v_first timestamptz;
+    v_last timestamptz;
+    v_scanned bigint;
+    v_until timestamptz;
+begin
+    if p_kind = 'stock' then
+        select min(s."timestamp"), max(s."timestamp"), count(*) into v_first, v_last, v_scanned
+        from (
+            select "timestamp" from stock_prices
+            where "timestamp" >= p_from and "timestamp" < p_to
+            order by "timestamp"
+            limit p_batch
+        ) s;
+    else
+        select min(s."timestamp"), max(s."timestamp"), count(*) into v_first, v_last, v_scanned
+        from (
+            select "timestamp" from currency_rates
+            where "timestamp" >= p_from and "timestamp" < p_to
+            order by "timestamp"
+            limit p_batch
+        ) s;
+    end if;
+
+    if v_scanned = 0 then
+        return query select 0::bigint, 0::bigint, null::timestamptz;
+        return;
+    end if;
+    if v_scanned < p_batch then
+        v_until := p_to;
+    else
+        -- The slice may end inside a bucket: stop at that bucket's start
+        v_until := least(p_to, greatest(
+            to_timestamp(floor(extract(epoch from v_last) / p_step) * p_step),
+            to_timestamp(floor(extract(epoch from v_first) / p_step) * p_step) + make_interval(secs => p_step)
+        ));
+    end if;
+
+    if p_kind = 'stock' then
+        return query
+        with targets as (
+            select stock_id, to_timestamp(floor(extract(epoch from "timestamp") / p_step) * p_step) as bucket
+            from stock_prices
+            where "timestamp" >= p_from and "timestamp" < v_until
+            group by 1, 2
+            having count(*) > 1
+        ), doomed as (
+            delete from stock_prices sp
+            using targets t
+            where sp.stock_id = t.stock_id
+              and sp."timestamp" >= t.bucket
+              and sp."timestamp" < t.bucket + make_interval(secs => p_step)
+              and sp."timestamp" >= p_from and sp."timestamp" < v_until
+            returning sp.stock_id, t.bucket, sp."timestamp", sp.open, sp.high, sp.low, sp.close, sp.volume
+        ), merged as (
+            insert into stock_prices (stock_id, "timestamp", open, high, low, close, volume)
+            select d.stock_id, d.bucket,
+                   (array_agg(d.open order by d."timestamp"))[1],
+                   max(d.high), min(d.low),
+                   (array_agg(d.close order by d."timestamp" desc))[1],
+                   sum(d.volume)
+            from doomed d
+            group by d.stock_id, d.bucket
+            returning 1
+        )
+        select (select count(*) from merged), (select count(*) from doomed), v_until;
+    else
+        return query
+        with targets as (
+            select currency_id, to_timestamp(floor(extract(epoch from "timestamp") / p_step) * p_step) as bucket
+            from currency_rates
+            where "timestamp" >= p_from and "timestamp" < v_until
+            group by 1, 2
+            having count(*) > 1
+        ), doomed as (
+            delete from currency_rates cr
+            using targets t
+            where cr.currency_id = t.currency_id
+              and cr."timestamp" >= t.bucket
+              and cr."timestamp" < t.bucket + make_interval(secs => p_step)
+              and cr."timestamp" >= p_from and cr."timestamp" < v_until
+            returning cr.currency_id, t.bucket, cr."timestamp", cr.rate, cr.high, cr.low
+        ), merged as (
+            insert into currency_rates (currency_id, "timestamp", rate, high, low)
+            select d.currency_id, d.bucket,
+                   (array_agg(d.rate order by d."timestamp" desc))[1],
+                   max(d.high), min(d.low)
+            from doomed d
+            group by d.currency_id, d.bucket
+            returning 1
+        )
+        select (select count(*) from merged), (select count(*) from doomed), v_until;
+    end if;
+end;
+$$;
+
+-- Delete up to p_limit price rows older than p_before, optionally for one
+-- instrument only. Returns the number of rows deleted.
+create or replace function delete_price_rows(
+    p_kind text,
+    p_before timestamptz,
+    p_limit int,
+    p_instrument_id text default null
+)
+returns bigint
+language plpgsql
+as $$
+declare
+    deleted bigint;
+    -- The id is cast to the column's type once, so the (instrument, timestamp) index applies
+    v_stock_id stock_prices.stock_id%type;
+    v_currency_id currency_rates.currency_id%type;
+begin
+    if p_kind = 'stock' then
+        v_stock_id := p_instrument_id;
+        delete from stock_prices
+        where id in (
+            select id from stock_prices
+            where "timestamp" < p_before
+              and (p_instrument_id is null or stock_id = v_stock_id)
+            limit p_limit
+        );
+    else
+        v_currency_id := p_instrument_id;
+        delete from currency_rates
+        where id in (
+            select id from currency_rates
+            where "timestamp" < p_before
+              and (p_instrument_id is null or currency_id = v_currency_id)
+            limit p_limit
+        );
+    end if;
+    get diagnostics deleted = row_count;
+    return deleted;
+end;
+$$;
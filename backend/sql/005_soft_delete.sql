@@ -0,0 +1,15 @@
+-- Soft delete of instruments: a deleted instrument keeps its row (with
+-- deleted_at set) until the background purge has removed its history in
+-- bounded batches through delete_price_rows (sql/004).
+
+alter table stocks add column if not exists deleted_at timestamptz;
+alter table currencies add column if not exists deleted_at timestamptz;
+
+-- Catalog queries only read live rows; the purge resumes from deleted ones
+create index if not exists stocks_live_symbol_idx on stocks (symbol) where deleted_at is null;
+create index if not exists currencies_live_symbol_idx on currencies (symbol) where deleted_at is null;
+create index if not exists stocks_deleted_idx on stocks (deleted_at) where deleted_at is not null;
+create index if not exists currencies_deleted_idx on currencies (deleted_at) where deleted_at is not null;
+
+-- Per-instrument history lookups of the batched purge use the
+-- (instrument, timestamp) indexes from 002_price_history_window.sql
@@ -0,0 +1,23 @@
+-- Portfolios and their positions. Positions hold TRY-priced instruments
+-- (BIST stocks, or foreign currency valued through its TRY pair); each
+-- portfolio is reported in its base currency.
+
+create table if not exists portfolios (
+    id uuid primary key default gen_random_uuid(),
+    name text not null,
+    base_currency text not null default 'TRY' check (base_currency in ('TRY', 'USD', 'EUR')),
+    created_at timestamptz not null default now(),
+    updated_at timestamptz not null default now()
+);
+
+create table if not exists portfolio_positions (
+    portfolio_id uuid not null references portfolios (id) on delete cascade,
+    kind text not null check (kind in ('stock', 'currency')),
+    instrument_id text not null,
+    quantity double precision not null check (quantity > 0),
+    average_cost double precision not null default 0,  -- per unit, in TRY
+    updated_at timestamptz not null default now(),
+    primary key (portfolio_id, kind, instrument_id)
+);
+
+create index if not exists portfolio_positions_instrument_idx on portfolio_positions (kind, instrument_id);
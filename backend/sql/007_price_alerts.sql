@@ -0,0 +1,18 @@
+-- User price alerts. Active rules are loaded into the alert engine of the
+-- elected evaluator process; fired one-shot rules are marked triggered.
+
+create table if not exists price_alerts (
+    id uuid primary key default gen_random_uuid(),
+    kind text not null check (kind in ('stock', 'currency')),
+    instrument_id text not null,
+    condition text not null check (condition in ('above', 'below', 'move_pct')),
+    threshold double precision not null check (threshold > 0),  -- price, or percent for move_pct
+    reference_price double precision,                           -- move_pct anchor
+    repeat boolean not null default false,
+    status text not null default 'active' check (status in ('active', 'triggered')),
+    created_at timestamptz not null default now(),
+    triggered_at timestamptz,
+    triggered_price double precision
+);
+
+create index if not exists price_alerts_active_idx on price_alerts (kind, instrument_id) where status = 'active';
@@ -0,0 +1,30 @@
+-- Persisted sector / market index series. The analytics leader upserts one
+-- row per scope ('ALL' or a sector) per snapshot bucket: '1m' rows for
+-- intraday charts (pruned after a few days) and one '1d' row per day that
+-- is overwritten until the close.
+
+create table if not exists index_values (
+    scope text not null,
+    resolution text not null check (resolution in ('1m', '1d')),
+    "timestamp" timestamptz not null,
+    cap_weighted double precision,
+    equal_weighted double precision,
+    constituents int not null,
+    advancers int not null,
+    decliners int not null,
+    unchanged int not null,
+    new_highs int not null,
+    new_lows int not null,
+    primary key (scope, resolution, "timestamp")
+);
+
+-- Prior 52-week extremes per stock, the reference for new highs / lows
+create or replace function stock_price_extremes(p_since timestamptz, p_before timestamptz)
+returns table (instrument_id text, high double precision, low double precision)
+language sql stable
+as $$
+    select stock_id::text, max(coalesce(high, close)), min(coalesce(low, close))
+    from stock_prices
+    where "timestamp" >= p_since and "timestamp" < p_before
+    group by stock_id
+$$;
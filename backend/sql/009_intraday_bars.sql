@@ -0,0 +1,19 @@
+-- Intraday bars are upserted on (instrument, bar start) with
+-- ignore-duplicates, so overlapping provider windows and restarts never
+-- store a bar twice. Existing duplicates are removed before the unique
+-- index is built. Databases set up with an earlier 005_soft_delete.sql also
+-- have a plain copy of that index, dropped here.
+
+delete from stock_prices a
+using stock_prices b
+where a.stock_id = b.stock_id and a."timestamp" = b."timestamp" and a.id > b.id;
+
+delete from currency_rates a
+using currency_rates b
+where a.currency_id = b.currency_id and a."timestamp" = b."timestamp" and a.id > b.id;
+
+create unique index if not exists stock_prices_stock_timestamp_key on stock_prices (stock_id, "timestamp");
+create unique index if not exists currency_rates_currency_timestamp_key on currency_rates (currency_id, "timestamp");
+
+drop index if exists stock_prices_stock_timestamp_idx;
+drop index if exists currency_rates_currency_timestamp_idx;
@@ -0,0 +1,22 @@
+-- Bulk write-back of refreshed provider metadata. Market caps follow the
+-- provider; sectors only fill gaps, so curated catalog sectors are kept.
+-- Returns the number of stocks actually changed.
+
+create or replace function update_stock_metadata(p_rows jsonb)
+returns integer
+language sql
+as $$
+    with updated as (
+        update stocks s
+        set market_cap = coalesce(r.market_cap, s.market_cap),
+            sector = coalesce(s.sector, r.sector),
+            updated_at = now()
+        from jsonb_to_recordset(p_rows) as r(symbol text, sector text, market_cap bigint)
+        where s.symbol = r.symbol
+          and s.deleted_at is null
+          and (s.market_cap is distinct from coalesce(r.market_cap, s.market_cap)
+               or (s.sector is null and r.sector is not null))
+        returning 1
+    )
+    select count(*)::integer from updated
+$$;
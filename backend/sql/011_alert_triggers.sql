@@ -0,0 +1,20 @@
+-- Bulk update of fired alerts. One-shot rules are marked triggered;
+-- repeating move_pct rules stay active and re-anchor at the trigger price.
+-- Returns the number of alerts updated.
+
+create or replace function mark_alerts_triggered(p_rows jsonb)
+returns integer
+language sql
+as $$
+    with updated as (
+        update price_alerts a
+        set triggered_at = now(),
+            triggered_price = r.price,
+            reference_price = case when r.reanchor then r.price else a.reference_price end,
+            status = case when r.reanchor then a.status else 'triggered' end
+        from jsonb_to_recordset(p_rows) as r(id uuid, price double precision, reanchor boolean)
+        where a.id = r.id
+        returning 1
+    )
+    select count(*)::integer from updated
+$$;
@@ -0,0 +1,145 @@
+"""
+Price alert engine tests
+"""
+
+import asyncio
+
+import pytest
+
+from config.local_storage import LocalStorageClient
+from services import alert_service as alert_module
+from services.alert_service import FIRED_EVENT, AlertEngine, AlertRule, AlertService, AlertSink
+
+
+def _rule(rule_id, condition, threshold, instrument_id="1", repeat=False, reference_price=None):
+    return AlertRule({
+        "id": rule_id, "kind": "stock", "instrument_id": instrument_id, "condition": condition,
+        "threshold": threshold, "repeat": repeat, "reference_price": reference_price
+    })
+
+
+def _fired(events):
+    return sorted(event["rule_id"] for event in events)
+
+
+def test_ticks_fire_only_crossed_rules_once():
+    """A rise fires the 'above' rules it passed; a fall fires the 'below' ones"""
+    engine = AlertEngine()
+    engine.set_price("stock", "1", 100.0)
+    for rule_id, condition, threshold in [("a", "above", 105), ("b", "above", 110), ("c", "above", 120),
+                                          ("d", "below", 95), ("e", "below", 90)]:
+        assert engine.add(_rule(rule_id, condition, threshold)) == []
+
+    assert _fired(engine.evaluate("stock", "1", 110.0)) == ["a", "b"]
+    assert engine.evaluate("stock", "1", 111.0) == []
+    assert _fired(engine.evaluate("stock", "1", 92.0)) == ["d"]
+    assert engine.evaluate("stock", "1", 115.0) == []
+    assert sorted(engine.rules) == ["c", "e"]
+    assert engine.evaluate("stock", "2", 1.0) == []
+
+
+def test_rule_already_satisfied_fires_on_creation():
+    engine = AlertEngine()
+    engine.set_price("stock", "1", 100.0)
+    assert _fired(engine.add(_rule("a", "above", 90))) == ["a"]
+    assert len(engine) == 0
+
+
+def test_pending_rules_arm_on_first_price():
+    """Without a known price, rules wait for the first tick; move_pct anchors on it"""
+    engine = AlertEngine()
+    engine.add(_rule("a", "below", 50))
+    engine.add(_rule("b", "move_pct", 1.0))
+    assert _fired(engine.evaluate("stock", "1", 40.0)) == ["a"]
+    assert engine.rules["b"].reference_price == 40.0
+    assert _fired(engine.evaluate("stock", "1", 40.5)) == ["b"]
+
+
+def test_repeating_move_rule_reanchors():
+    """A repeating move_pct rule fires on each 1% move from its last trigger price"""
+    engine = AlertEngine()
+    engine.set_price("currency", "7", 32.0)
+    rule = AlertRule({"id": "m", "kind": "currency", "instrument_id": "7", "condition": "move_pct",
+                      "threshold": 1.0, "repeat": True})
+    engine.add(rule)
+
+    assert engine.evaluate("currency", "7", 32.2) == []
+    [event] = engine.evaluate("currency", "7", 32.4)
+    assert (event["reference_price"], event["price"]) == (32.0, 32.4)
+    assert rule.reference_price == 32.4
+    assert engine.evaluate("currency", "7", 32.1) == []
+    assert _fired(engine.evaluate("currency", "7", 32.0)) == ["m"]
+    # Both band edges are re-indexed around the new anchor
+    assert [threshold for _, threshold in rule.entries] == pytest.approx([32.32, 31.68])
+
+
+def test_remove_rule():
+    engine = AlertEngine()
+    engine.set_price("stock", "1", 100.0)
+    engine.add(_rule("a", "above", 105))
+    engine.add(_rule("m", "move_pct", 2.0))
+    engine.remove("a")
+    engine.remove("m")
+    assert engine.evaluate("stock", "1", 200.0) == []
+    assert len(engine.index[("stock", "1")].up) == 0
+
+
+class _FlakySink(AlertSink):
+    def __init__(self, failures):
+        self.failures = failures
+        self.batches = []
+
+    async def deliver(self, events):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("webhook down")
+        self.batches.append([event["rule_id"] for event in events])
+
+
+def test_failed_batches_are_retried_and_marked_in_one_call(monkeypatch):
+    storage = LocalStorageClient()
+    storage.table("price_alerts").insert([
+        {"id": "a", "kind": "stock", "instrument_id": "1", "condition": "above", "threshold": 105.0,
+         "repeat": False, "status": "active"},
+        {"id": "m", "kind": "stock", "instrument_id": "1", "condition": "move_pct", "threshold": 2.0,
+         "reference_price": 100.0, "repeat": True, "status": "active"},
+    ]).execute()
+    rpc_calls = []
+    rpc = storage.rpc
+    monkeypatch.setattr(storage, "rpc", lambda name, params=None: rpc_calls.append(name) or rpc(name, params))
+    monkeypatch.setattr(alert_module, "get_db_client", lambda: storage)
+    monkeypatch.setattr(alert_module.settings, "alert_retry_delay", 0.01)
+
+    sink = _FlakySink(failures=2)
+    service = AlertService(sink)
+
+    async def scenario():
+        service._queue = asyncio.Queue()
+        delivery = asyncio.create_task(service._deliver())
+        service.active = True
+        service.engine.set_price("stock", "1", 100.0)
+        for row in storage.table("price_alerts").select("*").execute().data:
+            service._index(AlertRule(row))
+        service.on_quote({"kind": "stock", "instrument_id": "1", "price": 106.0, "timestamp": "t"})
+        for _ in range(100):
+            if sink.batches:
+                break
+            await asyncio.sleep(0.01)
+        delivery.cancel()
+        await asyncio.gather(delivery, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert [sorted(batch) for batch in sink.batches] == [["a", "m"]]
+    assert rpc_calls == ["mark_alerts_triggered"]
+    assert service.counters["delivery_errors"] == 2 and service.counters["delivered"] == 2
+    alerts = {row["id"]: row for row in storage.table("price_alerts").select("*").execute().data}
+    assert alerts["a"]["status"] == "triggered" and alerts["a"]["triggered_price"] == 106.0
+    assert alerts["m"]["status"] == "active" and alerts["m"]["reference_price"] == 106.0
+
+
+def test_every_worker_keeps_published_fired_alerts():
+    service = AlertService()
+    for rule_id in ("a", "b"):
+        asyncio.run(service.receive_event({"event": FIRED_EVENT, "rule_id": rule_id, "price": 1.0}))
+    assert [event["rule_id"] for event in service.recent_fired] == ["b", "a"]
+    assert "event" not in service.recent_fired[0]
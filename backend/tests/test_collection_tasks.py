@@ -0,0 +1,47 @@
+"""
+Distributed collection tests (in-memory broker, eager execution)
+"""
+
+from services import collection_tasks
+from services.collection_tasks import celery_app, schedule_collection, shard_instruments
+from services.data_collector import DataCollectorService
+
+
+def _instruments(count):
+    return [{"id": str(i), "symbol": f"SYM{i:03d}"} for i in range(count)]
+
+
+def test_shard_instruments_is_stable():
+    """Shards are ordered by symbol and cover every instrument once"""
+    shards = shard_instruments(list(reversed(_instruments(7))), 3)
+    assert [len(shard) for shard in shards] == [3, 3, 1]
+    assert [item["symbol"] for item in shards[0]] == ["SYM000", "SYM001", "SYM002"]
+
+
+def test_schedule_collection_aggregates_shards(monkeypatch):
+    """Every shard is collected and the report sums per-shard results"""
+    # Restored after the test: the Celery app is shared by every module
+    for key, value in (
+        ("broker_url", "memory://"),
+        ("result_backend", "cache+memory://"),
+        ("task_always_eager", True),
+        ("task_eager_propagates", True),
+    ):
+        monkeypatch.setitem(celery_app.conf, key, value)
+    collected = []
+
+    async def fake_collect(self, stocks):
+        collected.extend(stock["symbol"] for stock in stocks)
+        return {"updated": len(stocks) - 1, "missing": 1, "failed": 0}
+
+    monkeypatch.setattr(DataCollectorService, "collect_stocks", fake_collect)
+    monkeypatch.setattr(collection_tasks.settings, "quote_channel_backend", "local")
+
+    summary = schedule_collection("stock", instruments=_instruments(10), shard_size=4).get()
+
+    assert sorted(collected) == [f"SYM{i:03d}" for i in range(10)]
+    assert summary["shards"] == 3
+    assert summary["instruments"] == 10
+    assert summary["updated"] == 7
+    assert summary["missing"] == 3
+    assert [item["shard"] for item in summary["shard_results"]] == [0, 1, 2]
@@ -0,0 +1,70 @@
+"""
+Retention compaction tests
+"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from services import compaction_service
+from services.compaction_service import CompactionJob, RetentionTier, parse_retention_tiers
+
+
+def test_parse_retention_tiers():
+    """Tier specs are parsed and checked for increasing ages and intervals"""
+    assert parse_retention_tiers("raw:7d,5m:90d,1d:forever") == [
+        RetentionTier("raw", 7 * 86400), RetentionTier("5m", 90 * 86400), RetentionTier("1d", None)
+    ]
+    for spec in ("5m:7d,1d:forever", "raw:7d,1d:forever,5m:1y", "raw:90d,5m:7d", "raw:7d,1d:90d,5m:1y", "raw:7x"):
+        with pytest.raises(ValueError):
+            parse_retention_tiers(spec)
+
+
+def test_job_walks_each_window_with_a_cursor(monkeypatch):
+    """Each call starts where the previous slice ended; reclaimed rows add up"""
+    calls = []
+    compact_results = iter([
+        {"buckets": 10, "rows_deleted": 50, "next_from": "2024-04-01T00:00:00+00:00"},  # 5m window
+        {"buckets": 0, "rows_deleted": 0, "next_from": None},
+        {"buckets": 2, "rows_deleted": 24, "next_from": "2024-03-03T00:00:00+00:00"},   # 1d window, to its end
+    ])
+    deletes = iter([7, 0])
+
+    def rpc(name, params):
+        calls.append((name, params))
+        data = [next(compact_results)] if name == "compact_price_bars" else next(deletes)
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=data))
+
+    monkeypatch.setattr(compaction_service, "get_db_client", lambda: SimpleNamespace(rpc=rpc))
+    job = CompactionJob(parse_retention_tiers("raw:7d,5m:90d,1d:5y"), batch_size=100, pause=0)
+    report = job.run(kinds=["currency"], now=datetime(2024, 6, 1, tzinfo=timezone.utc))
+
+    windows = [(params["p_step"], params["p_from"][:10], params["p_to"][:10]) for name, params in calls[:3]]
+    assert windows == [
+        (300, "2024-03-03", "2024-05-25"), (300, "2024-04-01", "2024-05-25"), (86400, "2019-06-03", "2024-03-03")
+    ]
+    assert [name for name, _ in calls[3:]] == ["delete_price_rows", "delete_price_rows"]
+    assert calls[-1][1]["p_before"][:10] == "2019-06-03"
+    assert report["kinds"]["currency"]["5m"]["rows_reclaimed"] == 40
+    assert report["kinds"]["currency"]["5m"]["batches"] == 1
+    assert report["kinds"]["currency"]["expired"] == 7
+    assert report["rows_reclaimed"] == 40 + 22 + 7
+
+
+def test_windows_are_whole_buckets(monkeypatch):
+    """A bar never reaches across a tier boundary into rows of the neighbouring tier"""
+    calls = []
+
+    def rpc(name, params):
+        calls.append(params)
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=[{"buckets": 0, "rows_deleted": 0}]))
+
+    monkeypatch.setattr(compaction_service, "get_db_client", lambda: SimpleNamespace(rpc=rpc))
+    job = CompactionJob(parse_retention_tiers("raw:7d,5m:90d,1d:forever"), pause=0)
+    job.run(kinds=["stock"], now=datetime(2024, 6, 1, 13, 47, 12, tzinfo=timezone.utc))
+
+    five_minute, daily = calls
+    assert five_minute["p_from"] == "2024-03-03T13:50:00+00:00"
+    assert five_minute["p_to"] == "2024-05-25T13:45:00+00:00"
+    assert daily["p_from"] == "-infinity" and daily["p_to"] == "2024-03-03T00:00:00+00:00"
@@ -0,0 +1,49 @@
+"""
+Rolling correlation and beta tests
+"""
+
+import numpy as np
+
+from services.correlation_service import RollingMoments, _Universe, align_prices, log_returns
+
+
+def test_align_prices_forward_fills():
+    """Missing samples take the previous bucket's price"""
+    day = 86400
+    epochs = np.array([0, 10, day, 2 * day], dtype=float)
+    columns = np.array([0, 1, 0, 1])
+    values = np.array([10.0, 20.0, 11.0, 22.0])
+    buckets, prices = align_prices(epochs, columns, values, 2, "1d")
+    assert buckets.tolist() == [0, day, 2 * day]
+    assert prices.tolist() == [[10.0, 20.0], [11.0, 20.0], [11.0, 22.0]]
+
+
+def test_rolling_moments_match_numpy():
+    """Incremental window updates agree with a fresh computation"""
+    returns = np.random.default_rng(3).normal(size=(300, 6))
+    moments = RollingMoments(returns[:50], window=40)
+    for row in returns[50:]:
+        moments.push(row)
+
+    expected = returns[-40:]
+    assert np.allclose(moments.covariance(), np.cov(expected, rowvar=False, bias=True))
+    assert np.allclose(moments.correlation(), np.corrcoef(expected, rowvar=False))
+
+
+def test_universe_closes_bars_from_quotes():
+    """A quote in a new bucket completes the forming bar"""
+    day = 86400
+    instruments = [
+        {"kind": "stock", "id": "1", "symbol": "THYAO"},
+        {"kind": "currency", "id": "9", "symbol": "USDTRY=X"}
+    ]
+    universe = _Universe("1d", instruments, lookback_bars=10)
+    prices = np.array([[100.0, 30.0], [110.0, 33.0]])
+    universe.load(np.array([0, day]), prices)
+    moments = universe.moments(5)
+    assert moments.count == 0
+
+    universe.on_quote("stock", "1", day + 60, 121.0)
+    universe.on_quote("currency", "9", 2 * day + 5, 33.0)
+    assert moments.count == 1
+    assert np.allclose(universe.returns[-1], log_returns(np.array([[100.0, 30.0], [121.0, 33.0]]))[0])
@@ -0,0 +1,76 @@
+"""
+FX cross-rate triangulation tests
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from config.local_storage import LocalStorageClient
+from services import fx_graph as fx_module
+from services.fx_graph import FXGraph, parse_pair
+
+
+def _graph():
+    graph = FXGraph()
+    graph.update("USDTRY=X", 32.0, "2024-01-02T10:00:00", "1")
+    graph.update("EURTRY=X", 35.2, "2024-01-02T10:01:00", "2")
+    graph.update("GBPTRY=X", 40.0, "2024-01-02T10:02:00", "3")
+    return graph
+
+
+def test_parse_pair():
+    """Yahoo, slash and plain pair symbols are understood"""
+    assert parse_pair("USDTRY=X") == ("USD", "TRY")
+    assert parse_pair("eur/usd") == ("EUR", "USD")
+    assert parse_pair("THYAO") is None
+
+
+def test_cross_through_try():
+    """EUR/USD comes from EURTRY / USDTRY"""
+    cross = _graph().cross("eur", "usd")
+    assert cross["rate"] == pytest.approx(1.1)
+    assert cross["path"] == ["EURTRY", "1/USDTRY"]
+    assert cross["derived"] is True
+    assert cross["as_of"] == "2024-01-02T10:00:00"
+
+
+def test_direct_and_inverse_pairs():
+    """Polled pairs are served directly, and their inverse too"""
+    graph = _graph()
+    assert graph.cross("USD", "TRY")["derived"] is False
+    assert graph.cross("TRY", "USD")["rate"] == pytest.approx(1 / 32.0)
+    assert graph.cross("USD", "JPY") is None
+
+
+def test_tick_updates_crosses_and_table():
+    """A tick on one leg moves every cross that uses it"""
+    graph = _graph()
+    graph.on_quote({"kind": "currency", "symbol": "USDTRY=X", "price": 35.2, "timestamp": "t", "instrument_id": "1"})
+    assert graph.cross("EUR", "USD")["rate"] == pytest.approx(1.0)
+    table = graph.table()
+    assert table["GBP"]["EUR"] == pytest.approx(40.0 / 35.2)
+    assert table["TRY"]["TRY"] == 1.0
+
+
+def test_graph_loads_from_latest_quotes_and_history_is_utc(monkeypatch):
+    storage = LocalStorageClient()
+    storage.table('currencies').insert([
+        {'id': '1', 'symbol': 'USDTRY=X', 'deleted_at': None},
+        {'id': '2', 'symbol': 'EURTRY=X', 'deleted_at': None},
+    ]).execute()
+    storage.table('latest_quotes').insert([
+        {'kind': 'currency', 'instrument_id': '1', 'price': 32.0, 'timestamp': '2024-01-02T10:00:00+00:00'},
+        {'kind': 'currency', 'instrument_id': '2', 'price': 35.2, 'timestamp': '2024-01-02T10:00:00+00:00'},
+    ]).execute()
+    storage.table('currency_rates').insert([
+        {'currency_id': '1', 'timestamp': '2024-01-02T00:00:00+00:00', 'rate': 32.0},
+        {'currency_id': '2', 'timestamp': '2024-01-02T00:00:00+00:00', 'rate': 35.2},
+    ]).execute()
+    monkeypatch.setattr(fx_module, 'get_db_client', lambda: storage)
+
+    graph = FXGraph()
+    history = asyncio.run(graph.cross_history('EUR', 'USD', datetime(2024, 1, 1), datetime(2024, 1, 3)))
+    assert graph.cross('EUR', 'USD')['rate'] == pytest.approx(1.1)
+    assert history['rates'][0]['timestamp'] == '2024-01-02T00:00:00+00:00'
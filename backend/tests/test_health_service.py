@@ -0,0 +1,85 @@
+"""
+Background health prober tests
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from services import health_service
+from services.health_service import HealthProber
+
+
+def _no_quotes(monkeypatch):
+    query = SimpleNamespace()
+    for name in ("select", "eq", "order", "limit"):
+        setattr(query, name, lambda *args, **kwargs: query)
+    query.execute = lambda: SimpleNamespace(data=[])
+    monkeypatch.setattr(health_service, "get_db_client", lambda: SimpleNamespace(table=lambda name: query))
+
+
+def test_ready_when_database_up_and_collector_fresh(monkeypatch):
+    """A reachable database and recent writes make the worker ready"""
+    _no_quotes(monkeypatch)
+    monkeypatch.setattr(health_service.db_manager, "ping", lambda: None)
+    prober = HealthProber(interval=1, stale_after={"stock": 60, "currency": 60})
+    prober.add_cache("quotes", lambda: {"quotes": 3})
+    prober.on_quote({"kind": "stock"})
+    prober.on_quote({"kind": "currency"})
+
+    report = asyncio.run(prober.probe())
+    assert report["ready"] is True
+    assert report["collector"]["stock"]["status"] == "fresh"
+    assert report["caches"] == {"quotes": {"quotes": 3}}
+
+
+def test_not_ready_only_when_database_down(monkeypatch):
+    """A failing probe takes the worker out of rotation; a stale shared collector only degrades it"""
+    _no_quotes(monkeypatch)
+
+    def down():
+        raise ConnectionError("refused")
+
+    monkeypatch.setattr(health_service.db_manager, "ping", down)
+    prober = HealthProber(interval=1, stale_after={"stock": 60})
+    report = asyncio.run(prober.probe())
+    assert report["ready"] is False
+    assert report["status"] == "unavailable"
+    assert report["database"] == {"status": "failed", "error": "refused"}
+
+    monkeypatch.setattr(health_service.db_manager, "ping", lambda: None)
+    prober.last_write["stock"] = time.time() - 120
+    report = asyncio.run(prober.probe())
+    assert report["collector"]["stock"]["status"] == "stale"
+    assert report["status"] == "degraded"
+    assert report["ready"] is True
+
+
+def test_intraday_freshness_follows_the_session(monkeypatch):
+    """Outside the session nothing is written, so nothing is stale; on reopening age counts from the open"""
+    _no_quotes(monkeypatch)
+    monkeypatch.setattr(health_service.db_manager, "ping", lambda: None)
+    monkeypatch.setattr(health_service.settings, "collection_bars", "intraday")
+    session = {"open": False}
+    monkeypatch.setattr(health_service, "in_session", lambda kind, now: session["open"])
+
+    prober = HealthProber(interval=1, stale_after={"stock": 60})
+    prober.last_write["stock"] = time.time() - 12 * 3600
+    report = asyncio.run(prober.probe())
+    assert report["collector"]["stock"]["status"] == "closed"
+    assert report["ready"] is True
+
+    session["open"] = True
+    assert asyncio.run(prober.probe())["collector"]["stock"]["status"] == "fresh"
+    prober.session_opened["stock"] -= 120
+    assert asyncio.run(prober.probe())["collector"]["stock"]["status"] == "stale"
+
+
+def test_liveness_follows_probe_loop():
+    """Liveness fails once the probe loop stops cycling"""
+    prober = HealthProber(interval=1)
+    prober._task = object()
+    prober.last_cycle = time.time()
+    assert prober.liveness()["alive"] is True
+    prober.last_cycle = time.time() - 60
+    assert prober.liveness()["alive"] is False
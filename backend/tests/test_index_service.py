@@ -0,0 +1,93 @@
+"""
+Market and sector index tests
+"""
+
+import pytest
+
+from services.index_service import MarketIndices
+
+STOCKS = [
+    {"id": 1, "symbol": "AKBNK", "sector": "Banka", "market_cap": 3000.0},
+    {"id": 2, "symbol": "GARAN", "sector": "Banka", "market_cap": 1000.0},
+    {"id": 3, "symbol": "THYAO", "sector": "Ulaştırma", "market_cap": 2000.0},
+]
+
+
+def _quote(instrument_id, close, open_=None, high=None, low=None, timestamp="2026-10-19T10:00:00+00:00"):
+    return {"kind": "stock", "instrument_id": str(instrument_id), "close": close, "open": open_,
+            "high": high, "low": low, "timestamp": timestamp}
+
+
+def _indices():
+    indices = MarketIndices(base_level=1000.0)
+    quotes = [_quote(1, 30.0, open_=30.0), _quote(2, 10.0, open_=10.0), _quote(3, 20.0, open_=20.0)]
+    extremes = {"1": {"high": 35.0, "low": 25.0}, "3": {"high": 21.0, "low": 15.0}}
+    indices.rebalance(STOCKS, quotes, extremes)
+    return indices
+
+
+def _levels(indices):
+    return {row["scope"]: row for row in indices.snapshot()}
+
+
+def test_levels_start_at_base_and_follow_ticks():
+    indices = _indices()
+    assert {row["cap_weighted"] for row in indices.snapshot()} == {1000.0}
+
+    # AKBNK +10%: half of the market cap, three quarters of the bank sector
+    assert indices.update(_quote(1, 33.0))
+    levels = _levels(indices)
+    assert levels["ALL"]["cap_weighted"] == pytest.approx(1050.0)
+    assert levels["ALL"]["equal_weighted"] == pytest.approx(1000.0 * (1.1 + 1 + 1) / 3)
+    assert levels["Banka"]["cap_weighted"] == pytest.approx(1075.0)
+    assert levels["Ulaştırma"]["cap_weighted"] == pytest.approx(1000.0)
+    assert not indices.update(_quote(9, 1.0))
+
+
+def test_rebalance_keeps_levels_continuous():
+    indices = _indices()
+    indices.update(_quote(3, 24.0))
+    before = _levels(indices)
+
+    stocks = STOCKS + [{"id": 4, "symbol": "PGSUS", "sector": "Ulaştırma", "market_cap": 500.0}]
+    quotes = [_quote(1, 30.0), _quote(2, 10.0), _quote(3, 24.0), _quote(4, 50.0)]
+    indices.rebalance(stocks, quotes, {})
+    after = _levels(indices)
+    for scope in ("ALL", "Ulaştırma"):
+        assert after[scope]["cap_weighted"] == pytest.approx(before[scope]["cap_weighted"])
+        assert after[scope]["equal_weighted"] == pytest.approx(before[scope]["equal_weighted"])
+
+    # The new constituent now carries its weight
+    indices.update(_quote(4, 55.0))
+    assert _levels(indices)["Ulaştırma"]["cap_weighted"] == pytest.approx(1200.0 * (2000 + 550) / 2500)
+
+
+def test_breadth_moves_with_each_tick():
+    indices = _indices()
+    assert _levels(indices)["ALL"]["unchanged"] == 3
+
+    indices.update(_quote(1, 36.0, high=36.0))
+    indices.update(_quote(3, 14.0, low=14.0))
+    levels = _levels(indices)
+    assert [levels["ALL"][name] for name in ("advancers", "decliners", "unchanged", "new_highs", "new_lows")] \
+        == [1, 1, 1, 1, 1]
+    assert (levels["Banka"]["advancers"], levels["Banka"]["new_highs"]) == (1, 1)
+
+    # Falling back inside the range leaves the day's new high standing
+    indices.update(_quote(1, 29.0, high=36.0))
+    levels = _levels(indices)
+    assert (levels["ALL"]["advancers"], levels["ALL"]["decliners"], levels["ALL"]["new_highs"]) == (0, 2, 1)
+
+
+def test_remove_constituent():
+    indices = _indices()
+    indices.update(_quote(1, 33.0))
+    level = _levels(indices)["ALL"]["cap_weighted"]
+    indices.remove("1")
+    levels = _levels(indices)
+    assert levels["ALL"]["cap_weighted"] == pytest.approx(level)
+    assert levels["ALL"]["constituents"] == 2
+    assert levels["Banka"]["advancers"] == 0
+
+    indices.update(_quote(2, 11.0))
+    assert _levels(indices)["ALL"]["cap_weighted"] == pytest.approx(level * (1100 + 2000) / 3000)
@@ -0,0 +1,70 @@
+"""
+Technical indicator tests
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from services import indicator_service as indicator_module
+from services.indicator_service import IndicatorService, _BarSeries
+from services.indicators import EMA, MACD, RSI, SMA, BollingerBands, ema, parse_indicator_spec
+
+PRICES = 100 + np.cumsum(np.random.default_rng(7).normal(size=600))
+
+
+def test_ema_matches_recursive_definition():
+    """Vectorized EMA equals the textbook loop"""
+    period, alpha = 10, 2 / 11
+    expected = [PRICES[:period].mean()]
+    for value in PRICES[period:]:
+        expected.append((1 - alpha) * expected[-1] + alpha * value)
+    assert np.allclose(ema(PRICES, period)[period - 1:], expected)
+
+
+@pytest.mark.parametrize("factory", [
+    lambda: SMA(20), lambda: EMA(12), lambda: RSI(14),
+    lambda: MACD(12, 26, 9), lambda: BollingerBands(20, 2)
+])
+def test_incremental_updates_match_full_compute(factory):
+    """Advancing bar by bar gives the same series as recomputing"""
+    full = factory().compute(PRICES)
+    indicator = factory()
+    indicator.compute(PRICES[:30])
+    steps = [indicator.update(value) for value in PRICES[30:]]
+    for name, series in full.items():
+        incremental = np.array([step[name] for step in steps])
+        assert np.allclose(series[30:], incremental, equal_nan=True)
+
+
+def test_parse_indicator_spec():
+    """Specs map to indicator instances with stable cache keys"""
+    keys = [indicator.key for indicator in parse_indicator_spec("sma:20, macd:12:26:9,bbands:20:2.5")]
+    assert keys == ["sma_20", "macd_12_26_9", "bbands_20_2.5"]
+    with pytest.raises(ValueError):
+        parse_indicator_spec("vwap:10")
+
+
+def test_service_advances_cached_series(monkeypatch):
+    """Quotes in the current bucket replace the last bar, later ones append"""
+    service = IndicatorService()
+    day = 86400
+    buckets = np.arange(100, dtype=np.int64) * day
+
+    monkeypatch.setattr(
+        service, "_load_series",
+        lambda kind, instrument_id, interval, start: _BarSeries(0, buckets, PRICES[:100])
+    )
+    monkeypatch.setattr(indicator_module, "timestamp_to_epoch", lambda value: value)
+
+    result = asyncio.run(service.get_indicators("stock", "1", "1d", "ema:10", days=365000))
+    assert len(result["close"]) == 100
+
+    service.on_quote({"kind": "stock", "instrument_id": "1", "timestamp": 99 * day + 5, "price": 123.0})
+    service.on_quote({"kind": "stock", "instrument_id": "1", "timestamp": 100 * day, "price": 124.0})
+
+    series = service._series[("stock", "1", "1d")]
+    closes = np.concatenate([PRICES[:99], [123.0, 124.0]])
+    assert series.closes == closes.tolist()
+    assert np.allclose(series.tracks["ema_10"].outputs["value"], ema(closes, 10), equal_nan=True)
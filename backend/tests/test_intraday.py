@@ -0,0 +1,140 @@
+"""
+Intraday bar buffer and collection tests
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pandas as pd
+
+from services import data_collector, intraday_service
+from services.data_collector import DataCollectorService
+from services.market_data import MarketDataProvider, frame_to_bars
+from services.intraday_service import IntradayBook, IntradayBuffer
+
+T0 = 1760940000  # 2025-10-20 06:00 UTC, 09:00 in Istanbul
+
+
+def _bar(minute, close, volume=100.0):
+    return {'epoch': T0 + 60 * minute, 'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+            'volume': volume}
+
+
+def test_overlapping_windows_merge_without_duplicates():
+    buffer = IntradayBuffer(capacity=100)
+    assert len(buffer.merge([_bar(0, 10), _bar(1, 11), _bar(2, 12)])) == 3
+    # The next window overlaps two bars; only the revised forming bar and the new one change
+    changed = buffer.merge([_bar(1, 11), _bar(2, 12.5), _bar(3, 13)])
+    assert [bar['epoch'] for bar in changed] == [T0 + 120, T0 + 180]
+    assert len(buffer) == 4
+    assert buffer.session(T0) == {'epoch': T0 + 180, 'open': 10, 'high': 14, 'low': 9, 'close': 13,
+                                  'volume': 400.0}
+
+
+def test_finished_bars_flush_once():
+    buffer = IntradayBuffer(capacity=100)
+    buffer.merge([_bar(0, 10), _bar(1, 11), _bar(2, 12)])
+    # At T0 + 150 the bar starting at T0 + 120 is still forming
+    finished = buffer.finished(T0 + 150, 60)
+    assert [bar['epoch'] for bar in finished] == [T0, T0 + 60]
+    buffer.mark_flushed(finished[-1]['epoch'])
+
+    # Re-delivered flushed bars are ignored, even if the provider revised them
+    assert buffer.merge([_bar(1, 99), _bar(2, 12)]) == []
+    assert [bar['epoch'] for bar in buffer.finished(T0 + 180, 60)] == [T0 + 120]
+
+
+def test_capacity_only_drops_flushed_bars():
+    buffer = IntradayBuffer(capacity=2)
+    buffer.merge([_bar(minute, 10) for minute in range(4)])
+    assert len(buffer) == 4
+    buffer.mark_flushed(T0 + 120)
+    buffer.merge([_bar(4, 10)])
+    assert list(buffer.bars) == [T0 + 180, T0 + 240]
+
+
+def test_followers_trim_mirrored_bars_by_capacity():
+    book = IntradayBook(interval='1m')
+    for minute in range(0, 10, 2):
+        book.on_quote({'kind': 'stock', 'instrument_id': 7, 'bar_interval': '1m',
+                       'bars': [_bar(minute, 10), _bar(minute + 1, 11)]})
+    buffer = book.buffer('stock', 7)
+    buffer.capacity = 4
+    book.on_quote({'kind': 'stock', 'instrument_id': 7, 'bar_interval': '1m', 'bars': [_bar(10, 12)]})
+    # Nothing was flushed here: the leader writes these bars, so the follower only keeps the newest
+    assert list(buffer.bars) == [T0 + 60 * minute for minute in range(7, 11)]
+
+
+def test_frame_to_bars_splits_grouped_download():
+    index = pd.DatetimeIndex([pd.Timestamp(T0, unit='s', tz='UTC'), pd.Timestamp(T0 + 60, unit='s', tz='UTC')])
+    columns = pd.MultiIndex.from_product([['THYAO.IS', 'AKBNK.IS'], ['Open', 'High', 'Low', 'Close', 'Volume']])
+    frame = pd.DataFrame([
+        [10, 11, 9, 10.5, 1000, 20, 21, 19, 20.5, 2000],
+        [10.5, 12, 10, 11.5, 500, None, None, None, None, None]
+    ], index=index, columns=columns)
+
+    bars = frame_to_bars(frame, ['THYAO.IS', 'AKBNK.IS', 'GARAN.IS'])
+    assert [bar['close'] for bar in bars['THYAO.IS']] == [10.5, 11.5]
+    assert bars['AKBNK.IS'] == [{'epoch': T0, 'open': 20.0, 'high': 21.0, 'low': 19.0, 'close': 20.5,
+                                 'volume': 2000.0}]
+    assert 'GARAN.IS' not in bars
+
+
+class _Table:
+    def __init__(self, db, name):
+        self.db, self.name = db, name
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False):
+        self.db.upserts.append((self.name, on_conflict, ignore_duplicates, list(rows)))
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=[])
+
+
+class _Provider(MarketDataProvider):
+    """Serves one scripted window per call on a settable clock"""
+
+    def __init__(self, windows, clock):
+        self.windows, self.clock, self.requests = windows, clock, []
+
+    def now(self):
+        return self.clock
+
+    def intraday_bars(self, symbols, interval, start):
+        self.requests.append(start)
+        return self.windows[len(self.requests) - 1]
+
+
+def test_collect_intraday_emits_session_quote_and_flushes_finished_bars(monkeypatch):
+    db = SimpleNamespace(upserts=[], table=lambda name: _Table(db, name))
+    book = IntradayBook('1m')
+    provider = _Provider([
+        {'THYAO.IS': [_bar(0, 10), _bar(1, 11)]},
+        {'THYAO.IS': [_bar(1, 11), _bar(2, 12)]},
+    ], T0 + 100)
+    requests = provider.requests
+
+    monkeypatch.setattr(data_collector, 'intraday_book', book)
+    monkeypatch.setattr(data_collector, 'get_db_client', lambda: db)
+
+    collector = DataCollectorService(provider)
+    quotes = []
+    collector.add_listener(quotes.append)
+    stock = {'id': '1', 'symbol': 'THYAO'}
+
+    stats = asyncio.run(collector.collect_intraday('stock', [stock]))
+    assert (stats['updated'], stats['flushed']) == (1, 1)
+    assert requests == [None]
+    assert (quotes[0]['open'], quotes[0]['close'], quotes[0]['volume']) == (10, 11, 200)
+
+    provider.clock = T0 + 200
+    stats = asyncio.run(collector.collect_intraday('stock', [stock]))
+    # The second window starts a few bars before the newest known bar
+    assert requests[1] == T0 + 60 - 60 * intraday_service.settings.intraday_overlap_bars
+    assert stats['flushed'] == 2
+    assert [bar['epoch'] for bar in quotes[1]['bars']] == [T0 + 120]
+
+    bar_upserts = [call for call in db.upserts if call[0] == 'stock_prices']
+    assert [row['close'] for call in bar_upserts for row in call[3]] == [10, 11, 12]
+    assert all(call[1:3] == ('stock_id,timestamp', True) for call in bar_upserts)
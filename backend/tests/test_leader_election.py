@@ -0,0 +1,92 @@
+"""
+Collector leader election tests
+"""
+
+import asyncio
+import os
+import socket
+
+from services.leader_election import FileLeaderLock, LeaderElector
+from services.quote_channel import LocalQuoteChannel, UnixSocketQuoteChannel
+
+
+def test_file_lock_single_leader(tmp_path):
+    """Only one holder of the lock file can lead"""
+    async def scenario():
+        path = str(tmp_path / "collector.lock")
+        first, second = FileLeaderLock(path), FileLeaderLock(path)
+        assert await first.acquire()
+        assert not await second.acquire()
+        await first.release()
+        assert await second.acquire()
+        await second.release()
+
+    asyncio.run(scenario())
+
+
+def test_leadership_handover(tmp_path):
+    """A follower takes over once the leader stops"""
+    async def scenario():
+        path = str(tmp_path / "collector.lock")
+        events = []
+
+        def make_elector(name):
+            async def elected():
+                events.append(f"{name}:elected")
+
+            async def demoted():
+                events.append(f"{name}:demoted")
+
+            return LeaderElector(FileLeaderLock(path), elected, demoted, interval=0.01)
+
+        leader, follower = make_elector("a"), make_elector("b")
+        await leader.start()
+        await follower.start()
+        assert leader.is_leader and not follower.is_leader
+
+        await leader.stop()
+        await asyncio.sleep(0.05)
+        assert follower.is_leader
+        await follower.stop()
+        assert events == ["a:elected", "a:demoted", "b:elected", "b:demoted"]
+
+    asyncio.run(scenario())
+
+
+def test_local_channel_fan_out():
+    """Published quotes reach every subscriber"""
+    async def scenario():
+        channel = LocalQuoteChannel()
+        received = []
+        await channel.subscribe(received.append)
+        await channel.subscribe(lambda quote: received.append(quote["symbol"]))
+        await channel.publish({"symbol": "THYAO"})
+        assert received == [{"symbol": "THYAO"}, "THYAO"]
+
+    asyncio.run(scenario())
+
+
+def test_unix_channel_reaches_other_processes_sockets(tmp_path):
+    """Quotes reach every subscribed channel in the directory; dead sockets are dropped"""
+    async def scenario():
+        directory = str(tmp_path / "quotes")
+        leader, follower = UnixSocketQuoteChannel(directory), UnixSocketQuoteChannel(directory)
+        leader_quotes, follower_quotes = [], []
+        await leader.subscribe(leader_quotes.append)
+        await follower.subscribe(follower_quotes.append)
+
+        dead = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        dead.bind(os.path.join(directory, "dead.sock"))
+        dead.close()
+
+        await leader.publish({"symbol": "THYAO", "price": 1.5})
+        await leader.publish({"symbol": "GARAN", "price": 2.5})
+        await asyncio.sleep(0.05)
+        assert follower_quotes == leader_quotes == [{"symbol": "THYAO", "price": 1.5}, {"symbol": "GARAN", "price": 2.5}]
+        assert sorted(os.listdir(directory)) == sorted(os.path.basename(c.path) for c in (leader, follower))
+
+        await follower.close()
+        await leader.close()
+        assert os.listdir(directory) == []
+
+    asyncio.run(scenario())
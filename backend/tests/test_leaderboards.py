@@ -0,0 +1,65 @@
+"""
+Incremental leaderboard tests
+"""
+
+import pytest
+
+from services.leaderboard_service import Leaderboards
+
+
+def _quote(instrument_id, open_, close, volume):
+    return {"instrument_id": instrument_id, "timestamp": "2024-01-02T10:00:00",
+            "open": open_, "close": close, "volume": volume}
+
+
+def _boards():
+    stocks = [
+        {"id": "1", "symbol": "AKBNK", "sector": "Banka"},
+        {"id": "2", "symbol": "GARAN", "sector": "Banka"},
+        {"id": "3", "symbol": "THYAO", "sector": "Ulaştırma"},
+        {"id": "4", "symbol": "PGSUS", "sector": "Ulaştırma"},
+    ]
+    boards = Leaderboards()
+    boards.load(stocks, [
+        _quote("1", 40.0, 41.0, 20e6), _quote("2", 100.0, 98.0, 5e6),
+        _quote("3", 250.0, 260.0, 30e6), _quote("4", 500.0, 490.0, 1e6),
+    ])
+    return boards
+
+
+def _symbols(entries):
+    return [entry["symbol"] for entry in entries]
+
+
+def test_rankings_overall_and_per_sector():
+    boards = _boards()
+    snapshot = boards.snapshot(limit=3)
+    assert _symbols(snapshot["gainers"]) == ["THYAO", "AKBNK"]
+    assert _symbols(snapshot["losers"]) == ["GARAN", "PGSUS"]
+    assert _symbols(snapshot["most_active"]) == ["THYAO", "AKBNK", "GARAN"]
+    assert snapshot["gainers"][0]["change_percent"] == pytest.approx(4.0)
+
+    banks = boards.snapshot(sector="Banka")
+    assert _symbols(banks["gainers"]) == ["AKBNK"]
+    assert _symbols(banks["most_active"]) == ["AKBNK", "GARAN"]
+    assert boards.sectors == ["Banka", "Ulaştırma"]
+
+
+def test_ticks_move_entries_and_refresh_snapshots():
+    boards = _boards()
+    first = boards.snapshot(limit=2)
+    assert boards.snapshot(limit=2) is first
+
+    assert boards.update(_quote("2", 100.0, 110.0, 50e6))
+    snapshot = boards.snapshot(limit=2)
+    assert snapshot is not first
+    assert _symbols(snapshot["gainers"]) == ["GARAN", "THYAO"]
+    assert _symbols(snapshot["most_active"]) == ["GARAN", "THYAO"]
+    assert _symbols(snapshot["losers"]) == ["PGSUS"]
+    # One entry per stock and ranking, in both the overall and sector lists
+    assert len(boards.rankings[("volume", None)]) == 4
+    assert len(boards.rankings[("volume", "Banka")]) == 2
+
+    boards.remove("2")
+    assert _symbols(boards.snapshot(sector="Banka")["most_active"]) == ["AKBNK"]
+    assert not boards.update(_quote("99", 1.0, 1.0, 1.0))
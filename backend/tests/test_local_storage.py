@@ -0,0 +1,85 @@
+"""
+Local storage backend and load generator tests
+"""
+
+import asyncio
+
+import httpx
+
+from benchmarks.load import parse_mix, run_load
+from config import database
+from config.local_storage import LocalStorageClient, seed_synthetic
+
+
+def _storage():
+    storage = LocalStorageClient()
+    storage.table('stocks').insert([
+        {'id': '1', 'symbol': 'THYAO', 'name': 'Turk Hava Yollari', 'sector': 'Ulastirma', 'deleted_at': None},
+        {'id': '2', 'symbol': 'GARAN', 'name': 'Garanti Bankasi', 'sector': 'Banka', 'deleted_at': None},
+        {'id': '3', 'symbol': 'AKBNK', 'name': 'Akbank', 'sector': 'Banka', 'deleted_at': '2026-01-01T00:00:00+00:00'},
+    ]).execute()
+    return storage
+
+
+def test_queries_follow_postgrest_semantics():
+    storage = _storage()
+    response = storage.table('stocks').select('id,symbol', count='exact').is_('deleted_at', 'null')\
+        .or_('name.ilike.%bank%,symbol.ilike.%thy%').order('symbol').range(0, 0).execute()
+    assert response.data == [{'id': '2', 'symbol': 'GARAN'}]
+    assert response.count == 2
+
+    quotes = storage.table('stocks').select('*').in_('sector', ['Banka']).or_('id.in.("1","3")').execute().data
+    assert [row['symbol'] for row in quotes] == ['AKBNK']
+
+    # Timestamps compare as instants whatever their offset
+    storage.table('stock_prices').insert([
+        {'stock_id': '1', 'timestamp': '2026-10-19T10:00:00+00:00', 'close': 1.0},
+        {'stock_id': '1', 'timestamp': '2026-10-19T13:30:00+03:00', 'close': 2.0},
+    ]).execute()
+    rows = storage.table('stock_prices').select('close').eq('stock_id', 1)\
+        .gte('timestamp', '2026-10-19T10:15:00Z').execute().data
+    assert rows == [{'close': 2.0}]
+
+
+def test_writes_keep_indexes_current():
+    storage = _storage()
+    for price, ignore_duplicates in ((1.0, False), (2.0, False), (3.0, True)):
+        storage.table('latest_quotes').upsert(
+            [{'kind': 'stock', 'instrument_id': '1', 'price': price}],
+            on_conflict='kind,instrument_id', ignore_duplicates=ignore_duplicates
+        ).execute()
+    assert storage.table('latest_quotes').select('price').eq('instrument_id', '1').execute().data == [{'price': 2.0}]
+
+    storage.table('stocks').update({'sector': 'Havayolu'}).eq('id', '1').execute()
+    assert storage.table('stocks').select('id').eq('sector', 'Havayolu').execute().data == [{'id': '1'}]
+    storage.table('stocks').delete().eq('id', '1').execute()
+    assert storage.table('stocks').select('id').eq('sector', 'Havayolu').execute().data == []
+
+
+def test_seeded_universe_serves_price_windows():
+    storage = LocalStorageClient()
+    stats = seed_synthetic(storage, 10, history_days=1, interval='1h', seed=1, now=1792400400)
+    assert stats['stocks'] == 10 and stats['latest_quotes'] == 10
+    window = storage.rpc('price_history_window', {'p_kind': 'stock', 'p_ids': ['1', '2'], 'p_points': 3}).execute().data
+    assert [row['instrument_id'] for row in window] == ['1'] * 3 + ['2'] * 3
+    latest = storage.table('latest_quotes').select('price').eq('instrument_id', '1').execute().data[0]
+    assert latest['price'] == window[2]['close']
+
+
+def test_load_run_reports_every_route(monkeypatch):
+    from main import app
+
+    storage = LocalStorageClient()
+    seed_synthetic(storage, 40, history_days=1, seed=3)
+    monkeypatch.setattr(database.db_manager, '_client', storage)
+    universe = storage.table('stocks').select('id,symbol,name,sector').execute().data
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as http:
+            return await run_load(http, universe, parse_mix("browse"), clients=4, duration=0.5, think=0, watchlist_size=5)
+
+    report = asyncio.run(scenario())
+    assert {'GET /quotes (watchlist)', 'GET /stocks?search', 'GET /stocks?page'} <= set(report['routes'])
+    assert report['total']['requests'] > 0
+    assert report['total']['error_rate'] == 0
@@ -0,0 +1,140 @@
+"""
+Market data recording, replay and synthetic provider tests
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from services import data_collector
+from services.data_collector import DataCollectorService
+from services.market_data import RecordingProvider, ReplayProvider, SyntheticProvider, VirtualClock, read_archive
+
+START = 1792400400  # 2026-10-19 10:00 UTC
+
+
+def test_synthetic_bars_are_deterministic_and_consistent():
+    first = SyntheticProvider(seed=7, start=START)
+    second = SyntheticProvider(seed=7, start=START)
+    whole_day = first.intraday_bars(['THYAO.IS', 'GARAN.IS'], '5m', None)
+    assert whole_day == second.intraday_bars(['THYAO.IS', 'GARAN.IS'], '5m', None)
+    assert whole_day['THYAO.IS'] != whole_day['GARAN.IS']
+    assert whole_day['THYAO.IS'] != SyntheticProvider(seed=8, start=START).intraday_bars(['THYAO.IS'], '5m', None)['THYAO.IS']
+
+    # An overlapping later window agrees on the bars both contain
+    window = first.intraday_bars(['THYAO.IS'], '5m', START - 1800)['THYAO.IS']
+    assert window[:-1] == whole_day['THYAO.IS'][-len(window):-1]
+
+    # Daily bars aggregate the same path, and days continue from the previous close
+    daily = first.daily_bars('THYAO.IS')
+    assert len(daily) == 5
+    assert daily[-1]['close'] == whole_day['THYAO.IS'][-1]['close']
+    assert daily[-1]['open'] == daily[-2]['close']
+
+
+def test_virtual_clock_runs_faster_than_real_time():
+    clock = VirtualClock(START, speed=1000)
+
+    async def scenario():
+        started = time.perf_counter()
+        await asyncio.gather(clock.sleep(60), clock.sleep(300))
+        return time.perf_counter() - started
+
+    assert asyncio.run(scenario()) < 1
+    assert clock.now() == START + 300
+
+
+def test_replay_serves_latest_recording_at_virtual_time(tmp_path):
+    path = str(tmp_path / 'market.jsonl.gz')
+    synthetic = SyntheticProvider(start=START, speed=1000)
+    recorder = RecordingProvider(synthetic, path)
+    recorded = [recorder.daily_bars('THYAO.IS')]
+    asyncio.run(recorder.sleep(300))
+    recorded.append(recorder.daily_bars('THYAO.IS'))
+    recorder.close()
+
+    header, records = read_archive(path)
+    assert header['started_at'] == START
+    assert [record['t'] for record in records] == [START, START + 300]
+
+    replay = ReplayProvider(path, speed=1000, start=START - 60)
+    assert replay.daily_bars('THYAO.IS') == []
+    asyncio.run(replay.sleep(60))
+    assert replay.daily_bars('THYAO.IS') == recorded[0]
+    asyncio.run(replay.sleep(299))
+    assert replay.daily_bars('THYAO.IS') == recorded[0]
+    asyncio.run(replay.sleep(1))
+    assert replay.daily_bars('THYAO.IS') == recorded[1]
+
+
+class _Table:
+    def __init__(self, rows, name):
+        self.rows, self.name = rows, name
+
+    def insert(self, row):
+        self.rows.append((self.name, row))
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=[])
+
+
+def test_collector_replay_is_deterministic(tmp_path, monkeypatch):
+    path = str(tmp_path / 'market.jsonl.gz')
+    recorder = RecordingProvider(SyntheticProvider(start=START, speed=1000), path)
+    for symbol in ('THYAO.IS', 'GARAN.IS', 'USDTRY=X'):
+        recorder.daily_bars(symbol)
+    recorder.close()
+
+    stocks = [{'id': '1', 'symbol': 'THYAO'}, {'id': '2', 'symbol': 'GARAN'}]
+    currencies = [{'id': '9', 'symbol': 'USDTRY=X'}]
+
+    def run_once():
+        rows = []
+        monkeypatch.setattr(data_collector, 'get_db_client', lambda: SimpleNamespace(table=lambda name: _Table(rows, name)))
+        collector = DataCollectorService(ReplayProvider(path, speed=1000))
+        stats = asyncio.run(collector.collect_stocks(stocks))
+        asyncio.run(collector.collect_currencies(currencies))
+        return stats, rows
+
+    (stats, rows), (_, again) = run_once(), run_once()
+    assert stats == {'updated': 2, 'missing': 0, 'failed': 0}
+    assert rows == again
+    assert [name for name, _ in rows] == ['stock_prices', 'stock_prices', 'currency_rates']
+    # Rows are stamped with the replay clock, not the wall clock
+    assert datetime.fromisoformat(rows[0][1]['timestamp']).timestamp() == START
+
+
+def test_recording_from_threads_keeps_records_whole(tmp_path):
+    path = str(tmp_path / 'market.jsonl.gz')
+    recorder = RecordingProvider(SyntheticProvider(start=START), path)
+    symbols = [f'S{index}.IS' for index in range(40)]
+
+    async def record():
+        await asyncio.gather(*(asyncio.to_thread(recorder.daily_bars, symbol) for symbol in symbols))
+
+    asyncio.run(record())
+    recorder.close()
+    _, records = read_archive(path)
+    assert sorted(symbol for record in records for symbol in record['bars']) == sorted(symbols)
+
+
+def test_request_scoped_services_share_one_provider(tmp_path, monkeypatch):
+    from services import market_data
+    from services.currency_service import CurrencyService
+    from services.stock_service import StockService
+
+    monkeypatch.setattr(market_data.settings, 'market_data_provider', 'synthetic')
+    monkeypatch.setattr(market_data.settings, 'market_data_record_path', str(tmp_path / 'market.jsonl.gz'))
+    market_data.close_market_data_provider()
+    try:
+        services = [StockService() for _ in range(3)] + [CurrencyService() for _ in range(2)]
+        providers = {id(service.data_collector.provider) for service in services}
+        assert len(providers) == 1
+        assert isinstance(services[0].data_collector.provider, RecordingProvider)
+    finally:
+        market_data.close_market_data_provider()
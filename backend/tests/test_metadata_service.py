@@ -0,0 +1,139 @@
+"""
+Ticker metadata cache tests
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from services import metadata_service as metadata_module
+from services.metadata_service import MetadataCache, MetadataService, parse_ttls
+
+TTLS = parse_ttls("name:30d,sector:7d,market_cap:1d,currency:30d,info:1d")
+INFO = {'longName': 'Turk Hava Yollari', 'sector': 'Industrials', 'marketCap': 400_000_000_000, 'currency': 'TRY'}
+
+
+def test_ttls_are_per_field():
+    cache = MetadataCache(path='', ttls=TTLS)
+    cache.put('stock', 'THYAO', {'name': 'THY', 'market_cap': 1}, now=0)
+    two_days = 2 * 86400
+    assert cache.stale_fields('stock', 'THYAO', ['name', 'market_cap'], now=two_days) == ['market_cap']
+    assert cache.stale_fields('stock', 'THYAO', ['name'], now=two_days) == []
+    assert cache.stale_fields('stock', 'GARAN', ['name'], now=two_days) == ['name']
+
+
+def test_fields_missing_from_a_fetch_keep_their_value():
+    cache = MetadataCache(path='', ttls=TTLS)
+    assert cache.put('stock', 'THYAO', {'sector': 'Industrials', 'market_cap': 5}, now=0) \
+        == {'sector': 'Industrials', 'market_cap': 5}
+    assert cache.put('stock', 'THYAO', {'market_cap': 6}, now=10) == {'market_cap': 6}
+    assert cache.values('stock', 'THYAO')['sector'] == 'Industrials'
+    assert cache.stale_fields('stock', 'THYAO', ['sector'], now=20) == []
+
+
+def test_cache_survives_restart(tmp_path):
+    path = str(tmp_path / 'metadata.json')
+    cache = MetadataCache(path=path, ttls=TTLS)
+    cache.put('stock', 'THYAO', {'name': 'THY', 'market_cap': 5}, now=100)
+    cache.save()
+
+    restored = MetadataCache(path=path, ttls=TTLS)
+    restored.load()
+    assert restored.values('stock', 'THYAO')['market_cap'] == 5
+    assert restored.stale_fields('stock', 'THYAO', ['market_cap'], now=100 + 3600) == []
+
+
+def test_stale_values_are_served_while_one_refresh_runs(tmp_path, monkeypatch):
+    calls = []
+
+    def fetcher(kind, symbol):
+        calls.append(symbol)
+        return {**INFO, 'marketCap': INFO['marketCap'] + len(calls)}
+
+    rpc_calls = []
+    db = SimpleNamespace(rpc=lambda name, params: rpc_calls.append((name, params)) or
+                         SimpleNamespace(execute=lambda: SimpleNamespace(data=1)))
+    monkeypatch.setattr(metadata_module, 'get_db_client', lambda: db)
+    monkeypatch.setattr(metadata_module.settings, 'metadata_flush_delay', 0)
+
+    cache = MetadataCache(path=str(tmp_path / 'metadata.json'), ttls=TTLS)
+    service = MetadataService(cache, fetcher)
+
+    async def scenario():
+        # First read waits for the provider
+        first = await service.get('stock', 'THYAO', ('sector', 'market_cap'))
+        assert first == {'sector': 'Industrials', 'market_cap': INFO['marketCap'] + 1}
+
+        # Age the market cap past its TTL: reads return the old value at once
+        for field, (fetched_at, value) in list(cache.entries[('stock', 'THYAO')].items()):
+            cache.entries[('stock', 'THYAO')][field] = (fetched_at - 2 * 86400, value)
+        stale = await asyncio.gather(*(service.get('stock', 'THYAO', ('market_cap',)) for _ in range(5)))
+        assert {read['market_cap'] for read in stale} == {INFO['marketCap'] + 1}
+        await asyncio.gather(*service.refreshing.values())
+        await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert calls == ['THYAO', 'THYAO']
+    assert cache.values('stock', 'THYAO')['market_cap'] == INFO['marketCap'] + 2
+
+    # Both changes went back to the catalog, coalesced per flush
+    written = [row['market_cap'] for _, params in rpc_calls for row in params['p_rows']]
+    assert written[-1] == INFO['marketCap'] + 2
+    assert all(name == 'update_stock_metadata' for name, _ in rpc_calls)
+    assert service.pending_writes == {}
+
+
+def test_failed_fetches_are_not_retried_at_once(monkeypatch):
+    calls = []
+
+    def fetcher(kind, symbol):
+        calls.append(symbol)
+        raise ConnectionError("provider down")
+
+    monkeypatch.setattr(metadata_module.settings, 'metadata_retry_after', 60)
+    service = MetadataService(MetadataCache(path='', ttls=TTLS), fetcher)
+    service.persist = False
+
+    async def reads():
+        return [await service.get('stock', 'NEWCO', ('name',)) for _ in range(5)]
+
+    assert asyncio.run(reads()) == [{'name': None}] * 5
+    assert calls == ['NEWCO']
+    assert service.cache_stats()['failed'] == 1
+
+    service.failed[('stock', 'NEWCO')] -= 61
+    asyncio.run(reads())
+    assert calls == ['NEWCO', 'NEWCO']
+
+
+def test_only_the_persisting_process_saves(tmp_path):
+    path = tmp_path / 'metadata.json'
+    cache = MetadataCache(path=str(path), ttls=TTLS)
+    cache.put('stock', 'THYAO', {'name': 'THY'}, now=100)
+    service = MetadataService(cache, lambda kind, symbol: INFO)
+
+    service.persist = False
+    service.flush()
+    assert not path.exists()
+
+    service.persist = True
+    service.flush()
+    assert path.exists()
+    assert [item.name for item in tmp_path.iterdir()] == ['metadata.json']
+
+
+def test_concurrent_first_reads_share_one_fetch(monkeypatch):
+    calls = []
+
+    def fetcher(kind, symbol):
+        calls.append(symbol)
+        return INFO
+
+    monkeypatch.setattr(metadata_module.settings, 'metadata_flush_delay', 0)
+    service = MetadataService(MetadataCache(path='', ttls=TTLS), fetcher)
+    service.persist = False
+
+    async def reads():
+        return await asyncio.gather(*(service.get('stock', 'THYAO', ('name',)) for _ in range(10)))
+
+    assert asyncio.run(reads()) == [{'name': 'Turk Hava Yollari'}] * 10
+    assert calls == ['THYAO']
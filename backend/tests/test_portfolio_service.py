@@ -0,0 +1,63 @@
+"""
+Vectorized portfolio valuation tests
+"""
+
+import pytest
+
+from services import portfolio_service as portfolio_module
+from services.fx_graph import FXGraph
+from services.portfolio_service import PortfolioBook, PortfolioService
+
+
+def _book():
+    book = PortfolioBook()
+    book.set_portfolio({"id": "a", "name": "TRY book", "base_currency": "TRY"}, [
+        {"kind": "stock", "instrument_id": "1", "quantity": 10, "average_cost": 90.0},
+        {"kind": "currency", "instrument_id": "7", "quantity": 100, "average_cost": 30.0},
+    ])
+    book.set_portfolio({"id": "b", "name": "USD book", "base_currency": "USD"}, [
+        {"kind": "stock", "instrument_id": "1", "quantity": 4, "average_cost": 100.0},
+        {"kind": "stock", "instrument_id": "2", "quantity": 1, "average_cost": 50.0},
+    ])
+    book.compile()
+    return book
+
+
+def test_revalue_all_portfolios_in_one_pass():
+    """Positions are priced in TRY, summed per portfolio and converted to each base currency"""
+    book = _book()
+    book.set_price("stock", "1", 100.0)
+    book.set_price("currency", "7", 32.0)
+    book.revalue({"TRY": 1.0, "USD": 32.0, "EUR": 35.0})
+
+    first, second = book.summary(book.rows["a"]), book.summary(book.rows["b"])
+    assert first["value"] == pytest.approx(10 * 100.0 + 100 * 32.0)
+    assert first["pnl"] == pytest.approx(4200.0 - 3900.0)
+    # Stock 2 has no price yet: counted as unpriced and left out of value and cost
+    assert second["value"] == pytest.approx(400.0 / 32.0)
+    assert second["cost"] == pytest.approx(400.0 / 32.0)
+    assert second["unpriced_positions"] == 1
+
+    detail = book.detail(book.rows["b"])
+    assert [position["price"] for position in detail["positions"]] == [100.0, None]
+    assert detail["position_count"] == 2
+
+
+def test_ticks_revalue_through_the_fx_graph(monkeypatch):
+    """A stock tick reprices its holders; a currency tick moves the USD/EUR bases"""
+    graph = FXGraph()
+    graph.update("USDTRY=X", 32.0, "2024-01-02T10:00:00", "7")
+    monkeypatch.setattr(portfolio_module, "fx_graph", graph)
+
+    service = PortfolioService(_book())
+    service.loaded = True
+    service.on_quote({"kind": "stock", "instrument_id": "1", "price": 100.0})
+    assert service.book.summary(service.book.rows["b"])["value"] == pytest.approx(400.0 / 32.0)
+
+    graph.update("USDTRY=X", 40.0, "2024-01-02T10:05:00", "7")
+    service.on_quote({"kind": "currency", "instrument_id": "7", "price": 40.0})
+    assert service.book.summary(service.book.rows["b"])["value"] == pytest.approx(400.0 / 40.0)
+    assert service.book.summary(service.book.rows["a"])["value"] == pytest.approx(1000.0 + 4000.0)
+
+    service.invalidate("stock", "1")
+    assert service.book.summary(service.book.rows["a"])["unpriced_positions"] == 1
@@ -0,0 +1,70 @@
+"""
+Price history resampling and fast serialization tests
+"""
+
+import orjson
+from starlette.requests import Request
+
+from app.responses import COLUMNAR_MEDIA_TYPE, FastJSONResponse, decode_columnar, encode_columnar, wants_columnar
+from schemas.stock import StockPrice
+from services.price_history import history_columns, history_rows, resample_ohlcv, rows_to_columns, with_changes
+
+
+def _row(minute, close, volume=100):
+    return {
+        "timestamp": f"2024-01-02T10:{minute:02d}:00+00:00",
+        "open": close - 0.5, "high": close + 1, "low": close - 1, "close": close, "volume": volume
+    }
+
+
+def _bars():
+    rows = [_row(0, 10.0), _row(2, 12.0), _row(4, 11.0), _row(5, 13.0, volume=50)]
+    return with_changes("stock", resample_ohlcv("stock", rows_to_columns("stock", rows), "5m"))
+
+
+def test_resample_ohlcv():
+    """Samples collapse into bars with first/max/min/last/sum semantics"""
+    bars = _bars()
+    assert bars["open"].tolist() == [9.5, 12.5]
+    assert bars["high"].tolist() == [13.0, 14.0]
+    assert bars["low"].tolist() == [9.0, 12.0]
+    assert bars["close"].tolist() == [11.0, 13.0]
+    assert bars["volume"].tolist() == [300.0, 50.0]
+    assert bars["change"][1] == 2.0
+
+
+def test_rows_and_columns_agree():
+    """Row layout validates against StockPrice and matches the column layout"""
+    bars = _bars()
+    rows = history_rows("stock", "1", bars)
+    prices = [StockPrice(**row) for row in rows]
+    assert prices[1].price == 13.0 and prices[1].volume == 50
+
+    body = orjson.loads(FastJSONResponse({"prices": history_columns("stock", bars)}).body)
+    assert body["prices"]["close"] == [price.price for price in prices]
+    assert body["prices"]["volume"] == [300, 50]
+    assert body["prices"]["timestamp"] == [row["timestamp"] for row in rows]
+
+
+def test_columnar_stream_round_trip():
+    """Chunked packed columns decode back to the same arrays"""
+    bars = _bars()
+    columns = history_columns("stock", bars)
+    chunks = list(encode_columnar(columns, {"stock_id": "1", "interval": "5m"}, chunk_rows=1))
+    assert len(chunks) == 4  # header, two single-row chunks, terminator
+
+    header, decoded = decode_columnar(b"".join(chunks))
+    assert header["rows"] == 2 and header["interval"] == "5m"
+    assert decoded["timestamp"].tolist() == bars["epoch"].tolist()
+    assert decoded["close"].tolist() == [11.0, 13.0]
+    assert decoded["volume"].dtype.str == "<i8"
+
+
+def test_accept_negotiation():
+    """Only an acceptable columnar media type selects the binary format"""
+    def request(accept):
+        return Request({"type": "http", "headers": [(b"accept", accept.encode())]})
+
+    assert wants_columnar(request(f"{COLUMNAR_MEDIA_TYPE}, application/json;q=0.5"))
+    assert not wants_columnar(request(f"application/json, {COLUMNAR_MEDIA_TYPE};q=0"))
+    assert not wants_columnar(request("*/*"))
@@ -0,0 +1,54 @@
+"""
+List endpoint price embedding tests
+"""
+
+from schemas.currency import CurrencyWithLatestRate
+from schemas.stock import StockWithLatestPrice
+from services import price_windows
+from services.price_windows import attach_prices
+
+STOCK = {
+    "id": "1", "symbol": "THYAO", "name": "Türk Hava Yolları", "sector": "Transport",
+    "market_cap": None, "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00"
+}
+
+
+def _bar(day, close):
+    return {
+        "id": f"p{day}", "instrument_id": "1", "timestamp": f"2024-01-0{day}T18:00:00",
+        "open": close - 1, "high": close + 1, "low": close - 2, "close": close, "volume": 1000
+    }
+
+
+def test_history_window_fetched_once(monkeypatch):
+    """All rows share one window call; latest comes from the window"""
+    calls = []
+
+    def fake_windows(kind, ids, points):
+        calls.append((kind, ids, points))
+        return {"1": [_bar(1, 100.0), _bar(2, 110.0), _bar(3, 99.0)]}
+
+    monkeypatch.setattr(price_windows, "fetch_price_windows", fake_windows)
+    rows = attach_prices("stock", [STOCK, {**STOCK, "id": "2", "symbol": "GARAN"}], 2, {})
+
+    assert calls == [("stock", ["1", "2"], 3)]
+    first = StockWithLatestPrice(**rows[0])
+    assert [price.price for price in first.price_history] == [110.0, 99.0]
+    assert first.price_history[0].change_percent == 10.0
+    assert first.latest_price.price == 99.0
+    assert rows[1]["latest_price"] is None
+
+
+def test_latest_from_quotes_without_history(monkeypatch):
+    """Without history the latest-quote lookup fills latest_rate"""
+    monkeypatch.setattr(price_windows, "fetch_price_windows", lambda *args: {})
+    currency = {
+        "id": "9", "symbol": "USDTRY=X", "name": "USD/TRY",
+        "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00"
+    }
+    quote = {"kind": "currency", "instrument_id": "9", "timestamp": "2024-01-02T10:00:00", "rate": 32.1, "close": None}
+
+    rows = attach_prices("currency", [currency], 0, {"9": quote})
+    row = CurrencyWithLatestRate(**rows[0])
+    assert row.latest_rate.rate == 32.1
+    assert row.rate_history == []
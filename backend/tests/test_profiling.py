@@ -0,0 +1,122 @@
+"""
+Server-Timing instrumentation and sampling profiler tests
+"""
+
+import asyncio
+import re
+import time
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from config import database
+from config.local_storage import LocalStorageClient, seed_synthetic
+from config.settings import settings
+from app.instrumentation import profile_lock
+from main import app
+from utils.profiling import SamplingProfiler, phase, start_request
+
+client = TestClient(app, base_url="http://localhost")
+
+
+def _use_local_storage(monkeypatch):
+    storage = LocalStorageClient()
+    seed_synthetic(storage, 20, history_days=1, seed=5)
+    monkeypatch.setattr(database.db_manager, '_client', storage)
+
+
+def _server_timing(response):
+    return {
+        name: float(duration)
+        for name, duration in re.findall(r'(\w+);dur=([\d.]+)', response.headers['server-timing'])
+    }
+
+
+def test_nested_phases_are_exclusive():
+    timings = start_request()
+    with phase('app'):
+        time.sleep(0.02)
+        with phase('db'):
+            time.sleep(0.03)
+        with phase('serialize'):
+            time.sleep(0.01)
+    assert 0.03 <= timings.phases['db'] < 0.05
+    assert 0.02 <= timings.phases['app'] < 0.03
+    assert timings.calls['db'] == 1
+    assert sum(timings.phases.values()) <= timings.total()
+
+
+def test_responses_carry_server_timing(monkeypatch):
+    _use_local_storage(monkeypatch)
+    response = client.get("/api/v1/stocks/", params={"size": 5, "history": 3})
+    assert response.status_code == 200
+    timings = _server_timing(response)
+    assert {'db', 'app', 'serialize', 'total'} <= set(timings)
+    assert timings['db'] + timings['app'] + timings['serialize'] <= timings['total'] + 0.5
+    assert 'desc="2 calls"' in response.headers['server-timing']
+
+
+def test_request_profile_is_admin_only(monkeypatch):
+    _use_local_storage(monkeypatch)
+    monkeypatch.setattr(settings, 'profiling_enabled', True)
+    monkeypatch.setattr(settings, 'admin_token', 'secret')
+
+    assert client.get("/api/v1/stocks/", headers={"X-Profile": "1"}).status_code == 403
+    assert client.get("/api/v1/stocks/", headers={"X-Profile": "1", "X-Admin-Token": "wrong"}).status_code == 403
+
+    response = client.get("/api/v1/stocks/1/prices", params={"interval": "1h"},
+                          headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.headers['x-profiled-status'] == '200'
+    assert 'profile-api-v1-stocks-1-prices.folded' in response.headers['content-disposition']
+    assert all(re.fullmatch(r'\S+ \d+', line) for line in response.text.splitlines())
+
+    monkeypatch.setattr(settings, 'profiling_enabled', False)
+    assert client.post("/api/v1/data/profile/collector", headers={"X-Admin-Token": "secret"}).status_code == 404
+
+
+def test_collector_profile_runs_on_the_leader_alone(monkeypatch):
+    monkeypatch.setattr(settings, 'profiling_enabled', True)
+    monkeypatch.setattr(settings, 'admin_token', 'secret')
+    cycles = []
+
+    async def run_cycle(kind):
+        cycles.append(kind)
+
+    monkeypatch.setattr(app.state, 'data_collector', SimpleNamespace(run_cycle=run_cycle), raising=False)
+    elector = SimpleNamespace(is_leader=False)
+    headers = {"X-Admin-Token": "secret"}
+
+    # Distributed mode (no elector) and followers must not collect
+    assert client.post("/api/v1/data/profile/collector", headers=headers).status_code == 503
+    monkeypatch.setattr(app.state, 'collector_elector', elector, raising=False)
+    assert client.post("/api/v1/data/profile/collector", headers=headers).status_code == 409
+    elector.is_leader = True
+
+    asyncio.run(profile_lock.acquire())
+    try:
+        assert client.post("/api/v1/data/profile/collector", headers=headers).status_code == 409
+        assert client.get("/api/v1/stocks/", headers={"X-Profile": "1", **headers}).status_code == 409
+    finally:
+        profile_lock.release()
+    assert cycles == []
+
+    response = client.post("/api/v1/data/profile/collector", params={"kind": "currency"}, headers=headers)
+    assert response.status_code == 200
+    assert cycles == ['currency']
+    assert not profile_lock.locked()
+
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+
+def test_sampler_collapses_stacks():
+    with SamplingProfiler(interval=0.001) as profiler:
+        _busy(0.1)
+    assert profiler.samples > 10
+    busy = [stack for stack in profiler.stacks if 'test_profiling:_busy' in stack]
+    assert busy and all(stack.startswith('MainThread;') for stack in busy)
+    assert profiler.collapsed().splitlines()[0].rsplit(' ', 1)[1].isdigit()
@@ -0,0 +1,106 @@
+"""
+Soft delete and background purge tests
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from services import purge_service
+from services.purge_service import InstrumentPurger
+from services.quote_channel import LocalQuoteChannel
+
+
+class _Query:
+    """Records the filters of one PostgREST call and applies it on execute"""
+
+    def __init__(self, storage, table, action, values=None):
+        self.storage, self.table, self.action, self.values = storage, table, action, values
+        self.filters = []
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: str(row.get(column)) == str(value))
+        return self
+
+    def is_(self, column, value):
+        self.filters.append(lambda row: row.get(column) is None)
+        return self
+
+    def execute(self):
+        rows = self.storage.tables.setdefault(self.table, [])
+        matched = [row for row in rows if all(check(row) for check in self.filters)]
+        if self.action == 'update':
+            for row in matched:
+                row.update(self.values)
+        elif self.action == 'delete':
+            self.storage.tables[self.table] = [row for row in rows if row not in matched]
+        return SimpleNamespace(data=matched)
+
+
+class _Table:
+    def __init__(self, storage, name):
+        self.storage, self.name = storage, name
+
+    def update(self, values):
+        return _Query(self.storage, self.name, 'update', values)
+
+    def delete(self):
+        return _Query(self.storage, self.name, 'delete')
+
+
+class _Storage:
+    def __init__(self, history_rows):
+        self.tables = {
+            'stocks': [{'id': '1', 'symbol': 'THYAO', 'deleted_at': None}],
+            'latest_quotes': [{'kind': 'stock', 'instrument_id': '1'}]
+        }
+        self.history_rows = history_rows
+        self.calls = []
+
+    def table(self, name):
+        return _Table(self, name)
+
+    def rpc(self, name, params):
+        self.calls.append(params)
+        deleted = min(params['p_limit'], self.history_rows)
+        self.history_rows -= deleted
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=deleted))
+
+
+def test_soft_delete_evicts_everywhere_and_purges_in_batches(monkeypatch):
+    """The instrument leaves every worker's caches at once; history goes in bounded batches"""
+    storage = _Storage(history_rows=25)
+    monkeypatch.setattr(purge_service, 'get_db_client', lambda: storage)
+
+    async def scenario():
+        channel = LocalQuoteChannel()
+        leader, worker = InstrumentPurger(batch_size=10, pause=0), InstrumentPurger(batch_size=10, pause=0)
+        evicted = []
+        leader.add_listener(lambda kind, instrument_id: evicted.append(('leader', kind, instrument_id)))
+        worker.add_listener(lambda kind, instrument_id: evicted.append(('worker', kind, instrument_id)))
+        await leader.attach_channel(channel)
+        await worker.attach_channel(channel)
+
+        job = await leader.soft_delete('stock', '1')
+        assert storage.tables['stocks'][0]['deleted_at'] is not None
+        assert storage.tables['latest_quotes'] == []
+        assert evicted == [('leader', 'stock', '1'), ('worker', 'stock', '1')]
+
+        await asyncio.gather(*leader._tasks.values())
+        assert await leader.soft_delete('stock', '1') is job
+        return job
+
+    job = asyncio.run(scenario())
+    assert (job.status, job.rows_deleted, job.batches) == ('done', 25, 3)
+    assert [call['p_limit'] for call in storage.calls] == [10, 10, 10, 10]
+    assert {call['p_instrument_id'] for call in storage.calls} == {'1'}
+    assert storage.tables['stocks'] == []
+
+
+def test_soft_delete_unknown_instrument(monkeypatch):
+    """Nothing is scheduled for an instrument that does not exist"""
+    storage = _Storage(history_rows=0)
+    monkeypatch.setattr(purge_service, 'get_db_client', lambda: storage)
+
+    purger = InstrumentPurger(batch_size=10, pause=0)
+    assert asyncio.run(purger.soft_delete('stock', '404')) is None
+    assert purger.progress() == []
@@ -0,0 +1,84 @@
+"""
+Bulk latest-quote tests
+"""
+
+import asyncio
+
+from config.local_storage import LocalStorageClient
+from services import quote_service as quote_module
+from services.quote_service import ID_BATCH_SIZE, QuoteService
+
+
+def _quote(kind, instrument_id, symbol, price, timestamp="2024-01-02T10:00:00"):
+    return {
+        "kind": kind, "instrument_id": instrument_id, "symbol": symbol,
+        "timestamp": timestamp, "price": price, "close": price
+    }
+
+
+def test_hot_quotes_need_no_query(monkeypatch):
+    """Quotes seen from the collector are served from memory"""
+    service = QuoteService()
+    service.on_quote(_quote("stock", "1", "THYAO", 300.0))
+    service.on_quote(_quote("currency", "9", "USDTRY=X", 32.0))
+    monkeypatch.setattr(service, "_fetch", lambda *args: (_ for _ in ()).throw(AssertionError("queried")))
+
+    result = asyncio.run(service.get_latest_quotes(ids=["1"], symbols=["usdtry=x"]))
+    assert sorted(quote["symbol"] for quote in result["quotes"]) == ["THYAO", "USDTRY=X"]
+    assert result["missing"] == []
+
+
+def test_misses_fetched_in_one_query(monkeypatch):
+    """Everything not in memory comes from a single latest_quotes query"""
+    service = QuoteService()
+    service.on_quote(_quote("stock", "1", "THYAO", 300.0))
+    calls = []
+
+    def fetch(kinds, ids, symbols):
+        calls.append((kinds, ids, symbols))
+        return [_quote("stock", "2", "GARAN", 100.0)]
+
+    monkeypatch.setattr(service, "_fetch", fetch)
+    result = asyncio.run(service.get_latest_quotes(kind="stock", ids=["1", "2", "3"], symbols=["GARAN"]))
+
+    assert calls == [(["stock"], ["2", "3"], ["GARAN"])]
+    assert result["count"] == 2
+    assert result["missing"] == ["3"]
+
+
+def test_older_quote_does_not_replace_newer():
+    """Out-of-order delivery keeps the most recent quote"""
+    service = QuoteService()
+    service.on_quote(_quote("stock", "1", "THYAO", 301.0, "2024-01-02T10:05:00"))
+    service.on_quote(_quote("stock", "1", "THYAO", 299.0, "2024-01-02T10:00:00"))
+    assert service.cache.get("stock", "1")["price"] == 301.0
+
+
+def test_large_lookups_are_batched(monkeypatch):
+    """Every query's `or` filter stays within ID_BATCH_SIZE values"""
+    storage = LocalStorageClient()
+    storage.table("latest_quotes").insert(
+        [_quote("stock", str(index), f"SYM{index}", float(index)) for index in range(250)]
+    ).execute()
+    queries = []
+    table = storage.table
+
+    def counting_table(name):
+        query = table(name)
+        original = query.or_
+
+        def or_(filters):
+            queries.append(filters.count('"'))
+            return original(filters)
+
+        query.or_ = or_
+        return query
+
+    monkeypatch.setattr(storage, "table", counting_table)
+    monkeypatch.setattr(quote_module, "get_db_client", lambda: storage)
+    ids = [str(index) for index in range(200)]
+    result = asyncio.run(QuoteService().get_latest_quotes(kind="stock", ids=ids, symbols=["SYM240", "NOPE"]))
+
+    assert result["count"] == 201
+    assert result["missing"] == ["NOPE"]
+    assert len(queries) == 3 and max(queries) <= 2 * ID_BATCH_SIZE
@@ -0,0 +1,69 @@
+"""
+Columnar stock screener tests
+"""
+
+import pytest
+
+from services.screener_service import StockScreener
+
+
+def _screener():
+    stocks = [
+        {"id": "1", "symbol": "AKBNK", "name": "Akbank", "sector": "Banka", "market_cap": 150e9},
+        {"id": "2", "symbol": "GARAN", "name": "Garanti BBVA", "sector": "Banka", "market_cap": 300e9},
+        {"id": "3", "symbol": "THYAO", "name": "Türk Hava Yolları", "sector": "Ulaştırma", "market_cap": 400e9},
+        {"id": "4", "symbol": "NEWCO", "name": "No quotes yet", "sector": None, "market_cap": None},
+    ]
+    quotes = [
+        {"instrument_id": "1", "timestamp": "2024-01-02T10:00:00", "open": 40.0, "high": 41.5, "low": 39.5, "close": 41.0, "volume": 20e6},
+        {"instrument_id": "2", "timestamp": "2024-01-02T10:00:00", "open": 100.0, "high": 101.0, "low": 99.0, "close": 101.0, "volume": 5e6},
+        {"instrument_id": "3", "timestamp": "2024-01-02T10:00:00", "open": 250.0, "high": 260.0, "low": 250.0, "close": 258.0, "volume": 30e6},
+    ]
+    screener = StockScreener()
+    screener.load(stocks, quotes)
+    return screener
+
+
+def test_screen_filters_with_vectorized_masks():
+    """'Banks up more than 2% with volume above 10M'"""
+    result = _screener().screen(where='sector == "Banka" and change_percent > 2 and volume > 10e6')
+    assert result["count"] == 1
+    [row] = result["results"]
+    assert row["symbol"] == "AKBNK"
+    assert row["change_percent"] == pytest.approx(2.5)
+    assert row["turnover"] == pytest.approx(41.0 * 20e6)
+
+    assert _screener().screen(where='symbol in ["GARAN", "THYAO"] and not price < 200')["count"] == 1
+    assert _screener().screen(where="1 < change_percent <= 3.2")["count"] == 2
+
+
+def test_sort_limit_and_missing_values():
+    """Sorting puts missing values last; fields project the output"""
+    result = _screener().screen(sort="-change_percent", limit=3, fields=["symbol", "change_percent"])
+    assert [row["symbol"] for row in result["results"]] == ["THYAO", "AKBNK", "GARAN"]
+    assert set(result["results"][0]) == {"symbol", "change_percent"}
+
+    result = _screener().screen(sort="market_cap")
+    assert [row["symbol"] for row in result["results"]] == ["AKBNK", "GARAN", "THYAO", "NEWCO"]
+    assert result["results"][-1]["price"] is None
+
+
+def test_ticks_update_rows_in_place():
+    screener = _screener()
+    screener.on_quote({"kind": "stock", "instrument_id": "2", "timestamp": "2024-01-02T10:05:00",
+                       "open": 100.0, "high": 104.0, "low": 99.0, "close": 104.0, "volume": 12e6, "price": 104.0})
+    assert screener.screen(where="change_percent > 3.5 and volume > 10e6", fields=["symbol"])["results"] == [{"symbol": "GARAN"}]
+
+    screener.on_quote({"kind": "stock", "instrument_id": "99", "timestamp": "2024-01-02T10:05:00", "price": 1.0})
+    assert screener.stale
+
+    screener.invalidate("stock", "2")
+    assert screener.screen(where='symbol == "GARAN"')["count"] == 0
+
+
+@pytest.mark.parametrize("expression", [
+    "__import__('os')", "price.real > 1", "unknown > 1", "price >", "symbol > 5", "price"
+])
+def test_rejects_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        _screener().screen(where=expression)
@@ -0,0 +1,138 @@
+"""
+Parquet snapshot export/import tests
+"""
+
+from types import SimpleNamespace
+
+from services import snapshot_service
+from services.snapshot_service import ParquetSnapshot
+
+
+class _Query:
+    """Minimal PostgREST builder over in-memory rows"""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.start, self.stop = 0, None
+
+    def select(self, columns):
+        return self
+
+    def order(self, column, desc=False):
+        self.rows.sort(key=lambda row: row[column], reverse=desc)
+        return self
+
+    def eq(self, column, value):
+        self.rows = [row for row in self.rows if str(row[column]) == str(value)]
+        return self
+
+    def gte(self, column, value):
+        self.rows = [row for row in self.rows if row[column] >= value[:19]]
+        return self
+
+    def lt(self, column, value):
+        self.rows = [row for row in self.rows if row[column] < value[:19]]
+        return self
+
+    def is_(self, column, value):
+        self.rows = [row for row in self.rows if row.get(column) is None]
+        return self
+
+    def gt(self, column, value):
+        self.rows = [row for row in self.rows if row[column] > value]
+        return self
+
+    def limit(self, count):
+        self.stop = count
+        return self
+
+    def range(self, start, stop):
+        self.start, self.stop = start, stop + 1
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=self.rows[self.start:self.stop])
+
+
+class _Storage:
+    def __init__(self, tables, stats=()):
+        self.tables, self.stats, self.upserts = tables, list(stats), []
+
+    def table(self, name):
+        storage = self
+
+        class _Table(_Query):
+            def upsert(self, rows, on_conflict=None):
+                storage.upserts.append((name, rows))
+                return self
+
+        return _Table(self.tables.get(name, []))
+
+    def rpc(self, name, params):
+        return _Query([row for row in self.stats if row["kind"] == params["p_kind"]])
+
+
+def _price(instrument_id, timestamp, close):
+    return {"id": f"{instrument_id}-{timestamp}", "stock_id": instrument_id, "timestamp": timestamp,
+            "open": close, "high": close, "low": close, "close": close, "volume": 1}
+
+
+def _source():
+    prices = [_price("1", "2024-01-30T18:00:00", 10.0), _price("1", "2024-02-01T18:00:00", 11.0)]
+    stats = [
+        {"kind": "stock", "instrument_id": "1", "month": "2024-01", "row_count": 1, "max_timestamp": "2024-01-30T18:00:00"},
+        {"kind": "stock", "instrument_id": "1", "month": "2024-02", "row_count": 1, "max_timestamp": "2024-02-01T18:00:00"}
+    ]
+    stocks = [{"id": "1", "symbol": "THYAO", "name": "Türk Hava Yolları", "created_at": "2024-01-01T00:00:00"}]
+    return _Storage({"stocks": stocks, "stock_prices": prices}, stats)
+
+
+def test_export_only_changed_partitions(tmp_path):
+    """A second run rewrites only the partition whose stats moved"""
+    source = _source()
+    snapshot = ParquetSnapshot(str(tmp_path), source)
+    assert snapshot.export(kinds=["stock"])["written"] == 2
+
+    source.tables["stock_prices"].append(_price("1", "2024-02-02T18:00:00", 12.0))
+    source.stats[1].update(row_count=2, max_timestamp="2024-02-02T18:00:00")
+    summary = snapshot.export(kinds=["stock"])
+    assert (summary["written"], summary["unchanged"], summary["rows"]) == (1, 1, 2)
+
+    source.stats.pop(0)
+    assert snapshot.export(kinds=["stock"])["removed"] == 1
+    assert len(snapshot.partition_files("stock")) == 1
+
+
+def test_manifest_is_checkpointed_not_saved_per_partition(tmp_path, monkeypatch):
+    """A long export saves the manifest every few partitions plus once at the end"""
+    prices = [_price("1", f"2020-{month:02d}-15T18:00:00", float(month)) for month in range(1, 13)]
+    stats = [
+        {"kind": "stock", "instrument_id": "1", "month": f"2020-{month:02d}", "row_count": 1,
+         "max_timestamp": f"2020-{month:02d}-15T18:00:00"}
+        for month in range(1, 13)
+    ]
+    source = _Storage({"stocks": [{"id": "1", "symbol": "THYAO"}], "stock_prices": prices}, stats)
+    snapshot = ParquetSnapshot(str(tmp_path), source)
+    saves = []
+    save = snapshot._save_manifest
+    monkeypatch.setattr(snapshot, "_save_manifest", lambda manifest: saves.append(len(manifest["partitions"])) or save(manifest))
+    monkeypatch.setattr(snapshot_service, "MANIFEST_SAVE_PARTITIONS", 5)
+
+    assert snapshot.export(kinds=["stock"])["written"] == 12
+    assert saves == [5, 10, 12]
+    assert len(snapshot.load_manifest()["partitions"]) == 12
+
+
+def test_import_round_trip(tmp_path):
+    """Imported rows match the exported storage rows"""
+    snapshot = ParquetSnapshot(str(tmp_path), _source())
+    snapshot.export(kinds=["stock"])
+
+    target = _Storage({})
+    summary = snapshot.import_into(target, kinds=["stock"], batch_size=1, workers=2)
+    assert summary == {"instruments": 1, "rows": 2, "files": 2}
+
+    rows = sorted((row for table, batch in target.upserts if table == "stock_prices" for row in batch),
+                  key=lambda row: row["timestamp"])
+    assert [row["close"] for row in rows] == [10.0, 11.0]
+    assert rows[0]["timestamp"] == "2024-01-30T18:00:00+00:00"
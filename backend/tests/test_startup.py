@@ -0,0 +1,39 @@
+"""
+Startup profiling and readiness tests
+"""
+
+import asyncio
+
+import pytest
+
+from utils.startup import StartupProfile
+
+
+async def _fail():
+    raise ConnectionError("database unreachable")
+
+
+def test_background_check_does_not_hold_startup():
+    """A failing background probe is reported, not raised"""
+    async def scenario():
+        startup = StartupProfile()
+        await startup.check("database", _fail, background=True)
+        with startup.phase("collector"):
+            pass
+        startup.finish()
+        assert startup.checks["database"]["status"] == "pending"
+        await asyncio.sleep(0)
+        return startup.report()
+
+    report = asyncio.run(scenario())
+    assert report["ready"] is False
+    assert report["checks"]["database"]["error"] == "database unreachable"
+    assert set(report["phases_ms"]) == {"database", "collector"}
+
+
+def test_foreground_check_failure_aborts_startup():
+    """Without fast start a failed probe stops startup as before"""
+    startup = StartupProfile()
+    with pytest.raises(ConnectionError):
+        asyncio.run(startup.check("database", _fail))
+    assert startup.ready is False
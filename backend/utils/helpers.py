@@ -81,6 +81,33 @@ def get_time_intervals() -> List[Dict[str, str]]:
         {"value": "1mo", "label": "1 Ay"}
     ]
 
+INTERVAL_SECONDS = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "1h": 3600,
+    "1d": 86400
+}
+
+def parse_timestamp(value: Any) -> datetime:
+    """Parse an ISO timestamp string (as returned by Supabase) into a datetime"""
+    if isinstance(value, datetime):
+        return value
+    text = str(value)
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    return datetime.fromisoformat(text)
+
+def timestamp_to_epoch(value: Any) -> float:
+    """Convert a datetime or ISO timestamp string to epoch seconds"""
+    return parse_timestamp(value).timestamp()
+
+def bucket_epoch(epoch: float, interval: str) -> int:
+    """Start (epoch seconds) of the interval bucket containing epoch"""
+    step = INTERVAL_SECONDS[interval]
+    return int(epoch // step) * step
+
 def sanitize_input(input_str: str, max_length: int = 100) -> str:
     """Sanitize user input"""
     if not input_str:
@@ -97,14 +124,17 @@ def sanitize_input(input_str: str, max_length: int = 100) -> str:
     return sanitized
 
 def log_api_request(endpoint: str, method: str, user_id: Optional[str] = None, 
-                   params: Optional[Dict] = None):
+                   params: Optional[Dict] = None, status: Optional[int] = None,
+                   timings: Optional[Dict] = None):
     """Log API request for monitoring"""
     log_data = {
         "endpoint": endpoint,
         "method": method,
         "timestamp": datetime.now().isoformat(),
         "user_id": user_id,
-        "params": params
+        "params": params,
+        "status": status,
+        "timings": timings
     }
     
     logger.info(f"API Request: {log_data}")
@@ -0,0 +1,217 @@
+"""
+Per-request phase timings and an in-process sampling profiler
+
+`RequestTimings` splits a request's time into storage calls, service logic
+and serialization. Phases nest exclusively on the request's own thread: time
+inside a storage call is not also counted as service logic. Storage calls
+made from worker threads (`asyncio.to_thread`) are added to `db` as well but
+overlap the awaiting phase.
+
+`SamplingProfiler` samples every thread's Python stack at a fixed interval
+and renders the counts as collapsed stacks ("frame;frame;frame count"), the
+input format of flamegraph.pl, speedscope and inferno.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+PHASES = ('db', 'app', 'serialize')
+
+_current: ContextVar[Optional["RequestTimings"]] = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Exclusive time per phase of one request, in seconds"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.calls: Counter = Counter()
+        self.thread = threading.get_ident()
+        self._stack: List[List] = []  # [phase, resumed_at]
+
+    def enter(self, name: str):
+        now = time.perf_counter()
+        if self._stack:
+            self._charge(self._stack[-1], now)
+        self._stack.append([name, now])
+        self.calls[name] += 1
+
+    def exit(self):
+        now = time.perf_counter()
+        self._charge(self._stack.pop(), now)
+        if self._stack:
+            self._stack[-1][1] = now
+
+    def _charge(self, frame: List, now: float):
+        self.phases[frame[0]] = self.phases.get(frame[0], 0.0) + now - frame[1]
+
+    def add(self, name: str, seconds: float):
+        """Time spent off the request's thread"""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        self.calls[name] += 1
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def header(self) -> str:
+        """Server-Timing header value (milliseconds)"""
+        entries = [
+            f"{name};dur={self.phases[name] * 1000:.1f}" + (f';desc="{self.calls[name]} calls"' if name == 'db' else '')
+            for name in PHASES if name in self.phases
+        ]
+        entries.append(f"total;dur={self.total() * 1000:.1f}")
+        return ", ".join(entries)
+
+    def report(self) -> Dict[str, float]:
+        report = {f"{name}_ms": round(self.phases[name] * 1000, 2) for name in PHASES if name in self.phases}
+        report['total_ms'] = round(self.total() * 1000, 2)
+        report['db_calls'] = self.calls['db']
+        return report
+
+
+def start_request() -> "RequestTimings":
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Attribute the enclosed time to `name` in the current request, if any"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    if threading.get_ident() != timings.thread:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings.add(name, time.perf_counter() - started)
+        return
+    timings.enter(name)
+    try:
+        yield
+    finally:
+        timings.exit()
+
+
+class TimedQuery:
+    """Query builder proxy that times `execute()` as a storage call"""
+
+    __slots__ = ('_query',)
+
+    def __init__(self, query):
+        self._query = query
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._query, name)
+        if name == 'execute':
+            return self._execute
+        if not callable(attribute):
+            return attribute
+
+        def chained(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            return TimedQuery(result) if hasattr(result, 'execute') else result
+        return chained
+
+    def _execute(self, *args, **kwargs):
+        with phase('db'):
+            return self._query.execute(*args, **kwargs)
+
+
+class TimedClient:
+    """Storage client proxy whose table() / rpc() builders are timed"""
+
+    __slots__ = ('_client',)
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name: str) -> TimedQuery:
+        return TimedQuery(self._client.table(name))
+
+    def rpc(self, name: str, params: Optional[Dict] = None) -> TimedQuery:
+        return TimedQuery(self._client.rpc(name, params))
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+
+# Innermost frames of threads that are waiting, not working
+IDLE_FRAMES = {('selectors', 'select'), ('threading', 'wait'), ('queue', 'get'), ('selectors', 'poll')}
+
+
+def _frame_name(frame) -> str:
+    module = frame.f_globals.get('__name__', '?')
+    return f"{module}:{frame.f_code.co_name}"
+
+
+class SamplingProfiler:
+    """Samples all threads' stacks from a background thread"""
+
+    def __init__(self, interval: float = 0.001, max_seconds: float = 60, include_idle: bool = False):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def __enter__(self) -> "SamplingProfiler":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        deadline = time.perf_counter() + self.max_seconds
+        while not self._stop.wait(self.interval) and time.perf_counter() < deadline:
+            self.sample(own, names)
+
+    def sample(self, skip: Optional[int] = None, names: Optional[Dict[int, str]] = None):
+        names = names if names is not None else {}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == skip:
+                continue
+            module = frame.f_globals.get('__name__', '?').split('.')[-1]
+            if not self.include_idle and (module, frame.f_code.co_name) in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if thread_id not in names:
+                names.update({thread.ident: thread.name for thread in threading.enumerate()})
+            stack.append(names.get(thread_id, str(thread_id)))
+            self.stacks[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def collapsed(self) -> str:
+        """One "root;...;leaf count" line per distinct stack"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
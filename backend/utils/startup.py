@@ -0,0 +1,81 @@
+"""
+Startup profiling and readiness of warm-up steps
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """Per-phase startup timings, plus warm-up checks that may finish after startup"""
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = started if started is not None else time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.checks: Dict[str, Dict[str, Any]] = {}
+        self.ready_after: Optional[float] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def record(self, name: str, since: float):
+        self.phases[name] = round((time.perf_counter() - since) * 1000, 1)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a blocking startup phase"""
+        since = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, since)
+
+    async def check(self, name: str, probe: Callable[[], Awaitable[Any]], background: bool = False):
+        """
+        Run a warm-up probe. In the foreground its failure aborts startup;
+        in the background it is timed and reported without holding startup.
+        """
+        self.checks[name] = {'status': 'pending', 'background': background}
+
+        async def run():
+            since = time.perf_counter()
+            try:
+                await probe()
+                self.checks[name]['status'] = 'ok'
+            except Exception as e:
+                self.checks[name].update(status='failed', error=str(e))
+                if not background:
+                    raise
+                logger.error(f"Startup check {name} failed: {e}")
+            finally:
+                self.record(name, since)
+
+        if background:
+            self._tasks[name] = asyncio.create_task(run())
+        else:
+            await run()
+
+    def finish(self):
+        """Mark the point where the app starts serving"""
+        self.ready_after = round((time.perf_counter() - self.started) * 1000, 1)
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_after is not None and all(check['status'] == 'ok' for check in self.checks.values())
+
+    async def close(self):
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'ready': self.ready,
+            'serving_after_ms': self.ready_after,
+            'phases_ms': self.phases,
+            'checks': self.checks
+        }